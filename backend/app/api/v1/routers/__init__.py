@@ -4,6 +4,6 @@ from __future__ import annotations
 
 from importlib import import_module
 
-# 自动导入 chat 与 export 路由，以便 main.py 只需 include_router
-for _mod in ("chat", "export"):
+# 自动导入 chat、export 与 ws 路由，以便 main.py 只需 include_router
+for _mod in ("chat", "export", "ws"):
     import_module(f"backend.app.api.v1.routers.{_mod}") 
\ No newline at end of file
@@ -1,12 +1,19 @@
 from __future__ import annotations
 
-from typing import List, Dict, Optional
+import asyncio
+import functools
+from contextlib import aclosing
+from typing import Any, AsyncGenerator, Callable, List, Dict, Optional, Tuple
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 
+from backend.app.core import stream_format
+from backend.app.core.config import settings
 from backend.app.core.logging_config import logger
 from backend.app.manager import LLMManager
+from backend.app.services.model_catalog import catalog_etag
 
 router = APIRouter(prefix="/api")
 
@@ -19,10 +26,9 @@ except Exception:
     import os
     _default_provider = os.getenv("DEFAULT_PROVIDER", "silicon")
 
-if not _manager.initialize_provider(_default_provider):
-    logger.warning("无法初始化默认 provider '%s'", _default_provider)
-else:
-    logger.info("成功初始化 provider: %s", _default_provider)
+# 仅选定默认 provider，构造与 API 密钥校验由 lifespan 中的后台预热完成，不阻塞导入
+_manager.select_provider(_default_provider)
+logger.info("默认 provider: %s（启动后后台预热）", _default_provider)
 
 
 class ChatRequest(BaseModel):
@@ -31,6 +37,19 @@ class ChatRequest(BaseModel):
     context_window: Optional[int] = None
     messages: Optional[List[Dict[str, str]]] = None
     model: str
+    # 本次请求使用的 provider；为空时依次回退到会话默认（见 /provider/switch）与进程默认
+    provider: Optional[str] = None
+    # 回复缓存开关：None 跟随 RESPONSE_CACHE_MODE，True 显式启用，False 绕过
+    cache: Optional[bool] = None
+
+
+class BatchItem(ChatRequest):
+    # 调用方自定义的条目标识，原样回显在结果行中
+    id: Optional[str] = None
+
+
+class BatchRequest(BaseModel):
+    items: List[BatchItem]
 
 
 class ChatResponse(BaseModel):
@@ -40,40 +59,120 @@ class ChatResponse(BaseModel):
 
 class ProviderSwitchRequest(BaseModel):
     provider_name: str
+    # 指定时只设置该会话的默认 provider，不影响其它会话与进程默认
+    session_id: Optional[str] = None
 
 
 @router.post("/provider/switch")
 async def switch_provider(request: ProviderSwitchRequest):
-    """切换当前 Provider。"""
-    if _manager.initialize_provider(request.provider_name):
-        return {
-            "status": "switched",
-            "current_provider": request.provider_name,
-            "models": _manager.get_available_models(),
-        }
-    raise HTTPException(status_code=400, detail=f"无法切换到 provider: {request.provider_name}")
+    """切换 Provider。
+
+    带 ``session_id`` 时设置该会话的默认 provider（保存在 session_repo 中），
+    后续未显式指定 ``provider`` 的该会话请求都使用它。不带 ``session_id`` 时只校验 provider 并返回其模型列表，
+    不修改进程默认，也不影响其它用户；尚无会话的客户端应在聊天请求中携带 ``provider``。
+    """
+    try:
+        await _manager.aresolve_provider(request.provider_name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    models = await _manager.aget_available_models(request.provider_name)
+    if not request.session_id:
+        return {"status": "selected", "current_provider": request.provider_name, "models": models}
+
+    await asyncio.to_thread(_manager.session_repo.set_provider, request.session_id, request.provider_name)
+    return {
+        "status": "switched",
+        "session_id": request.session_id,
+        "current_provider": request.provider_name,
+        "models": models,
+    }
+
+
+@router.get("/health")
+async def health():
+    """就绪检查：当前 provider 预热校验通过时返回 200，启动中或校验失败时返回 503。"""
+    report = _manager.health()
+    return JSONResponse(report, status_code=200 if report["status"] == "ready" else 503)
+
+
+@router.get("/health/live")
+async def liveness():
+    """存活检查：进程能处理请求即返回 200，不依赖上游。"""
+    return {"status": "alive"}
 
 
 @router.get("/models")
-async def get_models():
-    """返回当前 Provider 可用模型列表。"""
-    return {"models": _manager.get_available_models()}
+async def get_models(
+    request: Request,
+    provider: Optional[str] = Query(None),
+    session_id: Optional[str] = Query(None),
+):
+    """返回 Provider 可用模型列表；支持 ETag / If-None-Match，列表未变化时返回 304。
+
+    ``?provider=`` 指定 provider，``?session_id=`` 使用该会话的默认 provider，都未给出时为进程默认。
+    """
+    models = await _manager.aget_available_models(provider, session_id)
+    etag = catalog_etag(models)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _if_none_match(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse({"models": models}, headers=headers)
+
+
+def _if_none_match(value: Optional[str], etag: str) -> bool:
+    """If-None-Match 是否命中当前 ETag（RFC 9110 §13.1.2：``*`` 匹配任意当前表示，按弱比较忽略 W/ 前缀）。"""
+    if not value:
+        return False
+    if value.strip() == "*":
+        return True
+    current = _opaque_tag(etag)
+    return any(_opaque_tag(tag) == current for tag in value.split(","))
+
+
+def _opaque_tag(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+@router.get("/models/catalog/stats")
+async def model_catalog_stats():
+    """模型目录缓存的命中 / 过期命中 / 刷新统计。"""
+    return _manager.model_catalog.stats()
+
+
+@router.get("/cache/stats")
+async def cache_stats():
+    """回复缓存的命中率、占用与查询耗时；``semantic`` 字段为语义缓存的同类统计，
+    ``single_flight`` 字段为进行中请求合并的统计。"""
+    stats = {**_manager.response_cache.stats(), "semantic": _manager.semantic_cache.stats()}
+    if _manager.single_flight is not None:
+        stats["single_flight"] = _manager.single_flight.stats()
+    return stats
+
+
+@router.get("/routing/stats")
+async def routing_stats():
+    """多 provider 路由各后端的 EWMA 延迟、首字延迟与错误率，以及对冲请求统计。"""
+    if _manager.model_router is None:
+        return {"enabled": False, "routes": {}}
+    stats = {"enabled": True, "strategy": _manager.model_router.strategy, "routes": _manager.model_router.stats()}
+    if _manager.hedging is not None:
+        stats["hedging"] = _manager.hedging.stats()
+    return stats
+
+
+@router.get("/http/stats")
+async def http_stats():
+    """上游 HTTP 连接池占用：进行中请求（按 host）、活动 / 空闲连接、DNS 缓存命中等，用于规划连接池大小。"""
+    from backend.app.core.http_transport import http_transport  # 延迟导入，避免启动时加载 httpx
+
+    return http_transport.stats()
 
 
 @router.post("/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest):
     """聊天接口，兼容带会话记忆和完整 messages 两种模式。"""
-    if request.user_message is not None:
-        session_id = request.session_id or _generate_session_id()
-        result = _manager.chat_with_memory(
-            session_id=session_id,
-            user_message=request.user_message,
-            model=request.model,
-            context_window=request.context_window,
-        )
-    else:
-        result = _manager.chat(messages=request.messages or [], model=request.model)
-
+    result = await _chat_result(request)
     if isinstance(result, dict) and result.get("status") == "success":
         return ChatResponse(response=result["response"], session_id=result.get("session_id"))
 
@@ -81,10 +180,203 @@ async def chat(request: ChatRequest):
     raise HTTPException(status_code=500, detail=result.get("error", "未知错误"))
 
 
+@router.post("/chat/batch")
+async def chat_batch(request: BatchRequest):
+    """批量聊天：并发处理多条相互独立的会话，按完成顺序以 NDJSON 返回。
+
+    每行对应一项 ``{"index", "id", "status", "response" | "error", "session_id"}``，
+    最后一行为 ``{"type": "summary", "total", "succeeded", "failed"}``。
+    同一 provider 的并发数受 ``BATCH_PROVIDER_CONCURRENCY`` 限制，多个批次共享该上限。
+    """
+    from backend.app.services.batch import provider_concurrency, run_batch  # 延迟导入
+
+    if len(request.items) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"批量条目数超过上限 {settings.BATCH_MAX_ITEMS}")
+
+    # 条目可指定不同 provider，各自受对应 provider 的并发上限约束
+    # 会话默认 provider 存在 session_repo 中，一次性在线程池里解析，避免逐条阻塞事件循环
+    names = await asyncio.to_thread(
+        lambda: [_manager.provider_name_for(item.provider, item.session_id) for item in request.items]
+    )
+    semaphores = [provider_concurrency.semaphore(name or "default") for name in names]
+    jobs = [functools.partial(_chat_result, item) for item in request.items]
+
+    async def lines() -> AsyncGenerator[str, None]:
+        succeeded = 0
+        async with aclosing(run_batch(jobs, semaphores)) as results:
+            async for index, result in results:
+                item = request.items[index]
+                line: Dict[str, Any] = {"index": index, "id": item.id, "status": result.get("status", "error")}
+                if line["status"] == "success":
+                    succeeded += 1
+                    line["response"] = result.get("response")
+                else:
+                    line["error"] = result.get("error", "未知错误")
+                if result.get("session_id"):
+                    line["session_id"] = result["session_id"]
+                yield stream_format.encode_ndjson(line)
+        total = len(request.items)
+        yield stream_format.encode_ndjson(
+            {"type": "summary", "total": total, "succeeded": succeeded, "failed": total - succeeded}
+        )
+
+    return StreamingResponse(lines(), media_type=stream_format.NDJSON_MEDIA_TYPE, headers=_STREAM_HEADERS)
+
+
+@router.post("/chat/stream")
+async def chat_stream(
+    request: ChatRequest,
+    http_request: Request,
+    wire_format: Optional[str] = Query(None, alias="format"),
+):
+    """流式聊天接口，每个 provider 增量到达即推送。
+
+    默认使用 delta-v1 帧格式（见 ``backend.app.core.stream_format``），``?format=verbose`` 可切回旧格式；
+    ``Accept: application/x-ndjson`` 时以 NDJSON 输出，否则为 SSE。
+    带 ``user_message`` 时使用会话记忆，流结束后写入 session_repo。
+
+    delta-v1 格式下生成在后台进行并可续传：响应头 ``X-Stream-Id`` 给出流 id，
+    断线后可通过 ``GET /api/chat/stream/{stream_id}`` 携带 ``Last-Event-ID`` 继续接收。
+    """
+    wire_format = wire_format or settings.STREAM_FORMAT
+    if wire_format not in stream_format.SUPPORTED_FORMATS:
+        raise HTTPException(status_code=400, detail=f"不支持的流格式: {wire_format}")
+
+    headers = {**_STREAM_HEADERS, "X-Stream-Format": wire_format}
+    session_id, events = stream_events(request)
+    if wire_format == stream_format.FORMAT_VERBOSE:
+        frames = stream_format.verbose_frames(events)
+    else:
+        start_meta: Dict[str, Any] = {"session_id": session_id} if session_id else {}
+        resumable = settings.STREAM_RESUME_ENABLED
+        if resumable:
+            from backend.app.services.stream_resume import stream_registry  # 延迟导入
+
+            # 保留的流已满且都在进行中时退化为不可续传的直接推送
+            resumable = stream_registry.has_room()
+        if resumable:
+            stream_id = _generate_session_id()
+            start_meta["stream_id"] = stream_id
+            headers["X-Stream-Id"] = stream_id
+        frames = stream_format.delta_frames(
+            events,
+            start_meta=start_meta or None,
+            coalesce_chars=settings.STREAM_COALESCE_CHARS,
+            coalesce_ms=settings.STREAM_COALESCE_MS,
+        )
+        if resumable:
+            stream_registry.start(stream_id, frames)
+            frames = stream_registry.subscribe(stream_id)
+
+    encode, media_type = _negotiate_encoding(http_request)
+    return StreamingResponse(_encode_frames(frames, encode), media_type=media_type, headers=headers)
+
+
+@router.get("/chat/stream/{stream_id}")
+async def resume_chat_stream(
+    stream_id: str,
+    http_request: Request,
+    last_event_id: Optional[int] = Query(None),
+):
+    """续传流式响应：补发 ``Last-Event-ID``（或 ``?last_event_id=``）之后的帧并继续实时推送。"""
+    from backend.app.services.stream_resume import StreamExpired, StreamNotFound, stream_registry
+
+    if last_event_id is None:
+        header = http_request.headers.get("last-event-id")
+        try:
+            last_event_id = int(header) if header else -1
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"无效的 Last-Event-ID: {header}")
+
+    frames = stream_registry.subscribe(stream_id, after_seq=last_event_id)
+    try:
+        first = await frames.__anext__()
+    except StreamNotFound:
+        raise HTTPException(status_code=404, detail=f"流不存在或已过期: {stream_id}")
+    except StreamExpired:
+        raise HTTPException(status_code=410, detail=f"seq {last_event_id} 之后的部分帧已淘汰，无法续传")
+    except StopAsyncIteration:
+        first = None
+
+    encode, media_type = _negotiate_encoding(http_request)
+    headers = {**_STREAM_HEADERS, "X-Stream-Format": stream_format.FORMAT_DELTA, "X-Stream-Id": stream_id}
+    return StreamingResponse(_encode_frames(_prepend(first, frames), encode), media_type=media_type, headers=headers)
+
+
 # ---------------------------------------------------------------------------
 # 工具函数
 # ---------------------------------------------------------------------------
 
+async def _chat_result(request: ChatRequest) -> Dict[str, Any]:
+    """按请求模式调用 manager 的异步接口，返回其结果字典。"""
+    if request.user_message is not None:
+        return await _manager.achat_with_memory(
+            session_id=request.session_id or _generate_session_id(),
+            user_message=request.user_message,
+            model=request.model,
+            context_window=request.context_window,
+            use_cache=request.cache,
+            provider_name=request.provider,
+        )
+    return await _manager.achat(
+        messages=request.messages or [], model=request.model, use_cache=request.cache, provider_name=request.provider
+    )
+
+
+def stream_events(request: ChatRequest) -> Tuple[Optional[str], AsyncGenerator[Dict[str, Any], None]]:
+    """根据请求选择会话记忆 / 完整 messages 模式，返回 (session_id, manager 事件流)。"""
+    if request.user_message is None:
+        return None, _manager.chat_stream(
+            messages=request.messages or [], model=request.model, provider_name=request.provider
+        )
+
+    session_id = request.session_id or _generate_session_id()
+    events = _manager.chat_stream_with_memory(
+        session_id=session_id,
+        user_message=request.user_message,
+        model=request.model,
+        context_window=request.context_window,
+        provider_name=request.provider,
+    )
+    return session_id, events
+
+
+# 禁止中间代理缓冲 / 缓存，保证增量即时到达浏览器
+_STREAM_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def _negotiate_encoding(http_request: Request) -> Tuple[Callable[[Dict[str, Any]], str], str]:
+    """按 Accept 头选择 NDJSON 或 SSE。"""
+    if stream_format.NDJSON_MEDIA_TYPE in http_request.headers.get("accept", ""):
+        return stream_format.encode_ndjson, stream_format.NDJSON_MEDIA_TYPE
+    return stream_format.encode_sse, stream_format.SSE_MEDIA_TYPE
+
+
+async def _prepend(
+    first: Optional[Dict[str, Any]], rest: AsyncGenerator[Dict[str, Any], None]
+) -> AsyncGenerator[Dict[str, Any], None]:
+    if first is not None:
+        yield first
+    async for frame in rest:
+        yield frame
+
+
+async def _encode_frames(
+    frames: AsyncGenerator[Dict[str, Any], None], encode: Callable[[Dict[str, Any]], str]
+) -> AsyncGenerator[str, None]:
+    """把帧逐个编码为线上文本。
+
+    续传缓冲中的帧在读取前被淘汰时以 ``stream_expired`` 错误帧收尾，而不是中断响应。
+    """
+    from backend.app.services.stream_resume import StreamExpired  # 延迟导入
+
+    try:
+        async for frame in frames:
+            yield encode(frame)
+    except StreamExpired:
+        yield encode({"type": "error", "error": "stream_expired"})
+
+
 def _generate_session_id() -> str:  # pragma: no cover
     import uuid
 
@@ -0,0 +1,82 @@
+"""Prometheus 抓取端点 ``GET /metrics``。
+
+直接记录的指标见 ``backend.app.core.metrics``；这里注册抓取时才计算的 collector，
+把缓存、请求合并、上游连接池、provider 就绪状态与日志队列的 ``stats()`` 转成 gauge。
+"""
+
+from __future__ import annotations
+
+import sys
+from typing import Iterator, List, Tuple
+
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from backend.app.api.v1.routers.chat import _manager
+from backend.app.core import metrics
+from backend.app.core.logging_config import dropped_records
+from backend.app.services.provider_health import STATE_READY
+
+router = APIRouter()
+
+Family = Tuple[str, str, str, List[metrics.Sample]]
+
+
+def _cache_families() -> Iterator[Family]:
+    caches = {"response": _manager.response_cache.stats(), "semantic": _manager.semantic_cache.stats()}
+    yield (
+        "llm_cache_hit_ratio", "gauge", "回复缓存累计命中率",
+        [({"cache": name}, stats.get("hit_ratio", 0.0)) for name, stats in caches.items()],
+    )
+    yield (
+        "llm_cache_entries", "gauge", "回复缓存条目数",
+        [({"cache": name}, stats.get("entries", 0)) for name, stats in caches.items()],
+    )
+    if _manager.single_flight is not None:
+        yield (
+            "llm_single_flight_in_flight", "gauge", "进行中的合并上游请求数",
+            [({}, _manager.single_flight.stats().get("in_flight", 0))],
+        )
+
+
+def _provider_families() -> Iterator[Family]:
+    snapshot = _manager.provider_health.snapshot()
+    yield (
+        "llm_provider_ready", "gauge", "provider 是否已通过预热校验（1 为就绪）",
+        [({"provider": name, "state": entry["state"]}, 1 if entry["state"] == STATE_READY else 0)
+         for name, entry in snapshot.items()],
+    )
+
+
+def _http_families() -> Iterator[Family]:
+    # 连接池随首个 provider 延迟创建，未加载时不导入 httpx
+    module = sys.modules.get("backend.app.core.http_transport")
+    if module is None:
+        return
+    stats = module.http_transport.stats()
+    yield (
+        "http_upstream_in_flight", "gauge", "进行中的上游 HTTP 请求数",
+        [({"host": host}, n) for host, n in stats["in_flight_by_host"].items()] or [({"host": ""}, 0)],
+    )
+    yield (
+        "http_pool_connections", "gauge", "上游连接池中的连接数",
+        [({"pool": pool, "state": state}, stats["pools"][pool][state])
+         for pool in ("sync", "async") for state in ("active", "idle")],
+    )
+    yield ("http_pool_utilization", "gauge", "活动连接数占连接池上限的比例", [({}, stats["utilization"])])
+    yield ("http_upstream_requests_total", "counter", "上游 HTTP 请求总数", [({}, stats["requests_total"])])
+    yield ("http_upstream_errors_total", "counter", "上游 HTTP 传输层错误数", [({}, stats["errors_total"])])
+
+
+def _logging_families() -> Iterator[Family]:
+    yield ("log_dropped_records_total", "counter", "日志队列已满而丢弃的记录数", [({}, dropped_records())])
+
+
+for _collector in (_cache_families, _provider_families, _http_families, _logging_families):
+    metrics.registry.register_collector(_collector)
+
+
+@router.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus 文本格式的全部指标。"""
+    return Response(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
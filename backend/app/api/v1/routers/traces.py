@@ -0,0 +1,30 @@
+"""最近请求的 trace 查看端点（数据来自进程内环形缓冲导出器）。"""
+
+from __future__ import annotations
+
+from fastapi import APIRouter, HTTPException, Query
+
+from backend.app.core.tracing import ring_buffer
+
+router = APIRouter()
+
+
+def _buffer():
+    buffer = ring_buffer()
+    if buffer is None:
+        raise HTTPException(status_code=404, detail="未启用进程内 trace 缓冲")
+    return buffer
+
+
+@router.get("/api/traces")
+async def list_traces(limit: int = Query(20, ge=1, le=1000)):
+    """最近的 trace，新的在前。"""
+    return {"traces": _buffer().recent(limit)}
+
+
+@router.get("/api/traces/{trace_id}")
+async def get_trace(trace_id: str):
+    trace = _buffer().get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail=f"trace {trace_id} 不存在或已被淘汰")
+    return trace
@@ -0,0 +1,236 @@
+"""WebSocket 聊天通道：单连接复用多个会话与并发生成。
+
+客户端消息（JSON）::
+
+    {"op": "chat", "id": "s1", "user_message": "...", "session_id": "...", "model": "...", "provider": "..."}
+    {"op": "cancel", "id": "s1"}
+    {"op": "models"}
+    {"op": "switch_provider", "provider_name": "google"}
+    {"op": "ping"}
+
+服务端帧与 ``/api/chat/stream`` 的 delta-v1 帧一致，并附带所属流的 ``id``；
+此外还有 ``cancelled`` / ``models`` / ``pong`` / ``error`` 等控制帧。
+
+``switch_provider`` 只设置本连接的默认 provider（仅向本连接回复模型列表），
+同一 worker 上的其它连接不受影响；``chat`` 未带 ``provider`` 时使用该默认。
+模型目录刷新后某个 provider 的模型列表发生变化时，向正在使用该 provider 的连接推送
+``{"type": "models", "provider": ..., "models": ...}``（未切换过的连接按进程默认 provider 计）。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import uuid
+from contextlib import aclosing
+from typing import Any, Coroutine, Dict, Optional, Set
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
+
+from backend.app.api.v1.routers.chat import ChatRequest, _manager, stream_events
+from backend.app.core import stream_format
+from backend.app.core.config import settings
+from backend.app.core.logging_config import logger
+
+router = APIRouter()
+
+
+class _Connection:
+    """单个 WebSocket 连接：有界发送队列 + 唯一写协程 + 进行中的生成任务。"""
+
+    def __init__(self, websocket: WebSocket, queue_size: int) -> None:
+        self.websocket = websocket
+        self.outbox: asyncio.Queue = asyncio.Queue(maxsize=max(1, queue_size))
+        self.streams: Dict[str, asyncio.Task] = {}
+        # 读循环派生的后台任务（模型列表查询、排队中的回复），连接关闭时一并取消
+        self.tasks: Set[asyncio.Task] = set()
+        # 本连接的默认 provider（switch_provider 设置），为空时按会话默认 / 进程默认解析
+        self.provider: Optional[str] = None
+
+    async def send(self, message: Dict[str, Any]) -> None:
+        """排队发送；队列满时等待，使慢客户端的背压传导到上游生成。"""
+        await self.outbox.put(message)
+
+    def offer(self, message: Dict[str, Any]) -> bool:
+        """尽力发送，不等待；队列满时丢弃并返回 False。用于广播等可丢失的推送。"""
+        try:
+            self.outbox.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def reply(self, message: Dict[str, Any]) -> None:
+        """读循环的回复：不等待发送队列；队列满时交给后台任务排队，读循环照常处理 cancel / ping。"""
+        if not self.offer(message):
+            self.spawn(self.send(message))
+
+    def spawn(self, coro: Coroutine[Any, Any, None]) -> None:
+        task = asyncio.create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def run_writer(self) -> None:
+        while True:
+            message = await self.outbox.get()
+            await self.websocket.send_text(stream_format.encode_json(message))
+
+    async def close(self) -> None:
+        pending = [*self.streams.values(), *self.tasks]
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+class ConnectionHub:
+    """记录所有活动连接，用于服务端推送。"""
+
+    def __init__(self) -> None:
+        self._connections: Set[_Connection] = set()
+
+    def register(self, conn: _Connection) -> None:
+        self._connections.add(conn)
+
+    def unregister(self, conn: _Connection) -> None:
+        self._connections.discard(conn)
+
+    def broadcast(self, message: Dict[str, Any], provider: Optional[str] = None) -> None:
+        """推送消息；给出 ``provider`` 时只推送给使用该 provider 的连接。发送队列已满的慢连接本次跳过。"""
+        for conn in list(self._connections):
+            if provider is not None and (conn.provider or _manager.current_provider_name) != provider:
+                continue
+            if not conn.offer(message):
+                logger.warning("WebSocket 发送队列已满，跳过推送: %s", message.get("type"))
+
+    def models_changed(self, provider: str, models: Dict[str, str]) -> None:
+        """模型目录回调：把变化后的模型列表推送给使用该 provider 的连接。"""
+        if self._connections:
+            models = _manager._with_routed_models(models)
+            self.broadcast({"type": "models", "provider": provider, "models": models}, provider)
+
+
+hub = ConnectionHub()
+_manager.model_catalog.add_listener(hub.models_changed)
+
+
+@router.websocket("/ws")
+async def websocket_endpoint(websocket: WebSocket):
+    """多路复用的聊天 WebSocket。"""
+    await websocket.accept()
+    conn = _Connection(websocket, settings.WS_SEND_QUEUE_SIZE)
+    hub.register(conn)
+    writer = asyncio.create_task(conn.run_writer())
+    try:
+        while True:
+            try:
+                message = await websocket.receive_json()
+            except WebSocketDisconnect:
+                break
+            except ValueError:
+                conn.reply({"type": "error", "error": "消息必须是 JSON"})
+                continue
+            await _dispatch(conn, message)
+    finally:
+        hub.unregister(conn)
+        await conn.close()
+        writer.cancel()
+        await asyncio.gather(writer, return_exceptions=True)
+
+
+async def _dispatch(conn: _Connection, message: Any) -> None:
+    """处理一条客户端消息；回复一律经 ``reply`` 交给写协程，耗时查询放到后台任务，读循环不会被阻塞。"""
+    if not isinstance(message, dict):
+        conn.reply({"type": "error", "error": "消息必须是 JSON 对象"})
+        return
+
+    op = message.get("op")
+    if op == "chat":
+        await _start_stream(conn, message)
+    elif op == "cancel":
+        task = conn.streams.get(str(message.get("id")))
+        if task is None:
+            conn.reply({"id": message.get("id"), "type": "error", "error": "流不存在或已结束"})
+        else:
+            task.cancel()
+    elif op == "models":
+        conn.spawn(_send_models(conn, message.get("provider") or conn.provider, message.get("session_id")))
+    elif op == "switch_provider":
+        await _switch_provider(conn, message.get("provider_name"))
+    elif op == "ping":
+        conn.reply({"type": "pong"})
+    else:
+        conn.reply({"type": "error", "error": f"未知操作: {op}"})
+
+
+async def _start_stream(conn: _Connection, message: Dict[str, Any]) -> None:
+    stream_id = str(message.get("id") or uuid.uuid4())
+    if stream_id in conn.streams:
+        conn.reply({"id": stream_id, "type": "error", "error": "流 id 重复"})
+        return
+    if len(conn.streams) >= settings.WS_MAX_STREAMS:
+        conn.reply({"id": stream_id, "type": "error", "error": "并发生成数已达上限"})
+        return
+    try:
+        request = ChatRequest(**{k: v for k, v in message.items() if k not in ("op", "id")})
+    except ValidationError as exc:
+        conn.reply({"id": stream_id, "type": "error", "error": str(exc)})
+        return
+    if request.provider is None:
+        request.provider = conn.provider
+
+    conn.streams[stream_id] = asyncio.create_task(_run_stream(conn, stream_id, request))
+
+
+async def _run_stream(conn: _Connection, stream_id: str, request: ChatRequest) -> None:
+    """把一次生成的帧逐个送入连接的发送队列。"""
+    try:
+        session_id, events = stream_events(request)
+        async with aclosing(events):
+            frames = stream_format.delta_frames(
+                events,
+                start_meta={"session_id": session_id} if session_id else None,
+                coalesce_chars=settings.STREAM_COALESCE_CHARS,
+                coalesce_ms=settings.STREAM_COALESCE_MS,
+            )
+            async with aclosing(frames):
+                async for frame in frames:
+                    frame["id"] = stream_id
+                    await conn.send(frame)
+    except asyncio.CancelledError:
+        conn.offer({"id": stream_id, "type": "cancelled"})
+        raise
+    except Exception as exc:  # pragma: no cover
+        logger.exception("WebSocket 流 %s 失败: %s", stream_id, exc)
+        conn.offer({"id": stream_id, "type": "error", "error": str(exc)})
+    finally:
+        conn.streams.pop(stream_id, None)
+
+
+async def _send_models(
+    conn: _Connection, provider_name: Optional[str], session_id: Optional[str] = None, announce: bool = False
+) -> None:
+    """后台查询模型列表并回复；``announce`` 为真时附带 provider 名（switch_provider 的回复）。"""
+    try:
+        models = await _manager.aget_available_models(provider_name, session_id)
+    except Exception as exc:
+        logger.warning("WebSocket 获取模型列表失败: %s", exc)
+        conn.reply({"type": "error", "error": str(exc)})
+        return
+    reply: Dict[str, Any] = {"type": "models", "models": models}
+    if announce:
+        reply["provider"] = provider_name
+    await conn.send(reply)
+
+
+async def _switch_provider(conn: _Connection, provider_name: Optional[str]) -> None:
+    if not provider_name:
+        conn.reply({"type": "error", "error": "缺少 provider_name"})
+        return
+    # 校验并立即生效，保证紧随其后的 chat 使用新 provider；模型列表在后台查询
+    try:
+        await _manager.aresolve_provider(provider_name)
+    except ValueError as exc:
+        conn.reply({"type": "error", "error": str(exc)})
+        return
+    conn.provider = provider_name
+    conn.spawn(_send_models(conn, provider_name, announce=True))
@@ -37,6 +37,76 @@ class Settings(BaseSettings):
     # 会话上下文窗口
     memory_window: int = 5
 
+    # 流式响应线上格式：delta-v1（默认，仅增量）或 verbose（旧格式，附带累计全文）
+    STREAM_FORMAT: str = "delta-v1"
+    # 增量合并：累计字数达到阈值或等待超过毫秒数即发送一帧；0 表示关闭
+    STREAM_COALESCE_CHARS: int = 0
+    STREAM_COALESCE_MS: int = 0
+
+    # 流续传：后台生成 + 环形缓冲，断线后可凭 Last-Event-ID 继续接收
+    STREAM_RESUME_ENABLED: bool = True
+    STREAM_RESUME_BACKEND: str = "memory"  # memory | redis
+    STREAM_RESUME_BUFFER_FRAMES: int = 4096
+    STREAM_RESUME_GRACE_SECONDS: float = 30.0
+    STREAM_RESUME_TTL_SECONDS: float = 300.0
+    STREAM_RESUME_MAX_STREAMS: int = 1024
+
+    # 回复精确匹配缓存：off | opt_in（请求 cache=true 时启用）| on（请求 cache=false 时绕过）
+    RESPONSE_CACHE_MODE: str = "opt_in"
+    RESPONSE_CACHE_MAX_ENTRIES: int = 1024
+    RESPONSE_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    RESPONSE_CACHE_TTL_SECONDS: float = 3600.0
+    RESPONSE_CACHE_REDIS: bool = False
+
+    # 语义缓存：按最后一轮用户消息的相似度命中，模式同上，默认关闭（需要 numpy）
+    # n-gram 哈希向量下只改一个词的不同问题相似度可达 0.92~0.96，阈值需明显高于此
+    SEMANTIC_CACHE_MODE: str = "off"
+    SEMANTIC_CACHE_THRESHOLD: float = 0.97
+    SEMANTIC_CACHE_CAPACITY: int = 10000
+    SEMANTIC_CACHE_DIM: int = 256
+
+    # 合并进行中的相同请求（相同 provider / model / messages 只调用一次上游）
+    SINGLE_FLIGHT_ENABLED: bool = True
+
+    # 批量聊天：单次请求条目上限，以及每个 provider 的并发上限（可按 provider 名覆盖，JSON 格式）
+    BATCH_MAX_ITEMS: int = 1000
+    BATCH_PROVIDER_CONCURRENCY: int = 8
+    BATCH_PROVIDER_CONCURRENCY_OVERRIDES: dict[str, int] = {}
+
+    # 上游容错：指数退避 + full jitter 重试、重试预算（占请求数比例）与熔断器
+    RETRY_MAX_ATTEMPTS: int = 3
+    RETRY_BASE_DELAY: float = 0.2
+    RETRY_MAX_DELAY: float = 5.0
+    RETRY_BUDGET_RATIO: float = 0.2
+    BREAKER_FAILURE_THRESHOLD: int = 5
+    BREAKER_RECOVERY_SECONDS: float = 30.0
+
+    # 上游 HTTP 连接池（所有 provider 共用）：总连接数、每个 host 的并发请求上限（0 不限）、keep-alive、
+    # HTTP/2（需要安装 h2，未安装时回退 HTTP/1.1）、超时（等待空闲连接为 pool）与 DNS 缓存（0 关闭）
+    HTTP_MAX_CONNECTIONS: int = 1000
+    HTTP_MAX_CONNECTIONS_PER_HOST: int = 0
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 200
+    HTTP_KEEPALIVE_EXPIRY: float = 60.0
+    HTTP2_ENABLED: bool = True
+    HTTP_CONNECT_TIMEOUT: float = 10.0
+    HTTP_READ_TIMEOUT: float = 60.0
+    HTTP_POOL_TIMEOUT: float = 30.0
+    HTTP_DNS_CACHE_TTL_SECONDS: float = 300.0
+
+    # 模型目录：模型列表缓存 TTL、过期后仍可返回旧列表（后台刷新）的时长，以及磁盘快照路径（留空不落盘）
+    MODEL_CATALOG_TTL_SECONDS: float = 300.0
+    MODEL_CATALOG_STALE_SECONDS: float = 86400.0
+    MODEL_CATALOG_SNAPSHOT: str = ".cache/model_catalog.json"
+
+    # WebSocket：单连接待发送帧队列上限（满时生成端等待，形成背压）与并发生成数上限
+    WS_SEND_QUEUE_SIZE: int = 256
+    WS_MAX_STREAMS: int = 8
+
+    # 请求追踪：是否开启、进程内保留的最近 trace 条数，以及 JSON-lines 导出文件（留空不落盘）
+    TRACING_ENABLED: bool = True
+    TRACE_BUFFER_SIZE: int = 200
+    TRACE_EXPORT_PATH: str = ""
+
     # 其他配置占位，可后续扩展
 
     model_config = SettingsConfigDict(
@@ -0,0 +1,641 @@
+"""上游 HTTP 传输层：所有 provider 共用的连接池。
+
+* 连接池大小、每个 host 的并发请求上限、keep-alive、HTTP/2 与超时由 ``HTTP_*`` 配置统一控制；
+* 同步请求共用一个连接池；异步请求按事件循环各用一个连接池（anyio 连接不能跨事件循环复用）；
+* 直连的连接池直接用 httpcore 的公开构造参数 ``network_backend`` 接入 DNS 缓存：新建连接时的解析结果按
+  ``HTTP_DNS_CACHE_TTL_SECONDS`` 缓存，解析出的地址依次尝试；
+* :meth:`SharedTransport.stats` 给出连接池占用（活动 / 空闲连接、进行中请求、等待 host 配额的次数），
+  用于按并发流数量规划连接池大小。
+
+provider 通过 :meth:`SharedTransport.client` / :meth:`SharedTransport.async_client` 获取绑定到共享连接池的
+httpx 客户端（各自带 base_url、请求头）；客户端本身不持有连接，关闭客户端不会关闭共享连接池。
+
+用法::
+
+    from backend.app.core.http_transport import http_transport
+
+    self.http = http_transport.client(base_url=BASE_URL, headers=headers)
+    self.async_http = http_transport.async_client(base_url=BASE_URL, headers=headers)
+
+代理按与 httpx ``trust_env`` 相同的环境变量规则逐个请求选择：``HTTP_PROXY`` / ``HTTPS_PROXY`` / ``ALL_PROXY``
+按 URL scheme 生效，``NO_PROXY`` 中的 host 直连。经代理的请求使用 httpx 自带的代理传输（由代理负责 DNS 解析，不做 DNS 缓存）。
+httpx 在传入自定义 transport 时不再读取代理环境变量，因此这里自行按同样规则分派。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import ipaddress
+import socket
+import threading
+import time
+import urllib.request
+import weakref
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+import httpcore
+import httpx
+
+from backend.app.core.config import settings
+from backend.app.core.logging_config import logger
+
+
+class DNSCache:
+    """按 (host, port) 缓存解析结果，线程安全；``ttl_seconds <= 0`` 时不缓存。"""
+
+    def __init__(self, ttl_seconds: float = 300.0, clock=time.monotonic) -> None:
+        self.ttl = ttl_seconds
+        self._clock = clock
+        self._entries: Dict[Tuple[str, int], Tuple[float, List[str]]] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0}
+
+    def resolve(self, host: str, port: int) -> List[str]:
+        cached = self._lookup(host, port)
+        if cached is not None:
+            return cached
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        return self._store(host, port, infos)
+
+    async def aresolve(self, host: str, port: int) -> List[str]:
+        cached = self._lookup(host, port)
+        if cached is not None:
+            return cached
+        infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        return self._store(host, port, infos)
+
+    def invalidate(self, host: str, port: int) -> None:
+        with self._lock:
+            self._entries.pop((host, port), None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries), "ttl_seconds": self.ttl}
+
+    def _lookup(self, host: str, port: int) -> Optional[List[str]]:
+        if self.ttl <= 0 or _is_ip(host):
+            return [host]
+        with self._lock:
+            entry = self._entries.get((host, port))
+            if entry is not None and entry[0] > self._clock():
+                self._stats["hits"] += 1
+                return entry[1]
+            self._stats["misses"] += 1
+        return None
+
+    def _store(self, host: str, port: int, infos) -> List[str]:
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))  # 去重并保持解析顺序
+        with self._lock:
+            self._entries[(host, port)] = (self._clock() + self.ttl, addresses)
+        return addresses
+
+
+def _is_ip(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host)
+        return True
+    except ValueError:
+        return False
+
+
+class _CachingSyncBackend(httpcore.SyncBackend):
+    """建立 TCP 连接前经 :class:`DNSCache` 解析；TLS 的 SNI 仍使用原始 host。"""
+
+    def __init__(self, dns: DNSCache) -> None:
+        super().__init__()
+        self._dns = dns
+
+    def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        try:
+            addresses = self._dns.resolve(host, port)
+        except OSError as exc:
+            raise httpcore.ConnectError(str(exc)) from exc
+        for i, address in enumerate(addresses):
+            try:
+                return super().connect_tcp(address, port, timeout, local_address, socket_options)
+            except httpcore.ConnectError:
+                if i == len(addresses) - 1:
+                    self._dns.invalidate(host, port)  # 全部地址不可达，下次重新解析
+                    raise
+
+
+class _CachingAsyncBackend(httpcore.AsyncNetworkBackend):
+    """:class:`_CachingSyncBackend` 的异步版本，连接本身交给 anyio 后端。"""
+
+    def __init__(self, dns: DNSCache) -> None:
+        self._dns = dns
+        self._backend = httpcore.AnyIOBackend()
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        try:
+            addresses = await self._dns.aresolve(host, port)
+        except OSError as exc:
+            raise httpcore.ConnectError(str(exc)) from exc
+        for i, address in enumerate(addresses):
+            try:
+                return await self._backend.connect_tcp(address, port, timeout, local_address, socket_options)
+            except httpcore.ConnectError:
+                if i == len(addresses) - 1:
+                    self._dns.invalidate(host, port)
+                    raise
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return await self._backend.connect_unix_socket(path, timeout, socket_options)
+
+    async def sleep(self, seconds: float) -> None:
+        await self._backend.sleep(seconds)
+
+
+# httpcore 异常 -> httpx 异常，按异常类的 MRO 取最具体的映射（与 httpx 自带传输的行为一致）
+_EXCEPTION_MAP = {
+    httpcore.ConnectTimeout: httpx.ConnectTimeout,
+    httpcore.ReadTimeout: httpx.ReadTimeout,
+    httpcore.WriteTimeout: httpx.WriteTimeout,
+    httpcore.PoolTimeout: httpx.PoolTimeout,
+    httpcore.TimeoutException: httpx.TimeoutException,
+    httpcore.ConnectError: httpx.ConnectError,
+    httpcore.ReadError: httpx.ReadError,
+    httpcore.WriteError: httpx.WriteError,
+    httpcore.NetworkError: httpx.NetworkError,
+    httpcore.ProxyError: httpx.ProxyError,
+    httpcore.UnsupportedProtocol: httpx.UnsupportedProtocol,
+    httpcore.RemoteProtocolError: httpx.RemoteProtocolError,
+    httpcore.LocalProtocolError: httpx.LocalProtocolError,
+    httpcore.ProtocolError: httpx.ProtocolError,
+}
+
+
+@contextmanager
+def _mapped_exceptions(request: httpx.Request) -> Iterator[None]:
+    try:
+        yield
+    except Exception as exc:
+        for cls in type(exc).__mro__:
+            target = _EXCEPTION_MAP.get(cls)
+            if target is not None:
+                raise target(str(exc), request=request) from exc
+        raise
+
+
+def _core_request(request: httpx.Request, content: Any) -> httpcore.Request:
+    return httpcore.Request(
+        method=request.method,
+        url=httpcore.URL(
+            scheme=request.url.raw_scheme,
+            host=request.url.raw_host,
+            port=request.url.port,
+            target=request.url.raw_path,
+        ),
+        headers=request.headers.raw,
+        content=content,
+        extensions=request.extensions,
+    )
+
+
+class _CoreStream(httpx.SyncByteStream):
+    def __init__(self, stream: Any, request: httpx.Request) -> None:
+        self._stream = stream
+        self._request = request
+
+    def __iter__(self) -> Iterator[bytes]:
+        with _mapped_exceptions(self._request):
+            for part in self._stream:
+                yield part
+
+    def close(self) -> None:
+        if hasattr(self._stream, "close"):
+            self._stream.close()
+
+
+class _AsyncCoreStream(httpx.AsyncByteStream):
+    def __init__(self, stream: Any, request: httpx.Request) -> None:
+        self._stream = stream
+        self._request = request
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        with _mapped_exceptions(self._request):
+            async for part in self._stream:
+                yield part
+
+    async def aclose(self) -> None:
+        if hasattr(self._stream, "aclose"):
+            await self._stream.aclose()
+
+
+class _DirectTransport(httpx.BaseTransport):
+    """直连传输：自建带 DNS 缓存的 httpcore 连接池，只使用 httpx / httpcore 的公开接口。"""
+
+    def __init__(self, pool: httpcore.ConnectionPool) -> None:
+        self.pool = pool
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        assert isinstance(request.stream, httpx.SyncByteStream)
+        with _mapped_exceptions(request):
+            response = self.pool.handle_request(_core_request(request, request.stream))
+        return httpx.Response(
+            status_code=response.status,
+            headers=response.headers,
+            stream=_CoreStream(response.stream, request),
+            extensions=response.extensions,
+        )
+
+    def close(self) -> None:
+        self.pool.close()
+
+
+class _AsyncDirectTransport(httpx.AsyncBaseTransport):
+    def __init__(self, pool: httpcore.AsyncConnectionPool) -> None:
+        self.pool = pool
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        assert isinstance(request.stream, httpx.AsyncByteStream)
+        with _mapped_exceptions(request):
+            response = await self.pool.handle_async_request(_core_request(request, request.stream))
+        return httpx.Response(
+            status_code=response.status,
+            headers=response.headers,
+            stream=_AsyncCoreStream(response.stream, request),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self) -> None:
+        await self.pool.aclose()
+
+
+class TransportMetrics:
+    """请求级计数：总数、失败数、进行中请求（按 host）与峰值，线程安全。"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._hosts: Counter = Counter()
+        self.requests_total = 0
+        self.errors_total = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.host_limit_waits = 0
+
+    def begin(self, host: str) -> Callable[[bool], None]:
+        """登记一个请求，返回结束回调 ``finish(error)``。"""
+        with self._lock:
+            self.requests_total += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            self._hosts[host] += 1
+
+        def finish(error: bool = False) -> None:
+            with self._lock:
+                self.in_flight -= 1
+                self._hosts[host] -= 1
+                if self._hosts[host] <= 0:
+                    del self._hosts[host]
+                if error:
+                    self.errors_total += 1
+
+        return finish
+
+    def waited(self) -> None:
+        with self._lock:
+            self.host_limit_waits += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests_total": self.requests_total,
+                "errors_total": self.errors_total,
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+                "host_limit_waits": self.host_limit_waits,
+                "in_flight_by_host": dict(self._hosts),
+            }
+
+
+class _TrackedStream(httpx.SyncByteStream):
+    """响应体读完或关闭时结束计数并归还 host 配额（流式响应在整个流期间计为进行中）。"""
+
+    def __init__(self, stream: httpx.SyncByteStream, on_close: Callable[..., None]) -> None:
+        self._stream = stream
+        self._on_close = on_close
+
+    def __iter__(self) -> Iterator[bytes]:
+        yield from self._stream
+
+    def close(self) -> None:
+        try:
+            self._stream.close()
+        finally:
+            self._on_close()
+
+
+class _AsyncTrackedStream(httpx.AsyncByteStream):
+    def __init__(self, stream: httpx.AsyncByteStream, on_close: Callable[..., None]) -> None:
+        self._stream = stream
+        self._on_close = on_close
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            self._on_close()
+
+
+def _releaser(finish: Callable[[bool], None], limit: Any) -> Callable[..., None]:
+    """结束计数并归还 host 配额，只生效一次（异常路径与关闭响应可能先后调用）。"""
+    lock = threading.Lock()
+    released = False
+
+    def release(error: bool = False) -> None:
+        nonlocal released
+        with lock:
+            if released:
+                return
+            released = True
+        finish(error)
+        if limit is not None:
+            limit.release()
+
+    return release
+
+
+def _pool_snapshot(pool: Any) -> Dict[str, int]:
+    connections = list(getattr(pool, "connections", []))
+    idle = sum(1 for conn in connections if conn.is_idle())
+    return {"connections": len(connections), "idle": idle, "active": len(connections) - idle}
+
+
+class _SyncTransport(httpx.BaseTransport):
+    """共享的同步传输：进程内唯一连接池 + 每个 host 的并发配额。"""
+
+    def __init__(self, owner: "SharedTransport") -> None:
+        self._owner = owner
+        self._direct = _DirectTransport(owner._build_pool(httpcore.ConnectionPool, _CachingSyncBackend))
+        self._proxied: Dict[str, httpx.HTTPTransport] = {}
+        self._host_limits: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def _route(self, request: httpx.Request) -> httpx.BaseTransport:
+        proxy = self._owner.proxy_for(request.url)
+        if proxy is None:
+            return self._direct
+        with self._lock:
+            transport = self._proxied.get(proxy)
+            if transport is None:
+                transport = self._proxied[proxy] = self._owner._build_proxy_transport(httpx.HTTPTransport, proxy)
+            return transport
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        limit = self._host_limit(host)
+        if limit is not None and not limit.acquire(blocking=False):
+            self._owner.metrics.waited()
+            if not limit.acquire(timeout=self._owner.pool_timeout):
+                raise httpx.PoolTimeout(f"等待 {host} 的并发配额超时", request=request)
+        release = _releaser(self._owner.metrics.begin(host), limit)
+        try:
+            response = self._route(request).handle_request(request)
+        except Exception:
+            release(error=True)
+            raise
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_TrackedStream(response.stream, release),
+            extensions=response.extensions,
+        )
+
+    def _host_limit(self, host: str) -> Optional[threading.BoundedSemaphore]:
+        if self._owner.max_connections_per_host <= 0:
+            return None
+        with self._lock:
+            sem = self._host_limits.get(host)
+            if sem is None:
+                sem = self._host_limits[host] = threading.BoundedSemaphore(self._owner.max_connections_per_host)
+            return sem
+
+    def pool_stats(self) -> Dict[str, int]:
+        """直连连接池的占用；经代理的请求只计入请求级计数。"""
+        return _pool_snapshot(self._direct.pool)
+
+    def close(self) -> None:
+        """客户端关闭时调用；共享连接池不随单个客户端关闭，见 :meth:`SharedTransport.close`。"""
+
+    def shutdown(self) -> None:
+        self._direct.close()
+        with self._lock:
+            proxied, self._proxied = list(self._proxied.values()), {}
+        for transport in proxied:
+            transport.close()
+
+
+class _LoopState:
+    """单个事件循环内的异步连接池（直连 + 各代理）与 host 配额。"""
+
+    def __init__(self, direct: _AsyncDirectTransport) -> None:
+        self.direct = direct
+        self.proxied: Dict[str, httpx.AsyncHTTPTransport] = {}
+        self.host_limits: Dict[str, asyncio.Semaphore] = {}
+
+
+class _AsyncTransport(httpx.AsyncBaseTransport):
+    """共享的异步传输：按当前事件循环分派到各自的连接池。"""
+
+    def __init__(self, owner: "SharedTransport") -> None:
+        self._owner = owner
+        self._loops: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopState]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _state(self) -> _LoopState:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            state = self._loops.get(loop)
+            if state is None:
+                pool = self._owner._build_pool(httpcore.AsyncConnectionPool, _CachingAsyncBackend)
+                state = self._loops[loop] = _LoopState(_AsyncDirectTransport(pool))
+            return state
+
+    def _route(self, state: _LoopState, request: httpx.Request) -> httpx.AsyncBaseTransport:
+        proxy = self._owner.proxy_for(request.url)
+        if proxy is None:
+            return state.direct
+        transport = state.proxied.get(proxy)
+        if transport is None:
+            transport = state.proxied[proxy] = self._owner._build_proxy_transport(httpx.AsyncHTTPTransport, proxy)
+        return transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        state = self._state()
+        host = request.url.host
+        limit = None
+        if self._owner.max_connections_per_host > 0:
+            limit = state.host_limits.get(host)
+            if limit is None:
+                limit = state.host_limits[host] = asyncio.Semaphore(self._owner.max_connections_per_host)
+            if not limit.locked():
+                await limit.acquire()  # 有空闲配额时立即返回，不会让出事件循环
+            else:
+                self._owner.metrics.waited()
+                try:
+                    await asyncio.wait_for(limit.acquire(), self._owner.pool_timeout)
+                except asyncio.TimeoutError:
+                    raise httpx.PoolTimeout(f"等待 {host} 的并发配额超时", request=request)
+        release = _releaser(self._owner.metrics.begin(host), limit)
+        try:
+            response = await self._route(state, request).handle_async_request(request)
+        except BaseException:
+            release(error=True)
+            raise
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_AsyncTrackedStream(response.stream, release),
+            extensions=response.extensions,
+        )
+
+    def pool_stats(self) -> Dict[str, int]:
+        totals = {"connections": 0, "idle": 0, "active": 0, "event_loops": 0}
+        with self._lock:
+            states = list(self._loops.values())
+        for state in states:
+            for key, value in _pool_snapshot(state.direct.pool).items():
+                totals[key] += value
+            totals["event_loops"] += 1
+        return totals
+
+    async def aclose(self) -> None:
+        """客户端关闭时调用；共享连接池不随单个客户端关闭，见 :meth:`SharedTransport.aclose`。"""
+
+    async def shutdown(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            state = self._loops.pop(loop, None)
+        if state is not None:
+            await state.direct.aclose()
+            for transport in state.proxied.values():
+                await transport.aclose()
+
+
+class SharedTransport:
+    """所有 provider 共用的 HTTP 连接池及其配置。"""
+
+    def __init__(
+        self,
+        max_connections: int = 1000,
+        max_connections_per_host: int = 0,
+        max_keepalive_connections: int = 200,
+        keepalive_expiry: float = 60.0,
+        http2: bool = True,
+        connect_timeout: float = 10.0,
+        read_timeout: float = 60.0,
+        pool_timeout: float = 30.0,
+        dns_cache_ttl: float = 300.0,
+    ) -> None:
+        if http2 and importlib.util.find_spec("h2") is None:
+            logger.info("未安装 h2，上游连接回退为 HTTP/1.1（pip install 'httpx[http2]' 启用 HTTP/2）")
+            http2 = False
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http2 = http2
+        self.pool_timeout = pool_timeout
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout, pool=pool_timeout)
+        # 与 httpx trust_env 相同的来源：scheme -> 代理 URL，"no" 为 NO_PROXY
+        self._proxies = {k: v for k, v in urllib.request.getproxies().items() if v}
+        self._bypass: Dict[str, bool] = {}
+        self.dns = DNSCache(dns_cache_ttl)
+        self.metrics = TransportMetrics()
+        self._sync = _SyncTransport(self)
+        self._async = _AsyncTransport(self)
+
+    @classmethod
+    def from_settings(cls) -> "SharedTransport":
+        return cls(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_connections_per_host=settings.HTTP_MAX_CONNECTIONS_PER_HOST,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+            http2=settings.HTTP2_ENABLED,
+            connect_timeout=settings.HTTP_CONNECT_TIMEOUT,
+            read_timeout=settings.HTTP_READ_TIMEOUT,
+            pool_timeout=settings.HTTP_POOL_TIMEOUT,
+            dns_cache_ttl=settings.HTTP_DNS_CACHE_TTL_SECONDS,
+        )
+
+    def proxy_for(self, url: httpx.URL) -> Optional[str]:
+        """按环境变量为请求选择代理；直连时返回 None。"""
+        proxy = self._proxies.get(url.scheme) or self._proxies.get("all")
+        if proxy is None:
+            return None
+        bypass = self._bypass.get(url.host)
+        if bypass is None:
+            bypass = self._bypass[url.host] = bool(urllib.request.proxy_bypass_environment(url.host, self._proxies))
+        return None if bypass else proxy
+
+    def _build_pool(self, pool_cls, backend_cls):
+        """直连连接池：通过 ``network_backend`` 接入 DNS 缓存，参数与 httpx 自带传输一致。"""
+        return pool_cls(
+            ssl_context=httpx.create_ssl_context(),
+            max_connections=self.limits.max_connections,
+            max_keepalive_connections=self.limits.max_keepalive_connections,
+            keepalive_expiry=self.limits.keepalive_expiry,
+            http1=True,
+            http2=self.http2,
+            network_backend=backend_cls(self.dns),
+        )
+
+    def _build_proxy_transport(self, transport_cls, proxy: str):
+        return transport_cls(http2=self.http2, limits=self.limits, proxy=proxy)
+
+    def client(self, base_url: str = "", headers: Optional[Dict[str, str]] = None, timeout=None) -> httpx.Client:
+        """返回绑定到共享同步连接池的客户端；``timeout`` 缺省为 ``HTTP_*_TIMEOUT``。"""
+        return httpx.Client(transport=self._sync, base_url=base_url, headers=headers, timeout=timeout or self.timeout)
+
+    def async_client(
+        self, base_url: str = "", headers: Optional[Dict[str, str]] = None, timeout=None
+    ) -> httpx.AsyncClient:
+        """返回绑定到共享异步连接池的客户端，可在任意事件循环中使用。"""
+        return httpx.AsyncClient(
+            transport=self._async, base_url=base_url, headers=headers, timeout=timeout or self.timeout
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        sync_pool = self._sync.pool_stats()
+        async_pool = self._async.pool_stats()
+        active = sync_pool["active"] + async_pool["active"]
+        return {
+            **self.metrics.snapshot(),
+            "pools": {"sync": sync_pool, "async": async_pool},
+            # 异步连接池按事件循环各自计算上限，这里按单个事件循环（单 worker）的上限估算占用率
+            "utilization": round(active / self.max_connections, 4) if self.max_connections else 0.0,
+            "dns": self.dns.stats(),
+            "config": {
+                "max_connections": self.max_connections,
+                "max_connections_per_host": self.max_connections_per_host,
+                "max_keepalive_connections": self.limits.max_keepalive_connections,
+                "keepalive_expiry": self.limits.keepalive_expiry,
+                "http2": self.http2,
+                "proxy": sorted(k for k in self._proxies if k != "no"),
+            },
+        }
+
+    def close(self) -> None:
+        """关闭同步连接池（进程退出时调用）。"""
+        self._sync.shutdown()
+
+    async def aclose(self) -> None:
+        """关闭当前事件循环的异步连接池与同步连接池。"""
+        await self._async.shutdown()
+        self.close()
+
+
+# 单例
+http_transport = SharedTransport.from_settings()
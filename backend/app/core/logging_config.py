@@ -5,29 +5,158 @@
     from backend.app.core.logging_config import logger
 
 然后使用 ``logger.info/ debug / warning / error / exception`` 输出日志，禁止继续使用 ``print()``。
+
+日志经 ``QueueHandler`` 放入有界队列，由 ``QueueListener`` 后台线程格式化并写出，请求路径上不阻塞于 stdout；
+队列满时丢弃并计数（见 :func:`dropped_records`），``LOG_ASYNC=0`` 时退回同步写出。
+
+provider 请求 / 响应等结构化事件使用 :func:`log_event` 输出单行紧凑 JSON，JSON 序列化在后台线程进行。
+消息正文默认只记录条数与字数，按 ``LOG_MESSAGE_SAMPLE_RATE`` 抽样记录（每条截断到 ``LOG_MESSAGE_MAX_CHARS``）；
+逐 token 日志由 ``LOG_STREAM_TOKENS`` 开启，默认关闭。
 """
+import atexit
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import random
 import sys
+import threading
+from typing import Any, Dict, List, Optional, Sequence
 
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
 LOG_FORMAT = "% (asctime)s | % (levelname)-8s | % (name)s:% (lineno)d | % (message)s".replace("% ", "%")
+LOG_ASYNC = os.getenv("LOG_ASYNC", "1").lower() not in ("0", "false", "no")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_MESSAGE_SAMPLE_RATE = float(os.getenv("LOG_MESSAGE_SAMPLE_RATE", "0.01"))
+LOG_MESSAGE_MAX_CHARS = int(os.getenv("LOG_MESSAGE_MAX_CHARS", "200"))
+LOG_STREAM_TOKENS = os.getenv("LOG_STREAM_TOKENS", "0").lower() in ("1", "true", "yes")
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """队列满时丢弃记录并计数，而不是阻塞调用方。
+
+    普通记录在调用线程中完成 ``msg % args`` 拼接，避免参数对象在后台线程格式化之前被修改；
+    只有 :func:`log_event` 产生的 :class:`_JsonEvent`（字段字典由其独占）把 JSON 序列化留给后台线程。
+    """
+
+    def __init__(self, log_queue: "queue.Queue") -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if not _is_json_event(record):
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            # traceback 对象不能跨线程保留太久，提前渲染为文本
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+
+_queue_handler: Optional[_DroppingQueueHandler] = None
+_listener: Optional[logging.handlers.QueueListener] = None
 
 
 def _setup_logging() -> None:  # noqa: D401
-    """配置根日志记录器并附加到 stdout。"""
-    handler = logging.StreamHandler(sys.stdout)
-    formatter = logging.Formatter(LOG_FORMAT, datefmt="%Y-%m-%d %H:%M:%S")
-    handler.setFormatter(formatter)
+    """配置根日志记录器并附加到 stdout（默认经后台线程写出）。"""
+    global _queue_handler, _listener
 
     root_logger = logging.getLogger()
+    root_logger.setLevel(LOG_LEVEL)
     # 避免重复添加 handler
-    if not root_logger.handlers:
+    if root_logger.handlers:
+        return
+
+    handler = logging.StreamHandler(sys.stdout)
+    formatter = logging.Formatter(LOG_FORMAT, datefmt="%Y-%m-%d %H:%M:%S")
+    handler.setFormatter(formatter)
+    if not LOG_ASYNC:
         root_logger.addHandler(handler)
-    root_logger.setLevel(LOG_LEVEL)
+        return
+
+    _queue_handler = _DroppingQueueHandler(queue.Queue(maxsize=max(1, LOG_QUEUE_SIZE)))
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, handler, respect_handler_level=True)
+    _listener.start()
+    root_logger.addHandler(_queue_handler)
+    atexit.register(flush_logs)
+
+
+def flush_logs() -> None:
+    """停止后台写出线程并写完队列中剩余的日志（进程退出时自动调用）。"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def dropped_records() -> int:
+    """因队列已满被丢弃的日志条数。"""
+    return _queue_handler.dropped if _queue_handler is not None else 0
 
 
 _setup_logging()
 
 # 项目统一使用的 logger
-logger = logging.getLogger("llm_api") 
\ No newline at end of file
+logger = logging.getLogger("llm_api")
+
+
+class _JsonEvent:
+    """延迟序列化的事件：只在后台线程格式化时才调用 ``json.dumps``。"""
+
+    __slots__ = ("fields",)
+
+    def __init__(self, fields: Dict[str, Any]) -> None:
+        self.fields = fields
+
+    def __str__(self) -> str:
+        return json.dumps(self.fields, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def _is_json_event(record: logging.LogRecord) -> bool:
+    args = record.args
+    return isinstance(args, tuple) and len(args) == 1 and isinstance(args[0], _JsonEvent)
+
+
+def log_event(event: str, level: int = logging.INFO, **fields: Any) -> None:
+    """以单行紧凑 JSON 记录一个结构化事件，如 ``log_event("chat_request", provider="silicon", model=...)``。"""
+    if not logger.isEnabledFor(level):
+        return
+    logger.log(level, "%s", _JsonEvent({"event": event, **fields}), stacklevel=2)
+
+
+def log_token(provider: str, content: str) -> None:
+    """逐 token 日志，仅 ``LOG_STREAM_TOKENS`` 开启时以 DEBUG 级别记录。"""
+    if LOG_STREAM_TOKENS:
+        log_event("stream_token", logging.DEBUG, provider=provider, content=content)
+
+
+def message_fields(messages: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    """请求日志中的消息摘要：条数与总字数；按 ``LOG_MESSAGE_SAMPLE_RATE`` 抽样附带截断后的正文。"""
+    fields: Dict[str, Any] = {
+        "message_count": len(messages),
+        "message_chars": sum(len(str(m.get("content", ""))) for m in messages),
+    }
+    if LOG_MESSAGE_SAMPLE_RATE > 0 and random.random() < LOG_MESSAGE_SAMPLE_RATE:
+        fields["messages"] = _truncate(messages)
+    return fields
+
+
+def _truncate(messages: Sequence[Dict[str, Any]]) -> List[Dict[str, str]]:
+    limit = LOG_MESSAGE_MAX_CHARS
+    result = []
+    for m in messages:
+        content = str(m.get("content", ""))
+        if len(content) > limit:
+            content = f"{content[:limit]}…(+{len(content) - limit})"
+        result.append({"role": str(m.get("role", "")), "content": content})
+    return result
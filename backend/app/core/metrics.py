@@ -0,0 +1,355 @@
+"""进程内指标，按 Prometheus 文本格式（0.0.4）导出，供 ``GET /metrics`` 抓取。
+
+不依赖 prometheus_client：每个指标按标签值元组缓存子项，热路径上一次记录只是一次字典查找、
+一次 ``bisect`` 与加锁累加，开销在微秒以内。
+
+* :class:`Counter` / :class:`Histogram` 在调用处直接记录；
+* :meth:`Registry.register_collector` 注册抓取时才计算的指标（如缓存命中率、连接池占用），
+  把已有组件的 ``stats()`` 转成 gauge，热路径上没有额外开销。
+
+LLM 相关指标（标签 provider / model）由 ``LLMManager`` 在调用 provider 的边界处记录，
+所有 provider 的请求都经过这里，无需逐个修改 provider 实现。model 来自客户端请求，
+记录前经 :func:`model_label` 归一：只有模型目录、路由配置中出现过的模型与 provider 默认模型保留原值，
+其余一律记为 ``other``，避免任意模型名让时间序列无限增长。
+"""
+
+from __future__ import annotations
+
+import bisect
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 延迟类直方图的默认桶（秒），覆盖缓存命中的亚毫秒到长回复的分钟级
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+# 相邻增量间隔（秒）
+INTER_TOKEN_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+# 生成速度（token/秒）
+THROUGHPUT_BUCKETS = (1, 5, 10, 20, 40, 60, 80, 100, 150, 200, 400)
+# 本地存储读写（秒）
+STORAGE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5)
+
+Sample = Tuple[Dict[str, str], float]
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: Any):
+        """按位置给出标签值，返回可记录的子项（同一组标签值复用同一子项）。"""
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} 需要标签 {self.labelnames}，收到 {key}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self):  # pragma: no cover - 子类实现
+        raise NotImplementedError
+
+    def _label_dict(self, key: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    @property
+    def family(self) -> str:
+        return self.name
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.family} {_escape_help(self.documentation)}", f"# TYPE {self.family} {self.kind}"]
+        for key, child in sorted(self._children.items()):
+            lines.extend(self._render_child(self._label_dict(key), child))
+        return lines
+
+    def _render_child(self, labels: Dict[str, str], child) -> List[str]:  # pragma: no cover
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        with self._lock:
+            self._children.clear()
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self) -> None:
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    @property
+    def family(self) -> str:
+        return f"{self.name}_total"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def _render_child(self, labels, child) -> List[str]:
+        return [f"{self.family}{_format_labels(labels)} {_format_value(child.value)}"]
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # 最后一格为 +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def _render_child(self, labels, child) -> List[str]:
+        with child._lock:
+            counts, total, count = list(child.counts), child.sum, child.count
+        lines = []
+        cumulative = 0
+        for bound, n in zip(self.buckets + (math.inf,), counts):
+            cumulative += n
+            le = "+Inf" if bound == math.inf else _format_value(bound)
+            lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': le})} {cumulative}")
+        lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+        lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+class Registry:
+    """指标注册表：直接记录的指标 + 抓取时计算的 collector。"""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]] = []
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"指标 {metric.name} 已注册")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]) -> None:
+        """注册抓取时调用的函数，产出 ``(name, type, help, [(labels, value), ...])``。"""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        for collector in list(self._collectors):
+            try:
+                families = list(collector())
+            except Exception:  # noqa: BLE001 - 单个组件统计失败不影响其它指标
+                continue
+            for name, kind, documentation, samples in families:
+                lines.append(f"# HELP {name} {_escape_help(documentation)}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}" for labels, value in samples)
+        return "\n".join(lines) + "\n"
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", r"\\").replace("\n", r"\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for name, value in labels.items():
+        value = str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+        parts.append(f'{name}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def error_code(exc: BaseException) -> str:
+    """上游错误的标签值：HTTP 状态码，没有状态码时为异常类名。"""
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return str(status) if status is not None else type(exc).__name__
+
+
+def provider_label(provider: Any) -> str:
+    return getattr(provider, "name", None) or type(provider).__name__
+
+
+OTHER_MODEL = "other"
+# 通配 provider：路由的逻辑模型可在任意 provider 下使用
+ANY_PROVIDER = "*"
+_known_models: Dict[str, frozenset] = {}
+_known_models_lock = threading.Lock()
+
+
+def register_models(provider: str, models: Iterable[str]) -> None:
+    """登记 provider 的已知模型（模型目录刷新、路由配置加载时调用），它们作为 model 标签保留原值。"""
+    models = {m for m in models if m}
+    if not models:
+        return
+    with _known_models_lock:
+        _known_models[provider] = _known_models.get(provider, frozenset()) | models
+
+
+def model_label(provider: Any, model: str) -> str:
+    """把请求中的模型名归一为有界的标签值；未登记的模型记为 ``other``。"""
+    if model and (
+        model == getattr(provider, "default_model", None)
+        or model in _known_models.get(provider_label(provider), ())
+        or model in _known_models.get(ANY_PROVIDER, ())
+    ):
+        return model
+    return OTHER_MODEL
+
+
+# ---------------------------------------------------------------------------
+# 单例与预定义指标
+# ---------------------------------------------------------------------------
+
+registry = Registry()
+
+LLM_REQUEST_SECONDS = registry.histogram(
+    "llm_request_duration_seconds", "上游 LLM 请求总耗时（流式为整条流）", ("provider", "model", "mode", "status")
+)
+LLM_TTFT_SECONDS = registry.histogram(
+    "llm_time_to_first_token_seconds", "流式请求首个增量到达耗时", ("provider", "model")
+)
+LLM_INTER_TOKEN_SECONDS = registry.histogram(
+    "llm_inter_token_latency_seconds", "流式请求相邻增量的间隔", ("provider", "model"), INTER_TOKEN_BUCKETS
+)
+LLM_TOKENS_PER_SECOND = registry.histogram(
+    "llm_output_tokens_per_second", "生成速度（输出 token / 秒，无 usage 时按字数估算）", ("provider", "model"),
+    THROUGHPUT_BUCKETS,
+)
+LLM_OUTPUT_TOKENS = registry.counter("llm_output_tokens", "输出 token 数", ("provider", "model"))
+LLM_UPSTREAM_ERRORS = registry.counter(
+    "llm_upstream_errors", "上游调用失败次数（code 为 HTTP 状态码或异常类名）", ("provider", "model", "code")
+)
+CACHE_LOOKUPS = registry.counter(
+    "llm_cache_lookups", "回复缓存查询次数", ("cache", "provider", "model", "result")
+)
+SESSION_REPO_SECONDS = registry.histogram(
+    "session_repo_operation_duration_seconds", "会话存储读写耗时", ("backend", "operation"), STORAGE_BUCKETS
+)
+EXPORT_RENDER_SECONDS = registry.histogram("export_render_duration_seconds", "对话导出渲染耗时", ("format", "status"))
+
+
+def observe_llm_call(
+    provider: str,
+    model: str,
+    mode: str,
+    duration: float,
+    error: Optional[BaseException] = None,
+    output_tokens: Optional[int] = None,
+) -> None:
+    """记录一次非流式上游调用。"""
+    status = "ok" if error is None else "error"
+    LLM_REQUEST_SECONDS.labels(provider, model, mode, status).observe(duration)
+    if error is not None:
+        LLM_UPSTREAM_ERRORS.labels(provider, model, error_code(error)).inc()
+    elif output_tokens:
+        LLM_OUTPUT_TOKENS.labels(provider, model).inc(output_tokens)
+        if duration > 0:
+            LLM_TOKENS_PER_SECOND.labels(provider, model).observe(output_tokens / duration)
+
+
+class StreamObserver:
+    """记录一条上游流：首字延迟、增量间隔、总耗时与生成速度。"""
+
+    __slots__ = ("provider", "model", "_start", "_first", "_last", "_ttft", "_inter_token")
+
+    def __init__(self, provider: str, model: str) -> None:
+        self.provider = provider
+        self.model = model
+        self._start = self._last = time.perf_counter()
+        self._first: Optional[float] = None
+        # 预先取出子项，每个增量只剩一次 observe
+        self._ttft = LLM_TTFT_SECONDS.labels(provider, model)
+        self._inter_token = LLM_INTER_TOKEN_SECONDS.labels(provider, model)
+
+    def on_delta(self) -> None:
+        now = time.perf_counter()
+        if self._first is None:
+            self._first = now
+            self._ttft.observe(now - self._start)
+        else:
+            self._inter_token.observe(now - self._last)
+        self._last = now
+
+    @property
+    def ttft(self) -> Optional[float]:
+        """首字延迟（秒），尚未收到增量时为 ``None``。"""
+        return None if self._first is None else self._first - self._start
+
+    def finish(self, output_tokens: Optional[int] = None, error: Optional[BaseException] = None, status: str = "") -> None:
+        """流结束时调用；``status`` 缺省按 ``error`` 取 ok / error，客户端断开时传 ``cancelled``。"""
+        end = time.perf_counter()
+        status = status or ("ok" if error is None else "error")
+        LLM_REQUEST_SECONDS.labels(self.provider, self.model, "stream", status).observe(end - self._start)
+        if error is not None:
+            LLM_UPSTREAM_ERRORS.labels(self.provider, self.model, error_code(error)).inc()
+        if output_tokens:
+            LLM_OUTPUT_TOKENS.labels(self.provider, self.model).inc(output_tokens)
+            # 生成速度按首个增量之后计算，不含排队与首字等待
+            if self._first is not None and end > self._first:
+                LLM_TOKENS_PER_SECOND.labels(self.provider, self.model).observe(output_tokens / (end - self._first))
+
+
+def observe_session_op(backend: str, operation: str, start: float) -> None:
+    SESSION_REPO_SECONDS.labels(backend, operation).observe(time.perf_counter() - start)
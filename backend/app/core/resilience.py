@@ -0,0 +1,309 @@
+"""Provider 与 MCP 调用共用的容错组件。
+
+* 错误分类：超时 / 连接错误 / 429 / 5xx 视为可重试，其余（鉴权失败、参数错误等）立即失败；
+* 重试：指数退避 + full jitter（``uniform(0, min(cap, base * 2**n))``），避免多个 worker 同步重试；
+* 重试预算：每个上游在滑动窗口内的重试次数不超过请求数的固定比例，上游整体故障时不会被重试放大流量；
+* 熔断器：连续失败达到阈值后打开，期间直接抛出 :class:`CircuitOpenError`；冷却结束后进入半开状态，
+  仅放行少量探测请求，探测成功即关闭、失败则重新打开；不可重试的错误（如 401 / 400）与取消不计入熔断，
+  只归还探测名额。
+
+用法::
+
+    result = await call_async("silicon", lambda: client.chat.completions.create(...))
+    result = call_sync("wisdom_gate", lambda: session.post(...))
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+from backend.app.core.config import settings
+from backend.app.core.error_handler import ProviderError
+from backend.app.core.logging_config import logger
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+class UpstreamError(ProviderError):
+    """上游调用失败，携带状态码与是否可重试。"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, retryable: Optional[bool] = None) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+        self.retryable = retryable if retryable is not None else status_code in RETRYABLE_STATUS
+
+
+class CircuitOpenError(ProviderError):
+    """熔断器处于打开状态，请求被直接拒绝。"""
+
+    retryable = False
+
+
+def _status_of(exc: BaseException) -> Optional[int]:
+    for candidate in (exc, getattr(exc, "response", None)):
+        for attr in ("status_code", "code"):
+            value = getattr(candidate, attr, None)
+            if isinstance(value, int):
+                return value
+    return None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """判断异常是否值得重试。"""
+    retryable = getattr(exc, "retryable", None)
+    if isinstance(retryable, bool):
+        return retryable
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    status = _status_of(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    # httpx / requests / openai 的超时与连接错误类名均含 Timeout / Connect
+    name = type(exc).__name__
+    return "Timeout" in name or "Connect" in name
+
+
+def as_provider_error(message: str, exc: BaseException) -> ProviderError:
+    """把底层异常包装为 :class:`UpstreamError`，保留状态码与可重试性；已是 ProviderError 的原样返回。"""
+    if isinstance(exc, ProviderError):
+        return exc
+    error = UpstreamError(f"{message}: {exc}", status_code=_status_of(exc), retryable=is_retryable(exc))
+    error.__cause__ = exc
+    return error
+
+
+class RetryPolicy:
+    """指数退避 + full jitter。"""
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.2, max_delay: float = 5.0) -> None:
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def backoff(self, attempt: int) -> float:
+        """第 attempt 次（从 1 开始）失败后的等待秒数。"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+
+class RetryBudget:
+    """滑动窗口内重试数不超过 ``min_retries + ratio * 请求数``。"""
+
+    def __init__(self, ratio: float = 0.2, min_retries: int = 3, window_seconds: float = 10.0, clock=time.monotonic) -> None:
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.window = window_seconds
+        self._clock = clock
+        self._requests: Deque[float] = deque()
+        self._retries: Deque[float] = deque()
+        self._lock = threading.Lock()
+
+    def _trim(self, now: float) -> None:
+        for events in (self._requests, self._retries):
+            while events and events[0] <= now - self.window:
+                events.popleft()
+
+    def record_request(self) -> None:
+        with self._lock:
+            now = self._clock()
+            self._trim(now)
+            self._requests.append(now)
+
+    def try_spend(self) -> bool:
+        """尝试消耗一次重试额度。"""
+        with self._lock:
+            now = self._clock()
+            self._trim(now)
+            if len(self._retries) >= self.min_retries + self.ratio * len(self._requests):
+                return False
+            self._retries.append(now)
+            return True
+
+
+class CircuitBreaker:
+    """三态熔断器（closed / open / half_open），线程安全。"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        recovery_seconds: float = 30.0,
+        half_open_max_calls: int = 1,
+        clock=time.monotonic,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.recovery_seconds = recovery_seconds
+        self.half_open_max_calls = max(1, half_open_max_calls)
+        self._clock = clock
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def _maybe_half_open(self) -> None:
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.recovery_seconds:
+            self._state = self.HALF_OPEN
+            self._probes = 0
+
+    def allow(self) -> None:
+        """放行则返回，否则抛出 :class:`CircuitOpenError`。"""
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == self.CLOSED:
+                return
+            if self._state == self.HALF_OPEN and self._probes < self.half_open_max_calls:
+                self._probes += 1
+                return
+            retry_in = max(0.0, self.recovery_seconds - (self._clock() - self._opened_at))
+        raise CircuitOpenError(f"{self.name} 熔断中，约 {retry_in:.0f} 秒后重试")
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info("%s 熔断器探测成功，恢复正常", self.name)
+            self._state = self.CLOSED
+            self._failures = 0
+
+    def release(self) -> None:
+        """调用结束但结果不说明上游健康与否（不可重试的错误、取消）：不改变状态，只归还半开探测名额。"""
+        with self._lock:
+            if self._state == self.HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning("%s 连续失败 %s 次，熔断器打开", self.name, self._failures)
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+
+
+class Resilience:
+    """按上游名称管理熔断器与重试预算。"""
+
+    def __init__(
+        self,
+        policy: Optional[RetryPolicy] = None,
+        budget_ratio: float = 0.2,
+        failure_threshold: int = 5,
+        recovery_seconds: float = 30.0,
+    ) -> None:
+        self.policy = policy or RetryPolicy()
+        self.budget_ratio = budget_ratio
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._budgets: Dict[str, RetryBudget] = {}
+        self._lock = threading.Lock()
+
+    def breaker(self, name: str) -> CircuitBreaker:
+        with self._lock:
+            if name not in self._breakers:
+                self._breakers[name] = CircuitBreaker(name, self.failure_threshold, self.recovery_seconds)
+            return self._breakers[name]
+
+    def budget(self, name: str) -> RetryBudget:
+        with self._lock:
+            if name not in self._budgets:
+                self._budgets[name] = RetryBudget(self.budget_ratio)
+            return self._budgets[name]
+
+    def _should_retry(self, name: str, exc: BaseException, attempt: int, policy: RetryPolicy) -> bool:
+        retryable = is_retryable(exc)
+        if retryable:
+            self.breaker(name).record_failure()
+        elif not isinstance(exc, CircuitOpenError):
+            # 鉴权 / 参数错误不反映上游健康状况，不能让半开的熔断器据此关闭
+            self.breaker(name).release()
+        if not retryable or attempt >= policy.max_attempts or isinstance(exc, CircuitOpenError):
+            return False
+        if not self.budget(name).try_spend():
+            logger.warning("%s 重试预算耗尽，放弃重试", name)
+            return False
+        return True
+
+    async def call_async(
+        self, name: str, fn: Callable[[], Awaitable[T]], policy: Optional[RetryPolicy] = None
+    ) -> T:
+        """异步执行 fn，按策略重试；熔断器打开时直接抛出 :class:`CircuitOpenError`。"""
+        policy = policy or self.policy
+        breaker = self.breaker(name)
+        self.budget(name).record_request()
+        attempt = 0
+        while True:
+            attempt += 1
+            breaker.allow()
+            try:
+                result = await fn()
+            except (asyncio.CancelledError, KeyboardInterrupt):
+                breaker.release()
+                raise
+            except Exception as exc:
+                if not self._should_retry(name, exc, attempt, policy):
+                    raise
+                delay = policy.backoff(attempt)
+                logger.warning("%s 第 %s 次调用失败（%s），%.2f 秒后重试", name, attempt, exc, delay)
+                await asyncio.sleep(delay)
+            else:
+                breaker.record_success()
+                return result
+
+    def call_sync(self, name: str, fn: Callable[[], T], policy: Optional[RetryPolicy] = None) -> T:
+        """:meth:`call_async` 的同步版本。"""
+        policy = policy or self.policy
+        breaker = self.breaker(name)
+        self.budget(name).record_request()
+        attempt = 0
+        while True:
+            attempt += 1
+            breaker.allow()
+            try:
+                result = fn()
+            except (asyncio.CancelledError, KeyboardInterrupt):
+                breaker.release()
+                raise
+            except Exception as exc:
+                if not self._should_retry(name, exc, attempt, policy):
+                    raise
+                delay = policy.backoff(attempt)
+                logger.warning("%s 第 %s 次调用失败（%s），%.2f 秒后重试", name, attempt, exc, delay)
+                time.sleep(delay)
+            else:
+                breaker.record_success()
+                return result
+
+    def stats(self) -> Dict[str, str]:
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {b.name: b.state for b in breakers}
+
+
+# 单例
+resilience = Resilience(
+    RetryPolicy(settings.RETRY_MAX_ATTEMPTS, settings.RETRY_BASE_DELAY, settings.RETRY_MAX_DELAY),
+    budget_ratio=settings.RETRY_BUDGET_RATIO,
+    failure_threshold=settings.BREAKER_FAILURE_THRESHOLD,
+    recovery_seconds=settings.BREAKER_RECOVERY_SECONDS,
+)
+call_async = resilience.call_async
+call_sync = resilience.call_sync
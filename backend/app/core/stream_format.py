@@ -0,0 +1,224 @@
+"""流式响应的线上帧格式。
+
+manager 产出的事件（``delta`` / ``done`` / ``error``）在这里被编码成发送给客户端的帧。
+
+``delta-v1``（默认）
+    仅传增量，每帧带单调递增的 ``seq``::
+
+        {"v":1,"seq":0,"type":"start","session_id":"..."}
+        {"seq":1,"d":"你好"}
+        {"seq":2,"d":"，世界"}
+        {"seq":3,"type":"done","session_id":"...","usage":{...},"digest":"sha256:..."}
+
+    ``digest`` 为完整回复的 SHA-256，客户端可据此校验拼接结果。
+    可选按字数 / 时间把细碎增量合并为一帧（首个增量总是立即发送，保证首字延迟）。
+
+``verbose``
+    旧格式：每块都附带时间戳与累计全文 ``full_content``，仅为兼容保留。
+
+帧可编码为 SSE（``id: <seq>`` + ``data: <json>``）或 NDJSON（每行一个 JSON）。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import time
+from typing import Any, AsyncGenerator, AsyncIterable, Dict, List, Optional
+
+STREAM_FORMAT_VERSION = 1
+
+FORMAT_DELTA = "delta-v1"
+FORMAT_VERBOSE = "verbose"
+SUPPORTED_FORMATS = (FORMAT_DELTA, FORMAT_VERBOSE)
+
+SSE_MEDIA_TYPE = "text/event-stream"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def encode_json(frame: Dict[str, Any]) -> str:
+    """紧凑 JSON 编码（无多余空白）。"""
+    return json.dumps(frame, ensure_ascii=False, separators=(",", ":"))
+
+
+def encode_sse(frame: Dict[str, Any]) -> str:
+    """编码为一条 SSE 消息；带 ``seq`` 的帧同时写入 ``id`` 字段。"""
+    seq = frame.get("seq")
+    if seq is None:
+        return f"data: {encode_json(frame)}\n\n"
+    return f"id: {seq}\ndata: {encode_json(frame)}\n\n"
+
+
+def encode_ndjson(frame: Dict[str, Any]) -> str:
+    """编码为一行 NDJSON。"""
+    return encode_json(frame) + "\n"
+
+
+class _DeltaFramer:
+    """把 manager 事件转换为 delta-v1 帧，并负责增量合并。"""
+
+    def __init__(self, coalesce_chars: int, coalesce_ms: int) -> None:
+        self.coalesce_chars = max(0, coalesce_chars)
+        self.coalesce_seconds = max(0, coalesce_ms) / 1000
+        self.seq = 0
+        self.digest = hashlib.sha256()
+        self.output_chars = 0
+        self.delta_count = 0
+        self.buffer: List[str] = []
+        self.buffer_chars = 0
+        self.first_sent = False
+
+    def _next_seq(self) -> int:
+        self.seq += 1
+        return self.seq
+
+    def start(self, meta: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        frame: Dict[str, Any] = {"v": STREAM_FORMAT_VERSION, "seq": 0, "type": "start"}
+        if meta:
+            frame.update(meta)
+        return frame
+
+    def add(self, text: str) -> bool:
+        """缓冲一个增量，返回是否应立即刷新。"""
+        self.digest.update(text.encode("utf-8"))
+        self.output_chars += len(text)
+        self.delta_count += 1
+        self.buffer.append(text)
+        self.buffer_chars += len(text)
+        if not self.first_sent:
+            return True
+        if not self.coalesce_chars and not self.coalesce_seconds:
+            return True
+        return bool(self.coalesce_chars) and self.buffer_chars >= self.coalesce_chars
+
+    def flush(self) -> Optional[Dict[str, Any]]:
+        if not self.buffer:
+            return None
+        text = self.buffer[0] if len(self.buffer) == 1 else "".join(self.buffer)
+        self.buffer.clear()
+        self.buffer_chars = 0
+        self.first_sent = True
+        return {"seq": self._next_seq(), "d": text}
+
+    def done(self, event: Dict[str, Any]) -> Dict[str, Any]:
+        usage = {"output_chars": self.output_chars, "deltas": self.delta_count}
+        usage.update(event.get("usage") or {})
+        frame: Dict[str, Any] = {"seq": self._next_seq(), "type": "done"}
+        if event.get("session_id") is not None:
+            frame["session_id"] = event["session_id"]
+        frame["usage"] = usage
+        frame["digest"] = f"sha256:{self.digest.hexdigest()}"
+        return frame
+
+    def error(self, event: Dict[str, Any]) -> Dict[str, Any]:
+        frame = {"seq": self._next_seq(), "type": "error", "error": event.get("error", "stream_error")}
+        if event.get("session_id") is not None:
+            frame["session_id"] = event["session_id"]
+        return frame
+
+
+async def delta_frames(
+    events: AsyncIterable[Dict[str, Any]],
+    *,
+    start_meta: Optional[Dict[str, Any]] = None,
+    coalesce_chars: int = 0,
+    coalesce_ms: int = 0,
+) -> AsyncGenerator[Dict[str, Any], None]:
+    """把 manager 事件流转换为 delta-v1 帧。
+
+    Args:
+        events: manager 产出的事件。
+        start_meta: 附加到 start 帧的字段（如 session_id）。
+        coalesce_chars: 缓冲增量累计达到该字数即发送；0 表示不按字数合并。
+        coalesce_ms: 缓冲中最早的增量等待超过该毫秒数即发送；0 表示不按时间合并。
+    """
+    framer = _DeltaFramer(coalesce_chars, coalesce_ms)
+    yield framer.start(start_meta)
+
+    source = _with_deadline(events, framer) if framer.coalesce_seconds else events
+
+    async for event in source:
+        if event is None:  # 合并窗口到期
+            frame = framer.flush()
+            if frame is not None:
+                yield frame
+            continue
+
+        kind = event.get("type")
+        if kind == "delta":
+            if framer.add(event.get("content", "")):
+                yield framer.flush()
+            continue
+
+        pending = framer.flush()
+        if pending is not None:
+            yield pending
+        if kind == "done":
+            yield framer.done(event)
+        elif kind == "error":
+            yield framer.error(event)
+
+
+async def _with_deadline(
+    events: AsyncIterable[Dict[str, Any]], framer: _DeltaFramer
+) -> AsyncGenerator[Optional[Dict[str, Any]], None]:
+    """转发事件；缓冲区中的增量等待超过合并窗口时额外产出 ``None`` 以触发刷新。"""
+    loop = asyncio.get_running_loop()
+    iterator = events.__aiter__()
+    pending: Optional[asyncio.Future] = None
+    deadline: Optional[float] = None
+    try:
+        while True:
+            if not framer.buffer:
+                deadline = None
+            elif deadline is None:
+                deadline = loop.time() + framer.coalesce_seconds
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+
+            timeout = None if deadline is None else max(0.0, deadline - loop.time())
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+            if not done:
+                yield None
+                continue
+
+            future, pending = pending, None
+            try:
+                event = future.result()
+            except StopAsyncIteration:
+                return
+            yield event
+    finally:
+        if pending is not None and not pending.done():
+            pending.cancel()
+
+
+async def verbose_frames(events: AsyncIterable[Dict[str, Any]]) -> AsyncGenerator[Dict[str, Any], None]:
+    """旧版冗长格式：每块附带时间戳与累计全文。"""
+    full_content = ""
+    async for event in events:
+        kind = event.get("type")
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
+        if kind == "delta":
+            full_content += event.get("content", "")
+            yield {
+                "type": "stream_chunk",
+                "timestamp": timestamp,
+                "status": "streaming",
+                "content": event.get("content", ""),
+                "full_content": full_content,
+            }
+        elif kind == "done":
+            frame = {"type": "stream_complete", "timestamp": timestamp, "status": "complete", "content": full_content}
+            if event.get("session_id") is not None:
+                frame["session_id"] = event["session_id"]
+            yield frame
+        elif kind == "error":
+            yield {
+                "type": "error",
+                "timestamp": timestamp,
+                "status": "error",
+                "error": "stream_error",
+                "message": event.get("error", ""),
+            }
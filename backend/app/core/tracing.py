@@ -0,0 +1,378 @@
+"""轻量的请求链路追踪：span 计时、trace id 传播、``Server-Timing`` 响应头与可插拔导出器。
+
+一次 HTTP 请求由 :class:`TracingMiddleware` 开启根 span（trace id 取自请求头 ``traceparent``，
+没有则新生成），下游用 :func:`span` 记录子 span，父子关系经 ``contextvars`` 传递，
+``asyncio`` 任务与 ``to_thread`` 线程中同样可见。计时使用单调时钟 ``time.perf_counter``。
+
+请求结束时整条 trace 交给 :data:`tracer` 上注册的导出器：
+
+* :class:`RingBufferExporter`：进程内环形缓冲，``GET /api/traces`` 查看最近的 trace；
+* :class:`JsonLinesExporter`：每条 trace 一行 JSON，由后台线程追加写入文件。
+
+没有活动 trace 时（如脚本直接调用 ``LLMManager``）:func:`span` 只做一次 ``ContextVar.get`` 并产出空操作的
+:data:`NOOP_SPAN`，几乎没有开销。
+异步生成器中不要用 :func:`span` 包住 ``yield``（上下文会泄漏到消费方），改为结束时调用 :func:`record`。
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import queue
+import re
+import secrets
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+_current: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+_TRACEPARENT = re.compile(r"^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+# Server-Timing 的指标名必须是 HTTP token
+_NON_TOKEN = re.compile(r"[^A-Za-z0-9!#$%&'*+.^_`|~-]")
+
+
+class Trace:
+    """一条 trace：同一请求内所有 span 共享的容器。"""
+
+    __slots__ = ("trace_id", "spans", "wall_start", "perf_start")
+
+    def __init__(self, trace_id: Optional[str] = None) -> None:
+        self.trace_id = trace_id or secrets.token_hex(16)
+        self.spans: List[Span] = []
+        self.wall_start = time.time()
+        self.perf_start = time.perf_counter()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "start_time": self.wall_start,
+            "spans": [s.to_dict(self.perf_start) for s in list(self.spans)],
+        }
+
+
+class Span:
+    """单个计时区间；``end`` 为 ``None`` 表示尚未结束。"""
+
+    __slots__ = ("trace", "span_id", "parent_id", "name", "start", "end", "attributes", "status")
+
+    def __init__(
+        self,
+        trace: Trace,
+        name: str,
+        parent_id: Optional[str] = None,
+        start: Optional[float] = None,
+        attributes: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.trace = trace
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.start = time.perf_counter() if start is None else start
+        self.end: Optional[float] = None
+        self.attributes = attributes or {}
+        self.status = "ok"
+        trace.spans.append(self)  # list.append 是原子操作，跨线程追加无需加锁
+
+    @property
+    def trace_id(self) -> str:
+        return self.trace.trace_id
+
+    @property
+    def duration(self) -> float:
+        """耗时（秒）；未结束的 span 计到当前时刻。"""
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def finish(self, end: Optional[float] = None) -> None:
+        if self.end is None:
+            self.end = time.perf_counter() if end is None else end
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_dict(self, origin: float) -> Dict[str, Any]:
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round(self.duration * 1000, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    """没有活动 trace 时 :func:`span` 产出的占位对象，调用方无需判空。"""
+
+    __slots__ = ()
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def current_trace_id() -> Optional[str]:
+    active = _current.get()
+    return active.trace_id if active is not None else None
+
+
+def now() -> float:
+    """span 使用的时钟，供 :func:`record` 的 ``start`` 参数。"""
+    return time.perf_counter()
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Any]:
+    """在当前 trace 下记录一个子 span；没有活动 trace 时什么也不做（产出 :data:`NOOP_SPAN`）。"""
+    parent = _current.get()
+    if parent is None:
+        yield NOOP_SPAN
+        return
+    child = Span(parent.trace, name, parent.span_id, attributes=attributes)
+    token = _current.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.status = "error"
+        child.attributes.setdefault("error", type(e).__name__)
+        raise
+    finally:
+        child.finish()
+        _current.reset(token)
+
+
+def record(name: str, start: float, end: Optional[float] = None, status: str = "ok", **attributes: Any) -> None:
+    """在当前 trace 下追加一个已结束的 span（``start`` / ``end`` 取自 :func:`now`）。"""
+    parent = _current.get()
+    if parent is None:
+        return
+    child = Span(parent.trace, name, parent.span_id, start=start, attributes=attributes)
+    child.status = status
+    child.finish(end)
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[tuple]:
+    """解析 W3C ``traceparent`` 头，返回 ``(trace_id, parent_span_id)``；格式不符时返回 ``None``。"""
+    if not value:
+        return None
+    match = _TRACEPARENT.match(value.strip().lower())
+    if match is None or match.group(1) == "0" * 32:
+        return None
+    return match.group(1), match.group(2)
+
+
+def server_timing(root: Span) -> str:
+    """按 span 名累计耗时生成 ``Server-Timing`` 头，``total`` 为根 span 至今的耗时。"""
+    totals: "OrderedDict[str, float]" = OrderedDict()
+    for item in list(root.trace.spans):
+        if item is root:
+            continue
+        name = _NON_TOKEN.sub("_", item.name)
+        totals[name] = totals.get(name, 0.0) + item.duration
+    totals["total"] = root.duration
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in totals.items())
+
+
+# ---------------------------------------------------------------------------
+# 导出器
+# ---------------------------------------------------------------------------
+
+
+class SpanExporter:
+    """导出器接口：请求结束时以 :meth:`Trace.to_dict` 的结果调用 :meth:`export`。"""
+
+    def export(self, trace: Dict[str, Any]) -> None:  # pragma: no cover - 接口
+        raise NotImplementedError
+
+    def shutdown(self) -> None:
+        """进程退出时调用，默认无操作。"""
+
+
+class RingBufferExporter(SpanExporter):
+    """保留最近 ``capacity`` 条 trace。"""
+
+    def __init__(self, capacity: int = 200) -> None:
+        self._traces: deque = deque(maxlen=max(1, capacity))
+
+    def export(self, trace: Dict[str, Any]) -> None:
+        self._traces.append(trace)
+
+    def recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """最近的 trace，新的在前。"""
+        traces = list(self._traces)
+        return traces[::-1][: max(0, limit)]
+
+    def get(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        for trace in reversed(list(self._traces)):
+            if trace["trace_id"] == trace_id:
+                return trace
+        return None
+
+    def clear(self) -> None:
+        self._traces.clear()
+
+
+class JsonLinesExporter(SpanExporter):
+    """每条 trace 追加一行 JSON 到 ``path``；写文件在后台线程进行，队列满时丢弃。"""
+
+    def __init__(self, path: str, max_queue: int = 10000) -> None:
+        self.path = path
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=max(1, max_queue))
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def export(self, trace: Dict[str, Any]) -> None:
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_worker(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        with open(self.path, "a", encoding="utf-8") as fh:
+            while True:
+                trace = self._queue.get()
+                if trace is None:
+                    return
+                fh.write(json.dumps(trace, ensure_ascii=False, separators=(",", ":"), default=str) + "\n")
+                if self._queue.empty():
+                    fh.flush()
+
+    def shutdown(self) -> None:
+        """写完队列中剩余的 trace 并停止后台线程。"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+        self._thread = None
+
+
+class Tracer:
+    """开启根 span 并在结束时把 trace 交给已注册的导出器。"""
+
+    def __init__(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self.exporters: List[SpanExporter] = []
+
+    def add_exporter(self, exporter: SpanExporter) -> SpanExporter:
+        self.exporters.append(exporter)
+        return exporter
+
+    def remove_exporter(self, exporter: SpanExporter) -> None:
+        if exporter in self.exporters:
+            self.exporters.remove(exporter)
+
+    @contextmanager
+    def trace(self, name: str, traceparent: Optional[str] = None, **attributes: Any) -> Iterator[Optional[Span]]:
+        """开启一条 trace 的根 span；``traceparent`` 合法时沿用其中的 trace id 与父 span。"""
+        if not self.enabled:
+            yield None
+            return
+        parsed = parse_traceparent(traceparent)
+        root = Span(Trace(parsed[0] if parsed else None), name, parsed[1] if parsed else None, attributes=attributes)
+        token = _current.set(root)
+        try:
+            yield root
+        except BaseException as e:
+            root.status = "error"
+            root.attributes.setdefault("error", type(e).__name__)
+            raise
+        finally:
+            root.finish()
+            _current.reset(token)
+            self._export(root.trace)
+
+    def _export(self, trace: Trace) -> None:
+        if not self.exporters:
+            return
+        data = trace.to_dict()
+        for exporter in list(self.exporters):
+            try:
+                exporter.export(data)
+            except Exception:  # noqa: BLE001 - 导出失败不影响请求
+                continue
+
+    def shutdown(self) -> None:
+        for exporter in list(self.exporters):
+            exporter.shutdown()
+
+    @classmethod
+    def from_settings(cls) -> "Tracer":
+        from backend.app.core.config import settings
+
+        tracer = cls(enabled=settings.TRACING_ENABLED)
+        tracer.add_exporter(RingBufferExporter(settings.TRACE_BUFFER_SIZE))
+        if settings.TRACE_EXPORT_PATH:
+            tracer.add_exporter(JsonLinesExporter(settings.TRACE_EXPORT_PATH))
+        return tracer
+
+
+tracer = Tracer.from_settings()
+
+
+def ring_buffer() -> Optional[RingBufferExporter]:
+    """:data:`tracer` 上的环形缓冲导出器（未注册时为 ``None``）。"""
+    for exporter in tracer.exporters:
+        if isinstance(exporter, RingBufferExporter):
+            return exporter
+    return None
+
+
+class TracingMiddleware:
+    """为每个 HTTP 请求开启 trace，并在响应头写入 ``Server-Timing`` 与 ``traceparent``。
+
+    响应头在响应开始时写出，只包含此前结束的 span；流式响应的上游耗时在导出的 trace 中查看。
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        incoming = None
+        for key, value in scope.get("headers") or ():
+            if key == b"traceparent":
+                incoming = value.decode("latin-1")
+                break
+
+        with tracer.trace("request", incoming, method=scope.get("method"), path=scope.get("path")) as root:
+
+            async def send_with_timing(message) -> None:
+                if message["type"] == "http.response.start":
+                    root.set(status_code=message["status"])
+                    headers = list(message.get("headers") or [])
+                    headers.append((b"server-timing", server_timing(root).encode("latin-1")))
+                    headers.append((b"traceparent", root.traceparent().encode("latin-1")))
+                    headers.append((b"timing-allow-origin", b"*"))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_with_timing)
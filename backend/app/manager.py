@@ -1,5 +1,11 @@
+import asyncio
+import functools
 import os
-from typing import List, Dict, Optional, Union
+import json
+import threading
+import time
+from contextlib import aclosing
+from typing import List, Dict, Optional, Tuple, Union, AsyncGenerator, Any
 from dotenv import load_dotenv
 
 # 现阶段保留 MCPClient 用于 chat，但 provider 创建逻辑交由 ProviderFactory
@@ -11,28 +17,85 @@ from backend.app.providers.factory import factory as provider_factory  # type: i
 
 # 统一日志
 from backend.app.core.logging_config import logger
+from backend.app.core.config import settings
+from backend.app.core import metrics, tracing
+from backend.app.providers.rate_limit import estimate_tokens
+from backend.app.services.provider_health import (
+    STATE_FAILED,
+    STATE_INITIALIZED,
+    STATE_PENDING,
+    STATE_READY,
+    ProviderHealth,
+)
+from backend.app.services.response_cache import make_cache_key
+from backend.app.services.single_flight import SingleFlight
 
 class LLMManager:
-    def __init__(self, session_repo=None):
+    def __init__(
+        self,
+        session_repo=None,
+        response_cache=None,
+        semantic_cache=None,
+        rate_limiter=None,
+        model_router=None,
+        hedging=None,
+        model_catalog=None,
+    ):
         """初始化LLM管理器
 
         Args:
             session_repo: 会话存储仓库实例，默认使用 InMemory 实现。
+            response_cache: 回复缓存实例，默认使用 services.response_cache 单例。
+            semantic_cache: 语义缓存实例，默认使用 services.semantic_cache 单例。
+            rate_limiter: provider 限流器，默认使用 providers.rate_limit 单例。
+            model_router: 多 provider 路由器，默认使用 providers.routing 单例（未启用时为 None）。
+            hedging: 对冲策略，默认使用 providers.hedging 单例（未启用时为 None）。
+            model_catalog: 模型目录缓存，默认使用 services.model_catalog 单例。
         """
         # 延迟导入以避免循环
         if session_repo is None:
             from backend.app.repositories import session_repo as default_repo  # type: ignore
             session_repo = default_repo
+        if response_cache is None:
+            from backend.app.services.response_cache import response_cache as default_cache
+            response_cache = default_cache
+        if semantic_cache is None:
+            from backend.app.services.semantic_cache import semantic_cache as default_semantic
+            semantic_cache = default_semantic
+        if rate_limiter is None:
+            from backend.app.providers.rate_limit import rate_limiter as default_limiter
+            rate_limiter = default_limiter
+        if model_router is None:
+            from backend.app.providers.routing import model_router as default_router
+            model_router = default_router
+        if hedging is None:
+            from backend.app.providers.hedging import hedge_policy as default_hedging
+            hedging = default_hedging
+        if model_catalog is None:
+            from backend.app.services.model_catalog import model_catalog as default_catalog
+            model_catalog = default_catalog
 
         self.session_repo = session_repo
+        self.response_cache = response_cache
+        self.semantic_cache = semantic_cache
+        self.rate_limiter = rate_limiter
+        self.model_router = model_router
+        self.hedging = hedging
+        self.model_catalog = model_catalog
+        # 合并进行中的相同上游调用；关闭时为 None
+        self.single_flight = SingleFlight() if settings.SINGLE_FLIGHT_ENABLED else None
 
-        self.current_provider = None
+        self._current_provider = None
+        # 已选定但尚未构造的 provider 名（见 select_provider）
+        self._pending_provider: Optional[str] = None
+        self._provider_lock = threading.Lock()
+        self.current_provider_name: Optional[str] = None
+        self.provider_health = ProviderHealth()
         self.providers = {}
         # 使用配置中的 URL 初始化 MCP 客户端
         self.mcp_client = MCPClient(MCPSettings.HOSTED_URL)
         # 默认携带的上下文轮数（可通过环境变量 MEMORY_WINDOW 设置）
         try:
-            from backend.app.core.config import settings  # type: ignore
             self.default_context_window = settings.memory_window
         except Exception:
             # 兼容旧环境变量
@@ -42,8 +105,29 @@ class LLMManager:
                 self.default_context_window = 5
         logger.info("初始化LLM管理器...")
 
+    @property
+    def current_provider(self):
+        """当前 provider；通过 :meth:`select_provider` 选定的 provider 在首次访问时才构造。"""
+        if self._current_provider is None and self._pending_provider is not None:
+            with self._provider_lock:
+                name, self._pending_provider = self._pending_provider, None
+                if name is not None and self._current_provider is None:
+                    self.initialize_provider(name)
+        return self._current_provider
+
+    @current_provider.setter
+    def current_provider(self, provider) -> None:
+        self._current_provider = provider
+
+    def select_provider(self, provider_name: str) -> None:
+        """选定 provider 但不立即构造，供导入阶段使用；构造推迟到首次使用或 :meth:`warm_up`。"""
+        self._pending_provider = provider_name
+        self._current_provider = None
+        self.current_provider_name = provider_name
+        self.provider_health.mark(provider_name, STATE_PENDING)
+
     def initialize_provider(self, provider_name: str) -> bool:
-        """初始化指定的LLM提供商"""
+        """初始化指定的LLM提供商（仅构造客户端，不做网络请求）"""
         try:
             provider_instance = provider_factory.get(provider_name)
             if provider_instance is None:
@@ -52,10 +136,93 @@ class LLMManager:
 
             self.providers[provider_name] = provider_instance
             self.current_provider = provider_instance
+            self.current_provider_name = provider_name
+            if self.provider_health.state(provider_name) != STATE_READY:
+                self.provider_health.mark(provider_name, STATE_INITIALIZED)
             return True
         except Exception as e:
             logger.exception("初始化提供商失败: %s", e)
+            self.provider_health.mark(provider_name, STATE_FAILED, e)
+            return False
+
+    def provider_name_for(self, provider_name: Optional[str] = None, session_id: Optional[str] = None) -> Optional[str]:
+        """本次请求使用的 provider 名：请求参数 > 会话默认 > 进程默认。"""
+        if not provider_name and session_id:
+            provider_name = self.session_repo.get_provider(session_id)
+        return provider_name or self.current_provider_name
+
+    async def aprovider_name_for(
+        self, provider_name: Optional[str] = None, session_id: Optional[str] = None
+    ) -> Optional[str]:
+        """:meth:`provider_name_for` 的异步版本；需要读取会话默认时在线程池中访问 session_repo（可能是阻塞的 Redis 调用）。"""
+        if not provider_name and session_id:
+            return await asyncio.to_thread(self.provider_name_for, None, session_id)
+        return provider_name or self.current_provider_name
+
+    def resolve_provider(self, provider_name: Optional[str] = None, session_id: Optional[str] = None):
+        """按 :meth:`provider_name_for` 的顺序解析 provider 实例，不修改进程默认。
+
+        指定的 provider 无法构造时抛出 ``ValueError``；均未指定且进程默认也未选定时返回 None。
+        """
+        name = self.provider_name_for(provider_name, session_id)
+        if not name or name == self.current_provider_name:
+            return self.current_provider
+        try:
+            provider = provider_factory.get(name)
+        except Exception as e:
+            self.provider_health.mark(name, STATE_FAILED, e)
+            raise ValueError(f"无法使用提供商 {name}: {e}") from e
+        if provider is None:
+            raise ValueError(f"不支持的提供商: {name}")
+        return provider
+
+    async def aresolve_provider(self, provider_name: Optional[str] = None, session_id: Optional[str] = None):
+        """:meth:`resolve_provider` 的异步版本；读取会话默认与 provider 尚未构造（首次导入 SDK）时在线程池中进行。"""
+        name = await self.aprovider_name_for(provider_name, session_id)
+        if not name or name == self.current_provider_name:
+            provider = self._current_provider
+        else:
+            provider = provider_factory.cached(name)
+        if provider is not None:
+            return provider
+        return await asyncio.to_thread(self.resolve_provider, name)
+
+    async def warm_up(self) -> bool:
+        """启动预热：构造当前 provider、校验 API 密钥并预取模型列表。
+
+        在 FastAPI lifespan 中作为后台任务运行，不阻塞 worker 接收请求；结果记录在 ``provider_health``。
+        """
+        name = self.current_provider_name
+        if name is None:
+            return False
+        provider = await asyncio.to_thread(lambda: self.current_provider)
+        if provider is None:
+            return False
+        try:
+            await asyncio.to_thread(provider.validate)
+        except Exception as e:
+            logger.warning("provider %s 校验失败: %s", name, e)
+            self.provider_health.mark(name, STATE_FAILED, e)
             return False
+        self.provider_health.mark(name, STATE_READY)
+        logger.info("provider %s 预热完成", name)
+        await self.aget_available_models()
+        return True
+
+    def health(self) -> Dict[str, Any]:
+        """就绪状态：当前 provider 校验通过为 ready，尚在构造 / 校验中为 starting，失败为 degraded。"""
+        state = self.provider_health.state(self.current_provider_name)
+        if state == STATE_READY:
+            status = "ready"
+        elif state == STATE_FAILED:
+            status = "degraded"
+        else:
+            status = "starting"
+        return {
+            "status": status,
+            "current_provider": self.current_provider_name,
+            "providers": self.provider_health.snapshot(),
+        }
 
     def get_available_models(self) -> Dict[str, str]:
         """获取当前提供商可用的模型列表"""
@@ -64,28 +231,60 @@ class LLMManager:
                 logger.error("错误：未初始化提供商")
                 return {}
             # 通过MCP客户端获取模型列表
-            return self.mcp_client.get_available_models(self.current_provider)
+            return self._with_routed_models(self.mcp_client.get_available_models(self.current_provider))
         except Exception as e:
             logger.exception("获取模型列表失败: %s", e)
             return {}
 
-    def chat(self, messages: List[Dict[str, str]], model: str) -> Dict[str, Union[str, List[Dict[str, str]]]]:
-        """处理聊天请求"""
+    async def aget_available_models(
+        self, provider_name: Optional[str] = None, session_id: Optional[str] = None
+    ) -> Dict[str, str]:
+        """:meth:`get_available_models` 的异步版本，经模型目录缓存，不在请求路径上等待上游（缓存缺失时除外）。
+
+        provider 解析顺序同 :meth:`resolve_provider`。
+        """
         try:
-            if not self.current_provider:
+            provider = await self.aresolve_provider(provider_name, session_id)
+        except ValueError as e:
+            logger.error("获取模型列表失败: %s", e)
+            return {}
+        if not provider:
+            logger.error("错误：未初始化提供商")
+            return {}
+        name = getattr(provider, "name", None) or type(provider).__name__
+        try:
+            # 目录刷新用会抛出异常的 fetch_models，失败时保留旧列表；默认列表只用于冷启动
+            fallback = functools.partial(self.mcp_client.get_available_models, provider)
+            fetch = getattr(provider, "fetch_models", None) or fallback
+            models = await self.model_catalog.get(name, fetch, fallback)
+        except Exception as e:
+            logger.exception("获取模型列表失败: %s", e)
+            return {}
+        return self._with_routed_models(models)
+
+    def _with_routed_models(self, models: Dict[str, str]) -> Dict[str, str]:
+        if self.model_router is None:
+            return models
+        # 路由的逻辑模型可在任意当前 provider 下使用
+        return {**models, **{f"{name}（路由）": name for name in self.model_router.routes}}
+
+    def chat(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        use_cache: Optional[bool] = None,
+        provider_name: Optional[str] = None,
+    ) -> Dict[str, Union[str, List[Dict[str, str]]]]:
+        """处理聊天请求；``provider_name`` 为空时使用进程默认 provider"""
+        try:
+            provider = self.resolve_provider(provider_name)
+            if not provider:
                 return {"status": "error", "error": "未初始化提供商"}
 
-            if not model:
-                model = self.current_provider.default_model
-                logger.info("未指定模型，使用默认模型: %s", model)
+            model = self._resolve_model(model, provider)
 
             # 使用MCP客户端发送聊天请求
-            response = self.mcp_client.chat(
-                provider=self.current_provider,
-                messages=messages,
-                model=model,
-                stream=False  # 暂时不使用流式响应
-            )
+            response = self._call_provider(messages, model, use_cache, provider)
             
             return {
                 "status": "success",
@@ -106,18 +305,108 @@ class LLMManager:
         """构造模型输入消息列表。"""
         return history[-context_window * 2 :]
 
-    def _call_provider(self, messages: List[Dict[str, str]], model: str) -> str:
-        """调用底层 provider 获取回复。"""
-        return self.mcp_client.chat(
-            provider=self.current_provider,
-            messages=messages,
-            model=model,
-            stream=False,
-        )
+    def _call_provider(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        use_cache: Optional[bool] = None,
+        provider: Any = None,
+    ) -> str:
+        """调用底层 provider 获取回复；按缓存策略依次查精确匹配缓存与语义缓存。"""
+        provider = provider or self.current_provider
+        with tracing.span("provider", provider=metrics.provider_label(provider), model=model) as trace_span:
+            return self._call_provider_traced(messages, model, use_cache, provider, trace_span)
+
+    def _call_provider_traced(
+        self, messages: List[Dict[str, str]], model: str, use_cache: Optional[bool], provider: Any, trace_span: Any
+    ) -> str:
+        cache_key = None
+        if self.response_cache.enabled_for(use_cache):
+            cache_key = make_cache_key(provider, model, messages)
+            cached = self.response_cache.get(cache_key)
+            self._count_cache_lookup("response", provider, model, cached, trace_span)
+            if cached is not None:
+                return cached
+        semantic = self.semantic_cache.enabled_for(use_cache)
+        if semantic:
+            cached = self.semantic_cache.lookup(provider, model, messages)
+            self._count_cache_lookup("semantic", provider, model, cached, trace_span)
+            if cached is not None:
+                return cached
+
+        def upstream() -> str:
+            start = time.perf_counter()
+            try:
+                with tracing.span("upstream"):
+                    response = self.mcp_client.chat(
+                        provider=provider,
+                        messages=messages,
+                        model=model,
+                        stream=False,
+                    )
+            except Exception as e:
+                metrics.observe_llm_call(
+                    metrics.provider_label(provider), metrics.model_label(provider, model), "chat",
+                    time.perf_counter() - start, e,
+                )
+                raise
+            metrics.observe_llm_call(
+                metrics.provider_label(provider), metrics.model_label(provider, model), "chat",
+                time.perf_counter() - start, output_tokens=estimate_tokens(response or ""),
+            )
+            return response
+
+        if self.single_flight is None:
+            response = upstream()
+        else:
+            flight_key = cache_key or make_cache_key(provider, model, messages)
+            response = self.single_flight.do_sync(flight_key, upstream)
+        if cache_key is not None and response:
+            self.response_cache.set(cache_key, response)
+        if semantic and response:
+            self.semantic_cache.store(provider, model, messages, response)
+        return response
 
     def _update_history(self, session_id: str, history: List[Dict[str, str]]) -> None:
         """把最新对话历史写入仓库。"""
-        self.session_repo.save_history(session_id, history)
+        start = time.perf_counter()
+        with tracing.span("repo_save"):
+            self.session_repo.save_history(session_id, history)
+        metrics.observe_session_op(type(self.session_repo).__name__, "save_history", start)
+
+    @staticmethod
+    def _count_cache_lookup(
+        cache: str, provider: Any, model: str, cached: Optional[str], trace_span: Any = tracing.NOOP_SPAN
+    ) -> None:
+        result = "miss" if cached is None else "hit"
+        metrics.CACHE_LOOKUPS.labels(
+            cache, metrics.provider_label(provider), metrics.model_label(provider, model), result
+        ).inc()
+        trace_span.set(**{f"{cache}_cache": result})
+
+    def _prepare_memory_prompt(
+        self,
+        session_id: str,
+        user_message: str,
+        context_window: Optional[int],
+    ) -> Tuple[List[Dict[str, str]], List[Dict[str, str]]]:
+        """读取会话历史并追加本轮用户消息，返回 (完整历史, 模型输入消息)。"""
+        start = time.perf_counter()
+        with tracing.span("repo_load"):
+            history = self.session_repo.get_history(session_id)
+        metrics.observe_session_op(type(self.session_repo).__name__, "get_history", start)
+        history.append({"role": "user", "content": user_message})
+        if context_window is None or context_window <= 0:
+            context_window = self.default_context_window
+        with tracing.span("build_prompt", context_window=context_window):
+            return history, self._build_prompt(history, context_window)
+
+    def _resolve_model(self, model: Optional[str], provider: Any = None) -> str:
+        """未指定模型时回退到 provider（默认为当前 provider）的默认模型。"""
+        if not model:
+            model = (provider or self.current_provider).default_model
+            logger.info("未指定模型，使用默认模型: %s", model)
+        return model
 
     def chat_with_memory(
         self,
@@ -125,21 +414,17 @@ class LLMManager:
         user_message: str,
         model: Optional[str] = None,
         context_window: Optional[int] = None,
+        use_cache: Optional[bool] = None,
+        provider_name: Optional[str] = None,
     ) -> Dict[str, Union[str, List[Dict[str, str]]]]:
-        """基于会话记忆处理聊天请求。"""
+        """基于会话记忆处理聊天请求；provider 解析顺序见 :meth:`resolve_provider`。"""
         try:
-            if not self.current_provider:
+            provider = self.resolve_provider(provider_name, session_id)
+            if not provider:
                 return {"status": "error", "error": "未初始化提供商"}
-            if not model:
-                model = self.current_provider.default_model
-                logger.info("未指定模型，使用默认模型: %s", model)
-            history = self.session_repo.get_history(session_id)
-            history.append({"role": "user", "content": user_message})
-            if context_window is None or context_window <= 0:
-                context_window = self.default_context_window
-
-            prompt_messages = self._build_prompt(history, context_window)
-            response_text = self._call_provider(prompt_messages, model)
+            model = self._resolve_model(model, provider)
+            history, prompt_messages = self._prepare_memory_prompt(session_id, user_message, context_window)
+            response_text = self._call_provider(prompt_messages, model, use_cache, provider)
 
             history.append({"role": "assistant", "content": response_text})
             self._update_history(session_id, history)
@@ -149,4 +434,396 @@ class LLMManager:
                 "session_id": session_id,
             }
         except Exception as e:
-            return {"status": "error", "error": str(e)} 
\ No newline at end of file
+            return {"status": "error", "error": str(e)}
+
+    # ------------------------------------------------------------------
+    # 异步接口：供路由使用，避免同步 SDK 阻塞事件循环
+    # ------------------------------------------------------------------
+
+    async def _acall_provider(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        use_cache: Optional[bool] = None,
+        provider: Any = None,
+    ) -> str:
+        """异步调用底层 provider 获取回复；缓存策略同 :meth:`_call_provider`。"""
+        provider = provider or self.current_provider
+        with tracing.span("provider", provider=metrics.provider_label(provider), model=model) as trace_span:
+            return await self._acall_provider_traced(messages, model, use_cache, provider, trace_span)
+
+    async def _acall_provider_traced(
+        self, messages: List[Dict[str, str]], model: str, use_cache: Optional[bool], provider: Any, trace_span: Any
+    ) -> str:
+        cache_key = None
+        if self.response_cache.enabled_for(use_cache):
+            cache_key = make_cache_key(provider, model, messages)
+            cached = await self.response_cache.aget(cache_key)
+            self._count_cache_lookup("response", provider, model, cached, trace_span)
+            if cached is not None:
+                return cached
+        semantic = self.semantic_cache.enabled_for(use_cache)
+        if semantic:
+            # 向量检索是 CPU 计算，大索引下放到线程中避免占用事件循环
+            cached = await asyncio.to_thread(self.semantic_cache.lookup, provider, model, messages)
+            self._count_cache_lookup("semantic", provider, model, cached, trace_span)
+            if cached is not None:
+                return cached
+
+        def upstream():
+            return self._invoke_upstream(provider, messages, model)
+
+        if self.single_flight is None:
+            response = await upstream()
+        else:
+            flight_key = cache_key or make_cache_key(provider, model, messages)
+            response = await self.single_flight.do(flight_key, upstream)
+        if cache_key is not None and response:
+            await self.response_cache.aset(cache_key, response)
+        if semantic and response:
+            await asyncio.to_thread(self.semantic_cache.store, provider, model, messages, response)
+        return response
+
+    async def _invoke_upstream(self, provider: Any, messages: List[Dict[str, str]], model: str) -> str:
+        """调用一次上游；model 配置了多 provider 路由时按候选后端依次尝试，失败自动转移。
+
+        启用对冲时，前两个候选后端以对冲方式并发竞速，其余后端仍按顺序转移。
+        """
+        backends = self.model_router.candidates(model) if self.model_router is not None else []
+        if not backends:
+            return await self._call_backend(provider, messages, model)
+
+        attempts = [functools.partial(self._attempt_backend, b, messages) for b in backends]
+        if self.hedging is not None and len(backends) > 1:
+            primary, secondary = attempts[:2]
+            delay = self.hedging.delay_for(backends[0].stats)
+            attempts[:2] = [lambda: self.hedging.call(primary, secondary, delay)]
+
+        last_error: Optional[Exception] = None
+        for attempt in attempts:
+            try:
+                return await attempt()
+            except Exception as e:
+                last_error = e
+        raise last_error
+
+    async def _attempt_backend(self, backend: Any, messages: List[Dict[str, str]]) -> str:
+        """调用单个路由后端并记录延迟 / 失败。"""
+        start = time.monotonic()
+        try:
+            # 首次使用时 provider 的构造（导入 SDK、创建客户端）在线程池中进行，不阻塞事件循环
+            backend_provider = await self.aresolve_provider(backend.provider)
+            # provider 会就地插入系统提示词，每个后端使用独立副本
+            response = await self._call_backend(backend_provider, list(messages), backend.model)
+        except Exception as e:
+            self.model_router.record_failure(backend, e)
+            raise
+        self.model_router.record_success(backend, time.monotonic() - start)
+        return response
+
+    async def _call_backend(self, provider: Any, messages: List[Dict[str, str]], model: str) -> str:
+        """在限流额度内调用单个 provider。"""
+        queued = tracing.now()
+        async with self.rate_limiter.limit(provider, model, messages) as governor:
+            tracing.record("queue", queued)
+            start = time.perf_counter()
+            try:
+                with tracing.span("upstream", provider=metrics.provider_label(provider), model=model):
+                    response = await self.mcp_client.achat(provider=provider, messages=messages, model=model)
+            except Exception as e:
+                metrics.observe_llm_call(
+                    metrics.provider_label(provider), metrics.model_label(provider, model), "chat",
+                    time.perf_counter() - start, e,
+                )
+                raise
+            output_tokens = estimate_tokens(response or "")
+            metrics.observe_llm_call(
+                metrics.provider_label(provider), metrics.model_label(provider, model), "chat",
+                time.perf_counter() - start, output_tokens=output_tokens,
+            )
+            await governor.charge_output(response)
+            return response
+
+    async def achat(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        use_cache: Optional[bool] = None,
+        provider_name: Optional[str] = None,
+    ) -> Dict[str, Union[str, List[Dict[str, str]]]]:
+        """:meth:`chat` 的异步版本。"""
+        try:
+            provider = await self.aresolve_provider(provider_name)
+            if not provider:
+                return {"status": "error", "error": "未初始化提供商"}
+            model = self._resolve_model(model, provider)
+            response = await self._acall_provider(messages, model, use_cache, provider)
+            return {
+                "status": "success",
+                "response": response,
+                "messages": messages
+            }
+        except Exception as e:
+            error_msg = str(e)
+            logger.exception("聊天请求失败: %s", error_msg)
+            return {"status": "error", "error": error_msg}
+
+    async def achat_with_memory(
+        self,
+        session_id: str,
+        user_message: str,
+        model: Optional[str] = None,
+        context_window: Optional[int] = None,
+        use_cache: Optional[bool] = None,
+        provider_name: Optional[str] = None,
+    ) -> Dict[str, Union[str, List[Dict[str, str]]]]:
+        """:meth:`chat_with_memory` 的异步版本。"""
+        try:
+            provider = await self.aresolve_provider(provider_name, session_id)
+            if not provider:
+                return {"status": "error", "error": "未初始化提供商"}
+            model = self._resolve_model(model, provider)
+            # session_repo 可能是阻塞的 Redis 客户端，读写都放到线程池
+            history, prompt_messages = await asyncio.to_thread(
+                self._prepare_memory_prompt, session_id, user_message, context_window
+            )
+            response_text = await self._acall_provider(prompt_messages, model, use_cache, provider)
+
+            history.append({"role": "assistant", "content": response_text})
+            await asyncio.to_thread(self._update_history, session_id, history)
+            return {
+                "status": "success",
+                "response": response_text,
+                "session_id": session_id,
+            }
+        except Exception as e:
+            logger.exception("聊天请求失败: %s", e)
+            return {"status": "error", "error": str(e)}
+
+    # ------------------------------------------------------------------
+    # 流式接口
+    # ------------------------------------------------------------------
+
+    async def _stream_provider(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        meta: Optional[Dict[str, Any]] = None,
+        provider: Any = None,
+    ) -> AsyncGenerator[str, None]:
+        """逐块产出 provider 返回的增量文本。
+
+        provider 的 ``chat_completion_stream`` 产出 JSON 字符串（stream_chunk /
+        stream_complete / error），此处统一解析为纯文本增量；非 JSON 的块按原文处理。
+        若 provider 不支持流式，则调用异步接口并一次性产出。
+        ``meta`` 不为空时，stream_complete 中携带的 usage 会写入 ``meta["usage"]``。
+        并发的相同请求共享同一条上游流。
+        """
+        provider = provider or self.current_provider
+        routed = self.model_router is not None and model in self.model_router
+        if not routed and not hasattr(provider, "chat_completion_stream"):
+            yield await self._acall_provider(messages, model, provider=provider)
+            return
+
+        if self.single_flight is None:
+            deltas = self._iter_upstream_stream(provider, messages, model, meta)
+        else:
+            deltas = self.single_flight.stream(
+                make_cache_key(provider, model, messages),
+                lambda shared_meta: self._iter_upstream_stream(provider, messages, model, shared_meta),
+                meta,
+            )
+        async with aclosing(deltas):
+            async for delta in deltas:
+                yield delta
+
+    async def _iter_upstream_stream(
+        self, provider: Any, messages: List[Dict[str, str]], model: str, meta: Optional[Dict[str, Any]]
+    ) -> AsyncGenerator[str, None]:
+        """打开一条上游流；model 配置了路由时，在首个增量之前失败可透明转移到下一个后端。
+
+        启用对冲时，前两个候选后端按首个增量竞速。
+        """
+        backends = self.model_router.candidates(model, stream=True) if self.model_router is not None else []
+        if not backends:
+            async with aclosing(self._iter_provider_stream(provider, messages, model, meta)) as deltas:
+                async for delta in deltas:
+                    yield delta
+            return
+
+        attempts = [functools.partial(self._attempt_backend_stream, b, messages, meta) for b in backends]
+        if self.hedging is not None and len(backends) > 1:
+            primary, secondary = (functools.partial(self._attempt_backend_stream, b, messages) for b in backends[:2])
+            delay = self.hedging.delay_for(backends[0].stats, stream=True)
+            attempts[:2] = [lambda: self.hedging.stream(primary, secondary, delay, meta)]
+
+        last_error: Optional[Exception] = None
+        for attempt in attempts:
+            started = False
+            try:
+                async with aclosing(attempt()) as deltas:
+                    async for delta in deltas:
+                        started = True
+                        yield delta
+            except Exception as e:
+                if started:
+                    raise  # 已向客户端输出内容，无法透明转移
+                last_error = e
+                continue
+            return
+        raise last_error
+
+    async def _attempt_backend_stream(
+        self, backend: Any, messages: List[Dict[str, str]], meta: Optional[Dict[str, Any]]
+    ) -> AsyncGenerator[str, None]:
+        """打开单个路由后端的流并记录首字延迟 / 总延迟 / 失败。"""
+        start = time.monotonic()
+        ttft: Optional[float] = None
+        try:
+            backend_provider = await self.aresolve_provider(backend.provider)
+            deltas = self._iter_provider_stream(backend_provider, list(messages), backend.model, meta)
+            async with aclosing(deltas):
+                async for delta in deltas:
+                    if ttft is None:
+                        ttft = time.monotonic() - start
+                    yield delta
+        except Exception as e:
+            self.model_router.record_failure(backend, e)
+            raise
+        self.model_router.record_success(backend, time.monotonic() - start, ttft, stream=True)
+
+    async def _iter_provider_stream(
+        self, provider: Any, messages: List[Dict[str, str]], model: str, meta: Optional[Dict[str, Any]]
+    ) -> AsyncGenerator[str, None]:
+        """在限流额度内打开一条上游流；整条流期间占用一个并发名额。
+
+        异步生成器中不能用 ``tracing.span`` 包住 ``yield``，上游区间在流结束时以 ``tracing.record`` 补记。
+        """
+        queued = tracing.now()
+        async with self.rate_limiter.limit(provider, model, messages) as governor:
+            started = tracing.now()
+            tracing.record("queue", queued, started)
+            label = metrics.provider_label(provider)
+            parts: List[str] = []
+            observer = metrics.StreamObserver(label, metrics.model_label(provider, model))
+            deltas = self._parse_provider_stream(provider, messages, model, meta)
+            try:
+                async with aclosing(deltas):
+                    async for delta in deltas:
+                        observer.on_delta()
+                        parts.append(delta)
+                        yield delta
+            except (GeneratorExit, asyncio.CancelledError):
+                observer.finish(status="cancelled")
+                tracing.record("upstream", started, status="cancelled", provider=label, model=model)
+                raise
+            except Exception as e:
+                observer.finish(error=e)
+                tracing.record("upstream", started, status="error", provider=label, model=model, error=type(e).__name__)
+                raise
+            text = "".join(parts)
+            usage = (meta or {}).get("usage") or {}
+            observer.finish(output_tokens=usage.get("completion_tokens") or estimate_tokens(text))
+            ttft = observer.ttft
+            tracing.record(
+                "upstream", started, provider=label, model=model,
+                ttft_ms=round(ttft * 1000, 3) if ttft is not None else None, chunks=len(parts),
+            )
+            await governor.charge_output(text)
+
+    @staticmethod
+    async def _parse_provider_stream(
+        provider: Any, messages: List[Dict[str, str]], model: str, meta: Optional[Dict[str, Any]]
+    ) -> AsyncGenerator[str, None]:
+        """解析 provider 的流式 JSON 块，产出纯文本增量。"""
+        async for raw in provider.chat_completion_stream(messages=messages, model=model):
+            try:
+                chunk = json.loads(raw)
+            except (TypeError, ValueError):
+                chunk = None
+            if not isinstance(chunk, dict):
+                if raw:
+                    yield str(raw)
+                continue
+
+            chunk_type = chunk.get("type")
+            if chunk_type == "stream_chunk":
+                if chunk.get("content"):
+                    yield chunk["content"]
+            elif chunk_type == "error":
+                raise RuntimeError(chunk.get("message") or chunk.get("error") or "stream_error")
+            elif chunk_type == "stream_complete" and meta is not None and chunk.get("usage"):
+                meta["usage"] = chunk["usage"]
+
+    async def chat_stream(
+        self, messages: List[Dict[str, str]], model: str, provider_name: Optional[str] = None
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """流式聊天（无会话记忆）。
+
+        依次产出 ``{"type": "delta", "content": ...}`` 事件，
+        结束时产出 ``{"type": "done", "content": 全文}``，出错时产出 ``{"type": "error", "error": ...}``。
+        """
+        try:
+            provider = await self.aresolve_provider(provider_name)
+        except ValueError as e:
+            yield {"type": "error", "error": str(e)}
+            return
+        if not provider:
+            yield {"type": "error", "error": "未初始化提供商"}
+            return
+        model = self._resolve_model(model, provider)
+
+        parts: List[str] = []
+        meta: Dict[str, Any] = {}
+        try:
+            async for delta in self._stream_provider(list(messages), model, meta, provider):
+                parts.append(delta)
+                yield {"type": "delta", "content": delta}
+        except Exception as e:
+            logger.exception("流式聊天请求失败: %s", e)
+            yield {"type": "error", "error": str(e)}
+            return
+        yield {"type": "done", "content": "".join(parts), **meta}
+
+    async def chat_stream_with_memory(
+        self,
+        session_id: str,
+        user_message: str,
+        model: Optional[str] = None,
+        context_window: Optional[int] = None,
+        provider_name: Optional[str] = None,
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """基于会话记忆的流式聊天。
+
+        事件格式同 :meth:`chat_stream`，``done`` 事件额外携带 ``session_id``。
+        仅在流完整结束后才把 user / assistant 两条消息写入 ``session_repo``；
+        中途出错或客户端断开时不落库，避免保存半截回复。
+        """
+        try:
+            provider = await self.aresolve_provider(provider_name, session_id)
+        except ValueError as e:
+            yield {"type": "error", "error": str(e), "session_id": session_id}
+            return
+        if not provider:
+            yield {"type": "error", "error": "未初始化提供商"}
+            return
+        model = self._resolve_model(model, provider)
+        history, prompt_messages = await asyncio.to_thread(
+            self._prepare_memory_prompt, session_id, user_message, context_window
+        )
+
+        parts: List[str] = []
+        meta: Dict[str, Any] = {}
+        try:
+            async for delta in self._stream_provider(prompt_messages, model, meta, provider):
+                parts.append(delta)
+                yield {"type": "delta", "content": delta}
+        except Exception as e:
+            logger.exception("流式聊天请求失败: %s", e)
+            yield {"type": "error", "error": str(e), "session_id": session_id}
+            return
+
+        response_text = "".join(parts)
+        history.append({"role": "assistant", "content": response_text})
+        await asyncio.to_thread(self._update_history, session_id, history)
+        yield {"type": "done", "content": response_text, "session_id": session_id, **meta}
@@ -7,6 +7,8 @@
 # ---------------------------------------------------------------------------
 
 import importlib
+import importlib.abc
+import importlib.machinery
 import sys
 
 # legacy → real
@@ -24,11 +26,30 @@ _alias_map = {
     "llm_api_project.server": "backend.app.server",
 }
 
-# 注册别名
-for legacy_path, real_path in _alias_map.items():
-    try:
-        module = importlib.import_module(real_path)
-        sys.modules.setdefault(legacy_path, module)
-    except ModuleNotFoundError:
-        # 若实际模块尚未迁移，可忽略，等后续实现
-        pass 
\ No newline at end of file
+
+class _AliasLoader(importlib.abc.Loader):
+    """直接返回真实模块，别名与真实路径共享同一模块对象。"""
+
+    def __init__(self, real_path: str) -> None:
+        self.real_path = real_path
+
+    def create_module(self, spec):
+        return importlib.import_module(self.real_path)
+
+    def exec_module(self, module) -> None:
+        pass
+
+
+class _AliasFinder(importlib.abc.MetaPathFinder):
+    """按需解析别名：首次 import 别名时才导入真实模块（openai / google SDK 等），而不是在包初始化时全部导入。"""
+
+    def find_spec(self, fullname, path=None, target=None):
+        real_path = _alias_map.get(fullname)
+        if real_path is None:
+            return None
+        return importlib.machinery.ModuleSpec(fullname, _AliasLoader(real_path))
+
+
+# 注册别名查找器；放在最前，避免 llm_api_project.* 经 backend.app 的 __path__ 被重复加载为另一份模块
+if not any(isinstance(finder, _AliasFinder) for finder in sys.meta_path):
+    sys.meta_path.insert(0, _AliasFinder())
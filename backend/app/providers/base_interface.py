@@ -1,3 +1,4 @@
+import asyncio
 from abc import ABC, abstractmethod
 from typing import Dict, List, Optional
 
@@ -11,11 +12,31 @@ class LLMInterface(ABC):
     def get_available_models(self) -> Dict[str, str]:
         """获取可用的模型列表"""
         pass
+
+    def fetch_models(self) -> Dict[str, str]:
+        """从上游获取模型列表，失败时抛出异常而不是返回默认列表（供模型目录刷新使用）。
+
+        默认委托 :meth:`get_available_models`；该方法出错时回退默认列表的子类应重写本方法。
+        """
+        return self.get_available_models()
     
     @abstractmethod
     def chat_completion(self, messages: List[Dict[str, str]], model: str, temperature: float = 0.7, stream: bool = True) -> str:
         """发送聊天请求并获取响应"""
         pass
+
+    async def achat_completion(self, messages: List[Dict[str, str]], model: str, temperature: float = 0.7) -> str:
+        """异步聊天接口（非流式）
+
+        默认在线程池中执行同步 ``chat_completion``，子类应使用原生异步客户端重写。
+        """
+        return await asyncio.to_thread(self.chat_completion, messages, model, temperature, False)
+
+    def validate(self) -> None:
+        """校验 API 密钥与连通性，失败时抛出异常。
+
+        构造 provider 时不做网络请求；该方法由启动预热在后台调用，默认不做任何检查。
+        """
     
     @property
     @abstractmethod
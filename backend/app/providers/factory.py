@@ -5,6 +5,7 @@
 
 from __future__ import annotations
 
+import threading
 from typing import Dict
 
 from mcp_service.client import MCPClient  # 依赖现有包
@@ -12,17 +13,29 @@ from mcp_service.config.settings import MCPSettings
 
 
 class ProviderFactory:
-    """简单 Provider 工厂，按名称创建 provider 并缓存。"""
+    """简单 Provider 工厂，按名称创建 provider 并缓存。线程安全：同一 provider 并发首次获取时只构造一次。"""
 
     def __init__(self) -> None:
         self._mcp_client = MCPClient(MCPSettings.HOSTED_URL)
         self._cache: Dict[str, object] = {}
+        self._lock = threading.Lock()
+        # 按 provider 名加锁，构造某个 provider 时不阻塞其它 provider
+        self._build_locks: Dict[str, threading.Lock] = {}
 
     def get(self, provider_name: str):  # 返回类型保持 object，兼容旧 manager
-        if provider_name not in self._cache:
-            self._cache[provider_name] = self._mcp_client.create_provider(provider_name)
+        if provider_name in self._cache:
+            return self._cache[provider_name]
+        with self._lock:
+            build_lock = self._build_locks.setdefault(provider_name, threading.Lock())
+        with build_lock:
+            if provider_name not in self._cache:
+                self._cache[provider_name] = self._mcp_client.create_provider(provider_name)
         return self._cache[provider_name]
 
+    def cached(self, provider_name: str):
+        """返回已构造的 provider，尚未构造时返回 None（不触发构造）。"""
+        return self._cache.get(provider_name)
+
 
 # 单例
 factory = ProviderFactory() 
\ No newline at end of file
@@ -0,0 +1,223 @@
+"""对冲请求（hedged requests）：主后端迟迟不出首字时，把同一请求再发给备用后端，先响应者胜出。
+
+* 触发延迟：主后端同类请求最近延迟的 ``percentile`` 分位数（流式取首字延迟，非流式取总耗时，分开统计），
+  限制在 ``[min_delay_ms, max_delay_ms]``；样本不足 ``min_samples`` 时使用 ``initial_delay_ms``；
+* 胜负：非流式以先成功返回者为准，流式以先产出首个增量者为准，落败的一方立即取消；
+* 预算：滑动窗口内对冲次数不超过请求数的 ``budget_ratio``，上游整体变慢时不会把流量翻倍；
+* 主后端在触发延迟之前就失败时直接转移到备用后端，属于故障转移，不消耗对冲预算。
+
+配置位于 ``backend/config.yml`` 的 ``routing.hedging`` 段，仅对配置了多个后端的路由模型生效。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from contextlib import aclosing
+from typing import Any, AsyncGenerator, AsyncIterator, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+from backend.app.core.resilience import RetryBudget
+from backend.app.providers.routing import BackendStats
+
+T = TypeVar("T")
+
+_ITEM, _DONE, _ERROR = "item", "done", "error"
+
+
+class _StreamRunner:
+    """在后台任务中消费一条流，产出依次放入有界队列；队列满时暂停读取上游，落败方不会缓冲整段回复。"""
+
+    QUEUE_SIZE = 32
+
+    def __init__(self, factory: Callable[[Dict[str, Any]], AsyncIterator[T]]) -> None:
+        self.meta: Dict[str, Any] = {}
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=self.QUEUE_SIZE)
+        self.task = asyncio.create_task(self._run(factory))
+
+    async def _run(self, factory: Callable[[Dict[str, Any]], AsyncIterator[T]]) -> None:
+        try:
+            async with aclosing(factory(self.meta)) as items:
+                async for item in items:
+                    await self.queue.put((_ITEM, item))
+            await self.queue.put((_DONE, None))
+        except Exception as exc:
+            await self.queue.put((_ERROR, exc))
+
+
+class HedgePolicy:
+    """对冲触发延迟与预算。"""
+
+    def __init__(
+        self,
+        percentile: float = 95,
+        min_delay: float = 0.2,
+        max_delay: float = 5.0,
+        initial_delay: float = 2.0,
+        min_samples: int = 20,
+        budget_ratio: float = 0.1,
+        budget_window_seconds: float = 60.0,
+    ) -> None:
+        self.quantile = percentile / 100.0
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.initial_delay = initial_delay
+        self.min_samples = min_samples
+        self.budget = RetryBudget(budget_ratio, min_retries=0, window_seconds=budget_window_seconds)
+        self._stats = {"requests": 0, "hedged": 0, "hedge_wins": 0, "budget_denied": 0}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "HedgePolicy":
+        return cls(
+            percentile=float(config.get("percentile", 95)),
+            min_delay=float(config.get("min_delay_ms", 200)) / 1000,
+            max_delay=float(config.get("max_delay_ms", 5000)) / 1000,
+            initial_delay=float(config.get("initial_delay_ms", 2000)) / 1000,
+            min_samples=int(config.get("min_samples", 20)),
+            budget_ratio=float(config.get("budget_ratio", 0.1)),
+            budget_window_seconds=float(config.get("budget_window_seconds", 60)),
+        )
+
+    def delay_for(self, stats: BackendStats, stream: bool = False) -> float:
+        """主后端的对冲触发延迟（秒）；``stream`` 选择流式首字延迟或非流式总耗时的样本。"""
+        if len(stats.samples(stream)) < self.min_samples:
+            return self.initial_delay
+        return min(self.max_delay, max(self.min_delay, stats.latency_quantile(self.quantile, stream)))
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+    def _try_hedge(self) -> bool:
+        if self.budget.try_spend():
+            self._count("hedged")
+            return True
+        self._count("budget_denied")
+        return False
+
+    def _start(self) -> None:
+        self.budget.record_request()
+        self._count("requests")
+
+    async def call(
+        self, primary: Callable[[], Awaitable[T]], secondary: Callable[[], Awaitable[T]], delay: float
+    ) -> T:
+        """执行 primary，超过 delay 未完成时对冲 secondary，返回先成功者的结果；两者都失败时抛出最后的异常。"""
+        self._start()
+        first = asyncio.ensure_future(primary())
+        tasks = {first}
+        secondary_started = hedged = False
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done and self._try_hedge():
+                tasks.add(asyncio.ensure_future(secondary()))
+                secondary_started = hedged = True
+            last_error: Optional[BaseException] = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if hedged and task is not first:
+                            self._count("hedge_wins")
+                        return task.result()
+                    last_error = task.exception()
+                if not tasks and not secondary_started:
+                    # 主后端失败：转移到备用后端
+                    tasks = {asyncio.ensure_future(secondary())}
+                    secondary_started = True
+            raise last_error
+        finally:
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def stream(
+        self,
+        primary: Callable[[Dict[str, Any]], AsyncIterator[T]],
+        secondary: Callable[[Dict[str, Any]], AsyncIterator[T]],
+        delay: float,
+        meta: Optional[Dict[str, Any]] = None,
+    ) -> AsyncGenerator[T, None]:
+        """流式版本：以先产出首个增量者为胜者，之后只转发胜者的流。
+
+        primary / secondary 接收各自的 meta 字典，胜者的 meta 在流结束后合并进 ``meta``。
+        """
+        self._start()
+        runners: List[_StreamRunner] = [_StreamRunner(primary)]
+        getters: Dict[asyncio.Future, _StreamRunner] = {}
+
+        def watch(runner: _StreamRunner) -> None:
+            getters[asyncio.ensure_future(runner.queue.get())] = runner
+
+        try:
+            watch(runners[0])
+            winner: Optional[_StreamRunner] = None
+            first_event = None
+            last_error: Optional[BaseException] = None
+            timeout: Optional[float] = delay
+            hedged = False
+            while winner is None:
+                done, _ = await asyncio.wait(getters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                timeout = None
+                if not done:
+                    if self._try_hedge():
+                        runners.append(_StreamRunner(secondary))
+                        watch(runners[1])
+                        hedged = True
+                    continue
+                for getter in done:
+                    runner = getters.pop(getter)
+                    event = getter.result()
+                    if event[0] == _ERROR:
+                        last_error = event[1]
+                    elif winner is None:
+                        winner, first_event = runner, event
+                if winner is None and not getters:
+                    if len(runners) > 1:
+                        raise last_error
+                    # 主后端在首个增量之前失败：转移到备用后端
+                    runners.append(_StreamRunner(secondary))
+                    watch(runners[1])
+
+            for getter in getters:
+                getter.cancel()
+            getters.clear()
+            for runner in runners:
+                if runner is not winner:
+                    runner.task.cancel()
+            if hedged and winner is runners[1]:
+                self._count("hedge_wins")
+
+            kind, value = first_event
+            while kind == _ITEM:
+                yield value
+                kind, value = await winner.queue.get()
+            if kind == _ERROR:
+                raise value
+            if meta is not None:
+                meta.update(winner.meta)
+        finally:
+            for getter in getters:
+                getter.cancel()
+            for runner in runners:
+                runner.task.cancel()
+            # 等待被取消的任务真正结束（关闭上游连接），并回收其异常，避免 "Task exception was never retrieved"
+            await asyncio.gather(*getters, *(runner.task for runner in runners), return_exceptions=True)
+
+
+def _create_policy() -> Optional[HedgePolicy]:
+    from backend.app.providers.impl.config import ROUTING_CONFIG
+
+    config = ROUTING_CONFIG.get("hedging") or {}
+    if not ROUTING_CONFIG.get("enabled") or not config.get("enabled"):
+        return None
+    return HedgePolicy.from_config(config)
+
+
+# 单例；未启用对冲时为 None
+hedge_policy = _create_policy()
@@ -1,26 +1,36 @@
-"""Provider 实现包装层（占位）。
+"""Provider 实现包装层。
 
-当前阶段仅做路径过渡：保持代码逻辑在 `llm_api_project.*_provider`，
-但对外暴露新的导入路径 `backend.app.providers.impl.*Provider`，
-以便后续逐步迁移实现源码而不影响运行。"""
+对外暴露 `backend.app.providers.impl.*Provider` 导入路径。各 provider 依赖较重的 SDK
+（openai / google.generativeai 等），因此通过 PEP 562 的模块级 ``__getattr__`` 在首次访问时才导入，
+仅使用其中一个 provider 时不会加载其余 SDK。"""
 
 from importlib import import_module as _import
 
+# 类名 -> 实现模块
+_PROVIDERS = {
+    "SiliconProvider": "silicon_provider",
+    "GoogleProvider": "google_provider",
+    "WisdomGateProvider": "wisdom_gate_provider",
+    "MockProvider": "mock_provider",
+}
 
-# 从旧包动态导入并重新导出类 --------------------------------------------------
 
-_silicon_mod = _import("backend.app.providers.impl.silicon_provider")
-SiliconProvider = _silicon_mod.SiliconProvider  # type: ignore
+def __getattr__(name: str):
+    module = _PROVIDERS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(_import(f"{__name__}.{module}"), name)
+    globals()[name] = value  # 缓存，后续访问不再经过 __getattr__
+    return value
 
-_google_mod = _import("backend.app.providers.impl.google_provider")
-GoogleProvider = _google_mod.GoogleProvider  # type: ignore
 
-_wisdom_mod = _import("backend.app.providers.impl.wisdom_gate_provider")
-WisdomGateProvider = _wisdom_mod.WisdomGateProvider  # type: ignore
+def __dir__():
+    return sorted(set(globals()) | set(_PROVIDERS))
 
 
 __all__ = [
     "SiliconProvider",
     "GoogleProvider",
     "WisdomGateProvider",
-] 
\ No newline at end of file
+    "MockProvider",
+]
@@ -49,6 +49,12 @@ MCP_CONFIG = _config.get('mcp', {})
 MCP_ENABLED = MCP_CONFIG.get('enabled', False)
 MCP_TIMEOUT = MCP_CONFIG.get('timeout_seconds', 30)
 
+# Provider 限流配置（见 backend/app/providers/rate_limit.py）
+RATE_LIMIT_CONFIG = _config.get('rate_limits', {}) or {}
+
+# 多 provider 路由配置（见 backend/app/providers/routing.py）
+ROUTING_CONFIG = _config.get('routing', {}) or {}
+
 # 获取当前激活的LLM配置
 def get_active_llm_config():
     """获取当前激活的LLM配置，并处理动态变量"""
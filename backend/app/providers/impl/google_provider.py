@@ -1,37 +1,32 @@
 import os
 import json
+import logging
 import time
 from typing import List, Dict, AsyncGenerator
 
 import google.generativeai as genai
 
 from ..base_interface import LLMInterface
+from ..stream_bridge import iterate_in_thread
 from . import config
+from backend.app.core.logging_config import log_event, log_token, logger, message_fields
+from backend.app.core.resilience import as_provider_error, call_async, call_sync
 
 
 class GoogleProvider(LLMInterface):
     """基于 Google Gemini 的 LLM Provider 实现"""
 
+    name = "google"
+
     def __init__(self):
         self.api_key = os.getenv("GOOGLE_API_KEY")
-        print(json.dumps({
-            "type": "system",
-            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-            "event": "provider_init",
-            "provider": "google",
-            "api_key_status": "已设置" if self.api_key else "未设置"
-        }, ensure_ascii=False, indent=2))
+        log_event("provider_init", provider="google", api_key_status="已设置" if self.api_key else "未设置")
 
         if not self.api_key:
             raise ValueError("请在.env文件中设置GOOGLE_API_KEY")
 
         self.setup_client()
-        print(json.dumps({
-            "type": "system",
-            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-            "event": "provider_ready",
-            "provider": "google"
-        }, ensure_ascii=False, indent=2))
+        log_event("provider_ready", provider="google")
 
     # ---------------------------------------------------------------------
     # 基础接口实现
@@ -43,42 +38,44 @@ class GoogleProvider(LLMInterface):
             # 直接使用 genai 作为客户端
             self.client = genai
         except Exception as e:
-            print(f"Google Gemini SDK 初始化失败: {e}")
+            logger.error("Google Gemini SDK 初始化失败: %s", e)
             raise
 
+    def validate(self) -> None:
+        """拉取一页模型列表以验证 API 密钥（由启动预热在后台调用）"""
+        call_sync(self.name, lambda: next(iter(genai.list_models(page_size=1)), None))
+
     @property
     def default_model(self) -> str:
         """返回默认模型名称"""
         return "gemini-pro"
 
     def get_available_models(self) -> Dict[str, str]:
-        """返回可用模型列表（动态调用Gemini API以确保最新）"""
+        """返回可用模型列表（动态调用Gemini API以确保最新），失败时回退默认列表"""
         try:
-            models = {}
-            for model in genai.list_models():
-                # 仅保留支持文本生成的方法
-                if 'generateContent' in getattr(model, 'supported_generation_methods', []):
-                    # model.name 形如 'models/gemini-2.5-pro'
-                    model_id = model.name.split('/')[-1]
-                    display_name = self._get_display_name(model_id)
-                    models[display_name] = model_id
-
-            # 如果未获取到任何模型则回退默认静态列表
-            if not models:
-                models = {
-                    "Gemini Pro": "gemini-pro",
-                    "Gemini Pro Vision": "gemini-pro-vision"
-                }
-
-            return models
+            return self.fetch_models()
         except Exception as e:
-            print(f"获取模型列表失败: {e}")
-            # 出错时回退默认列表
+            logger.warning("获取模型列表失败，使用默认模型列表: %s", e)
             return {
                 "Gemini Pro": "gemini-pro",
                 "Gemini Pro Vision": "gemini-pro-vision"
             }
 
+    def fetch_models(self) -> Dict[str, str]:
+        """调用 Gemini API 获取模型列表，失败或列表为空时抛出异常"""
+        models = {}
+        for model in genai.list_models():
+            # 仅保留支持文本生成的方法
+            if 'generateContent' in getattr(model, 'supported_generation_methods', []):
+                # model.name 形如 'models/gemini-2.5-pro'
+                model_id = model.name.split('/')[-1]
+                display_name = self._get_display_name(model_id)
+                models[display_name] = model_id
+
+        if not models:
+            raise ValueError("未获取到任何支持文本生成的模型")
+        return models
+
     # ------------------------------------------------------------------
     # 私有工具方法
     # ------------------------------------------------------------------
@@ -115,54 +112,65 @@ class GoogleProvider(LLMInterface):
     # 聊天接口实现
     # ------------------------------------------------------------------
 
+    # 流式缓冲区最多容纳的未消费块数
+    STREAM_BUFFER_SIZE = 64
+
     async def chat_completion_stream(
         self,
         messages: List[Dict[str, str]],
         model: str,
         temperature: float = 0.7
     ) -> AsyncGenerator[str, None]:
-        """异步流式聊天接口（Gemini 暂不提供原生异步，使用线程池包装）"""
-        # 由于 Gemini SDK 仅提供同步流式接口，简单地在协程中包裹即可
-        import asyncio
-        loop = asyncio.get_event_loop()
-        for chunk in await loop.run_in_executor(None, lambda: list(self._sync_stream(messages, model, temperature))):
-            yield chunk
+        """异步流式聊天接口
+
+        Gemini SDK 仅提供同步流式迭代器，这里通过 ``iterate_in_thread`` 在工作线程中驱动，
+        每个块到达即交给调用方；调用方提前退出时停止拉取上游。
+        """
+        try:
+            async for chunk in iterate_in_thread(
+                lambda: self._sync_stream(messages, model, temperature),
+                maxsize=self.STREAM_BUFFER_SIZE,
+            ):
+                yield chunk
+        except Exception as e:
+            yield json.dumps({
+                "type": "error",
+                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "status": "error",
+                "error": "stream_error",
+                "message": str(e)
+            }, ensure_ascii=False)
 
     def _sync_stream(self, messages: List[Dict[str, str]], model: str, temperature: float):
         """同步流式生成，供异步包装调用"""
         messages = self._add_system_prompt(messages)
-        print(json.dumps({
-            "type": "request",
-            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-            "event": "stream_request",
-            "provider": "google",
-            "model": model,
-            "temperature": temperature,
-            "messages": messages
-        }, ensure_ascii=False, indent=2))
+        log_event("stream_request", provider="google", model=model, temperature=temperature, **message_fields(messages))
 
         gemini_messages = self._convert_messages(messages)
         model_obj = genai.GenerativeModel(model)
-        response = model_obj.generate_content(gemini_messages, generation_config={"temperature": temperature}, stream=True)
+        response = call_sync(self.name, lambda: model_obj.generate_content(
+            gemini_messages, generation_config={"temperature": temperature}, stream=True
+        ))
 
-        current_content = ""
+        # 仅发送增量；累计全文由调用方自行拼接，避免每块重复序列化整段内容
+        content_length = 0
+        usage = None
         for chunk in response:
+            if getattr(chunk, "usage_metadata", None):
+                usage = chunk.usage_metadata
             if getattr(chunk, "text", None):
                 content = chunk.text
-                current_content += content
-                yield json.dumps({
-                    "type": "stream_chunk",
-                    "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-                    "status": "streaming",
-                    "content": content,
-                    "full_content": current_content
-                }, ensure_ascii=False)
-        yield json.dumps({
-            "type": "stream_complete",
-            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-            "status": "complete",
-            "content": current_content
-        }, ensure_ascii=False)
+                content_length += len(content)
+                yield json.dumps({"type": "stream_chunk", "content": content}, ensure_ascii=False)
+
+        complete = {"type": "stream_complete", "content_length": content_length}
+        if usage is not None:
+            complete["usage"] = {
+                "prompt_tokens": getattr(usage, "prompt_token_count", 0),
+                "completion_tokens": getattr(usage, "candidates_token_count", 0),
+                "total_tokens": getattr(usage, "total_token_count", 0),
+            }
+        yield json.dumps(complete, ensure_ascii=False)
 
     def chat_completion(
         self,
@@ -174,61 +182,71 @@ class GoogleProvider(LLMInterface):
         """同步聊天接口"""
         try:
             messages = self._add_system_prompt(messages)
-            print(json.dumps({
-                "type": "request",
-                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-                "event": "chat_request",
-                "provider": "google",
-                "model": model,
-                "temperature": temperature,
-                "stream": stream,
-                "messages": messages
-            }, ensure_ascii=False, indent=2))
+            log_event(
+                "chat_request",
+                provider="google",
+                model=model,
+                temperature=temperature,
+                stream=stream,
+                **message_fields(messages),
+            )
 
             gemini_messages = self._convert_messages(messages)
             model_obj = genai.GenerativeModel(model)
 
             if stream:
                 full_response = ""
-                response = model_obj.generate_content(gemini_messages, generation_config={"temperature": temperature}, stream=True)
-                print(json.dumps({
-                    "type": "response",
-                    "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-                    "event": "stream_start",
-                    "provider": "google"
-                }, ensure_ascii=False, indent=2))
+                response = call_sync(self.name, lambda: model_obj.generate_content(
+                    gemini_messages, generation_config={"temperature": temperature}, stream=True
+                ))
+                log_event("stream_start", provider="google")
                 for chunk in response:
                     if getattr(chunk, "text", None):
                         content = chunk.text
                         full_response += content
-                        print(content, end="", flush=True)
-                print(json.dumps({
-                    "type": "response",
-                    "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-                    "event": "stream_complete",
-                    "provider": "google",
-                    "content_length": len(full_response)
-                }, ensure_ascii=False, indent=2))
+                        log_token(self.name, content)
+                log_event("stream_complete", provider="google", content_length=len(full_response))
                 return full_response
             else:
-                response = model_obj.generate_content(gemini_messages, generation_config={"temperature": temperature})
+                response = call_sync(self.name, lambda: model_obj.generate_content(
+                    gemini_messages, generation_config={"temperature": temperature}
+                ))
                 content = response.text
-                print(json.dumps({
-                    "type": "response",
-                    "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-                    "event": "chat_response",
-                    "provider": "google",
-                    "content_length": len(content)
-                }, ensure_ascii=False, indent=2))
+                log_event("chat_response", provider="google", content_length=len(content))
                 return content
 
         except Exception as e:
             error_msg = str(e)
-            print(json.dumps({
-                "type": "error",
-                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-                "event": "chat_error",
-                "provider": "google",
-                "error": error_msg
-            }, ensure_ascii=False, indent=2))
-            raise Exception(f"Google Gemini API 调用失败: {error_msg}") 
\ No newline at end of file
+            log_event("chat_error", logging.ERROR, provider="google", error=error_msg)
+            raise as_provider_error("Google Gemini API 调用失败", e) 
+    async def achat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float = 0.7
+    ) -> str:
+        """异步聊天接口（非流式），使用 SDK 原生的 generate_content_async"""
+        try:
+            messages = self._add_system_prompt(messages)
+            log_event(
+                "chat_request",
+                provider="google",
+                model=model,
+                temperature=temperature,
+                stream=False,
+                **message_fields(messages),
+            )
+
+            gemini_messages = self._convert_messages(messages)
+            model_obj = genai.GenerativeModel(model)
+            response = await call_async(self.name, lambda: model_obj.generate_content_async(
+                gemini_messages, generation_config={"temperature": temperature}
+            ))
+            content = response.text
+            log_event("chat_response", provider="google", content_length=len(content))
+            return content
+
+        except Exception as e:
+            error_msg = str(e)
+            log_event("chat_error", logging.ERROR, provider="google", error=error_msg)
+            raise as_provider_error("Google Gemini API 调用失败", e)
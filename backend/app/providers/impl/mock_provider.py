@@ -0,0 +1,276 @@
+"""离线 Mock Provider：按配置的延迟分布与故障率模拟上游，用于压测与测试，不消耗真实 API 额度。
+
+延迟与输出长度用分布描述（见 :class:`Distribution`），默认从环境变量读取，构造时传参可覆盖：
+
+* ``MOCK_TTFT_MS``：首字延迟（毫秒），默认 ``lognormal:300,0.5``；
+* ``MOCK_INTER_TOKEN_MS``：相邻 token 间隔（毫秒），默认 ``normal:20,5``；
+* ``MOCK_OUTPUT_TOKENS``：输出 token 数，默认 ``uniform:50,300``；
+* ``MOCK_ERROR_RATE`` / ``MOCK_RATE_LIMIT_RATE`` / ``MOCK_TIMEOUT_RATE``：每次调用注入 500 错误、
+  429 限流、超时（等待 ``MOCK_TIMEOUT_SECONDS`` 后失败）的概率，默认均为 0；
+* ``MOCK_SEED``：随机种子，便于复现。
+
+故障在首个 token 之前注入，并与真实 provider 一样经 ``core.resilience`` 调用，重试 / 熔断行为与线上一致。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import time
+from typing import AsyncGenerator, Dict, List, Optional, Union
+
+from ..base_interface import LLMInterface
+from backend.app.core.logging_config import log_event, message_fields
+from backend.app.core.resilience import UpstreamError, as_provider_error, call_async, call_sync
+from backend.app.providers.rate_limit import estimate_prompt_tokens
+
+_WORDS = (
+    "the", "model", "returns", "a", "simulated", "answer", "with", "tokens", "streamed", "at",
+    "configurable", "latency", "for", "offline", "benchmarks", "and", "tests", "of", "this", "service",
+)
+
+
+class Distribution:
+    """数值分布，由形如 ``"kind:a,b"`` 的字符串描述；采样结果不小于 0。
+
+    * ``"200"`` / ``"const:200"``：常数；
+    * ``"uniform:100,300"``：均匀分布；
+    * ``"normal:200,50"``：正态分布（均值、标准差）；
+    * ``"lognormal:200,0.5"``：对数正态（中位数、对数标准差），适合长尾延迟；
+    * ``"exp:200"``：指数分布（均值）。
+    """
+
+    KINDS = {"const": 1, "uniform": 2, "normal": 2, "lognormal": 2, "exp": 1}
+
+    def __init__(self, kind: str, *params: float) -> None:
+        if kind not in self.KINDS:
+            raise ValueError(f"不支持的分布类型: {kind}")
+        if len(params) != self.KINDS[kind]:
+            raise ValueError(f"{kind} 分布需要 {self.KINDS[kind]} 个参数，收到 {len(params)}")
+        self.kind = kind
+        self.params = params
+
+    @classmethod
+    def parse(cls, spec: Union[str, float, "Distribution"]) -> "Distribution":
+        if isinstance(spec, Distribution):
+            return spec
+        if isinstance(spec, (int, float)):
+            return cls("const", float(spec))
+        kind, _, args = str(spec).strip().partition(":")
+        if not args:
+            kind, args = "const", kind
+        try:
+            params = [float(p) for p in args.split(",")]
+        except ValueError:
+            raise ValueError(f"无法解析分布: {spec!r}") from None
+        return cls(kind.strip().lower(), *params)
+
+    def sample(self, rng: random.Random) -> float:
+        a = self.params[0]
+        if self.kind == "const":
+            value = a
+        elif self.kind == "uniform":
+            value = rng.uniform(a, self.params[1])
+        elif self.kind == "normal":
+            value = rng.gauss(a, self.params[1])
+        elif self.kind == "lognormal":
+            value = rng.lognormvariate(math.log(a), self.params[1]) if a > 0 else 0.0
+        else:
+            value = rng.expovariate(1.0 / a) if a > 0 else 0.0
+        return max(0.0, value)
+
+    def __repr__(self) -> str:
+        return f"{self.kind}:{','.join(f'{p:g}' for p in self.params)}"
+
+
+def _env_rate(name: str) -> float:
+    return min(1.0, max(0.0, float(os.getenv(name, "0"))))
+
+
+class MockProvider(LLMInterface):
+    """模拟上游的 LLM Provider，同步 / 异步 / 流式接口与真实 provider 一致。"""
+
+    name = "mock"
+
+    def __init__(
+        self,
+        ttft_ms: Union[str, float, Distribution, None] = None,
+        inter_token_ms: Union[str, float, Distribution, None] = None,
+        output_tokens: Union[str, float, Distribution, None] = None,
+        error_rate: Optional[float] = None,
+        rate_limit_rate: Optional[float] = None,
+        timeout_rate: Optional[float] = None,
+        timeout_seconds: Optional[float] = None,
+        seed: Optional[int] = None,
+    ):
+        self.ttft_ms = Distribution.parse(ttft_ms if ttft_ms is not None else os.getenv("MOCK_TTFT_MS", "lognormal:300,0.5"))
+        self.inter_token_ms = Distribution.parse(
+            inter_token_ms if inter_token_ms is not None else os.getenv("MOCK_INTER_TOKEN_MS", "normal:20,5")
+        )
+        self.output_tokens = Distribution.parse(
+            output_tokens if output_tokens is not None else os.getenv("MOCK_OUTPUT_TOKENS", "uniform:50,300")
+        )
+        self.error_rate = error_rate if error_rate is not None else _env_rate("MOCK_ERROR_RATE")
+        self.rate_limit_rate = rate_limit_rate if rate_limit_rate is not None else _env_rate("MOCK_RATE_LIMIT_RATE")
+        self.timeout_rate = timeout_rate if timeout_rate is not None else _env_rate("MOCK_TIMEOUT_RATE")
+        self.timeout_seconds = (
+            timeout_seconds if timeout_seconds is not None else float(os.getenv("MOCK_TIMEOUT_SECONDS", "30"))
+        )
+        if seed is None and os.getenv("MOCK_SEED"):
+            seed = int(os.environ["MOCK_SEED"])
+        self.seed = seed
+        self.setup_client()
+        log_event(
+            "provider_init",
+            provider="mock",
+            ttft_ms=repr(self.ttft_ms),
+            inter_token_ms=repr(self.inter_token_ms),
+            output_tokens=repr(self.output_tokens),
+            error_rate=self.error_rate,
+            rate_limit_rate=self.rate_limit_rate,
+            timeout_rate=self.timeout_rate,
+        )
+
+    # ------------------------------------------------------------------
+    # 基础接口实现
+    # ------------------------------------------------------------------
+
+    def setup_client(self):
+        """Mock 没有真实客户端，只初始化随机数发生器。"""
+        self.rng = random.Random(self.seed)
+
+    @property
+    def default_model(self) -> str:
+        return "mock-model"
+
+    def get_available_models(self) -> Dict[str, str]:
+        return {"Mock Model": "mock-model"}
+
+    # ------------------------------------------------------------------
+    # 模拟上游行为
+    # ------------------------------------------------------------------
+
+    def _plan(self) -> tuple:
+        """本次调用的 (故障类型, 首字延迟秒数, 输出 token 数)；故障类型为 None 表示成功。"""
+        roll = self.rng.random()
+        fault = None
+        for kind, rate in (("rate_limit", self.rate_limit_rate), ("error", self.error_rate), ("timeout", self.timeout_rate)):
+            if roll < rate:
+                fault = kind
+                break
+            roll -= rate
+        tokens = max(1, int(round(self.output_tokens.sample(self.rng))))
+        return fault, self.ttft_ms.sample(self.rng) / 1000, tokens
+
+    def _raise_fault(self, fault: str) -> None:
+        if fault == "rate_limit":
+            raise UpstreamError("Mock 上游限流 (429)", status_code=429)
+        if fault == "error":
+            raise UpstreamError("Mock 上游内部错误 (500)", status_code=500)
+        raise TimeoutError(f"Mock 上游超时（{self.timeout_seconds} 秒）")
+
+    async def _aopen(self) -> int:
+        """等待首字延迟并按概率注入故障，返回本次输出的 token 数。"""
+        fault, ttft, tokens = self._plan()
+        if fault == "timeout":
+            await asyncio.sleep(self.timeout_seconds)
+        elif fault is None:
+            await asyncio.sleep(ttft)
+        if fault is not None:
+            self._raise_fault(fault)
+        return tokens
+
+    def _open(self) -> int:
+        fault, ttft, tokens = self._plan()
+        time.sleep(self.timeout_seconds if fault == "timeout" else ttft if fault is None else 0)
+        if fault is not None:
+            self._raise_fault(fault)
+        return tokens
+
+    def _tokens(self, count: int) -> List[str]:
+        return [self.rng.choice(_WORDS) + " " for _ in range(count)]
+
+    def _generation_seconds(self, count: int) -> float:
+        """首个 token 之后生成其余 token 的总耗时。"""
+        return sum(self.inter_token_ms.sample(self.rng) for _ in range(count - 1)) / 1000
+
+    # ------------------------------------------------------------------
+    # 聊天接口实现
+    # ------------------------------------------------------------------
+
+    def chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float = 0.7,
+        stream: bool = True
+    ) -> str:
+        """同步聊天接口；流式与非流式的总耗时相同（首字延迟 + 逐 token 间隔）。"""
+        try:
+            log_event("chat_request", provider="mock", model=model, stream=stream, **message_fields(messages))
+            count = call_sync(self.name, self._open)
+            time.sleep(self._generation_seconds(count))
+            return "".join(self._tokens(count)).rstrip()
+        except Exception as e:
+            log_event("chat_error", logging.ERROR, provider="mock", error=str(e))
+            raise as_provider_error("Mock 上游调用失败", e)
+
+    async def achat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float = 0.7
+    ) -> str:
+        """异步聊天接口（非流式）"""
+        try:
+            log_event("chat_request", provider="mock", model=model, stream=False, **message_fields(messages))
+            count = await call_async(self.name, self._aopen)
+            await asyncio.sleep(self._generation_seconds(count))
+            return "".join(self._tokens(count)).rstrip()
+        except Exception as e:
+            log_event("chat_error", logging.ERROR, provider="mock", error=str(e))
+            raise as_provider_error("Mock 上游调用失败", e)
+
+    async def chat_completion_stream(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float = 0.7
+    ) -> AsyncGenerator[str, None]:
+        """异步流式聊天接口，输出格式同真实 provider（stream_chunk / stream_complete / error）。"""
+        try:
+            log_event("stream_request", provider="mock", model=model, **message_fields(messages))
+            # 仅对建立流的阶段重试，与真实 provider 一致
+            count = await call_async(self.name, self._aopen)
+            content_length = 0
+            for i, token in enumerate(self._tokens(count)):
+                if i:
+                    delay = self.inter_token_ms.sample(self.rng) / 1000
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                content_length += len(token)
+                yield json.dumps({"type": "stream_chunk", "content": token}, ensure_ascii=False)
+
+            prompt_tokens = estimate_prompt_tokens(messages)
+            yield json.dumps({
+                "type": "stream_complete",
+                "content_length": content_length,
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": count,
+                    "total_tokens": prompt_tokens + count,
+                },
+            }, ensure_ascii=False)
+        except Exception as e:
+            log_event("stream_error", logging.ERROR, provider="mock", error=str(e))
+            yield json.dumps({
+                "type": "error",
+                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "status": "error",
+                "error": "stream_error",
+                "message": str(e)
+            }, ensure_ascii=False)
@@ -1,101 +1,105 @@
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 import os
 from typing import Dict, List, Optional, Generator, AsyncGenerator
 from ..base_interface import LLMInterface
 from . import config  # 导入配置模块
-import requests
+from backend.app.core.http_transport import http_transport
+from backend.app.core.logging_config import log_event, log_token, logger, message_fields
+from backend.app.core.resilience import as_provider_error, call_async, call_sync
 import json
-import asyncio
+import logging
 import time
 
 class SiliconProvider(LLMInterface):
+    name = "silicon"
+    # 请求超时由共享连接池的 HTTP_*_TIMEOUT 配置；重试由 core.resilience 统一负责，关闭 SDK 自带重试
+    VALIDATE_TIMEOUT = 10.0
+
     def __init__(self):
         self.api_key = os.getenv("SILICON_API_KEY")
-        print(json.dumps({
-            "type": "system",
-            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-            "event": "provider_init",
-            "provider": "silicon",
-            "api_key_status": "已设置" if self.api_key else "未设置"
-        }, ensure_ascii=False, indent=2))
+        log_event("provider_init", provider="silicon", api_key_status="已设置" if self.api_key else "未设置")
         
         if not self.api_key:
             raise ValueError("请在.env文件中设置SILICON_API_KEY")
         self.setup_client()
-        print(json.dumps({
-            "type": "system",
-            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-            "event": "provider_ready",
-            "provider": "silicon"
-        }, ensure_ascii=False, indent=2))
+        log_event("provider_ready", provider="silicon")
     
     def setup_client(self):
         """设置API客户端"""
         self.base_url = "https://api.siliconflow.cn/v1"
         try:
-            self.client = OpenAI(
-                api_key=self.api_key,
-                base_url=self.base_url
-            )
-            # 测试API密钥是否有效
-            response = requests.get(
-                f"{self.base_url}/models",
+            # SDK 与模型列表请求共用同一个 keep-alive 连接池
+            self.http = http_transport.client(
+                base_url=self.base_url,
                 headers={
                     "Authorization": f"Bearer {self.api_key}",
                     "Content-Type": "application/json"
-                }
+                },
+            )
+            self.client = OpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                max_retries=0,
+                http_client=http_transport.client()
+            )
+            # 流式接口需要异步客户端，避免阻塞事件循环
+            self.async_client = AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                max_retries=0,
+                http_client=http_transport.async_client()
             )
-            if response.status_code == 401:
-                raise ValueError("API密钥无效，请检查是否正确设置")
-            elif response.status_code != 200:
-                raise ValueError(f"API连接测试失败: {response.text}")
         except Exception as e:
-            print(f"API客户端设置失败: {str(e)}")
+            logger.error("API客户端设置失败: %s", e)
             raise
 
+    def validate(self) -> None:
+        """测试API密钥是否有效（由启动预热在后台调用）"""
+        response = call_sync(self.name, lambda: self.http.get("/models", timeout=self.VALIDATE_TIMEOUT))
+        if response.status_code == 401:
+            raise ValueError("API密钥无效，请检查是否正确设置")
+        elif response.status_code != 200:
+            raise ValueError(f"API连接测试失败: {response.text}")
+
     @property
     def default_model(self) -> str:
         """获取默认模型名称"""
         return "gpt-3.5-turbo"
     
     def get_available_models(self) -> Dict[str, str]:
-        """获取可用的模型列表"""
+        """获取可用的模型列表，失败时回退默认列表"""
         try:
-            # 发送请求获取模型列表
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-            response = requests.get(f"{self.base_url}/models", headers=headers)
-            
-            if response.status_code == 401:
-                print("API密钥无效，请检查是否正确设置")
-                return self._get_default_models()
-            elif response.status_code != 200:
-                print(f"获取模型列表失败: {response.text}")
-                return self._get_default_models()
+            return self.fetch_models()
+        except Exception as e:
+            logger.warning("获取模型列表失败，使用默认模型列表: %s", e)
+            return self._get_default_models()
 
-            # 解析响应数据
-            models_data = response.json()
-            available_models = {}
+    def fetch_models(self) -> Dict[str, str]:
+        """从上游获取模型列表，失败或列表为空时抛出异常"""
+        # 发送请求获取模型列表
+        response = self.http.get("/models")
 
-            # 处理返回的模型数据
-            for model in models_data.get("data", []):
-                model_id = model.get("id")
-                if model_id:
-                    # 创建一个更友好的显示名称
-                    display_name = self._get_display_name(model_id)
-                    available_models[display_name] = model_id
+        if response.status_code == 401:
+            raise ValueError("API密钥无效，请检查是否正确设置")
+        elif response.status_code != 200:
+            raise ValueError(f"获取模型列表失败: {response.text}")
 
-            if not available_models:
-                print("未找到可用模型，使用默认模型列表")
-                return self._get_default_models()
+        # 解析响应数据
+        models_data = response.json()
+        available_models = {}
 
-            return available_models
+        # 处理返回的模型数据
+        for model in models_data.get("data", []):
+            model_id = model.get("id")
+            if model_id:
+                # 创建一个更友好的显示名称
+                display_name = self._get_display_name(model_id)
+                available_models[display_name] = model_id
 
-        except Exception as e:
-            print(f"获取模型列表失败: {str(e)}")
-            return self._get_default_models()
+        if not available_models:
+            raise ValueError("未找到可用模型")
+
+        return available_models
 
     def _get_default_models(self) -> Dict[str, str]:
         """获取默认的模型列表"""
@@ -146,54 +150,48 @@ class SiliconProvider(LLMInterface):
             # 添加系统提示词
             messages = self._add_system_prompt(messages)
             
-            print(json.dumps({
-                "type": "request",
-                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-                "event": "stream_request",
-                "provider": "silicon",
-                "model": model,
-                "temperature": temperature,
-                "messages": messages
-            }, ensure_ascii=False, indent=2))
+            log_event(
+                "stream_request",
+                provider="silicon",
+                model=model,
+                temperature=temperature,
+                **message_fields(messages),
+            )
 
-            response = await self.client.chat.completions.create(
+            # 仅对建立流的阶段重试；已开始输出后的中断直接上报
+            # include_usage 让服务端在最后一个 chunk（choices 为空）里返回 token 用量
+            response = await call_async(self.name, lambda: self.async_client.chat.completions.create(
                 model=model,
                 messages=messages,
                 temperature=temperature,
-                stream=True
-            )
+                stream=True,
+                stream_options={"include_usage": True}
+            ))
             
-            current_content = ""
+            # 仅发送增量；累计全文由调用方自行拼接，避免每块重复序列化整段内容
+            content_length = 0
+            usage = None
             async for chunk in response:
-                if chunk.choices[0].delta.content:
+                if getattr(chunk, "usage", None):
+                    usage = chunk.usage
+                if chunk.choices and chunk.choices[0].delta.content:
                     content = chunk.choices[0].delta.content
-                    current_content += content
-                    # 发送当前累积的内容
-                    yield json.dumps({
-                        "type": "stream_chunk",
-                        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-                        "status": "streaming",
-                        "content": content,
-                        "full_content": current_content
-                    }, ensure_ascii=False)
-            
+                    content_length += len(content)
+                    yield json.dumps({"type": "stream_chunk", "content": content}, ensure_ascii=False)
+
             # 发送完成信号
-            yield json.dumps({
-                "type": "stream_complete",
-                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-                "status": "complete",
-                "content": current_content
-            }, ensure_ascii=False)
+            complete = {"type": "stream_complete", "content_length": content_length}
+            if usage is not None:
+                complete["usage"] = {
+                    "prompt_tokens": usage.prompt_tokens,
+                    "completion_tokens": usage.completion_tokens,
+                    "total_tokens": usage.total_tokens,
+                }
+            yield json.dumps(complete, ensure_ascii=False)
 
         except Exception as e:
             error_msg = str(e)
-            print(json.dumps({
-                "type": "error",
-                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-                "status": "error",
-                "error": "stream_error",
-                "message": error_msg
-            }, ensure_ascii=False, indent=2))
+            log_event("stream_error", logging.ERROR, provider="silicon", error=error_msg)
             yield json.dumps({
                 "type": "error",
                 "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
@@ -214,68 +212,76 @@ class SiliconProvider(LLMInterface):
             # 添加系统提示词
             messages = self._add_system_prompt(messages)
             
-            print(json.dumps({
-                "type": "request",
-                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-                "event": "chat_request",
-                "provider": "silicon",
-                "model": model,
-                "temperature": temperature,
-                "stream": stream,
-                "messages": messages
-            }, ensure_ascii=False, indent=2))
+            log_event(
+                "chat_request",
+                provider="silicon",
+                model=model,
+                temperature=temperature,
+                stream=stream,
+                **message_fields(messages),
+            )
 
-            response = self.client.chat.completions.create(
+            response = call_sync(self.name, lambda: self.client.chat.completions.create(
                 model=model,
                 messages=messages,
                 temperature=temperature,
                 stream=stream
-            )
+            ))
             
             if stream:
                 # 处理流式响应
                 full_response = ""
-                print(json.dumps({
-                    "type": "response",
-                    "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-                    "event": "stream_start",
-                    "provider": "silicon"
-                }, ensure_ascii=False, indent=2))
+                log_event("stream_start", provider="silicon")
                 
                 for chunk in response:
                     if chunk.choices[0].delta.content:
                         content = chunk.choices[0].delta.content
                         full_response += content
-                        print(content, end="", flush=True)
+                        log_token(self.name, content)
                 
-                print(json.dumps({
-                    "type": "response",
-                    "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-                    "event": "stream_complete",
-                    "provider": "silicon",
-                    "content_length": len(full_response)
-                }, ensure_ascii=False, indent=2))
+                log_event("stream_complete", provider="silicon", content_length=len(full_response))
                 
                 return full_response
             else:
                 # 处理非流式响应
                 content = response.choices[0].message.content
-                print(json.dumps({
-                    "type": "response",
-                    "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-                    "event": "chat_response",
-                    "provider": "silicon",
-                    "content_length": len(content)
-                }, ensure_ascii=False, indent=2))
+                log_event("chat_response", provider="silicon", content_length=len(content))
                 return content
                 
         except Exception as e:
             error_msg = str(e)
-            print(json.dumps({
-                "type": "error",
-                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-                "event": "chat_error",
-                "provider": "silicon",
-                "error": error_msg
-            }, ensure_ascii=False, indent=2))
-            raise Exception(f"硅基流动API调用失败: {error_msg}") 
\ No newline at end of file
+            log_event("chat_error", logging.ERROR, provider="silicon", error=error_msg)
+            raise as_provider_error("硅基流动API调用失败", e) 
+    async def achat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        temperature: float = 0.7
+    ) -> str:
+        """异步聊天请求（非流式），使用 AsyncOpenAI 客户端"""
+        try:
+            messages = self._add_system_prompt(messages)
+
+            log_event(
+                "chat_request",
+                provider="silicon",
+                model=model,
+                temperature=temperature,
+                stream=False,
+                **message_fields(messages),
+            )
+
+            response = await call_async(self.name, lambda: self.async_client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                stream=False
+            ))
+            content = response.choices[0].message.content
+            log_event("chat_response", provider="silicon", content_length=len(content))
+            return content
+
+        except Exception as e:
+            error_msg = str(e)
+            log_event("chat_error", logging.ERROR, provider="silicon", error=error_msg)
+            raise as_provider_error("硅基流动API调用失败", e)
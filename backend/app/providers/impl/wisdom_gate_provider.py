@@ -4,69 +4,75 @@ import time
 from typing import List, Dict, AsyncGenerator
 import re
 
-import requests
+import httpx
 
 from ..base_interface import LLMInterface
 from . import config
+from backend.app.core.http_transport import http_transport
+from backend.app.core.logging_config import log_event, logger
+from backend.app.core.resilience import UpstreamError, as_provider_error, call_async, call_sync
 
 
 class WisdomGateProvider(LLMInterface):
     """智慧之门 (JuheAPI ‑ Wisdom Gate) LLM Provider"""
 
+    name = "wisdom_gate"
     BASE_URL = "https://wisdom-gate.juheapi.com/v1"
 
     def __init__(self):
         self.api_key = os.getenv("WISDOM_API_KEY")
-        print(json.dumps({
-            "type": "system",
-            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-            "event": "provider_init",
-            "provider": "wisdom_gate",
-            "api_key_status": "已设置" if self.api_key else "未设置"
-        }, ensure_ascii=False, indent=2))
+        log_event("provider_init", provider="wisdom_gate", api_key_status="已设置" if self.api_key else "未设置")
 
         if not self.api_key:
             raise ValueError("请在 .env 中配置 WISDOM_API_KEY")
 
         self.setup_client()
-        print(json.dumps({
-            "type": "system",
-            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-            "event": "provider_ready",
-            "provider": "wisdom_gate"
-        }, ensure_ascii=False, indent=2))
+        log_event("provider_ready", provider="wisdom_gate")
 
     # ------------------------------------------------------------------
     # 基础接口
     # ------------------------------------------------------------------
     def setup_client(self):
-        """当前无需专门 SDK, 使用 requests 调用 REST 接口"""
-        self.session = requests.Session()
-        self.session.headers.update({
+        """当前无需专门 SDK, 同步 / 异步调用均使用共享连接池上的 httpx 客户端（超时见 HTTP_*_TIMEOUT）"""
+        headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
-        })
+        }
+        self.session = http_transport.client(base_url=self.BASE_URL, headers=headers)
+        self.async_client = http_transport.async_client(base_url=self.BASE_URL, headers=headers)
+
+    def fetch_models(self) -> Dict[str, str]:
+        """从 Wisdom Gate 查询模型列表，失败或列表为空时抛出异常"""
+        resp = self.session.get("/models")
+        if resp.status_code != 200:
+            raise ValueError(f"获取模型失败 {resp.status_code}: {resp.text}")
+        # 假设返回格式 {"data":[{"id":"model-id","name":"display"},...]}
+        models = {}
+        for m in resp.json().get("data", []):
+            display = self._get_display_name(m.get("name", m["id"]))
+            models[display] = m["id"]
+        if not models:
+            raise ValueError("Wisdom Gate 未返回任何模型")
+        return models
+
+    def validate(self) -> None:
+        """测试 API 密钥是否有效（由启动预热在后台调用）"""
+        resp = call_sync(self.name, lambda: self.session.get("/models", timeout=10.0))
+        if resp.status_code == 401:
+            raise ValueError("Wisdom Gate API 密钥无效，请检查 WISDOM_API_KEY")
+        if resp.status_code != 200:
+            raise ValueError(f"Wisdom Gate 连接测试失败: {resp.status_code} {resp.text}")
 
     @property
     def default_model(self) -> str:
         return "gemini-2.5-flash"  # Wisdom Gate 免费首推模型
 
     def get_available_models(self) -> Dict[str, str]:
-        """从 Wisdom Gate 查询可用模型列表"""
+        """从 Wisdom Gate 查询可用模型列表，失败时回退默认列表"""
         try:
-            resp = self.session.get(f"{self.BASE_URL}/models")
-            if resp.status_code == 200:
-                data = resp.json()
-                # 假设返回格式 {"data":[{"id":"model-id","name":"display"},...]} 
-                models = {}
-                for m in data.get("data", []):
-                    display = self._get_display_name(m.get("name", m["id"]))
-                    models[display] = m["id"]
-                if models:
-                    return models
-            print(f"获取模型失败 {resp.status_code}: {resp.text}")
+            return self.fetch_models()
         except Exception as e:
-            print(f"获取模型异常: {e}")
+            logger.warning("获取模型异常: %s", e)
         # fallback list (核心文档中的热门模型)
         return {
             "Gemini 2.5 Flash": "gemini-2.5-flash",
@@ -115,20 +121,95 @@ class WisdomGateProvider(LLMInterface):
             "temperature": temperature,
             "stream": stream
         }
+        def post():
+            resp = self.session.post("/chat/completions", json=payload)
+            if resp.status_code != 200:
+                raise UpstreamError(f"智慧之门 API 调用失败: HTTP {resp.status_code}: {resp.text}", status_code=resp.status_code)
+            return resp.json()
+
         try:
-            resp = self.session.post(f"{self.BASE_URL}/chat/completions", data=json.dumps(payload))
-            if resp.status_code == 200:
-                data = resp.json()
-                if stream:
-                    # 若后端支持 SSE, 这里简化直接返回完整 content
-                    return data.get("choices", [{}])[0].get("message", {}).get("content", "")
-                else:
-                    return data.get("choices", [{}])[0].get("message", {}).get("content", "")
-            raise Exception(f"HTTP {resp.status_code}: {resp.text}")
+            # 若后端支持 SSE, 这里简化直接返回完整 content
+            return self._extract_content(call_sync(self.name, post))
         except Exception as e:
-            raise Exception(f"智慧之门 API 调用失败: {e}")
+            raise as_provider_error("智慧之门 API 调用失败", e)
+
+    @staticmethod
+    def _extract_content(data: Dict) -> str:
+        return data.get("choices", [{}])[0].get("message", {}).get("content", "")
+
+    async def achat_completion(self, messages: List[Dict[str, str]], model: str, temperature: float = 0.7) -> str:
+        """异步聊天接口（非流式），使用 httpx.AsyncClient"""
+        messages = self._add_system_prompt(messages)
+        payload = {
+            "model": model,
+            "messages": self._convert_messages(messages),
+            "temperature": temperature,
+            "stream": False
+        }
+        async def post():
+            resp = await self.async_client.post("/chat/completions", json=payload)
+            if resp.status_code != 200:
+                raise UpstreamError(f"智慧之门 API 调用失败: HTTP {resp.status_code}: {resp.text}", status_code=resp.status_code)
+            return resp.json()
+
+        try:
+            return self._extract_content(await call_async(self.name, post))
+        except Exception as e:
+            raise as_provider_error("智慧之门 API 调用失败", e)
+
+    async def _open_stream(self, payload: Dict) -> httpx.Response:
+        """发起流式请求并校验状态码; 非 200 时读取错误体、关闭连接并抛出 UpstreamError"""
+        request = self.async_client.build_request("POST", "/chat/completions", json=payload)
+        resp = await self.async_client.send(request, stream=True)
+        if resp.status_code != 200:
+            body = (await resp.aread()).decode("utf-8", errors="replace")
+            await resp.aclose()
+            raise UpstreamError(f"HTTP {resp.status_code}: {body}", status_code=resp.status_code)
+        return resp
+
+    async def _iter_deltas(self, resp: httpx.Response) -> AsyncGenerator[str, None]:
+        """从 OpenAI 兼容的 SSE 响应中逐个取出增量文本; 非 SSE 响应整体作为一个增量"""
+        if not resp.headers.get("content-type", "").startswith("text/event-stream"):
+            yield self._extract_content(json.loads(await resp.aread()))
+            return
+        async for line in resp.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            choices = json.loads(data).get("choices") or [{}]
+            content = (choices[0].get("delta") or {}).get("content")
+            if content:
+                yield content
 
     async def chat_completion_stream(self, messages: List[Dict[str, str]], model: str, temperature: float = 0.7) -> AsyncGenerator[str, None]:
-        """简单包装, 使用同步接口阻塞获取后一次性返回"""
-        content = self.chat_completion(messages, model, temperature, stream=False)
-        yield content 
\ No newline at end of file
+        """异步流式接口: 解析 SSE 响应, 以 stream_chunk / stream_complete 格式输出"""
+        messages = self._add_system_prompt(messages)
+        payload = {
+            "model": model,
+            "messages": self._convert_messages(messages),
+            "temperature": temperature,
+            "stream": True
+        }
+        # 仅发送增量；累计全文由调用方自行拼接
+        content_length = 0
+        try:
+            # 仅对建立流的阶段重试；已开始输出后的中断直接上报
+            resp = await call_async(self.name, lambda: self._open_stream(payload))
+            try:
+                async for content in self._iter_deltas(resp):
+                    content_length += len(content)
+                    yield json.dumps({"type": "stream_chunk", "content": content}, ensure_ascii=False)
+            finally:
+                await resp.aclose()
+
+            yield json.dumps({"type": "stream_complete", "content_length": content_length}, ensure_ascii=False)
+        except Exception as e:
+            yield json.dumps({
+                "type": "error",
+                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "status": "error",
+                "error": "stream_error",
+                "message": f"智慧之门 API 调用失败: {e}"
+            }, ensure_ascii=False)
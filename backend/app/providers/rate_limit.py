@@ -0,0 +1,263 @@
+"""Provider 级限流与并发治理。
+
+每个 (provider, model) 对应一个 :class:`_Governor`，包含三道闸：
+
+* 请求令牌桶：``requests_per_minute``；
+* token 令牌桶：``tokens_per_minute``，调用前按 prompt 估算预扣，完成后按输出补扣；
+* 并发上限：``max_in_flight``（流式请求在整条流期间占用一个名额）。
+
+超出限额的请求排队等待而不是直接失败；预计等待超过 ``queue_timeout_seconds`` 时抛出
+:class:`RateLimitExceeded`。令牌桶采用“预约”方式：桶余量可以为负，负值即后来者需等待的时长，
+因此排队天然按到达顺序进行。
+
+请求中的模型名先归一：配置了模型级限额或已在模型目录中登记的模型各有一个限流器，
+其余模型共用 provider 的 ``other`` 限流器，客户端传入任意模型名也不会让限流器（及 Redis 键）无限增长。
+
+配置位于 ``backend/config.yml`` 的 ``rate_limits`` 段，模型级配置覆盖 provider 级配置；
+``backend: redis`` 时令牌桶存放在 Redis 中，所有 worker 共享同一预算（并发上限仍为单进程）。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Iterable, Optional, Tuple
+
+from backend.app.core import metrics
+from backend.app.core.logging_config import logger
+
+_LIMIT_FIELDS = ("requests_per_minute", "tokens_per_minute", "max_in_flight")
+
+
+class RateLimitExceeded(RuntimeError):
+    """排队等待会超过截止时间。"""
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数：非 ASCII 字符（中文等）约 1 字 1 token，ASCII 约 4 字符 1 token。"""
+    ascii_chars = len(text.encode("ascii", "ignore"))  # C 层计数，避免逐字符的 Python 循环
+    return len(text) - ascii_chars + (ascii_chars + 3) // 4
+
+
+def estimate_prompt_tokens(messages: Iterable[Dict[str, str]]) -> int:
+    return sum(estimate_tokens(m.get("content") or "") for m in messages)
+
+
+class TokenBucket:
+    """进程内令牌桶，容量为一分钟的额度。"""
+
+    def __init__(self, per_minute: float, clock=time.monotonic) -> None:
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def reserve(self, amount: float, max_wait: float) -> Optional[float]:
+        """预约 amount 个令牌，返回需要等待的秒数；等待会超过 max_wait 时不预约并返回 None。"""
+        amount = min(amount, self.capacity)
+        self._refill()
+        self._tokens -= amount
+        wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > max_wait:
+            self._tokens += amount
+            return None
+        return wait
+
+    async def charge(self, amount: float) -> None:
+        """事后补扣（如按实际输出长度），余量可变为负数以减缓后续请求。"""
+        self._refill()
+        self._tokens -= amount
+
+    async def refund(self, amount: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + amount)
+
+
+# KEYS[1]=桶键；ARGV=rate/秒, capacity, now, amount, max_wait, ttl。返回等待秒数，-1 表示超时未预约
+_RESERVE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local amount = tonumber(ARGV[4])
+local max_wait = tonumber(ARGV[5])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate) - amount
+local wait = 0
+if tokens < 0 then wait = -tokens / rate end
+if wait > max_wait and max_wait >= 0 then
+    return '-1'
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], ARGV[6])
+return tostring(wait)
+"""
+
+
+class RedisTokenBucket:
+    """Redis 令牌桶，多个 worker 共享同一预算；时间取 Redis 客户端所在机器的墙钟。"""
+
+    KEY_PREFIX = "llm:ratelimit:"
+
+    def __init__(self, client, key: str, per_minute: float) -> None:
+        self._client = client
+        self._key = self.KEY_PREFIX + key
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+
+    async def _eval(self, amount: float, max_wait: float) -> float:
+        result = await self._client.eval(
+            _RESERVE_SCRIPT, 1, self._key, self.rate, self.capacity, time.time(), amount, max_wait, 120
+        )
+        return float(result)
+
+    async def reserve(self, amount: float, max_wait: float) -> Optional[float]:
+        wait = await self._eval(min(amount, self.capacity), max_wait)
+        return None if wait < 0 else wait
+
+    async def charge(self, amount: float) -> None:
+        await self._eval(amount, -1)
+
+    async def refund(self, amount: float) -> None:
+        await self._eval(-amount, -1)
+
+
+class _Governor:
+    """单个 (provider, model) 的限流器。"""
+
+    def __init__(self, limits: Dict[str, Any], make_bucket) -> None:
+        self.limits = limits
+        rpm = limits.get("requests_per_minute") or 0
+        tpm = limits.get("tokens_per_minute") or 0
+        max_in_flight = limits.get("max_in_flight") or 0
+        self.requests = make_bucket("requests", rpm) if rpm > 0 else None
+        self.tokens = make_bucket("tokens", tpm) if tpm > 0 else None
+        self.in_flight = asyncio.Semaphore(max_in_flight) if max_in_flight > 0 else None
+        self.stats = {"admitted": 0, "queued": 0, "rejected": 0, "waited_seconds": 0.0}
+
+    @property
+    def unlimited(self) -> bool:
+        return self.requests is None and self.tokens is None and self.in_flight is None
+
+    async def acquire(self, prompt_tokens: int, timeout: float) -> None:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        deadline = start + timeout
+        reserved = []
+        try:
+            wait = 0.0
+            for bucket, amount in ((self.requests, 1), (self.tokens, prompt_tokens)):
+                if bucket is None:
+                    continue
+                bucket_wait = await bucket.reserve(amount, timeout)
+                if bucket_wait is None:
+                    raise RateLimitExceeded("请求速率超出限额，排队等待将超过截止时间")
+                reserved.append((bucket, amount))
+                wait = max(wait, bucket_wait)
+            if wait > 0:
+                self.stats["queued"] += 1
+                await asyncio.sleep(wait)
+            if self.in_flight is not None:
+                try:
+                    await asyncio.wait_for(self.in_flight.acquire(), max(0.0, deadline - loop.time()))
+                except asyncio.TimeoutError:
+                    raise RateLimitExceeded("并发请求数已达上限，排队等待超过截止时间") from None
+        except BaseException as exc:
+            for bucket, amount in reserved:
+                await bucket.refund(amount)
+            if isinstance(exc, RateLimitExceeded):
+                self.stats["rejected"] += 1
+            raise
+        self.stats["admitted"] += 1
+        self.stats["waited_seconds"] += loop.time() - start
+
+    def release(self) -> None:
+        if self.in_flight is not None:
+            self.in_flight.release()
+
+    async def charge_output(self, text: str) -> None:
+        if self.tokens is not None and text:
+            await self.tokens.charge(estimate_tokens(text))
+
+
+class ProviderRateLimiter:
+    """按 (provider, model) 懒创建 :class:`_Governor`。"""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None, redis_client=None) -> None:
+        config = config or {}
+        self.queue_timeout = float(config.get("queue_timeout_seconds", 30))
+        self._default = {k: v for k, v in (config.get("default") or {}).items() if k in _LIMIT_FIELDS}
+        self._providers: Dict[str, Dict[str, Any]] = config.get("providers") or {}
+        self._redis = redis_client
+        self._governors: Dict[Tuple[str, str], _Governor] = {}
+
+    def limits_for(self, provider_name: str, model: str) -> Dict[str, Any]:
+        provider_cfg = self._providers.get(provider_name) or {}
+        limits = dict(self._default)
+        limits.update({k: v for k, v in provider_cfg.items() if k in _LIMIT_FIELDS})
+        limits.update((provider_cfg.get("models") or {}).get(model) or {})
+        return limits
+
+    def model_key(self, provider: Any, model: str) -> str:
+        """限流器使用的模型名：配置了模型级限额的模型保留原名，其余按 :func:`metrics.model_label` 归一。"""
+        name = getattr(provider, "name", None) or type(provider).__name__
+        if model in ((self._providers.get(name) or {}).get("models") or {}):
+            return model
+        return metrics.model_label(provider, model)
+
+    def governor(self, provider_name: str, model: str) -> _Governor:
+        key = (provider_name, model)
+        gov = self._governors.get(key)
+        if gov is None:
+            def make_bucket(kind: str, per_minute: float):
+                if self._redis is not None:
+                    return RedisTokenBucket(self._redis, f"{provider_name}:{model}:{kind}", per_minute)
+                return TokenBucket(per_minute)
+
+            gov = self._governors[key] = _Governor(self.limits_for(provider_name, model), make_bucket)
+        return gov
+
+    @asynccontextmanager
+    async def limit(self, provider: Any, model: str, messages: Iterable[Dict[str, str]]) -> AsyncIterator[_Governor]:
+        """在限额内执行一次上游调用；超出限额时排队，等待超过截止时间抛出 :class:`RateLimitExceeded`。"""
+        name = getattr(provider, "name", None) or type(provider).__name__
+        gov = self.governor(name, self.model_key(provider, model))
+        if gov.unlimited:
+            yield gov
+            return
+        try:
+            await gov.acquire(estimate_prompt_tokens(messages), self.queue_timeout)
+        except RateLimitExceeded:
+            logger.warning("provider %s / 模型 %s 限流排队超时", name, model)
+            raise
+        try:
+            yield gov
+        finally:
+            gov.release()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {f"{p}/{m}": dict(g.stats) for (p, m), g in self._governors.items()}
+
+
+def _create_limiter() -> ProviderRateLimiter:
+    from backend.app.providers.impl.config import RATE_LIMIT_CONFIG
+
+    redis_client = None
+    if RATE_LIMIT_CONFIG.get("backend") == "redis":
+        from backend.infra.redis_client import AREDIS  # 延迟导入，仅 redis 模式需要
+
+        if AREDIS is None:
+            logger.warning("未安装 redis 库，限流回退为进程内令牌桶")
+        redis_client = AREDIS
+    return ProviderRateLimiter(RATE_LIMIT_CONFIG, redis_client)
+
+
+# 单例
+rate_limiter = _create_limiter()
@@ -0,0 +1,220 @@
+"""多 provider 路由：一个逻辑模型映射到多个 (provider, model) 后端，按实时表现选择并自动故障转移。
+
+配置位于 ``backend/config.yml`` 的 ``routing`` 段::
+
+    routing:
+      enabled: true
+      strategy: latency        # latency | ordered | weighted
+      routes:
+        gemini-2.5-flash:
+          - {provider: google, model: gemini-2.5-flash}
+          - {provider: wisdom_gate, model: gemini-2.5-flash, weight: 2}
+
+每个后端维护流式首字延迟（TTFT）、非流式总耗时与错误率的 EWMA，两种延迟分开统计：
+
+* ``latency``  —— 按与本次请求同类的延迟 ``(流式取 ttft，非流式取 chat_latency) * (1 + ERROR_PENALTY * error_rate)``
+  升序，该类请求尚无样本的后端优先探索；
+* ``ordered``  —— 按配置顺序；
+* ``weighted`` —— 按 weight 加权随机排序。
+
+任一策略下，熔断器打开的后端都排到最后。调用失败（流式请求在首个增量之前失败）时按顺序尝试下一个后端。
+"""
+
+from __future__ import annotations
+
+import math
+import random
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from backend.app.core import metrics
+from backend.app.core.logging_config import logger
+
+STRATEGY_LATENCY = "latency"
+STRATEGY_ORDERED = "ordered"
+STRATEGY_WEIGHTED = "weighted"
+
+
+class BackendStats:
+    """单个后端的 EWMA 统计。"""
+
+    # 保留最近的延迟样本供对冲请求计算分位数：流式为首字延迟，非流式为总耗时，两者分开保存
+    SAMPLE_SIZE = 200
+
+    def __init__(self, alpha: float = 0.3) -> None:
+        self.alpha = alpha
+        # latency 为全部调用的总耗时（仅用于展示）；排序只看同类请求的 ttft（流式）或 chat_latency（非流式）
+        self.latency: Optional[float] = None
+        self.ttft: Optional[float] = None
+        self.chat_latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.stream_samples: deque = deque(maxlen=self.SAMPLE_SIZE)
+        self.chat_samples: deque = deque(maxlen=self.SAMPLE_SIZE)
+
+    def _ewma(self, current: Optional[float], sample: float) -> float:
+        return sample if current is None else self.alpha * sample + (1 - self.alpha) * current
+
+    def record_success(self, latency: float, ttft: Optional[float] = None, stream: bool = False) -> None:
+        """``stream`` 为真时 ``ttft`` 计入流式统计（没有增量的流不计）；否则 ``latency`` 计入非流式统计。"""
+        if stream:
+            if ttft is not None:
+                self.stream_samples.append(ttft)
+                self.ttft = self._ewma(self.ttft, ttft)
+        else:
+            self.chat_samples.append(latency)
+            self.chat_latency = self._ewma(self.chat_latency, latency)
+        self.requests += 1
+        self.latency = self._ewma(self.latency, latency)
+        self.error_rate = (1 - self.alpha) * self.error_rate
+
+    def record_failure(self) -> None:
+        self.requests += 1
+        self.failures += 1
+        self.error_rate = self.alpha + (1 - self.alpha) * self.error_rate
+
+    def expected_latency(self, stream: bool) -> Optional[float]:
+        """同类请求的延迟 EWMA：流式为首字延迟，非流式为总耗时。"""
+        return self.ttft if stream else self.chat_latency
+
+    def samples(self, stream: bool) -> deque:
+        return self.stream_samples if stream else self.chat_samples
+
+    def latency_quantile(self, q: float, stream: bool) -> Optional[float]:
+        """最近样本的 q 分位数（0~1，最近秩法）：流式为首字延迟，非流式为总耗时；没有样本时返回 None。"""
+        samples = self.samples(stream)
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered), max(1, math.ceil(q * len(ordered)))) - 1]
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "latency": self.latency,
+            "ttft": self.ttft,
+            "chat_latency": self.chat_latency,
+            "error_rate": round(self.error_rate, 4),
+            "requests": self.requests,
+            "failures": self.failures,
+        }
+
+
+class Backend:
+    """逻辑模型的一个候选后端。"""
+
+    def __init__(self, provider: str, model: str, weight: float = 1.0, alpha: float = 0.3) -> None:
+        self.provider = provider
+        self.model = model
+        self.weight = max(0.0, weight)
+        self.stats = BackendStats(alpha)
+
+    @property
+    def key(self) -> str:
+        return f"{self.provider}/{self.model}"
+
+
+class ModelRouter:
+    """按策略为逻辑模型给出候选后端顺序，并记录每次调用的结果。"""
+
+    # 错误率对得分的惩罚系数：错误率 50% 时得分放大到 1 + 0.5 * 10 = 6 倍
+    ERROR_PENALTY = 10.0
+
+    def __init__(
+        self,
+        routes: Dict[str, List[Backend]],
+        strategy: str = STRATEGY_LATENCY,
+        breaker_state=None,
+    ) -> None:
+        self.routes = routes
+        self.strategy = strategy
+        # 路由涉及的模型作为指标 model 标签保留原值
+        metrics.register_models(metrics.ANY_PROVIDER, routes)
+        for backends in routes.values():
+            for backend in backends:
+                metrics.register_models(backend.provider, [backend.model])
+        # provider 名 -> 熔断器状态，用于把熔断中的后端排到最后
+        self._breaker_state = breaker_state
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], breaker_state=None) -> "ModelRouter":
+        alpha = float(config.get("ewma_alpha", 0.3))
+        routes = {
+            logical: [
+                Backend(b["provider"], b.get("model", logical), float(b.get("weight", 1.0)), alpha)
+                for b in backends or []
+            ]
+            for logical, backends in (config.get("routes") or {}).items()
+        }
+        return cls(routes, config.get("strategy", STRATEGY_LATENCY), breaker_state)
+
+    def __contains__(self, logical_model: str) -> bool:
+        return bool(self.routes.get(logical_model))
+
+    def candidates(self, logical_model: str, stream: bool = False) -> List[Backend]:
+        """返回按优先级排序的后端；``stream`` 决定 latency 策略按首字延迟还是总耗时排序。
+
+        逻辑模型未配置路由时返回空列表。
+        """
+        backends = list(self.routes.get(logical_model) or [])
+        if not backends:
+            return []
+        with self._lock:
+            if self.strategy == STRATEGY_LATENCY:
+                backends.sort(key=lambda b: self._score(b, stream))
+            elif self.strategy == STRATEGY_WEIGHTED:
+                backends = self._weighted_order(backends)
+        # 稳定排序：熔断中的后端整体后移，其余保持策略顺序
+        backends.sort(key=self._is_tripped)
+        return backends
+
+    def _score(self, backend: Backend, stream: bool = False) -> float:
+        stats = backend.stats
+        latency = stats.expected_latency(stream)
+        if latency is None:
+            return 0.0  # 未探索的后端优先尝试一次
+        return latency * (1 + self.ERROR_PENALTY * stats.error_rate)
+
+    @staticmethod
+    def _weighted_order(backends: List[Backend]) -> List[Backend]:
+        """按权重做不放回抽样（Efraimidis-Spirakis），得到加权随机顺序。"""
+        def key(b: Backend) -> float:
+            return random.random() ** (1.0 / b.weight) if b.weight > 0 else 0.0
+
+        return sorted(backends, key=key, reverse=True)
+
+    def _is_tripped(self, backend: Backend) -> bool:
+        return self._breaker_state is not None and self._breaker_state(backend.provider) == "open"
+
+    def record_success(
+        self, backend: Backend, latency: float, ttft: Optional[float] = None, stream: bool = False
+    ) -> None:
+        with self._lock:
+            backend.stats.record_success(latency, ttft, stream)
+
+    def record_failure(self, backend: Backend, error: BaseException) -> None:
+        logger.warning("路由后端 %s 调用失败，尝试下一个: %s", backend.key, error)
+        with self._lock:
+            backend.stats.record_failure()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                logical: {b.key: b.stats.snapshot() for b in backends}
+                for logical, backends in self.routes.items()
+            }
+
+
+def _create_router() -> Optional[ModelRouter]:
+    from backend.app.core.resilience import resilience
+    from backend.app.providers.impl.config import ROUTING_CONFIG
+
+    if not ROUTING_CONFIG.get("enabled"):
+        return None
+    return ModelRouter.from_config(ROUTING_CONFIG, lambda name: resilience.breaker(name).state)
+
+
+# 单例；未启用路由时为 None
+model_router = _create_router()
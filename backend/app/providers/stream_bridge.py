@@ -0,0 +1,85 @@
+"""同步迭代器 → 异步生成器桥接。
+
+部分 SDK（如 Google Gemini）只提供同步流式迭代器。这里在线程池中运行迭代器，
+通过有界缓冲把每个块即时交给事件循环中的消费者：
+
+* 生产者线程每取得一块就立即投递，消费者无需等待整段响应；
+* 缓冲区满时生产者阻塞，避免慢消费者导致内存无限增长；
+* 消费者提前退出（客户端断开、``aclose``、取消）时通知生产者停止并关闭底层迭代器。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import AsyncGenerator, Callable, Iterable, TypeVar
+
+T = TypeVar("T")
+
+_ITEM = "item"
+_DONE = "done"
+_ERROR = "error"
+
+# 生产者等待缓冲区空位时检查停止信号的间隔（秒）
+_POLL_INTERVAL = 0.1
+
+
+async def iterate_in_thread(
+    factory: Callable[[], Iterable[T]],
+    maxsize: int = 64,
+) -> AsyncGenerator[T, None]:
+    """在线程中驱动 ``factory()`` 返回的同步迭代器，并逐块异步产出。
+
+    Args:
+        factory: 返回同步可迭代对象的工厂函数，在工作线程中调用（其中的阻塞 I/O 不会占用事件循环）。
+        maxsize: 缓冲区最多容纳的未消费块数。
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    slots = threading.Semaphore(max(1, maxsize))
+    stop = threading.Event()
+
+    def _emit(kind: str, payload) -> None:
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, (kind, payload))
+        except RuntimeError:
+            # 事件循环已关闭，消费者不复存在
+            stop.set()
+
+    def _acquire_slot() -> bool:
+        while not stop.is_set():
+            if slots.acquire(timeout=_POLL_INTERVAL):
+                return True
+        return False
+
+    def _produce() -> None:
+        iterator = None
+        try:
+            iterator = iter(factory())
+            for item in iterator:
+                if not _acquire_slot():
+                    return
+                _emit(_ITEM, item)
+            _emit(_DONE, None)
+        except Exception as exc:  # noqa: BLE001 - 原样转交给消费者
+            _emit(_ERROR, exc)
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                try:
+                    close()
+                except Exception:  # pragma: no cover
+                    pass
+
+    loop.run_in_executor(None, _produce)
+    try:
+        while True:
+            kind, payload = await queue.get()
+            if kind == _DONE:
+                break
+            if kind == _ERROR:
+                raise payload
+            slots.release()
+            yield payload
+    finally:
+        stop.set()
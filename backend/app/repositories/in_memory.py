@@ -2,7 +2,7 @@
 
 from __future__ import annotations
 
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 from .session_base import SessionRepoBase
 
@@ -10,9 +10,16 @@ from .session_base import SessionRepoBase
 class InMemorySessionRepo(SessionRepoBase):
     def __init__(self) -> None:
         self._storage: Dict[str, List[Dict[str, str]]] = {}
+        self._providers: Dict[str, str] = {}
 
     def get_history(self, session_id: str) -> List[Dict[str, str]]:
         return list(self._storage.get(session_id, []))
 
     def save_history(self, session_id: str, history: List[Dict[str, str]]) -> None:
-        self._storage[session_id] = history 
\ No newline at end of file
+        self._storage[session_id] = history
+
+    def get_provider(self, session_id: str) -> Optional[str]:
+        return self._providers.get(session_id)
+
+    def set_provider(self, session_id: str, provider_name: str) -> None:
+        self._providers[session_id] = provider_name
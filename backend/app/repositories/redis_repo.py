@@ -3,7 +3,7 @@
 from __future__ import annotations
 
 import json
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 # ---------------------------------------------------------------------------
 # 依赖基础设施层统一创建的 Redis 客户端
@@ -16,7 +16,7 @@ from .session_base import SessionRepoBase
 
 class RedisSessionRepo(SessionRepoBase):
     """使用共用的 `backend.infra.redis_client.REDIS` 实例存储会话历史。
-    会话数据以 JSON 字符串存储，键为 session_id。
+    会话数据以 JSON 字符串存储，键为 session_id；会话默认 provider 的键为 ``provider:<session_id>``。
     """
 
     def __init__(self, _redis_url: str | None = None):  # noqa: D401
@@ -37,4 +37,13 @@ class RedisSessionRepo(SessionRepoBase):
             return []
 
     def save_history(self, session_id: str, history: List[Dict[str, str]]) -> None:
-        self._client.set(session_id, json.dumps(history)) 
\ No newline at end of file
+        self._client.set(session_id, json.dumps(history))
+
+    def get_provider(self, session_id: str) -> Optional[str]:
+        data = self._client.get(f"provider:{session_id}")
+        if not data:
+            return None
+        return data.decode() if isinstance(data, bytes) else data
+
+    def set_provider(self, session_id: str, provider_name: str) -> None:
+        self._client.set(f"provider:{session_id}", provider_name)
@@ -3,7 +3,7 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 
 class SessionRepoBase(ABC):
@@ -15,4 +15,12 @@ class SessionRepoBase(ABC):
 
     @abstractmethod
     def save_history(self, session_id: str, history: List[Dict[str, str]]) -> None:
-        """覆盖保存整段历史""" 
\ No newline at end of file
+        """覆盖保存整段历史"""
+
+    @abstractmethod
+    def get_provider(self, session_id: str) -> Optional[str]:
+        """获取 session 的默认 provider 名，未设置返回 None"""
+
+    @abstractmethod
+    def set_provider(self, session_id: str, provider_name: str) -> None:
+        """设置 session 的默认 provider"""
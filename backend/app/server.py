@@ -2,11 +2,35 @@ from __future__ import annotations
 
 """简化后的服务器入口，仅负责创建 FastAPI 应用并提供 run_server。"""
 
+import asyncio
+import sys
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from backend.app.core.logging_config import logger
 from backend.app.core.error_handler import add_exception_handlers
+from backend.app.core.tracing import TracingMiddleware, tracer
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """启动时在后台预热默认 provider（校验 API 密钥、预取模型列表），不阻塞接收请求；
+    关闭时取消预热、关闭上游连接池并写完待导出的 trace。"""
+    from backend.app.api.v1.routers.chat import _manager  # noqa: WPS433
+
+    warm_up = asyncio.create_task(_manager.warm_up())
+    try:
+        yield
+    finally:
+        warm_up.cancel()
+        await asyncio.gather(warm_up, return_exceptions=True)
+        # 连接池随首个 provider 延迟创建，未使用过则无需关闭
+        transport_module = sys.modules.get("backend.app.core.http_transport")
+        if transport_module is not None:
+            await transport_module.http_transport.aclose()
+        tracer.shutdown()
 
 
 def create_app() -> FastAPI:
@@ -14,18 +38,27 @@ def create_app() -> FastAPI:
 
     from backend.app.api.v1.routers import chat as chat_router  # noqa: WPS433
     from backend.app.api.v1.routers import export as export_router  # noqa: WPS433
+    from backend.app.api.v1.routers import metrics as metrics_router  # noqa: WPS433
+    from backend.app.api.v1.routers import traces as traces_router  # noqa: WPS433
+    from backend.app.api.v1.routers import ws as ws_router  # noqa: WPS433
 
-    app = FastAPI()
+    app = FastAPI(lifespan=lifespan)
     app.add_middleware(
         CORSMiddleware,
         allow_origins=["*"],
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["Server-Timing", "traceparent"],
     )
+    # 最外层：计时覆盖 CORS 在内的整个请求
+    app.add_middleware(TracingMiddleware)
 
     app.include_router(chat_router.router)
     app.include_router(export_router.router)
+    app.include_router(metrics_router.router)
+    app.include_router(traces_router.router)
+    app.include_router(ws_router.router)
 
     # 全局异常处理
     add_exception_handlers(app)
@@ -0,0 +1,71 @@
+"""批量聊天的并发调度。
+
+``/api/chat/batch`` 把 N 个相互独立的会话并发地交给 provider 层；同一 provider 的并发数
+由 :class:`ProviderConcurrency` 的信号量限制（多个批次共享同一上限），结果按完成顺序产出，
+慢请求不会阻塞其它请求的返回。
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, Optional, Sequence, Tuple, Union
+
+from backend.app.core.config import settings
+from backend.app.core.logging_config import logger
+
+BatchJob = Callable[[], Awaitable[Dict[str, Any]]]
+
+
+class ProviderConcurrency:
+    """按 provider 名称分配的并发上限。"""
+
+    def __init__(self, default_limit: int = 8, overrides: Optional[Dict[str, int]] = None) -> None:
+        self.default_limit = max(1, default_limit)
+        self.overrides = {name: max(1, limit) for name, limit in (overrides or {}).items()}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def limit_for(self, provider_name: str) -> int:
+        return self.overrides.get(provider_name, self.default_limit)
+
+    def semaphore(self, provider_name: str) -> asyncio.Semaphore:
+        sem = self._semaphores.get(provider_name)
+        if sem is None:
+            sem = self._semaphores[provider_name] = asyncio.Semaphore(self.limit_for(provider_name))
+        return sem
+
+
+async def run_batch(
+    jobs: Sequence[BatchJob], semaphore: Union[asyncio.Semaphore, Sequence[asyncio.Semaphore]]
+) -> AsyncGenerator[Tuple[int, Dict[str, Any]], None]:
+    """并发执行 jobs，按完成顺序产出 (下标, 结果)。
+
+    ``semaphore`` 为所有 job 共用的信号量，或与 jobs 一一对应的信号量列表（条目可指定不同 provider）。
+    单个 job 抛出的异常转换为 ``{"status": "error"}`` 结果，不影响其它 job；
+    调用方提前关闭生成器（如客户端断开）时取消尚未完成的 job。
+    """
+    done: asyncio.Queue = asyncio.Queue()
+    semaphores = [semaphore] * len(jobs) if isinstance(semaphore, asyncio.Semaphore) else list(semaphore)
+
+    async def worker(index: int, job: BatchJob) -> None:
+        async with semaphores[index]:
+            try:
+                result = await job()
+            except Exception as exc:
+                logger.exception("批量请求第 %s 项失败: %s", index, exc)
+                result = {"status": "error", "error": str(exc)}
+        done.put_nowait((index, result))
+
+    tasks = [asyncio.create_task(worker(i, job)) for i, job in enumerate(jobs)]
+    try:
+        for _ in range(len(tasks)):
+            yield await done.get()
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# 单例：所有批次共享每个 provider 的并发上限
+provider_concurrency = ProviderConcurrency(
+    settings.BATCH_PROVIDER_CONCURRENCY, settings.BATCH_PROVIDER_CONCURRENCY_OVERRIDES
+)
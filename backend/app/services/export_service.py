@@ -4,14 +4,14 @@ from __future__ import annotations
 
 import os
 import tempfile
+import time
 from datetime import datetime
 from typing import List, Dict
 
-import pdfkit
-from jinja2 import Environment, FileSystemLoader, select_autoescape
-
 from backend.app.core.logging_config import logger
-from backend.app.services.word_styles import create_document, append_messages
+from backend.app.core.metrics import EXPORT_RENDER_SECONDS
+
+# pdfkit / jinja2 / python-docx 仅在实际导出对应格式时导入，避免拖慢服务启动
 
 # -------------------- 内部工具 --------------------
 
@@ -71,6 +71,8 @@ PDF_OPTIONS = {
 
 def _generate_word(messages: List[Dict[str, str]], title: str, temp_file_path: str) -> None:
     """使用 word_styles 封装创建 Word 文档。"""
+    from backend.app.services.word_styles import create_document, append_messages
+
     doc = create_document(title)
     append_messages(doc, messages)
     doc.save(temp_file_path)
@@ -78,6 +80,9 @@ def _generate_word(messages: List[Dict[str, str]], title: str, temp_file_path: s
 # -------------------- PDF 生成 --------------------
 
 def _generate_pdf(messages: List[Dict[str, str]], title: str, temp_file_path: str) -> None:
+    import pdfkit
+    from jinja2 import Environment, FileSystemLoader, select_autoescape
+
     # 利用 Jinja2 模板渲染
     env = Environment(
         loader=FileSystemLoader(os.path.join(os.path.dirname(__file__), "..", "templates")),
@@ -102,13 +107,16 @@ def generate_export(messages: List[Dict[str, str]], title: str, fmt: str) -> str
     temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
     temp_file.close()  # 我们将手动写入
 
+    start = time.perf_counter()
     try:
         if fmt == "word":
             _generate_word(messages, title, temp_file.name)
         else:
             _generate_pdf(messages, title, temp_file.name)
     except Exception as exc:
+        EXPORT_RENDER_SECONDS.labels(fmt, "error").observe(time.perf_counter() - start)
         logger.exception("导出失败: %s", exc)
         raise
 
+    EXPORT_RENDER_SECONDS.labels(fmt, "ok").observe(time.perf_counter() - start)
     return temp_file.name 
\ No newline at end of file
@@ -0,0 +1,186 @@
+"""模型目录：缓存各 provider 的模型列表，避免每次 ``/api/models`` 都发起网络请求。
+
+* TTL 内直接返回缓存；
+* 过期但仍在 ``stale`` 窗口内时立即返回旧列表，同时在后台刷新（stale-while-revalidate）；
+* 超出窗口或没有缓存时等待刷新，同一 provider 的并发刷新只发起一次上游请求；
+* 刷新失败时继续使用旧列表，不写入缓存与快照；既无缓存也无快照（冷启动）时才使用 ``fallback`` 给出的默认列表，
+  且默认列表不缓存，下次请求仍会尝试上游；
+* 每次刷新后把目录写入磁盘快照，进程冷启动时从快照加载，无需等待上游即可返回模型列表；
+* 刷新得到的列表与缓存不同时通知 :meth:`ModelCatalog.add_listener` 登记的回调（如向 WebSocket 客户端推送）。
+
+快照路径由 ``MODEL_CATALOG_SNAPSHOT`` 配置（相对路径基于项目根目录），留空则不落盘。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from backend.app.core import metrics
+from backend.app.core.config import BASE_DIR, settings
+from backend.app.core.logging_config import logger
+from backend.app.services.single_flight import SingleFlight
+
+
+def catalog_etag(models: Dict[str, str]) -> str:
+    """模型列表的强 ETag，内容不变则值不变。"""
+    payload = json.dumps(models, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return '"' + hashlib.sha256(payload).hexdigest()[:32] + '"'
+
+
+class CatalogEntry:
+    """一个 provider 的模型列表及获取时间（墙钟，便于跨进程持久化）。"""
+
+    __slots__ = ("models", "fetched_at")
+
+    def __init__(self, models: Dict[str, str], fetched_at: float) -> None:
+        self.models = models
+        self.fetched_at = fetched_at
+
+
+class ModelCatalog:
+    """按 provider 名缓存模型列表。"""
+
+    def __init__(
+        self,
+        ttl_seconds: float = 300.0,
+        stale_seconds: float = 86400.0,
+        snapshot_path: Optional[Path] = None,
+        clock=time.time,
+    ) -> None:
+        self.ttl = ttl_seconds
+        self.stale = stale_seconds
+        self._path = snapshot_path
+        self._clock = clock
+        self._entries: Dict[str, CatalogEntry] = {}
+        self._flight = SingleFlight()
+        self._background: Set[asyncio.Future] = set()
+        self._file_lock = threading.Lock()
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "refresh_errors": 0}
+        self._listeners: List[Callable[[str, Dict[str, str]], None]] = []
+        self._load_snapshot()
+
+    def add_listener(self, callback: Callable[[str, Dict[str, str]], None]) -> None:
+        """登记回调 ``callback(provider 名, 新列表)``，在刷新使已缓存的列表发生变化时于事件循环中调用。"""
+        self._listeners.append(callback)
+
+    async def get(
+        self,
+        name: str,
+        fetch: Callable[[], Dict[str, str]],
+        fallback: Optional[Callable[[], Dict[str, str]]] = None,
+    ) -> Dict[str, str]:
+        """返回 provider ``name`` 的模型列表。
+
+        ``fetch`` 为同步的上游获取函数（在线程池中执行），失败时应抛出异常；
+        ``fallback`` 仅在获取失败且没有任何缓存时调用，其结果不缓存。
+        """
+        entry = self._entries.get(name)
+        if entry is not None:
+            age = self._clock() - entry.fetched_at
+            if age < self.ttl:
+                self._stats["hits"] += 1
+                return entry.models
+            if age < self.ttl + self.stale:
+                self._stats["stale_hits"] += 1
+                self._refresh_in_background(name, fetch)
+                return entry.models
+        self._stats["misses"] += 1
+        try:
+            entry = await self._flight.do(name, lambda: self._refresh(name, fetch))
+        except Exception as exc:
+            if fallback is None:
+                raise
+            logger.warning("获取 %s 模型列表失败且没有缓存，使用默认列表: %s", name, exc)
+            return await asyncio.to_thread(fallback)
+        return entry.models
+
+    def _refresh_in_background(self, name: str, fetch: Callable[[], Dict[str, str]]) -> None:
+        task = asyncio.ensure_future(self._flight.do(name, lambda: self._refresh(name, fetch)))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _refresh(self, name: str, fetch: Callable[[], Dict[str, str]]) -> CatalogEntry:
+        try:
+            models = await asyncio.to_thread(fetch)
+        except Exception as exc:
+            self._stats["refresh_errors"] += 1
+            previous = self._entries.get(name)
+            if previous is None:
+                raise
+            logger.warning("刷新 %s 模型列表失败，继续使用缓存: %s", name, exc)
+            return previous
+
+        entry = CatalogEntry(dict(models or {}), self._clock())
+        previous = self._entries.get(name)
+        self._entries[name] = entry
+        metrics.register_models(name, entry.models.values())
+        self._stats["refreshes"] += 1
+        if self._path is not None:
+            snapshot = {n: {"models": e.models, "fetched_at": e.fetched_at} for n, e in self._entries.items()}
+            await asyncio.to_thread(self._save_snapshot, snapshot)
+        if previous is not None and previous.models != entry.models:
+            self._notify(name, entry.models)
+        return entry
+
+    def _notify(self, name: str, models: Dict[str, str]) -> None:
+        for callback in list(self._listeners):
+            try:
+                callback(name, models)
+            except Exception as exc:  # 回调失败不影响刷新结果
+                logger.warning("模型目录变更回调失败: %s", exc)
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """丢弃缓存（不删除磁盘快照），下次访问时重新获取。"""
+        if name is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(name, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, "providers": sorted(self._entries)}
+
+    # ------------------------------------------------------------------
+    # 磁盘快照
+    # ------------------------------------------------------------------
+
+    def _load_snapshot(self) -> None:
+        if self._path is None or not self._path.exists():
+            return
+        try:
+            data = json.loads(self._path.read_text(encoding="utf-8"))
+            for name, item in data.items():
+                self._entries[name] = CatalogEntry(dict(item["models"]), float(item["fetched_at"]))
+                metrics.register_models(name, self._entries[name].models.values())
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as exc:
+            logger.warning("读取模型目录快照失败，忽略: %s", exc)
+            self._entries.clear()
+
+    def _save_snapshot(self, snapshot: Dict[str, Any]) -> None:
+        with self._file_lock:
+            try:
+                self._path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = self._path.with_suffix(self._path.suffix + ".tmp")
+                tmp.write_text(json.dumps(snapshot, ensure_ascii=False), encoding="utf-8")
+                os.replace(tmp, self._path)  # 原子替换，读者不会看到半截文件
+            except OSError as exc:
+                logger.warning("写入模型目录快照失败: %s", exc)
+
+
+def _create_catalog() -> ModelCatalog:
+    path = None
+    if settings.MODEL_CATALOG_SNAPSHOT:
+        path = Path(settings.MODEL_CATALOG_SNAPSHOT)
+        if not path.is_absolute():
+            path = BASE_DIR / path
+    return ModelCatalog(settings.MODEL_CATALOG_TTL_SECONDS, settings.MODEL_CATALOG_STALE_SECONDS, path)
+
+
+# 单例
+model_catalog = _create_catalog()
@@ -0,0 +1,48 @@
+"""Provider 就绪状态。
+
+provider 的生命周期：
+
+* ``pending``     —— 已选定，尚未构造（构造推迟到首次使用或启动预热）；
+* ``initialized`` —— 已构造，API 密钥尚未校验；
+* ``ready``       —— 启动预热中校验通过；
+* ``failed``      —— 构造或校验失败，``error`` 字段给出原因。
+
+``/api/health`` 据此报告就绪状态，而不是在导入阶段阻塞等待上游。
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Dict, Optional
+
+STATE_PENDING = "pending"
+STATE_INITIALIZED = "initialized"
+STATE_READY = "ready"
+STATE_FAILED = "failed"
+
+
+class ProviderHealth:
+    """按 provider 名记录就绪状态，线程安全。"""
+
+    def __init__(self, clock=time.time) -> None:
+        self._clock = clock
+        self._states: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def mark(self, name: str, state: str, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            self._states[name] = {
+                "state": state,
+                "error": str(error) if error is not None else None,
+                "updated_at": self._clock(),
+            }
+
+    def state(self, name: Optional[str]) -> Optional[str]:
+        with self._lock:
+            entry = self._states.get(name) if name is not None else None
+            return entry["state"] if entry else None
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {name: dict(entry) for name, entry in self._states.items()}
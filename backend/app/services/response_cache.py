@@ -0,0 +1,236 @@
+"""LLM 回复的精确匹配缓存。
+
+键为 (provider, model, 注入系统提示词后的 messages, temperature) 的规范化 SHA-256；
+一级为进程内 LRU + TTL，可选二级为共享 Redis（``RESPONSE_CACHE_REDIS=true``）。
+
+缓存模式 ``RESPONSE_CACHE_MODE``：
+
+* ``off``    —— 完全关闭；
+* ``opt_in`` —— 默认，仅当请求显式 ``cache=true`` 时读写缓存；
+* ``on``     —— 默认启用，请求 ``cache=false`` 时绕过。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.app.core.config import settings
+from backend.app.core.logging_config import logger
+
+MODE_OFF = "off"
+MODE_OPT_IN = "opt_in"
+MODE_ON = "on"
+
+# 与 LLMInterface.chat_completion 的默认值一致
+DEFAULT_TEMPERATURE = 0.7
+
+
+def make_cache_key(
+    provider: Any,
+    model: str,
+    messages: List[Dict[str, str]],
+    temperature: float = DEFAULT_TEMPERATURE,
+) -> str:
+    """计算规范化缓存键。
+
+    messages 先按 provider 的规则注入系统提示词，保证与实际发给上游的内容一致。
+    """
+    add_system_prompt = getattr(provider, "_add_system_prompt", None)
+    canonical = add_system_prompt(list(messages)) if add_system_prompt else list(messages)
+    provider_name = getattr(provider, "name", None) or type(provider).__name__
+    payload = json.dumps(
+        [provider_name, model, canonical, temperature],
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """进程内 LRU + TTL 缓存，可选 Redis 二级缓存。线程安全（同步路径在线程池中调用）。"""
+
+    REDIS_PREFIX = "llm:cache:"
+
+    def __init__(
+        self,
+        mode: str = MODE_OPT_IN,
+        max_entries: int = 1024,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl_seconds: float = 3600.0,
+        redis_client=None,
+        async_redis_client=None,
+    ) -> None:
+        self.mode = mode
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max(1, max_bytes)
+        self.ttl_seconds = ttl_seconds
+        self._redis = redis_client
+        self._aredis = async_redis_client
+        self._entries: "OrderedDict[str, Tuple[str, float, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"lookups": 0, "hits": 0, "redis_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._lookup_ns = 0
+
+    # ------------------------------------------------------------------
+    # 策略
+    # ------------------------------------------------------------------
+
+    def enabled_for(self, use_cache: Optional[bool]) -> bool:
+        """结合全局模式与请求级开关判断本次请求是否走缓存。"""
+        if self.mode == MODE_OFF or use_cache is False:
+            return False
+        if self.mode == MODE_ON:
+            return True
+        return use_cache is True
+
+    # ------------------------------------------------------------------
+    # 同步接口
+    # ------------------------------------------------------------------
+
+    def get(self, key: str) -> Optional[str]:
+        start = time.perf_counter_ns()
+        value = self._get_local(key)
+        if value is None and self._redis is not None:
+            value = self._redis_get(key)
+        self._record_lookup(start, value)
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        self._set_local(key, value)
+        if self._redis is not None:
+            try:
+                self._redis.set(self.REDIS_PREFIX + key, value, ex=int(self.ttl_seconds))
+            except Exception as exc:  # pragma: no cover
+                logger.warning("写入 Redis 缓存失败: %s", exc)
+
+    # ------------------------------------------------------------------
+    # 异步接口（Redis 使用 asyncio 客户端，避免阻塞事件循环）
+    # ------------------------------------------------------------------
+
+    async def aget(self, key: str) -> Optional[str]:
+        start = time.perf_counter_ns()
+        value = self._get_local(key)
+        if value is None and self._aredis is not None:
+            try:
+                value = await self._aredis.get(self.REDIS_PREFIX + key)
+            except Exception as exc:  # pragma: no cover
+                logger.warning("读取 Redis 缓存失败: %s", exc)
+                value = None
+            if value is not None:
+                self._promote(key, value)
+        self._record_lookup(start, value)
+        return value
+
+    async def aset(self, key: str, value: str) -> None:
+        self._set_local(key, value)
+        if self._aredis is not None:
+            try:
+                await self._aredis.set(self.REDIS_PREFIX + key, value, ex=int(self.ttl_seconds))
+            except Exception as exc:  # pragma: no cover
+                logger.warning("写入 Redis 缓存失败: %s", exc)
+
+    # ------------------------------------------------------------------
+    # 统计
+    # ------------------------------------------------------------------
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            lookups = stats["lookups"]
+            stats.update(
+                mode=self.mode,
+                entries=len(self._entries),
+                bytes=self._bytes,
+                hit_ratio=(stats["hits"] / lookups) if lookups else 0.0,
+                avg_lookup_us=(self._lookup_ns / lookups / 1000) if lookups else 0.0,
+            )
+        return stats
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    # ------------------------------------------------------------------
+    # 内部
+    # ------------------------------------------------------------------
+
+    def _get_local(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at, size = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self._bytes -= size
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _redis_get(self, key: str) -> Optional[str]:
+        try:
+            value = self._redis.get(self.REDIS_PREFIX + key)
+        except Exception as exc:  # pragma: no cover
+            logger.warning("读取 Redis 缓存失败: %s", exc)
+            return None
+        if value is not None:
+            self._promote(key, value)
+        return value
+
+    def _promote(self, key: str, value: str) -> None:
+        """Redis 命中后回填本地缓存。"""
+        self._set_local(key, value, count_store=False)
+        with self._lock:
+            self._stats["redis_hits"] += 1
+
+    def _set_local(self, key: str, value: str, count_store: bool = True) -> None:
+        size = len(key) + len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds, size)
+            self._bytes += size
+            if count_store:
+                self._stats["stores"] += 1
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._stats["evictions"] += 1
+
+    def _record_lookup(self, start_ns: int, value: Optional[str]) -> None:
+        elapsed = time.perf_counter_ns() - start_ns
+        with self._lock:
+            self._stats["lookups"] += 1
+            self._stats["hits" if value is not None else "misses"] += 1
+            self._lookup_ns += elapsed
+
+
+def _create_cache() -> ResponseCache:
+    redis_client = async_redis_client = None
+    if settings.RESPONSE_CACHE_REDIS:
+        from backend.infra.redis_client import AREDIS, REDIS  # 延迟导入，仅启用 Redis 时需要
+
+        redis_client, async_redis_client = REDIS, AREDIS
+    return ResponseCache(
+        mode=settings.RESPONSE_CACHE_MODE,
+        max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+        max_bytes=settings.RESPONSE_CACHE_MAX_BYTES,
+        ttl_seconds=settings.RESPONSE_CACHE_TTL_SECONDS,
+        redis_client=redis_client,
+        async_redis_client=async_redis_client,
+    )
+
+
+# 单例
+response_cache = _create_cache()
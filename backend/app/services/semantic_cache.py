@@ -0,0 +1,333 @@
+"""LLM 回复的语义缓存。
+
+精确匹配缓存（``response_cache``）只能命中逐字相同的请求；本模块对最后一轮用户消息做本地向量化，
+在相似度超过阈值时直接返回历史回复，覆盖“换个说法问同一个问题”的情况。
+
+* 向量化：字符 n-gram + 词特征经 CRC32 哈希到固定维度（带符号哈希），L2 归一化，无网络、无模型文件；
+* 索引：预分配的 NumPy 矩阵，查询为一次矩阵-向量乘法，10 万条目量级下仍为毫秒级；
+* 淘汰：达到容量后替换最久未命中的条目；
+* 不同 (provider, model, temperature, 此前的对话上下文) 的条目互相隔离：上下文取注入系统提示词后、
+  最后一条用户消息之前的全部消息的 SHA-256，避免“继续”“翻译一下”这类追问命中其他会话的回复；
+* n-gram 相似度对数字与否定词不敏感（“100 USD”与“500 USD”、“safe”与“not safe”相似度都在 0.9 以上），
+  因此数字与否定词也计入命名空间，二者不同的问题从不互相命中；其余差异（如换了编程语言）靠较高的默认阈值区分。
+
+缓存模式 ``SEMANTIC_CACHE_MODE`` 与 ``RESPONSE_CACHE_MODE`` 含义相同，默认 ``off``。
+未安装 numpy 时语义缓存自动关闭；关闭时不导入 numpy。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from backend.app.core.config import settings
+from backend.app.core.logging_config import logger
+from backend.app.services.response_cache import DEFAULT_TEMPERATURE, MODE_OFF, MODE_ON
+
+# numpy 为可选依赖，且导入耗时明显；语义缓存关闭时不加载
+np = None
+
+
+def _require_numpy() -> bool:
+    """按需导入 numpy；未安装时返回 False。"""
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:  # pragma: no cover - numpy 为可选依赖
+            return False
+        np = numpy
+    return True
+
+
+def last_user_turn(messages: Sequence[Dict[str, str]]) -> Optional[str]:
+    """返回最后一条用户消息的内容；没有则返回 None。"""
+    for message in reversed(messages):
+        if message.get("role") == "user":
+            return message.get("content") or None
+    return None
+
+
+# 改变问题含义却几乎不影响 n-gram 相似度的词：数字与否定词
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)*")
+_NEGATION = re.compile(
+    r"\b(?:not|no|never|none|nothing|neither|nor|without|cannot)\b|n't\b|[不没別别勿非无未]",
+    re.IGNORECASE,
+)
+
+
+def critical_terms(text: str) -> str:
+    """问题中的数字与否定词（按出现顺序），作为命名空间的一部分。"""
+    numbers = _NUMBER.findall(text)
+    negations = [n.lower() for n in _NEGATION.findall(text)]
+    return " ".join(numbers) + "|" + " ".join(negations)
+
+
+def context_digest(provider: Any, messages: Sequence[Dict[str, str]]) -> str:
+    """最后一条用户消息之前的上下文（含 provider 注入的系统提示词）的规范化 SHA-256。"""
+    add_system_prompt = getattr(provider, "_add_system_prompt", None)
+    canonical = add_system_prompt(list(messages)) if add_system_prompt else list(messages)
+    last = max((i for i, m in enumerate(canonical) if m.get("role") == "user"), default=len(canonical))
+    payload = json.dumps(canonical[:last], ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class HashedNgramEmbedder:
+    """字符 n-gram 哈希向量化器。
+
+    中文按字符 n-gram 即可捕获词语信息，英文额外加入整词特征；
+    使用 CRC32 而非内置 ``hash``，保证跨进程结果一致。
+    """
+
+    _PUNCTUATION = re.compile(r"[^\w\s]+")
+
+    def __init__(self, dim: int = 256, ngram_range: Tuple[int, int] = (1, 3)) -> None:
+        if not _require_numpy():
+            raise ImportError("HashedNgramEmbedder 需要 numpy")
+        self.dim = dim
+        self.min_n, self.max_n = ngram_range
+
+    def _features(self, text: str) -> List[str]:
+        text = " ".join(self._PUNCTUATION.sub(" ", text.lower()).split())
+        features = text.split(" ")
+        for n in range(self.min_n, self.max_n + 1):
+            features.extend(text[i:i + n] for i in range(len(text) - n + 1))
+        return features
+
+    def embed(self, text: str):
+        hashes = np.fromiter(
+            (zlib.crc32(f.encode("utf-8")) for f in self._features(text)), dtype=np.uint32
+        )
+        vector = np.zeros(self.dim, dtype=np.float32)
+        if hashes.size:
+            signs = np.where(hashes >> 31, -1.0, 1.0).astype(np.float32)
+            np.add.at(vector, hashes % self.dim, signs)
+            norm = np.linalg.norm(vector)
+            if norm > 0:
+                vector /= norm
+        return vector
+
+    def embed_batch(self, texts: Sequence[str]):
+        return np.stack([self.embed(t) for t in texts]) if texts else np.zeros((0, self.dim), dtype=np.float32)
+
+
+class VectorIndex:
+    """定长向量索引：预分配矩阵 + 命名空间掩码 + 最近使用时间。非线程安全，由调用方加锁。"""
+
+    def __init__(self, dim: int, capacity: int) -> None:
+        if not _require_numpy():
+            raise ImportError("VectorIndex 需要 numpy")
+        self.dim = dim
+        self.capacity = max(1, capacity)
+        self._vectors = np.zeros((self.capacity, dim), dtype=np.float32)
+        self._namespaces = np.full(self.capacity, -1, dtype=np.int64)
+        self._last_used = np.zeros(self.capacity, dtype=np.int64)
+        self._payloads: List[Optional[str]] = [None] * self.capacity
+        self._size = 0
+        self._clock = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def nbytes(self) -> int:
+        return self._vectors.nbytes + self._namespaces.nbytes + self._last_used.nbytes
+
+    def _tick(self) -> int:
+        self._clock += 1
+        return self._clock
+
+    def search_batch(self, vectors, namespace: int):
+        """批量查询，返回每个查询的 (最佳槽位数组, 相似度数组)；无候选时槽位为 -1。"""
+        vectors = np.atleast_2d(vectors)
+        if self._size == 0:
+            return np.full(len(vectors), -1), np.full(len(vectors), -np.inf, dtype=np.float32)
+        scores = vectors @ self._vectors[: self._size].T
+        scores[:, self._namespaces[: self._size] != namespace] = -np.inf
+        slots = scores.argmax(axis=1)
+        best = scores[np.arange(len(vectors)), slots]
+        slots = np.where(np.isfinite(best), slots, -1)
+        return slots, best
+
+    def search(self, vector, namespace: int) -> Tuple[int, float]:
+        slots, scores = self.search_batch(vector, namespace)
+        return int(slots[0]), float(scores[0])
+
+    def get(self, slot: int) -> Optional[str]:
+        self._last_used[slot] = self._tick()
+        return self._payloads[slot]
+
+    def add(self, vector, namespace: int, payload: str, slot: int = -1) -> int:
+        """写入条目；slot 为 -1 时追加，满容量时替换最久未使用的条目。"""
+        if slot < 0:
+            if self._size < self.capacity:
+                slot = self._size
+                self._size += 1
+            else:
+                slot = int(self._last_used.argmin())
+                self.evictions += 1
+        self._vectors[slot] = vector
+        self._namespaces[slot] = namespace
+        self._payloads[slot] = payload
+        self._last_used[slot] = self._tick()
+        return slot
+
+    def drop_namespace(self, namespace: int) -> None:
+        """作废某个命名空间的全部条目；空出的槽位最先被复用。"""
+        mask = self._namespaces[: self._size] == namespace
+        self._namespaces[: self._size][mask] = -1
+        self._last_used[: self._size][mask] = 0
+        for slot in np.flatnonzero(mask):
+            self._payloads[slot] = None
+
+    def clear(self) -> None:
+        self._namespaces.fill(-1)
+        self._last_used.fill(0)
+        self._payloads = [None] * self.capacity
+        self._size = 0
+        self._clock = 0
+
+
+class SemanticCache:
+    """按最后一轮用户消息的语义相似度命中的回复缓存，仅在此前上下文完全相同时命中。线程安全。"""
+
+    # 与已有条目几乎相同的新回复直接覆盖，避免索引被重复问题填满
+    DUPLICATE_THRESHOLD = 0.999
+
+    def __init__(
+        self,
+        mode: str = MODE_OFF,
+        threshold: float = 0.97,
+        capacity: int = 10000,
+        dim: int = 256,
+    ) -> None:
+        if mode != MODE_OFF and not _require_numpy():
+            logger.warning("未安装 numpy，语义缓存已关闭")
+            mode = MODE_OFF
+        self.mode = mode
+        self.threshold = threshold
+        self._embedder = HashedNgramEmbedder(dim) if mode != MODE_OFF else None
+        self._index = VectorIndex(dim, capacity) if mode != MODE_OFF else None
+        # 命名空间 id 单调递增不复用；映射按 LRU 限制为索引容量，淘汰时同时作废对应条目
+        self._namespaces: "OrderedDict[Tuple[str, str, float, str, str], int]" = OrderedDict()
+        self._max_namespaces = max(1, capacity)
+        self._next_namespace = 0
+        self._lock = threading.Lock()
+        self._stats = {"lookups": 0, "hits": 0, "misses": 0, "stores": 0}
+        self._lookup_ns = 0
+
+    def enabled_for(self, use_cache: Optional[bool]) -> bool:
+        """结合全局模式与请求级开关判断本次请求是否走语义缓存。"""
+        if self._index is None or use_cache is False:
+            return False
+        if self.mode == MODE_ON:
+            return True
+        return use_cache is True
+
+    @staticmethod
+    def _key(
+        provider: Any, model: str, temperature: float, messages: Sequence[Dict[str, str]], text: str
+    ) -> Tuple[str, str, float, str, str]:
+        name = getattr(provider, "name", None) or type(provider).__name__
+        return (name, model, temperature, context_digest(provider, messages), critical_terms(text))
+
+    def _namespace(self, key: Tuple[str, str, float, str, str], create: bool = True) -> Optional[int]:
+        """返回命名空间 id；``create`` 为假且不存在时返回 None（查询不新建、不淘汰命名空间）。调用方持有锁。"""
+        namespace = self._namespaces.get(key)
+        if namespace is not None:
+            self._namespaces.move_to_end(key)
+            return namespace
+        if not create:
+            return None
+        namespace = self._next_namespace
+        self._next_namespace += 1
+        self._namespaces[key] = namespace
+        if len(self._namespaces) > self._max_namespaces:
+            _, evicted = self._namespaces.popitem(last=False)
+            self._index.drop_namespace(evicted)
+        return namespace
+
+    def lookup(
+        self,
+        provider: Any,
+        model: str,
+        messages: Sequence[Dict[str, str]],
+        temperature: float = DEFAULT_TEMPERATURE,
+    ) -> Optional[str]:
+        """返回相似度不低于阈值的缓存回复；未命中返回 None。"""
+        text = last_user_turn(messages)
+        if text is None:
+            return None
+        start = time.perf_counter_ns()
+        vector = self._embedder.embed(text)
+        key = self._key(provider, model, temperature, messages, text)
+        with self._lock:
+            namespace = self._namespace(key, create=False)
+            value = None
+            if namespace is not None:
+                slot, score = self._index.search(vector, namespace)
+                value = self._index.get(slot) if slot >= 0 and score >= self.threshold else None
+            self._stats["lookups"] += 1
+            self._stats["hits" if value is not None else "misses"] += 1
+            self._lookup_ns += time.perf_counter_ns() - start
+        return value
+
+    def store(
+        self,
+        provider: Any,
+        model: str,
+        messages: Sequence[Dict[str, str]],
+        response: str,
+        temperature: float = DEFAULT_TEMPERATURE,
+    ) -> None:
+        text = last_user_turn(messages)
+        if text is None:
+            return
+        vector = self._embedder.embed(text)
+        key = self._key(provider, model, temperature, messages, text)
+        with self._lock:
+            namespace = self._namespace(key)
+            slot, score = self._index.search(vector, namespace)
+            self._index.add(vector, namespace, response, slot if score >= self.DUPLICATE_THRESHOLD else -1)
+            self._stats["stores"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            lookups = stats["lookups"]
+            stats.update(
+                mode=self.mode,
+                threshold=self.threshold,
+                entries=len(self._index) if self._index is not None else 0,
+                evictions=self._index.evictions if self._index is not None else 0,
+                bytes=self._index.nbytes if self._index is not None else 0,
+                hit_ratio=(stats["hits"] / lookups) if lookups else 0.0,
+                avg_lookup_us=(self._lookup_ns / lookups / 1000) if lookups else 0.0,
+            )
+        return stats
+
+    def clear(self) -> None:
+        with self._lock:
+            if self._index is not None:
+                self._index.clear()
+            self._namespaces.clear()
+
+
+def _create_cache() -> SemanticCache:
+    return SemanticCache(
+        mode=settings.SEMANTIC_CACHE_MODE,
+        threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+        capacity=settings.SEMANTIC_CACHE_CAPACITY,
+        dim=settings.SEMANTIC_CACHE_DIM,
+    )
+
+
+# 单例
+semantic_cache = _create_cache()
@@ -0,0 +1,200 @@
+"""进行中请求的合并（single-flight）。
+
+同一时刻到达的相同请求（相同 provider / model / messages）只向上游发起一次调用，
+其余请求等待并共享同一结果或同一异常；流式请求共享同一条上游流，后加入者先补发已产出的增量。
+
+与回复缓存不同，这里只在调用进行期间生效：调用结束后条目立即移除，之后的相同请求会重新调用上游。
+所有等待者都离开（客户端断开 / 取消）时才取消上游调用，单个等待者取消不影响其它等待者。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from contextlib import aclosing
+from typing import Any, AsyncGenerator, AsyncIterator, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class _Flight:
+    """一次进行中的异步调用。"""
+
+    def __init__(self, task: asyncio.Future) -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class _SyncFlight:
+    """一次进行中的同步调用（线程池中的 chat / chat_with_memory）。"""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class _SharedStream:
+    """一条共享的上游流：产出的增量按顺序保存，供每个订阅者从头读取。"""
+
+    def __init__(self) -> None:
+        self.items: List[Any] = []
+        self.meta: Dict[str, Any] = {}
+        self.finished = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait(self) -> None:
+        await self._changed.wait()
+
+
+class SingleFlight:
+    """按 key 合并并发的相同调用。"""
+
+    def __init__(self) -> None:
+        self._flights: Dict[str, _Flight] = {}
+        self._streams: Dict[str, _SharedStream] = {}
+        self._sync_flights: Dict[str, _SyncFlight] = {}
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "coalesced": 0}
+
+    # ------------------------------------------------------------------
+    # 异步调用
+    # ------------------------------------------------------------------
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """执行 fn；若相同 key 的调用正在进行，则等待其结果。"""
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _t: self._forget(self._flights, key, flight))
+            self._count("calls")
+        else:
+            self._count("coalesced")
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    # ------------------------------------------------------------------
+    # 同步调用
+    # ------------------------------------------------------------------
+
+    def do_sync(self, key: str, fn: Callable[[], T]) -> T:
+        """:meth:`do` 的同步版本，供线程池中的调用使用。"""
+        with self._lock:
+            flight = self._sync_flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._sync_flights[key] = _SyncFlight()
+                self._stats["calls"] += 1
+            else:
+                self._stats["coalesced"] += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn()
+            return flight.result
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._sync_flights.pop(key, None)
+            flight.done.set()
+
+    # ------------------------------------------------------------------
+    # 流式调用
+    # ------------------------------------------------------------------
+
+    async def stream(
+        self,
+        key: str,
+        factory: Callable[[Dict[str, Any]], AsyncIterator[T]],
+        meta: Optional[Dict[str, Any]] = None,
+    ) -> AsyncGenerator[T, None]:
+        """订阅共享流；没有进行中的流时调用 ``factory(meta)`` 创建。
+
+        ``factory`` 收到的 meta 字典在流结束后合并进调用方传入的 ``meta``。
+        """
+        shared = self._streams.get(key)
+        if shared is None:
+            shared = _SharedStream()
+            self._streams[key] = shared
+            shared.task = asyncio.create_task(self._produce(key, shared, factory))
+            self._count("calls")
+        else:
+            self._count("coalesced")
+
+        shared.subscribers += 1
+        index = 0
+        try:
+            while True:
+                while index < len(shared.items):
+                    index += 1
+                    yield shared.items[index - 1]
+                if shared.finished:
+                    break
+                await shared.wait()
+            if shared.error is not None:
+                raise shared.error
+            if meta is not None:
+                meta.update(shared.meta)
+        finally:
+            shared.subscribers -= 1
+            if shared.subscribers == 0 and not shared.finished and shared.task is not None:
+                shared.task.cancel()
+
+    async def _produce(
+        self, key: str, shared: _SharedStream, factory: Callable[[Dict[str, Any]], AsyncIterator[T]]
+    ) -> None:
+        try:
+            async with aclosing(factory(shared.meta)) as items:
+                async for item in items:
+                    shared.items.append(item)
+                    shared.notify()
+        except asyncio.CancelledError:
+            shared.error = asyncio.CancelledError()
+        except Exception as exc:
+            shared.error = exc
+        finally:
+            shared.finished = True
+            self._forget(self._streams, key, shared)
+            shared.notify()
+
+    # ------------------------------------------------------------------
+    # 统计 / 内部
+    # ------------------------------------------------------------------
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["in_flight"] = len(self._flights) + len(self._streams) + len(self._sync_flights)
+        return stats
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    @staticmethod
+    def _forget(table: Dict[str, Any], key: str, entry: Any) -> None:
+        if table.get(key) is entry:
+            del table[key]
@@ -0,0 +1,302 @@
+"""可续传的流式生成。
+
+生成在后台任务中进行，帧写入按 stream id 索引的有界环形缓冲区；HTTP 响应只是缓冲区的订阅者。
+
+* 客户端断线后生成继续进行，宽限期内（``STREAM_RESUME_GRACE_SECONDS``）无人重连才取消上游；
+* 重连时携带最后收到的 ``seq``（SSE 的 ``Last-Event-ID``），从下一帧开始补发并继续实时推送；
+* 有订阅者在线时生成端等待最慢的订阅者取走最旧的帧，不会因读得慢而淘汰其尚未读取的帧；
+* 生成结束后缓冲区再保留 ``STREAM_RESUME_TTL_SECONDS`` 秒供迟到的重连读取；
+* 同时保留的流不超过 ``STREAM_RESUME_MAX_STREAMS``，已满且都在进行中时新的流不可续传（由调用方直接推送）；
+* ``STREAM_RESUME_BACKEND=redis`` 时帧同时写入 Redis 列表，落到其它 worker 的重连也能读取。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from collections import OrderedDict, deque
+from contextlib import aclosing
+from typing import Any, AsyncGenerator, AsyncIterator, Deque, Dict, List, Optional
+
+from backend.app.core.config import settings
+from backend.app.core.logging_config import logger
+
+_TERMINAL_TYPES = ("done", "error")
+
+
+class StreamNotFound(KeyError):
+    """stream id 不存在（从未创建或已过期）。"""
+
+
+class StreamExpired(LookupError):
+    """请求的 seq 已被环形缓冲区淘汰，无法补发。"""
+
+
+class StreamLimitReached(RuntimeError):
+    """保留的流已达 ``max_streams`` 且都在进行中。"""
+
+
+class _StreamBuffer:
+    """单个流的帧缓冲区。"""
+
+    def __init__(self, capacity: int) -> None:
+        self.frames: Deque[Dict[str, Any]] = deque(maxlen=max(1, capacity))
+        self.finished = False
+        self.subscribers = 0
+        # 在线订阅者 -> 已取走的最后一个 seq，生成端据此做背压
+        self.cursors: Dict[object, int] = {}
+        self.task: Optional[asyncio.Task] = None
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self._changed = asyncio.Event()
+
+    def append(self, frame: Dict[str, Any]) -> None:
+        self.frames.append(frame)
+        self._notify()
+
+    def advance(self, subscriber: object, seq: int) -> None:
+        self.cursors[subscriber] = seq
+        self._notify()
+
+    def has_room(self) -> bool:
+        """追加一帧是否不会淘汰在线订阅者尚未取走的帧。"""
+        if not self.cursors or len(self.frames) < self.frames.maxlen:
+            return True
+        return min(self.cursors.values()) >= self.frames[0]["seq"]
+
+    def finish(self) -> None:
+        self.finished = True
+        self._notify()
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def frames_after(self, seq: int) -> List[Dict[str, Any]]:
+        """返回 seq 之后的所有已缓冲帧。"""
+        if not self.frames:
+            return []
+        first = self.frames[0]["seq"]
+        if seq + 1 < first:
+            raise StreamExpired(seq)
+        start = seq + 1 - first
+        return [self.frames[i] for i in range(start, len(self.frames))]
+
+    async def wait(self) -> None:
+        await self._changed.wait()
+
+
+class _RedisFrameLog:
+    """把帧镜像到 Redis 列表（同样有界），供其它 worker 上的重连读取。"""
+
+    KEY_PREFIX = "llm:stream:"
+    POLL_INTERVAL = 0.2
+
+    def __init__(self, client, capacity: int, ttl: float) -> None:
+        self._client = client
+        self._capacity = max(1, capacity)
+        self._ttl = max(1, int(ttl))
+
+    def _key(self, stream_id: str) -> str:
+        return f"{self.KEY_PREFIX}{stream_id}"
+
+    async def append(self, stream_id: str, frame: Dict[str, Any]) -> None:
+        key = self._key(stream_id)
+        pipe = self._client.pipeline()
+        pipe.rpush(key, json.dumps(frame, ensure_ascii=False))
+        pipe.ltrim(key, -self._capacity, -1)
+        pipe.expire(key, self._ttl)
+        await pipe.execute()
+
+    async def read(self, stream_id: str, after_seq: int, idle_timeout: float) -> AsyncGenerator[Dict[str, Any], None]:
+        """读取 after_seq 之后的帧；流未结束时轮询等待，空闲超过 idle_timeout 即放弃。"""
+        key = self._key(stream_id)
+        loop = asyncio.get_running_loop()
+        last_progress = loop.time()
+        first_read = True
+        while True:
+            raw = await self._client.lrange(key, 0, -1)
+            if first_read:
+                if not raw:
+                    raise StreamNotFound(stream_id)
+                if json.loads(raw[0])["seq"] > after_seq + 1:
+                    raise StreamExpired(after_seq)
+                first_read = False
+            for item in raw:
+                frame = json.loads(item)
+                if frame["seq"] <= after_seq:
+                    continue
+                after_seq = frame["seq"]
+                last_progress = loop.time()
+                yield frame
+                if frame.get("type") in _TERMINAL_TYPES:
+                    return
+            if loop.time() - last_progress > idle_timeout:
+                return
+            await asyncio.sleep(self.POLL_INTERVAL)
+
+
+class StreamRegistry:
+    """管理进行中与最近结束的流。"""
+
+    def __init__(
+        self,
+        capacity: int = 4096,
+        grace_seconds: float = 30.0,
+        ttl_seconds: float = 300.0,
+        max_streams: int = 1024,
+        frame_log: Optional[_RedisFrameLog] = None,
+    ) -> None:
+        self.capacity = capacity
+        self.grace_seconds = grace_seconds
+        self.ttl_seconds = ttl_seconds
+        self.max_streams = max_streams
+        self._frame_log = frame_log
+        self._streams: "OrderedDict[str, _StreamBuffer]" = OrderedDict()
+
+    def __contains__(self, stream_id: str) -> bool:
+        return stream_id in self._streams
+
+    def has_room(self) -> bool:
+        """能否再登记一个流（必要时淘汰已结束的流）。"""
+        return self._make_room()
+
+    def start(self, stream_id: str, frames: AsyncIterator[Dict[str, Any]]) -> None:
+        """在后台任务中消费 frames 并写入缓冲区。
+
+        Raises:
+            StreamLimitReached: 已保留 ``max_streams`` 个流且都在进行中；调用方应先用 :meth:`has_room` 判断。
+        """
+        if not self._make_room():
+            raise StreamLimitReached(stream_id)
+        buf = _StreamBuffer(self.capacity)
+        self._streams[stream_id] = buf
+        buf.task = asyncio.create_task(self._produce(stream_id, buf, frames))
+        # 若始终没有订阅者，宽限期后同样取消
+        self._arm_grace_timer(stream_id, buf)
+
+    async def subscribe(self, stream_id: str, after_seq: int = -1) -> AsyncGenerator[Dict[str, Any], None]:
+        """从 after_seq 之后开始补发，并继续推送实时帧直到流结束。
+
+        Raises:
+            StreamNotFound: 流不存在。
+            StreamExpired: after_seq 之后的部分帧已被淘汰。
+        """
+        buf = self._streams.get(stream_id)
+        if buf is None:
+            if self._frame_log is None:
+                raise StreamNotFound(stream_id)
+            async for frame in self._frame_log.read(stream_id, after_seq, self.grace_seconds):
+                yield frame
+            return
+
+        buf.frames_after(after_seq)  # 提前校验，过期则直接抛出
+        token = object()
+        self._attach(buf, token, after_seq)
+        try:
+            while True:
+                pending = buf.frames_after(after_seq)
+                if pending:
+                    # 取走即可放行生成端，帧已在本地列表中
+                    after_seq = pending[-1]["seq"]
+                    buf.advance(token, after_seq)
+                    for frame in pending:
+                        yield frame
+                    continue  # yield 期间可能已有新帧，检查后再等待，避免错过通知
+                if buf.finished:
+                    return
+                await buf.wait()
+        finally:
+            self._detach(stream_id, buf, token)
+
+    # ------------------------------------------------------------------
+    # 内部
+    # ------------------------------------------------------------------
+
+    async def _produce(self, stream_id: str, buf: _StreamBuffer, frames: AsyncIterator[Dict[str, Any]]) -> None:
+        try:
+            async with aclosing(frames):
+                async for frame in frames:
+                    while not buf.has_room():
+                        await buf.wait()
+                    buf.append(frame)
+                    if self._frame_log is not None:
+                        try:
+                            await self._frame_log.append(stream_id, frame)
+                        except Exception as exc:  # pragma: no cover
+                            logger.warning("写入 Redis 流缓冲失败: %s", exc)
+        except asyncio.CancelledError:
+            logger.info("流 %s 无订阅者超过宽限期，已取消上游生成", stream_id)
+        except Exception as exc:  # pragma: no cover
+            logger.exception("流 %s 生成失败: %s", stream_id, exc)
+        finally:
+            buf.finish()
+            self._cancel_timer(buf)
+            loop = asyncio.get_running_loop()
+            buf.timer = loop.call_later(self.ttl_seconds, self._evict, stream_id, buf)
+
+    def _attach(self, buf: _StreamBuffer, token: object, after_seq: int) -> None:
+        buf.subscribers += 1
+        buf.cursors[token] = after_seq
+        if not buf.finished:
+            self._cancel_timer(buf)
+
+    def _detach(self, stream_id: str, buf: _StreamBuffer, token: object) -> None:
+        buf.subscribers -= 1
+        buf.cursors.pop(token, None)
+        buf._notify()  # 可能解除生成端的背压等待
+        if buf.subscribers == 0 and not buf.finished:
+            self._arm_grace_timer(stream_id, buf)
+
+    def _arm_grace_timer(self, stream_id: str, buf: _StreamBuffer) -> None:
+        self._cancel_timer(buf)
+        loop = asyncio.get_running_loop()
+        buf.timer = loop.call_later(self.grace_seconds, self._reap, buf)
+
+    @staticmethod
+    def _cancel_timer(buf: _StreamBuffer) -> None:
+        if buf.timer is not None:
+            buf.timer.cancel()
+            buf.timer = None
+
+    @staticmethod
+    def _reap(buf: _StreamBuffer) -> None:
+        if buf.subscribers == 0 and not buf.finished and buf.task is not None:
+            buf.task.cancel()
+
+    def _evict(self, stream_id: str, buf: _StreamBuffer) -> None:
+        if self._streams.get(stream_id) is buf:
+            del self._streams[stream_id]
+
+    def _make_room(self) -> bool:
+        """达到容量时淘汰最早结束的流；进行中的流不淘汰。返回是否还能登记新的流。"""
+        if len(self._streams) < self.max_streams:
+            return True
+        for stream_id, buf in list(self._streams.items()):
+            if buf.finished:
+                self._cancel_timer(buf)
+                del self._streams[stream_id]
+                if len(self._streams) < self.max_streams:
+                    return True
+        return False
+
+
+def _create_registry() -> StreamRegistry:
+    frame_log = None
+    if settings.STREAM_RESUME_BACKEND == "redis":
+        from backend.infra.redis_client import AREDIS  # 延迟导入，仅 redis 模式需要
+
+        if AREDIS is None:
+            logger.warning("未安装 redis 库，流续传回退为进程内缓冲")
+        else:
+            frame_log = _RedisFrameLog(AREDIS, settings.STREAM_RESUME_BUFFER_FRAMES, settings.STREAM_RESUME_TTL_SECONDS)
+    return StreamRegistry(
+        capacity=settings.STREAM_RESUME_BUFFER_FRAMES,
+        grace_seconds=settings.STREAM_RESUME_GRACE_SECONDS,
+        ttl_seconds=settings.STREAM_RESUME_TTL_SECONDS,
+        max_streams=settings.STREAM_RESUME_MAX_STREAMS,
+        frame_log=frame_log,
+    )
+
+
+# 单例
+stream_registry = _create_registry()
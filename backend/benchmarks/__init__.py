@@ -0,0 +1,10 @@
+"""热路径微基准。
+
+运行 ``python -m backend.benchmarks``：执行全部基准并与 ``backend/benchmarks/baseline.json`` 对比，
+有基准超过其退化阈值时以非零状态退出。基准定义见 :mod:`backend.benchmarks.suite`，
+计时与对比逻辑见 :mod:`backend.benchmarks.harness`。
+"""
+
+from backend.benchmarks.harness import SkipBenchmark, benchmark, compare, measure, registered, run
+
+__all__ = ["SkipBenchmark", "benchmark", "compare", "measure", "registered", "run"]
@@ -0,0 +1,111 @@
+"""微基准命令行入口。
+
+用法::
+
+    python -m backend.benchmarks                    # 运行全部基准并与基线对比，有退化时退出码为 1
+    python -m backend.benchmarks -k export          # 只运行名称包含 export 的基准
+    python -m backend.benchmarks --save-baseline    # 用本次结果更新基线（在代码评审中一并提交）
+    python -m backend.benchmarks --output out.json  # 另存本次结果
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+
+
+def _out(line: str = "") -> None:
+    sys.stdout.write(line + "\n")
+
+
+def _err(line: str) -> None:
+    sys.stderr.write(line + "\n")
+
+
+def _format_us(value: Optional[float]) -> str:
+    if value is None:
+        return "-"
+    if value >= 1000:
+        return f"{value / 1000:.2f}ms"
+    return f"{value:.2f}us"
+
+
+def _print_comparison(rows: List[Dict[str, Any]]) -> None:
+    width = max(len(r["name"]) for r in rows) + 2
+    _out(f"{'benchmark':<{width}}{'current':>12}{'baseline':>12}{'ratio':>8}  status")
+    for r in rows:
+        ratio = f"{r['ratio']:.2f}" if "ratio" in r else "-"
+        _out(
+            f"{r['name']:<{width}}{_format_us(r['current_us']):>12}{_format_us(r.get('baseline_us')):>12}"
+            f"{ratio:>8}  {r['status']}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m backend.benchmarks", description="热路径微基准")
+    parser.add_argument("-k", "--filter", default="", help="只运行名称包含该子串的基准")
+    parser.add_argument("--rounds", type=int, default=7, help="每个基准的测量轮数")
+    parser.add_argument("--min-time", type=float, default=0.05, help="每轮最短耗时（秒），据此确定迭代次数")
+    parser.add_argument("--max-time", type=float, default=10.0, help="单个基准的测量时间预算（秒），超出时减少轮数")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH, help="基线文件")
+    parser.add_argument("--save-baseline", action="store_true", help="把本次结果写入基线文件")
+    parser.add_argument("--threshold", type=float, default=None, help="统一覆盖各基准的退化阈值")
+    parser.add_argument("--no-normalize", action="store_true", help="不按校准基准缩放基线（同一台机器对比时使用）")
+    parser.add_argument("--output", type=Path, help="另存本次结果的路径")
+    args = parser.parse_args(argv)
+
+    # 基准会反复走业务代码，屏蔽其中的 INFO 日志
+    logging.getLogger("llm_api").setLevel(logging.WARNING)
+
+    from backend.benchmarks import suite  # noqa: F401 - 导入即注册基准
+    from backend.benchmarks.harness import compare, registered, run
+
+    benchmarks = registered(args.filter)
+    if not benchmarks:
+        _err(f"没有名称包含 {args.filter!r} 的基准")
+        return 2
+
+    def progress(name: str, result: Dict[str, Any]) -> None:
+        detail = result.get("skipped") or f"{_format_us(result['median_us'])} x{result['iterations']}"
+        _err(f"  {name}: {detail}")
+
+    result = run(benchmarks, rounds=args.rounds, min_time=args.min_time, max_time=args.max_time, progress=progress)
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(result, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+
+    if args.save_baseline:
+        baseline = {"meta": result["meta"], "calibration_us": result["calibration_us"], "benchmarks": {}}
+        if args.baseline.exists() and args.filter:
+            # 只运行了部分基准时保留其余基线
+            baseline["benchmarks"] = json.loads(args.baseline.read_text(encoding="utf-8"))["benchmarks"]
+        baseline["benchmarks"].update(
+            {name: {"median_us": r["median_us"], "min_us": r["min_us"]} for name, r in result["benchmarks"].items() if "skipped" not in r}
+        )
+        args.baseline.write_text(json.dumps(baseline, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        _out(f"基线已写入 {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        _err(f"基线文件 {args.baseline} 不存在，使用 --save-baseline 生成")
+        return 0
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    rows = compare(result, baseline, args.threshold, normalize=not args.no_normalize)
+    _print_comparison(rows)
+    regressed = [r["name"] for r in rows if r["status"] == "regressed"]
+    if regressed:
+        _out(f"\n{len(regressed)} 个基准超过退化阈值: {', '.join(regressed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
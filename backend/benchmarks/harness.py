@@ -0,0 +1,208 @@
+"""微基准的注册、计时与基线对比。
+
+基准用 :func:`benchmark` 注册：被装饰的 setup 函数完成准备工作并返回一个零参数的可调用对象，
+只有该对象的执行时间被计入。``params`` 为每个取值生成一个独立基准，如 ``export.word[messages=100]``。
+
+计时方式与 ``timeit`` 相同：关闭 GC，先自动确定每轮迭代次数（使一轮不短于 ``min_time``），
+再测量若干轮，记录每次调用耗时的中位数与最小值。
+
+对比基线时使用最小值：调度、频率调节等噪声只会让测量变慢，最小值在共享机器上最稳定。
+不同机器的绝对耗时不可直接比较，每次运行都会在每个基准之前测量一次纯 Python 的校准基准
+（取中位数，以跟随运行期间的机器负载漂移），对比时先按两次运行的校准耗时之比缩放基线，再用各基准的退化阈值判定；
+差值小于 :data:`NOISE_FLOOR_US` 的变化不计为退化。
+"""
+
+from __future__ import annotations
+
+import gc
+import platform
+import statistics
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+DEFAULT_THRESHOLD = 0.25
+# 亚微秒级基准的抖动常超过阈值比例，绝对差值低于该值时忽略
+NOISE_FLOOR_US = 1.0
+CALIBRATION = "_calibration"
+
+
+class SkipBenchmark(Exception):
+    """setup 阶段依赖不可用（如未安装的 SDK），跳过该基准。"""
+
+
+class Benchmark:
+    """一个已注册的基准。"""
+
+    def __init__(
+        self, name: str, setup: Callable[..., Callable[[], Any]], kwargs: Dict[str, Any], threshold: Optional[float]
+    ) -> None:
+        self.name = name
+        self.setup = setup
+        self.kwargs = kwargs
+        self.threshold = threshold
+
+    def __repr__(self) -> str:
+        return f"Benchmark({self.name!r})"
+
+
+_REGISTRY: Dict[str, Benchmark] = {}
+
+
+def benchmark(
+    name: str, *, params: Optional[Dict[str, Iterable[Any]]] = None, threshold: Optional[float] = None
+) -> Callable:
+    """注册基准；``threshold`` 为允许的相对退化（缺省 :data:`DEFAULT_THRESHOLD`），IO 密集的基准可适当放宽。"""
+
+    def decorator(setup: Callable[..., Callable[[], Any]]) -> Callable[..., Callable[[], Any]]:
+        if not params:
+            _register(Benchmark(name, setup, {}, threshold))
+            return setup
+        (key, values), = params.items()  # 只支持单个参数维度
+        for value in values:
+            _register(Benchmark(f"{name}[{key}={value}]", setup, {key: value}, threshold))
+        return setup
+
+    return decorator
+
+
+def _register(bench: Benchmark) -> None:
+    if bench.name in _REGISTRY:
+        raise ValueError(f"基准 {bench.name} 重复注册")
+    _REGISTRY[bench.name] = bench
+
+
+def registered(pattern: str = "") -> List[Benchmark]:
+    """按名称子串过滤已注册的基准（不含校准基准）。"""
+    return [b for name, b in _REGISTRY.items() if name != CALIBRATION and pattern in name]
+
+
+@benchmark(CALIBRATION)
+def _calibration() -> Callable[[], Any]:
+    data = list(range(1000))
+
+    def run() -> int:
+        total = 0
+        for value in data:
+            total += value * value
+        return total
+
+    return run
+
+
+# ---------------------------------------------------------------------------
+# 计时
+# ---------------------------------------------------------------------------
+
+
+def _time(fn: Callable[[], Any], iterations: int) -> float:
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        return time.perf_counter() - start
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def measure(fn: Callable[[], Any], rounds: int = 7, min_time: float = 0.05, max_time: float = 10.0) -> Dict[str, Any]:
+    """返回每次调用耗时（微秒）的中位数 / 最小值 / 标准差及迭代参数。
+
+    单轮就很慢的基准（如千条消息的导出）按 ``max_time`` 减少轮数，但至少测量 3 轮。
+    """
+    iterations = 1
+    while True:
+        elapsed = _time(fn, iterations)
+        if elapsed >= min_time or iterations >= 1_000_000:
+            break
+        scale = min_time / elapsed if elapsed > 0 else 10
+        iterations = min(1_000_000, max(iterations * 2, int(iterations * scale * 1.1)))
+
+    rounds = max(1, min(rounds, max(3, int(max_time / elapsed)))) if elapsed > 0 else max(1, rounds)
+    per_call = [_time(fn, iterations) / iterations * 1e6 for _ in range(rounds)]
+    return {
+        "median_us": round(statistics.median(per_call), 3),
+        "min_us": round(min(per_call), 3),
+        "stdev_us": round(statistics.stdev(per_call), 3) if len(per_call) > 1 else 0.0,
+        "iterations": iterations,
+        "rounds": len(per_call),
+    }
+
+
+def run(
+    benchmarks: Iterable[Benchmark],
+    rounds: int = 7,
+    min_time: float = 0.05,
+    max_time: float = 10.0,
+    progress: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """运行基准（穿插校准基准），返回可直接保存为 JSON 的结果。"""
+    calibrate = _REGISTRY[CALIBRATION].setup()
+    calibration: List[float] = []
+    results: Dict[str, Any] = {}
+    for bench in benchmarks:
+        calibration.append(measure(calibrate, 3, min_time, max_time)["min_us"])
+        try:
+            fn = bench.setup(**bench.kwargs)
+        except SkipBenchmark as e:
+            results[bench.name] = {"skipped": str(e)}
+        else:
+            results[bench.name] = measure(fn, rounds, min_time, max_time)
+        if progress is not None:
+            progress(bench.name, results[bench.name])
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "platform": platform.platform(terse=True),
+        },
+        "calibration_us": round(statistics.median(calibration), 3) if calibration else None,
+        "benchmarks": results,
+    }
+
+
+# ---------------------------------------------------------------------------
+# 基线对比
+# ---------------------------------------------------------------------------
+
+
+def compare(
+    current: Dict[str, Any], baseline: Dict[str, Any], threshold: Optional[float] = None, normalize: bool = True
+) -> List[Dict[str, Any]]:
+    """逐个基准与基线对比。
+
+    ``status`` 取值：``ok`` / ``regressed``（超过阈值变慢）/ ``improved``（快于基线超过阈值）/
+    ``new``（基线中没有）/ ``skipped``。``threshold`` 不为空时覆盖各基准自身的阈值。
+    """
+    scale = 1.0
+    if normalize and baseline.get("calibration_us") and current.get("calibration_us"):
+        scale = current["calibration_us"] / baseline["calibration_us"]
+
+    rows = []
+    for name, result in current["benchmarks"].items():
+        row: Dict[str, Any] = {"name": name, "current_us": result.get("min_us")}
+        base = baseline.get("benchmarks", {}).get(name) or {}
+        bench = _REGISTRY.get(name)
+        limit = threshold if threshold is not None else (bench.threshold if bench and bench.threshold else DEFAULT_THRESHOLD)
+        row["threshold"] = limit
+        if "skipped" in result:
+            row["status"] = "skipped"
+        elif not base.get("min_us"):
+            row["status"] = "new"
+        else:
+            expected = base["min_us"] * scale
+            ratio = result["min_us"] / expected
+            row.update(baseline_us=round(expected, 3), ratio=round(ratio, 3))
+            if abs(result["min_us"] - expected) < NOISE_FLOOR_US:
+                row["status"] = "ok"
+            elif ratio > 1 + limit:
+                row["status"] = "regressed"
+            elif ratio < 1 / (1 + limit):
+                row["status"] = "improved"
+            else:
+                row["status"] = "ok"
+        rows.append(row)
+    return rows
@@ -0,0 +1,194 @@
+"""热路径微基准：会话存储、上下文构造、provider 消息转换、流式帧序列化与 Word 导出。"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+from typing import Any, Callable, Dict, List, Optional
+
+from backend.benchmarks.harness import SkipBenchmark, benchmark
+
+HISTORY_SIZES = (20, 200, 2000)
+MESSAGE_COUNTS = (10, 100, 1000)
+
+
+def make_messages(count: int, chars: int = 200) -> List[Dict[str, str]]:
+    """交替的 user / assistant 消息，正文为中英混排，接近真实对话的序列化成本。"""
+    body = ("这是一段用于基准测试的消息 benchmark message. " * (chars // 30 + 1))[:chars]
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"{i}: {body}"}
+        for i in range(count)
+    ]
+
+
+# ---------------------------------------------------------------------------
+# 会话存储
+# ---------------------------------------------------------------------------
+
+
+class _DictRedis:
+    """只实现 get / set 的进程内替身，与 Redis 一样存取字符串；测量仓库自身的序列化开销。"""
+
+    def __init__(self) -> None:
+        self.store: Dict[str, str] = {}
+
+    def get(self, key: str) -> Optional[str]:
+        return self.store.get(key)
+
+    def set(self, key: str, value: str) -> None:
+        self.store[key] = value
+
+
+def _redis_client():
+    """设置了 ``REDIS_URL`` 且可连通时使用真实 Redis，否则使用进程内替身。"""
+    if os.getenv("REDIS_URL"):
+        from backend.infra.redis_client import REDIS
+
+        try:
+            if REDIS is not None and REDIS.ping():
+                return REDIS
+        except Exception:  # noqa: BLE001 - 连不上时退回替身
+            pass
+    return _DictRedis()
+
+
+def _repo_round_trip(repo, history_size: int) -> Callable[[], Any]:
+    session_id = "bench-session"
+    repo.save_history(session_id, make_messages(history_size))
+
+    def run() -> None:
+        history = repo.get_history(session_id)
+        repo.save_history(session_id, history)
+
+    return run
+
+
+@benchmark("repo.in_memory.round_trip", params={"history": HISTORY_SIZES})
+def in_memory_round_trip(history: int) -> Callable[[], Any]:
+    from backend.app.repositories.in_memory import InMemorySessionRepo
+
+    return _repo_round_trip(InMemorySessionRepo(), history)
+
+
+@benchmark("repo.redis.round_trip", params={"history": HISTORY_SIZES}, threshold=0.5)
+def redis_round_trip(history: int) -> Callable[[], Any]:
+    """连上真实 Redis 时包含网络往返，阈值放宽到 50%。"""
+    try:
+        from backend.app.repositories.redis_repo import RedisSessionRepo
+    except ImportError as e:
+        raise SkipBenchmark(f"redis 不可用: {e}")
+
+    repo = RedisSessionRepo()
+    repo._client = _redis_client()
+    return _repo_round_trip(repo, history)
+
+
+# ---------------------------------------------------------------------------
+# 上下文构造
+# ---------------------------------------------------------------------------
+
+
+def _manager():
+    from backend.app.manager import LLMManager
+    from backend.app.repositories.in_memory import InMemorySessionRepo
+
+    return LLMManager(session_repo=InMemorySessionRepo())
+
+
+@benchmark("manager.build_prompt", params={"history": HISTORY_SIZES})
+def build_prompt(history: int) -> Callable[[], Any]:
+    manager = _manager()
+    messages = make_messages(history)
+    return lambda: manager._build_prompt(messages, 10)
+
+
+@benchmark("manager.prepare_memory_prompt", params={"history": HISTORY_SIZES})
+def prepare_memory_prompt(history: int) -> Callable[[], Any]:
+    """读取历史 + 追加本轮消息 + 截取上下文（流式与非流式聊天共用）。"""
+    manager = _manager()
+    manager.session_repo.save_history("bench-session", make_messages(history))
+    return lambda: manager._prepare_memory_prompt("bench-session", "新的问题", 10)
+
+
+# ---------------------------------------------------------------------------
+# provider 消息转换
+# ---------------------------------------------------------------------------
+
+
+@benchmark("provider.google.convert_messages", params={"messages": MESSAGE_COUNTS})
+def google_convert_messages(messages: int) -> Callable[[], Any]:
+    try:
+        from backend.app.providers.impl.google_provider import GoogleProvider
+    except ImportError as e:
+        raise SkipBenchmark(f"google-generativeai 不可用: {e}")
+
+    # 转换不依赖客户端状态，跳过需要 API 密钥的构造函数
+    provider = object.__new__(GoogleProvider)
+    payload = make_messages(messages)
+    return lambda: provider._convert_messages(payload)
+
+
+# ---------------------------------------------------------------------------
+# 流式帧序列化
+# ---------------------------------------------------------------------------
+
+STREAM_DELTAS = 500
+
+
+def _deltas(count: int) -> List[str]:
+    return [f"增量{i} token " for i in range(count)]
+
+
+@benchmark("stream.encode_sse")
+def encode_sse() -> Callable[[], Any]:
+    """单帧 delta-v1 的 SSE 编码（每个增量都会经过）。"""
+    from backend.app.core import stream_format
+
+    frame = {"seq": 42, "d": "这是一个流式增量 token"}
+    return lambda: stream_format.encode_sse(frame)
+
+
+@benchmark("stream.delta_frames", params={"coalesce_chars": (0, 64)})
+def delta_frames(coalesce_chars: int) -> Callable[[], Any]:
+    """一条 500 个增量的流：manager 事件 -> delta-v1 帧 -> SSE 文本。"""
+    from backend.app.core import stream_format
+
+    deltas = _deltas(STREAM_DELTAS)
+
+    async def events():
+        for delta in deltas:
+            yield {"type": "delta", "content": delta}
+        yield {"type": "done", "content": "".join(deltas), "session_id": "bench"}
+
+    async def consume() -> int:
+        size = 0
+        async for frame in stream_format.delta_frames(
+            events(), start_meta={"session_id": "bench"}, coalesce_chars=coalesce_chars
+        ):
+            size += len(stream_format.encode_sse(frame))
+        return size
+
+    return lambda: asyncio.run(consume())
+
+
+# ---------------------------------------------------------------------------
+# 导出
+# ---------------------------------------------------------------------------
+
+
+@benchmark("export.word", params={"messages": MESSAGE_COUNTS}, threshold=0.5)
+def export_word(messages: int) -> Callable[[], Any]:
+    """生成 Word 文件（含写盘）；磁盘 IO 波动较大，阈值放宽到 50%。"""
+    try:
+        import docx  # noqa: F401
+    except ImportError as e:
+        raise SkipBenchmark(f"python-docx 不可用: {e}")
+    from backend.app.services import export_service
+
+    payload = make_messages(messages)
+
+    def run() -> None:
+        path = export_service.generate_export(payload, "benchmark", "word")
+        os.remove(path)
+
+    return run
@@ -31,5 +31,22 @@ def _create_client():  # noqa: D401
     return redis.Redis.from_url(url, decode_responses=True)
 
 
+def _create_async_client():  # noqa: D401
+    """创建 ``redis.asyncio`` 客户端，供事件循环内的高频读写使用（如流续传缓冲）。
+
+    redis 库缺失或不含 asyncio 子模块时返回 ``None``。
+    """
+
+    if redis is None:  # pragma: no cover
+        return None
+    try:
+        redis_asyncio = importlib.import_module("redis.asyncio")
+    except ModuleNotFoundError:  # pragma: no cover
+        return None
+    url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    return redis_asyncio.Redis.from_url(url, decode_responses=True)
+
+
 # 全局客户端实例
-REDIS = _create_client() 
\ No newline at end of file
+REDIS = _create_client()
+AREDIS = _create_async_client() 
\ No newline at end of file
@@ -0,0 +1,98 @@
+import asyncio
+import importlib
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+server_module = importlib.import_module("backend.app.main")
+chat_module = importlib.import_module("backend.app.api.v1.routers.chat")
+
+from backend.app.manager import LLMManager  # noqa: E402
+from backend.app.repositories.in_memory import InMemorySessionRepo  # noqa: E402
+
+client = TestClient(server_module.app)
+
+
+class _SlowAsyncProvider:
+    default_model = "fake-model"
+
+    def chat_completion(self, messages, model, temperature=0.7, stream=True):  # pragma: no cover
+        raise AssertionError("路由不应再走同步接口")
+
+    async def achat_completion(self, messages, model, temperature=0.7):
+        await asyncio.sleep(0.2)
+        return f"echo:{messages[-1]['content']}"
+
+
+def test_chat_route_uses_async_path(monkeypatch):
+    """/api/chat 应通过 achat_with_memory 调用 provider 的异步接口"""
+    repo = InMemorySessionRepo()
+    monkeypatch.setattr(chat_module._manager, "current_provider", _SlowAsyncProvider())
+    monkeypatch.setattr(chat_module._manager, "session_repo", repo)
+
+    resp = client.post("/api/chat", json={"session_id": "async-s", "user_message": "hi", "model": "m"})
+    assert resp.status_code == 200
+    assert resp.json()["response"] == "echo:hi"
+    assert len(repo.get_history("async-s")) == 2
+
+
+def test_concurrent_achat_does_not_serialize():
+    """多个并发 achat 应在同一事件循环中重叠执行，而非串行"""
+    manager = LLMManager(session_repo=InMemorySessionRepo())
+    manager.current_provider = _SlowAsyncProvider()
+
+    async def _run():
+        return await asyncio.gather(
+            *(manager.achat([{"role": "user", "content": str(i)}], model="m") for i in range(10))
+        )
+
+    start = time.perf_counter()
+    results = asyncio.run(_run())
+    elapsed = time.perf_counter() - start
+
+    assert all(r["status"] == "success" for r in results)
+    assert elapsed < 1.0  # 串行需 2 秒
+
+
+class _ThreadRecordingRepo(InMemorySessionRepo):
+    """记录每次仓库访问所在的线程，模拟阻塞的 Redis 仓库"""
+
+    def __init__(self):
+        super().__init__()
+        self.threads = []
+
+    def get_history(self, session_id):
+        self.threads.append(threading.get_ident())
+        return super().get_history(session_id)
+
+    def save_history(self, session_id, history):
+        self.threads.append(threading.get_ident())
+        super().save_history(session_id, history)
+
+    def get_provider(self, session_id):
+        self.threads.append(threading.get_ident())
+        return super().get_provider(session_id)
+
+
+def test_async_memory_paths_keep_repo_off_the_event_loop():
+    """异步记忆路径（含流式）对 session_repo 的读写都不在事件循环线程上执行"""
+    repo = _ThreadRecordingRepo()
+    manager = LLMManager(session_repo=repo)
+    manager.current_provider = _SlowAsyncProvider()
+
+    async def _stream_provider(messages, model, meta, provider=None):
+        yield "ok"
+
+    manager._stream_provider = _stream_provider
+
+    async def _run():
+        loop_thread = threading.get_ident()
+        result = await manager.achat_with_memory("s", "hi", model="m")
+        events = [e async for e in manager.chat_stream_with_memory("s", "again", model="m")]
+        return loop_thread, list(repo.threads), result, events
+
+    loop_thread, threads, result, events = asyncio.run(_run())
+    assert result["status"] == "success" and events[-1]["type"] == "done"
+    assert len(repo.get_history("s")) == 4
+    assert len(threads) == 6 and loop_thread not in threads
@@ -0,0 +1,51 @@
+import pytest
+
+from backend.benchmarks import harness, suite  # noqa: F401 - 导入即注册基准
+from backend.benchmarks.harness import SkipBenchmark, compare, measure, registered
+
+
+@pytest.mark.parametrize("bench", [b for b in registered() if "1000" not in b.name and "2000" not in b.name], ids=str)
+def test_benchmark_runs_once(bench):
+    try:
+        fn = bench.setup(**bench.kwargs)
+    except SkipBenchmark as e:
+        pytest.skip(str(e))
+    fn()
+
+
+def test_measure_reports_per_call_time():
+    result = measure(lambda: sum(range(100)), rounds=3, min_time=0.001)
+    assert result["rounds"] == 3
+    assert 0 < result["min_us"] <= result["median_us"]
+
+
+def _result(calibration_us, **benchmarks):
+    return {"calibration_us": calibration_us, "benchmarks": {k: {"min_us": v} for k, v in benchmarks.items()}}
+
+
+def test_compare_statuses():
+    baseline = _result(100.0, slow=100.0, fast=100.0, same=100.0, tiny=0.4)
+    current = _result(100.0, slow=140.0, fast=60.0, same=110.0, tiny=0.9, added=5.0)
+    current["benchmarks"]["missing_sdk"] = {"skipped": "未安装"}
+
+    statuses = {r["name"]: r["status"] for r in compare(current, baseline)}
+    assert statuses == {
+        "slow": "regressed",
+        "fast": "improved",
+        "same": "ok",
+        "tiny": "ok",  # 低于噪声下限的差值不计为退化
+        "added": "new",
+        "missing_sdk": "skipped",
+    }
+    # 显式阈值覆盖默认值
+    assert {r["name"]: r["status"] for r in compare(current, baseline, threshold=0.5)}["slow"] == "ok"
+
+
+def test_compare_scales_by_calibration():
+    baseline = _result(100.0, work=100.0)
+    current = _result(200.0, work=190.0)  # 整机慢一倍，基准本身没有退化
+
+    (row,) = compare(current, baseline)
+    assert row["status"] == "ok"
+    assert row["baseline_us"] == 200.0
+    assert compare(current, baseline, normalize=False)[0]["status"] == "regressed"
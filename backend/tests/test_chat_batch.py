@@ -0,0 +1,80 @@
+import asyncio
+import importlib
+import json
+
+from fastapi.testclient import TestClient
+
+from backend.app.services.batch import ProviderConcurrency
+
+server_module = importlib.import_module("backend.app.main")
+chat_module = importlib.import_module("backend.app.api.v1.routers.chat")
+batch_module = importlib.import_module("backend.app.services.batch")
+
+client = TestClient(server_module.app)
+
+
+class _DelayProvider:
+    """按消息内容 sleep 指定秒数；内容为 fail 时抛错。记录最大并发数。"""
+
+    default_model = "fake-model"
+
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+
+    async def achat_completion(self, messages, model, temperature=0.7):
+        text = messages[-1]["content"]
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            if text == "fail":
+                raise RuntimeError("boom")
+            await asyncio.sleep(float(text))
+            return f"slept {text}"
+        finally:
+            self.active -= 1
+
+
+def _install(monkeypatch, limit):
+    provider = _DelayProvider()
+    monkeypatch.setattr(chat_module._manager, "current_provider", provider)
+    monkeypatch.setattr(chat_module._manager, "single_flight", None)
+    monkeypatch.setattr(batch_module, "provider_concurrency", ProviderConcurrency(limit))
+    return provider
+
+
+def _post(items):
+    resp = client.post("/api/chat/batch", json={"items": items})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    return [json.loads(line) for line in resp.text.splitlines()]
+
+
+def test_batch_streams_in_completion_order(monkeypatch):
+    _install(monkeypatch, limit=4)
+    lines = _post([
+        {"id": "slow", "messages": [{"role": "user", "content": "0.3"}], "model": "m"},
+        {"id": "bad", "messages": [{"role": "user", "content": "fail"}], "model": "m"},
+        {"id": "fast", "messages": [{"role": "user", "content": "0.01"}], "model": "m"},
+    ])
+
+    assert [line.get("id") for line in lines[:3]] == ["bad", "fast", "slow"]
+    assert lines[1] == {"index": 2, "id": "fast", "status": "success", "response": "slept 0.01"}
+    assert lines[0]["status"] == "error" and lines[0]["error"] == "boom"
+    assert lines[-1] == {"type": "summary", "total": 3, "succeeded": 2, "failed": 1}
+
+
+def test_batch_respects_provider_concurrency(monkeypatch):
+    provider = _install(monkeypatch, limit=2)
+    items = [{"messages": [{"role": "user", "content": "0.02"}], "model": "m"} for _ in range(8)]
+    lines = _post(items)
+
+    assert sorted(line["index"] for line in lines[:-1]) == list(range(8))
+    assert provider.peak == 2
+
+
+def test_batch_rejects_oversized_request(monkeypatch):
+    _install(monkeypatch, limit=2)
+    monkeypatch.setattr(chat_module.settings, "BATCH_MAX_ITEMS", 1)
+    resp = client.post("/api/chat/batch", json={"items": [{"messages": [], "model": "m"}] * 2})
+    assert resp.status_code == 413
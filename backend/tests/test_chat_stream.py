@@ -0,0 +1,156 @@
+import asyncio
+import hashlib
+import importlib
+import json
+
+from fastapi.testclient import TestClient
+
+from backend.app.repositories.in_memory import InMemorySessionRepo
+
+server_module = importlib.import_module("backend.app.main")
+chat_module = importlib.import_module("backend.app.api.v1.routers.chat")
+
+client = TestClient(server_module.app)
+
+
+class _FakeStreamProvider:
+    default_model = "fake-model"
+
+    async def chat_completion_stream(self, messages, model, temperature=0.7):
+        for piece in ("Hel", "lo"):
+            yield json.dumps({"type": "stream_chunk", "content": piece})
+        yield json.dumps({"type": "stream_complete", "content": "Hello"})
+
+
+def _parse_sse(text):
+    return [json.loads(line[len("data: "):]) for line in text.splitlines() if line.startswith("data: ")]
+
+
+def test_chat_stream_persists_history(monkeypatch):
+    """/api/chat/stream 逐块推送 delta，结束后把本轮对话写入 session_repo"""
+    repo = InMemorySessionRepo()
+    monkeypatch.setattr(chat_module._manager, "current_provider", _FakeStreamProvider())
+    monkeypatch.setattr(chat_module._manager, "session_repo", repo)
+
+    resp = client.post(
+        "/api/chat/stream",
+        json={"session_id": "sse-session", "user_message": "hi", "model": "fake-model"},
+    )
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    assert resp.headers["x-stream-format"] == "delta-v1"
+
+    frames = _parse_sse(resp.text)
+    assert frames[0]["v"] == 1 and frames[0]["type"] == "start"
+    assert frames[0]["session_id"] == "sse-session"
+    assert frames[0]["stream_id"] == resp.headers["x-stream-id"]
+    assert [f["d"] for f in frames if "d" in f] == ["Hel", "lo"]
+    assert [f["seq"] for f in frames] == list(range(len(frames)))
+    done = frames[-1]
+    assert done["type"] == "done" and done["session_id"] == "sse-session"
+    assert done["digest"] == "sha256:" + hashlib.sha256("Hello".encode()).hexdigest()
+    assert done["usage"]["output_chars"] == 5
+    assert repo.get_history("sse-session") == [
+        {"role": "user", "content": "hi"},
+        {"role": "assistant", "content": "Hello"},
+    ]
+
+
+def test_chat_stream_error_not_persisted(monkeypatch):
+    """provider 报错时推送 error 事件且不写入历史"""
+
+    class _BrokenProvider(_FakeStreamProvider):
+        async def chat_completion_stream(self, messages, model, temperature=0.7):
+            yield json.dumps({"type": "error", "message": "boom"})
+
+    repo = InMemorySessionRepo()
+    monkeypatch.setattr(chat_module._manager, "current_provider", _BrokenProvider())
+    monkeypatch.setattr(chat_module._manager, "session_repo", repo)
+
+    resp = client.post(
+        "/api/chat/stream",
+        json={"session_id": "sse-error", "user_message": "hi", "model": "fake-model"},
+    )
+    frames = _parse_sse(resp.text)
+    assert frames[-1]["type"] == "error"
+    assert frames[-1]["error"] == "boom"
+    assert repo.get_history("sse-error") == []
+
+
+def test_chat_stream_verbose_ndjson(monkeypatch):
+    """?format=verbose 保留旧格式；Accept: application/x-ndjson 时按行输出"""
+    monkeypatch.setattr(chat_module._manager, "current_provider", _FakeStreamProvider())
+
+    resp = client.post(
+        "/api/chat/stream?format=verbose",
+        json={"messages": [{"role": "user", "content": "hi"}], "model": "fake-model"},
+        headers={"Accept": "application/x-ndjson"},
+    )
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    frames = [json.loads(line) for line in resp.text.splitlines()]
+    assert [f["full_content"] for f in frames if f["type"] == "stream_chunk"] == ["Hel", "Hello"]
+    assert frames[-1]["type"] == "stream_complete" and frames[-1]["content"] == "Hello"
+
+
+def test_chat_stream_rejects_unknown_format():
+    resp = client.post("/api/chat/stream?format=xml", json={"messages": [], "model": "m"})
+    assert resp.status_code == 400
+
+
+def _collect_frames(deltas, **kwargs):
+    from backend.app.core.stream_format import delta_frames
+
+    async def _events():
+        for text, pause in deltas:
+            await asyncio.sleep(pause)
+            yield {"type": "delta", "content": text}
+        yield {"type": "done", "content": "".join(t for t, _ in deltas)}
+
+    async def _run():
+        return [f async for f in delta_frames(_events(), **kwargs)]
+
+    return asyncio.run(_run())
+
+
+def test_coalesce_by_size_keeps_first_delta_immediate():
+    """按字数合并：首个增量立即发送，其余累计到阈值再发送"""
+    frames = _collect_frames([("a", 0), ("b", 0), ("c", 0), ("d", 0), ("e", 0)], coalesce_chars=2)
+    assert [f["d"] for f in frames if "d" in f] == ["a", "bc", "de"]
+    assert frames[-1]["usage"]["deltas"] == 5
+
+
+def test_coalesce_by_time_flushes_when_upstream_stalls():
+    """按时间合并：上游停顿超过窗口时，缓冲内容不应等到下一个增量才发送"""
+    frames = _collect_frames([("a", 0), ("b", 0), ("c", 0), ("d", 0.2)], coalesce_ms=20, coalesce_chars=100)
+    assert [f["d"] for f in frames if "d" in f] == ["a", "bc", "d"]
+
+
+def test_silicon_stream_requests_usage(monkeypatch):
+    """Silicon 流式请求带 stream_options.include_usage，结束帧携带最后一个 chunk 的用量"""
+    from types import SimpleNamespace
+
+    from backend.app.providers.impl.silicon_provider import SiliconProvider
+
+    sent = {}
+
+    async def chunks():
+        delta = SimpleNamespace(content="hi")
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None)
+        usage = SimpleNamespace(prompt_tokens=3, completion_tokens=1, total_tokens=4)
+        yield SimpleNamespace(choices=[], usage=usage)
+
+    async def create(**kwargs):
+        sent.update(kwargs)
+        return chunks()
+
+    monkeypatch.setenv("SILICON_API_KEY", "test-key")
+    provider = SiliconProvider()
+    provider.async_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+    async def collect():
+        return [json.loads(e) async for e in provider.chat_completion_stream([{"role": "user", "content": "x"}], "m")]
+
+    events = asyncio.run(collect())
+    assert sent["stream"] is True and sent["stream_options"] == {"include_usage": True}
+    assert events[-1]["type"] == "stream_complete"
+    assert events[-1]["usage"] == {"prompt_tokens": 3, "completion_tokens": 1, "total_tokens": 4}
@@ -0,0 +1,199 @@
+import asyncio
+import importlib
+import json
+
+importlib.import_module("backend.app.main")
+
+from backend.app import manager as manager_module  # noqa: E402
+from backend.app.manager import LLMManager  # noqa: E402
+from backend.app.providers.hedging import HedgePolicy, _StreamRunner  # noqa: E402
+from backend.app.providers.routing import STRATEGY_ORDERED, Backend, BackendStats, ModelRouter  # noqa: E402
+
+
+def _policy(**kwargs):
+    kwargs.setdefault("budget_ratio", 1.0)
+    return HedgePolicy(**kwargs)
+
+
+def test_delay_follows_ttft_percentile_within_bounds():
+    policy = _policy(percentile=90, min_delay=0.05, max_delay=1.0, initial_delay=0.5, min_samples=10)
+    stats = BackendStats()
+    assert policy.delay_for(stats) == 0.5  # 样本不足
+
+    for i in range(1, 11):
+        stats.record_success(i / 10)
+    assert policy.delay_for(stats) == 0.9
+    stats.record_success(30.0)
+    assert policy.delay_for(stats) == 1.0  # 限制在 max_delay 以内
+
+
+def test_stream_and_chat_delays_use_separate_samples():
+    policy = _policy(percentile=50, min_delay=0.01, max_delay=10.0, initial_delay=0.5, min_samples=3)
+    stats = BackendStats()
+    for _ in range(5):
+        stats.record_success(4.0)  # 非流式总耗时
+    assert policy.delay_for(stats) == 4.0
+    assert policy.delay_for(stats, stream=True) == 0.5  # 流式样本仍不足
+
+    for _ in range(5):
+        stats.record_success(3.0, ttft=0.2, stream=True)
+    assert policy.delay_for(stats, stream=True) == 0.2
+    assert policy.delay_for(stats) == 4.0
+
+
+def test_slow_primary_is_hedged_and_cancelled():
+    policy = _policy()
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return "slow"
+
+    async def fast():
+        await asyncio.sleep(0.01)
+        return "fast"
+
+    assert asyncio.run(policy.call(slow, fast, 0.02)) == "fast"
+    assert cancelled == [True]
+    assert policy.stats() == {"requests": 1, "hedged": 1, "hedge_wins": 1, "budget_denied": 0}
+
+
+def test_budget_caps_extra_load():
+    policy = _policy(budget_ratio=0.0)
+    calls = []
+
+    async def primary():
+        await asyncio.sleep(0.05)
+        return "primary"
+
+    async def secondary():
+        calls.append(1)
+        return "secondary"
+
+    assert asyncio.run(policy.call(primary, secondary, 0.01)) == "primary"
+    assert calls == []
+    assert policy.stats()["budget_denied"] == 1
+
+
+def test_fast_failure_fails_over_without_spending_budget():
+    policy = _policy(budget_ratio=0.0)
+
+    async def broken():
+        raise RuntimeError("down")
+
+    async def secondary():
+        return "secondary"
+
+    assert asyncio.run(policy.call(broken, secondary, 1.0)) == "secondary"
+    assert policy.stats()["hedged"] == 0
+
+
+async def _deltas(text, first_delay, meta):
+    await asyncio.sleep(first_delay)
+    for ch in text:
+        yield ch
+    meta["usage"] = {"from": text}
+
+
+def test_stream_winner_is_first_to_produce_a_delta():
+    policy = _policy()
+    meta = {}
+
+    async def run():
+        stream = policy.stream(
+            lambda m: _deltas("slow", 1.0, m), lambda m: _deltas("fast", 0.01, m), 0.02, meta
+        )
+        return "".join([d async for d in stream])
+
+    assert asyncio.run(run()) == "fast"
+    assert meta == {"usage": {"from": "fast"}}
+    assert policy.stats()["hedge_wins"] == 1
+
+
+def test_stream_runner_queue_is_bounded():
+    """消费方停止读取时，后台任务在队列满后暂停，不会缓冲整段回复"""
+    produced = []
+
+    async def endless(meta):
+        while True:
+            produced.append(1)
+            yield "x"
+
+    async def run():
+        runner = _StreamRunner(endless)
+        await asyncio.sleep(0.05)
+        size = runner.queue.qsize()
+        runner.task.cancel()
+        await asyncio.gather(runner.task, return_exceptions=True)
+        return size
+
+    assert asyncio.run(run()) == _StreamRunner.QUEUE_SIZE
+    assert len(produced) <= _StreamRunner.QUEUE_SIZE + 1
+
+
+def test_stream_losers_are_cancelled_and_awaited():
+    """流结束时落败方的任务已被取消并等待结束，不留下悬空任务"""
+    policy = _policy()
+    closed = []
+
+    async def loser(meta):
+        try:
+            await asyncio.sleep(1.0)
+            yield "slow"
+        finally:
+            await asyncio.sleep(0)  # 模拟关闭上游连接
+            closed.append(True)
+
+    async def run():
+        stream = policy.stream(loser, lambda m: _deltas("fast", 0.01, m), 0.02)
+        text = "".join([d async for d in stream])
+        pending = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        return text, pending
+
+    text, pending = asyncio.run(run())
+    assert text == "fast"
+    assert pending == [] and closed == [True]
+
+
+class _Provider:
+    default_model = "fake-model"
+
+    def __init__(self, name, reply, first_delay):
+        self.name = name
+        self.reply = reply
+        self.first_delay = first_delay
+        self.calls = 0
+
+    async def achat_completion(self, messages, model, temperature=0.7):
+        self.calls += 1
+        await asyncio.sleep(self.first_delay)
+        return self.reply
+
+    async def chat_completion_stream(self, messages, model, temperature=0.7):
+        self.calls += 1
+        await asyncio.sleep(self.first_delay)
+        for ch in self.reply:
+            yield json.dumps({"type": "stream_chunk", "content": ch})
+
+
+def test_manager_hedges_routed_model(monkeypatch):
+    providers = {"a": _Provider("a", "slow", 1.0), "b": _Provider("b", "fast", 0.0)}
+    router = ModelRouter({"logical": [Backend("a", "m"), Backend("b", "m")]}, STRATEGY_ORDERED)
+    monkeypatch.setattr(manager_module.provider_factory, "get", lambda name: providers[name])
+    manager = LLMManager(model_router=router, hedging=_policy(initial_delay=0.05))
+    manager.current_provider = providers["a"]
+    manager.single_flight = None
+
+    async def run():
+        result = await manager.achat([{"role": "user", "content": "hi"}], "logical")
+        events = [e async for e in manager.chat_stream([{"role": "user", "content": "s"}], "logical")]
+        return result, events
+
+    result, events = asyncio.run(run())
+    assert result["response"] == "fast"
+    assert events[-1]["type"] == "done" and events[-1]["content"] == "fast"
+    assert manager.hedging.stats()["hedge_wins"] == 2
@@ -0,0 +1,152 @@
+import asyncio
+import importlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+server_module = importlib.import_module("backend.app.main")
+
+from backend.app.core.http_transport import DNSCache, SharedTransport  # noqa: E402
+
+client = TestClient(server_module.app)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # 保持连接，验证 keep-alive 复用
+
+    def do_GET(self):
+        if self.path == "/slow":
+            time.sleep(0.2)
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def upstream():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_sync_clients_share_one_keep_alive_pool(upstream):
+    transport = SharedTransport(http2=False)
+    first = transport.client(base_url=upstream)
+    second = transport.client(base_url=upstream, headers={"X-Test": "1"})
+
+    for http in (first, second, first):
+        assert http.get("/").json() == {"ok": True}
+    first.close()  # 关闭单个客户端不影响共享连接池
+    assert second.get("/").status_code == 200
+
+    stats = transport.stats()
+    assert stats["requests_total"] == 4 and stats["in_flight"] == 0
+    assert stats["pools"]["sync"] == {"connections": 1, "idle": 1, "active": 0}
+    transport.close()
+
+
+def test_async_client_works_across_event_loops(upstream):
+    transport = SharedTransport(http2=False)
+    http = transport.async_client(base_url=upstream)
+
+    async def fetch():
+        return (await http.get("/")).json()
+
+    assert asyncio.run(fetch()) == {"ok": True}
+    assert asyncio.run(fetch()) == {"ok": True}
+    assert transport.stats()["requests_total"] == 2
+
+
+def test_per_host_limit_queues_requests(upstream):
+    transport = SharedTransport(http2=False, max_connections_per_host=2)
+    http = transport.async_client(base_url=upstream)
+
+    async def fetch():
+        return (await http.get("/slow")).status_code
+
+    async def run():
+        return await asyncio.gather(*(fetch() for _ in range(4)))
+
+    assert asyncio.run(run()) == [200] * 4
+    stats = transport.stats()
+    assert stats["max_in_flight"] == 2
+    assert stats["host_limit_waits"] >= 2
+    assert stats["in_flight"] == 0
+
+
+def test_streamed_response_counts_as_in_flight_until_closed(upstream):
+    transport = SharedTransport(http2=False)
+    http = transport.client(base_url=upstream)
+
+    with http.stream("GET", "/") as response:
+        assert transport.stats()["in_flight_by_host"] == {"127.0.0.1": 1}
+        response.read()
+    assert transport.stats()["in_flight"] == 0
+
+
+def test_dns_cache_respects_ttl(monkeypatch):
+    now = [0.0]
+    calls = []
+
+    def fake_getaddrinfo(host, port, type=0):
+        calls.append(host)
+        return [(2, 1, 6, "", ("10.0.0.1", port)), (2, 1, 6, "", ("10.0.0.1", port)), (2, 1, 6, "", ("10.0.0.2", port))]
+
+    monkeypatch.setattr("socket.getaddrinfo", fake_getaddrinfo)
+    dns = DNSCache(ttl_seconds=60, clock=lambda: now[0])
+
+    assert dns.resolve("api.example.com", 443) == ["10.0.0.1", "10.0.0.2"]
+    assert dns.resolve("api.example.com", 443) == ["10.0.0.1", "10.0.0.2"]
+    assert dns.resolve("127.0.0.1", 443) == ["127.0.0.1"]  # IP 不查询
+    now[0] = 61
+    dns.resolve("api.example.com", 443)
+    assert calls == ["api.example.com", "api.example.com"]
+    assert dns.stats()["hits"] == 1
+
+
+def test_direct_pool_resolves_through_dns_cache(upstream):
+    transport = SharedTransport(http2=False)
+    http = transport.client(base_url=upstream.replace("127.0.0.1", "localhost"))
+    assert http.get("/").status_code == 200
+    assert transport.stats()["dns"]["misses"] == 1
+    transport.close()
+
+
+def test_connect_errors_are_httpx_exceptions():
+    transport = SharedTransport(http2=False, dns_cache_ttl=0)
+    with pytest.raises(httpx.ConnectError):
+        transport.client().get("http://127.0.0.1:9/")  # discard 端口无人监听
+    assert transport.stats()["errors_total"] == 1
+
+
+def test_proxy_selection_follows_environment(monkeypatch):
+    monkeypatch.setenv("HTTP_PROXY", "http://proxy.local:3128")
+    monkeypatch.setenv("HTTPS_PROXY", "http://secure-proxy.local:3128")
+    monkeypatch.setenv("NO_PROXY", "internal.example.com,.corp")
+    transport = SharedTransport(http2=False)
+
+    assert transport.proxy_for(httpx.URL("http://api.example.com/")) == "http://proxy.local:3128"
+    assert transport.proxy_for(httpx.URL("https://api.example.com/")) == "http://secure-proxy.local:3128"
+    assert transport.proxy_for(httpx.URL("https://internal.example.com/")) is None
+    assert transport.proxy_for(httpx.URL("https://llm.corp/")) is None
+    assert transport.stats()["config"]["proxy"] == ["http", "https"]
+
+
+def test_http_stats_endpoint():
+    response = client.get("/api/http/stats")
+    assert response.status_code == 200
+    body = response.json()
+    assert {"in_flight", "pools", "utilization", "dns", "config"} <= set(body)
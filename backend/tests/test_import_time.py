@@ -0,0 +1,54 @@
+"""backend.app.main 的冷启动导入耗时预算。
+
+在子进程中运行 ``python -X importtime -c "import backend.app.main"``，解析 stderr 中的累计耗时。
+预算可通过环境变量 ``IMPORT_TIME_BUDGET_MS`` 调整（较慢的 CI 机器）。
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+IMPORT_TIME_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "1500"))
+
+# 这些依赖只应在实际使用对应 provider / 导出格式 / 功能时导入
+LAZY_MODULES = ("openai", "google.generativeai", "mcp", "numpy", "pdfkit", "jinja2", "docx")
+
+
+def _importtime(module: str) -> dict:
+    """返回 {模块名: 累计导入耗时（微秒）}。"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        cwd=ROOT,
+        timeout=120,
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue  # 表头
+        timings[fields[2].strip()] = int(fields[1])
+    return timings
+
+
+def test_heavy_dependencies_are_not_imported_at_startup():
+    timings = _importtime("backend.app.main")
+    assert "backend.app.main" in timings
+    loaded = [name for name in LAZY_MODULES if name in timings]
+    assert loaded == [], f"启动时被导入的重量级依赖: {loaded}"
+
+
+def test_main_import_time_within_budget():
+    # 取多次中的最小值，降低机器抖动的影响
+    best_ms = float("inf")
+    for _ in range(3):
+        best_ms = min(best_ms, _importtime("backend.app.main")["backend.app.main"] / 1000)
+        if best_ms <= IMPORT_TIME_BUDGET_MS:
+            break
+    assert best_ms <= IMPORT_TIME_BUDGET_MS, f"导入 backend.app.main 耗时 {best_ms:.0f}ms，超出预算 {IMPORT_TIME_BUDGET_MS:.0f}ms"
@@ -0,0 +1,60 @@
+import importlib.util
+import random
+from pathlib import Path
+
+import pytest
+
+# scripts/ 不是包，按文件路径加载压测脚本
+_PATH = Path(__file__).resolve().parents[2] / "scripts" / "loadtest.py"
+_spec = importlib.util.spec_from_file_location("loadtest", _PATH)
+loadtest = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(loadtest)
+
+
+def test_percentile_nearest_rank():
+    values = sorted(float(v) for v in range(1, 101))
+    assert loadtest.percentile(values, 50) == 50
+    assert loadtest.percentile(values, 99) == 99
+    assert loadtest.percentile(values, 100) == 100
+    assert loadtest.percentile([7.0], 99) == 7
+    assert loadtest.percentile([], 50) is None
+
+    summary = loadtest.summarize([0.3, 0.1, 0.2])
+    assert summary["p50_ms"] == 200 and summary["max_ms"] == 300 and summary["mean_ms"] == 200
+
+
+def _result(p99_ms, error_rate=0.0, rps=100.0, ttft_p99_ms=None):
+    scenario = {"latency": {"p99_ms": p99_ms}, "error_rate": error_rate, "rps": rps}
+    if ttft_p99_ms is not None:
+        scenario["ttft"] = {"p99_ms": ttft_p99_ms}
+    return {"scenarios": {"stream": scenario}}
+
+
+def test_compare_flags_regressions_beyond_threshold():
+    baseline = _result(100, ttft_p99_ms=50)
+    assert loadtest.compare(_result(115, ttft_p99_ms=55), baseline, 0.2) == []
+
+    problems = loadtest.compare(_result(130, error_rate=0.05, rps=70, ttft_p99_ms=70), baseline, 0.2)
+    assert len(problems) == 4
+    assert any("latency p99" in p for p in problems) and any("ttft p99" in p for p in problems)
+    assert any("error_rate" in p for p in problems) and any("rps" in p for p in problems)
+    # 基线中没有的场景不参与对比
+    assert loadtest.compare(_result(500), {"scenarios": {}}, 0.2) == []
+
+
+def test_poisson_arrivals_match_rate():
+    times = list(loadtest.arrival_times(200, 10.0, 60.0, random.Random(7)))
+    assert times[0] == 10.0 and all(10.0 <= t < 60.0 for t in times)
+    assert times == sorted(times)
+    # 50 秒 x 200/s，泊松计数的标准差约 100
+    assert abs(len(times) - 10_000) < 400
+    gaps = [b - a for a, b in zip(times, times[1:])]
+    assert sum(gaps) / len(gaps) == pytest.approx(1 / 200, rel=0.05)
+
+
+def test_parse_mix():
+    assert loadtest.parse_mix("chat=3,stream") == {"chat": 3.0, "stream": 1.0}
+    with pytest.raises(SystemExit):
+        loadtest.parse_mix("chat=0")
+    with pytest.raises(SystemExit):
+        loadtest.parse_mix("upload=1")
@@ -0,0 +1,58 @@
+import json
+import logging
+import queue
+
+from backend.app.core import logging_config
+from backend.app.core.logging_config import _DroppingQueueHandler, log_event, log_token, message_fields
+
+
+def test_log_event_is_single_line_compact_json(caplog):
+    with caplog.at_level(logging.INFO, logger="llm_api"):
+        log_event("chat_request", provider="silicon", model="m", note="多\n行")
+    (record,) = caplog.records
+    text = record.getMessage()
+    assert "\n" not in text and ": " not in text
+    assert json.loads(text) == {"event": "chat_request", "provider": "silicon", "model": "m", "note": "多\n行"}
+    assert record.filename == "test_logging_pipeline.py"  # 行号指向调用方
+
+
+def test_message_bodies_are_sampled_and_truncated(monkeypatch):
+    messages = [{"role": "user", "content": "hello world"}, {"role": "assistant", "content": "hi"}]
+
+    monkeypatch.setattr(logging_config, "LOG_MESSAGE_SAMPLE_RATE", 0.0)
+    assert message_fields(messages) == {"message_count": 2, "message_chars": 13}
+
+    monkeypatch.setattr(logging_config, "LOG_MESSAGE_SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(logging_config, "LOG_MESSAGE_MAX_CHARS", 5)
+    assert message_fields(messages)["messages"] == [
+        {"role": "user", "content": "hello…(+6)"},
+        {"role": "assistant", "content": "hi"},
+    ]
+
+
+def test_token_logging_is_off_by_default(caplog):
+    with caplog.at_level(logging.DEBUG, logger="llm_api"):
+        log_token("silicon", "tok")
+    assert caplog.records == []
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = _DroppingQueueHandler(queue.Queue(maxsize=1))
+    for i in range(3):
+        handler.handle(logging.LogRecord("llm_api", logging.INFO, __file__, 1, "msg %s", (i,), None))
+    assert handler.dropped == 2
+    assert handler.queue.get_nowait().getMessage() == "msg 0"
+
+
+def test_ordinary_records_are_formatted_on_the_calling_thread():
+    """普通记录入队前即完成拼接，之后修改参数对象不影响日志内容；log_event 的 JSON 仍延迟序列化"""
+    handler = _DroppingQueueHandler(queue.Queue())
+    payload = ["before"]
+    handler.handle(logging.LogRecord("llm_api", logging.INFO, __file__, 1, "payload=%s", (payload,), None))
+    payload.append("after")
+    record = handler.queue.get_nowait()
+    assert record.getMessage() == "payload=['before']" and record.args is None
+
+    event = logging_config._JsonEvent({"event": "e"})
+    handler.handle(logging.LogRecord("llm_api", logging.INFO, __file__, 1, "%s", (event,), None))
+    assert handler.queue.get_nowait().args == (event,)
@@ -0,0 +1,131 @@
+import asyncio
+import importlib
+import json
+import time
+
+from fastapi.testclient import TestClient
+
+server_module = importlib.import_module("backend.app.main")
+
+from backend.app.core import metrics  # noqa: E402
+from backend.app.core.metrics import Registry  # noqa: E402
+from backend.app.manager import LLMManager  # noqa: E402
+from backend.app.repositories.in_memory import InMemorySessionRepo  # noqa: E402
+from backend.app.services.model_catalog import ModelCatalog  # noqa: E402
+
+client = TestClient(server_module.app)
+
+
+class _Provider:
+    name = "metricsfake"
+    default_model = "m1"
+
+    def get_available_models(self):
+        return {"M1": "m1"}
+
+    async def achat_completion(self, messages, model, temperature=0.7):
+        if messages[-1]["content"] == "boom":
+            raise TimeoutError("upstream timed out")
+        return "four tokens here!"
+
+    async def chat_completion_stream(self, messages, model, temperature=0.7):
+        for word in ("alpha ", "beta ", "gamma"):
+            await asyncio.sleep(0.002)
+            yield json.dumps({"type": "stream_chunk", "content": word})
+        yield json.dumps({"type": "stream_complete", "usage": {"completion_tokens": 3}})
+
+
+def _manager():
+    manager = LLMManager(session_repo=InMemorySessionRepo(), model_catalog=ModelCatalog())
+    manager.current_provider = _Provider()
+    manager.current_provider_name = "metricsfake"
+    return manager
+
+
+def _sample(text, line_prefix):
+    for line in text.splitlines():
+        if line.startswith(line_prefix):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{line_prefix} 不在输出中")
+
+
+def test_text_format_counters_and_cumulative_buckets():
+    registry = Registry()
+    requests = registry.counter("demo_requests", "请求数", ["route"])
+    latency = registry.histogram("demo_seconds", "延迟", buckets=(0.1, 1.0))
+    requests.labels("/a").inc()
+    requests.labels("/a").inc(2)
+    for value in (0.05, 0.5, 5.0):
+        latency.labels().observe(value)
+
+    text = registry.render()
+    assert "# TYPE demo_requests_total counter" in text
+    assert 'demo_requests_total{route="/a"} 3' in text
+    assert 'demo_seconds_bucket{le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{le="1"} 2' in text
+    assert 'demo_seconds_bucket{le="+Inf"} 3' in text
+    assert "demo_seconds_count 3" in text
+
+
+def test_metrics_endpoint_reports_llm_calls_streams_and_errors():
+    manager = _manager()
+
+    async def run():
+        await manager.achat_with_memory("s1", "hi", model="m1", use_cache=False)
+        try:
+            await manager.achat([{"role": "user", "content": "boom"}], model="m1", use_cache=False)
+        except Exception:
+            pass
+        async for _ in manager.chat_stream_with_memory("s2", "hi", model="m1"):
+            pass
+
+    asyncio.run(run())
+
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = resp.text
+
+    ok = 'provider="metricsfake",model="m1",mode="chat",status="ok"'
+    assert _sample(text, f"llm_request_duration_seconds_count{{{ok}}}") >= 1
+    assert _sample(text, 'llm_upstream_errors_total{provider="metricsfake",model="m1",code="TimeoutError"}') >= 1
+    assert _sample(text, 'llm_time_to_first_token_seconds_count{provider="metricsfake",model="m1"}') >= 1
+    assert _sample(text, 'llm_inter_token_latency_seconds_count{provider="metricsfake",model="m1"}') >= 2
+    assert _sample(text, 'llm_output_tokens_total{provider="metricsfake",model="m1"}') >= 3
+    assert "session_repo_operation_duration_seconds_count" in text
+    # collector 产出的 gauge
+    assert "# TYPE llm_cache_hit_ratio gauge" in text
+    assert "log_dropped_records_total" in text
+
+
+def test_recording_overhead_is_small():
+    histogram = Registry().histogram("overhead_seconds", "开销", ["provider", "model"])
+    n = 20000
+    start = time.perf_counter()
+    for _ in range(n):
+        histogram.labels("p", "m").observe(0.01)
+    per_call = (time.perf_counter() - start) / n
+    # 宽松上限，只防止热路径上引入明显的退化（如每次记录都格式化字符串）
+    assert per_call < 50e-6
+    assert metrics.provider_label(_Provider()) == "metricsfake"
+
+
+def test_unknown_models_are_bucketed_as_other():
+    """客户端传入的任意模型名不会产生新的时间序列"""
+    manager = _manager()
+
+    async def run():
+        await manager.aget_available_models()  # 模型目录登记 m1
+        for i in range(5):
+            await manager.achat([{"role": "user", "content": "hi"}], model=f"random-{i}", use_cache=False)
+
+    asyncio.run(run())
+    text = client.get("/metrics").text
+    assert 'model="random-' not in text
+    assert _sample(text, 'llm_request_duration_seconds_count{provider="metricsfake",model="other",mode="chat",status="ok"}') >= 5
+
+    provider = _Provider()
+    assert metrics.model_label(provider, "m1") == "m1"
+    metrics.register_models("metricsfake", ["listed-model"])
+    assert metrics.model_label(provider, "listed-model") == "listed-model"
+    assert metrics.model_label(provider, "unlisted") == metrics.OTHER_MODEL
@@ -0,0 +1,83 @@
+import asyncio
+import random
+import time
+
+import pytest
+
+from backend.app.core.resilience import Resilience, RetryPolicy, UpstreamError
+from backend.app.manager import LLMManager
+from backend.app.providers.impl import mock_provider
+from backend.app.providers.impl.mock_provider import Distribution, MockProvider
+from backend.app.repositories.in_memory import InMemorySessionRepo
+from mcp_service.client.mcp_client import MCPClient
+
+
+@pytest.fixture
+def fast_retries(monkeypatch):
+    """隔离的容错实例：不污染全局熔断器，重试退避缩短到毫秒级。"""
+    resilience = Resilience(RetryPolicy(max_attempts=3, base_delay=0.001, max_delay=0.001), failure_threshold=100)
+    monkeypatch.setattr(mock_provider, "call_async", resilience.call_async)
+    monkeypatch.setattr(mock_provider, "call_sync", resilience.call_sync)
+    return resilience
+
+
+def test_distribution_specs():
+    rng = random.Random(1)
+    assert Distribution.parse("25").sample(rng) == 25
+    assert 10 <= Distribution.parse("uniform:10,20").sample(rng) <= 20
+    samples = [Distribution.parse("lognormal:100,0.5").sample(rng) for _ in range(2000)]
+    assert 80 < sorted(samples)[1000] < 125  # 中位数
+    assert all(Distribution.parse("normal:0,5").sample(rng) >= 0 for _ in range(100))
+    with pytest.raises(ValueError):
+        Distribution.parse("uniform:1")
+    with pytest.raises(ValueError):
+        Distribution.parse("pareto:1")
+
+
+def test_registered_in_factory(monkeypatch):
+    monkeypatch.setenv("MOCK_TTFT_MS", "const:5")
+    provider = MCPClient("http://unused").create_provider("mock")
+    assert isinstance(provider, MockProvider)
+    assert provider.ttft_ms.kind == "const" and provider.ttft_ms.params == (5.0,)
+
+
+def test_stream_follows_latency_profile_through_manager(fast_retries):
+    manager = LLMManager(session_repo=InMemorySessionRepo())
+    manager.current_provider = MockProvider(ttft_ms=40, inter_token_ms=5, output_tokens=8, seed=3)
+
+    async def run():
+        start = time.perf_counter()
+        arrivals, events = [], []
+        async for event in manager.chat_stream_with_memory("mock-s", "hi", model="mock-model"):
+            arrivals.append(time.perf_counter() - start)
+            events.append(event)
+        return arrivals, events
+
+    arrivals, events = asyncio.run(run())
+    deltas = [e for e in events if e["type"] == "delta"]
+    assert len(deltas) == 8
+    assert arrivals[0] >= 0.04
+    assert arrivals[-1] - arrivals[0] >= 7 * 0.005 * 0.8
+    assert events[-1]["type"] == "done"
+    assert events[-1]["usage"]["completion_tokens"] == 8
+    assert len(manager.session_repo.get_history("mock-s")) == 2
+
+
+def test_rate_limit_injection_is_retried_then_surfaces_429(fast_retries):
+    provider = MockProvider(ttft_ms=0, inter_token_ms=0, output_tokens=3, rate_limit_rate=1.0, seed=1)
+    with pytest.raises(UpstreamError) as info:
+        asyncio.run(provider.achat_completion([{"role": "user", "content": "hi"}], "mock-model"))
+    assert info.value.status_code == 429
+    assert fast_retries.breaker("mock")._failures == 3
+
+
+def test_error_and_timeout_rates(fast_retries):
+    provider = MockProvider(ttft_ms=0, inter_token_ms=0, output_tokens=1, error_rate=0.3, timeout_rate=0.2, seed=7)
+    faults = [provider._plan()[0] for _ in range(5000)]
+    assert abs(faults.count("error") / 5000 - 0.3) < 0.03
+    assert abs(faults.count("timeout") / 5000 - 0.2) < 0.03
+
+    hanging = MockProvider(ttft_ms=0, output_tokens=1, timeout_rate=1.0, timeout_seconds=0.01, seed=1)
+    with pytest.raises(UpstreamError) as info:
+        hanging.chat_completion([{"role": "user", "content": "hi"}], "mock-model", stream=False)
+    assert info.value.retryable
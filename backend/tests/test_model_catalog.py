@@ -0,0 +1,181 @@
+import asyncio
+import importlib
+import json
+
+from fastapi.testclient import TestClient
+
+server_module = importlib.import_module("backend.app.main")
+
+from backend.app.api.v1.routers import chat as chat_module  # noqa: E402
+from backend.app.services.model_catalog import ModelCatalog  # noqa: E402
+
+client = TestClient(server_module.app)
+
+
+class _Fetcher:
+    def __init__(self, models):
+        self.models = models
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return dict(self.models)
+
+
+def test_fresh_entries_are_served_from_cache():
+    now = [1000.0]
+    catalog = ModelCatalog(ttl_seconds=60, clock=lambda: now[0])
+    fetch = _Fetcher({"A": "a"})
+
+    async def run():
+        first = await catalog.get("p", fetch)
+        now[0] += 30
+        second = await catalog.get("p", fetch)
+        return first, second
+
+    assert asyncio.run(run()) == ({"A": "a"}, {"A": "a"})
+    assert fetch.calls == 1
+
+
+def test_stale_entry_is_served_while_refreshing_in_background():
+    now = [1000.0]
+    catalog = ModelCatalog(ttl_seconds=60, stale_seconds=600, clock=lambda: now[0])
+    fetch = _Fetcher({"A": "a"})
+
+    async def run():
+        await catalog.get("p", fetch)
+        fetch.models = {"B": "b"}
+        now[0] += 120
+        stale = await catalog.get("p", fetch)
+        await asyncio.sleep(0.05)  # 等待后台刷新完成
+        fresh = await catalog.get("p", fetch)
+        return stale, fresh
+
+    stale, fresh = asyncio.run(run())
+    assert stale == {"A": "a"} and fresh == {"B": "b"}
+    assert catalog.stats()["stale_hits"] == 1
+
+
+def test_concurrent_misses_coalesce_into_one_fetch():
+    catalog = ModelCatalog()
+    fetch = _Fetcher({"A": "a"})
+
+    async def run():
+        return await asyncio.gather(*(catalog.get("p", fetch) for _ in range(5)))
+
+    assert asyncio.run(run()) == [{"A": "a"}] * 5
+    assert fetch.calls == 1
+
+
+def test_refresh_failure_keeps_previous_list():
+    now = [1000.0]
+    catalog = ModelCatalog(ttl_seconds=60, stale_seconds=0, clock=lambda: now[0])
+
+    def broken():
+        raise RuntimeError("upstream down")
+
+    async def run():
+        await catalog.get("p", _Fetcher({"A": "a"}))
+        now[0] += 120
+        return await catalog.get("p", broken)
+
+    assert asyncio.run(run()) == {"A": "a"}
+    assert catalog.stats()["refresh_errors"] == 1
+
+
+def test_cold_start_failure_uses_fallback_without_caching(tmp_path):
+    path = tmp_path / "catalog.json"
+    catalog = ModelCatalog(snapshot_path=path)
+
+    def broken():
+        raise RuntimeError("upstream down")
+
+    async def run():
+        cold = await catalog.get("p", broken, fallback=lambda: {"Default": "default"})
+        recovered = await catalog.get("p", _Fetcher({"A": "a"}), fallback=lambda: {"Default": "default"})
+        return cold, recovered
+
+    assert asyncio.run(run()) == ({"Default": "default"}, {"A": "a"})
+    assert json.loads(path.read_text(encoding="utf-8"))["p"]["models"] == {"A": "a"}
+
+
+def test_failed_provider_refresh_keeps_cached_list_and_snapshot(tmp_path, monkeypatch):
+    """provider 上游失败时，目录不能被 provider 的默认列表覆盖"""
+    from types import SimpleNamespace
+
+    from backend.app.manager import LLMManager
+    from backend.app.providers.impl.silicon_provider import SiliconProvider
+
+    monkeypatch.setenv("SILICON_API_KEY", "test-key")
+    provider = SiliconProvider()
+    responses = [SimpleNamespace(status_code=200, json=lambda: {"data": [{"id": "live-model"}]})]
+    provider.http = SimpleNamespace(get=lambda path: responses[0])
+
+    now = [1000.0]
+    path = tmp_path / "catalog.json"
+    manager = LLMManager()
+    manager.current_provider = provider
+    manager.model_catalog = ModelCatalog(ttl_seconds=60, stale_seconds=0, snapshot_path=path, clock=lambda: now[0])
+    manager.model_router = None
+
+    first = asyncio.run(manager.aget_available_models())
+    responses[0] = SimpleNamespace(status_code=500, text="boom", json=lambda: {})
+    now[0] += 120
+    second = asyncio.run(manager.aget_available_models())
+
+    assert list(first.values()) == ["live-model"] and second == first
+    assert list(json.loads(path.read_text(encoding="utf-8"))["silicon"]["models"].values()) == ["live-model"]
+    assert provider.get_available_models() == provider._get_default_models()
+
+
+def test_listeners_are_notified_only_when_the_list_changes():
+    now = [1000.0]
+    catalog = ModelCatalog(ttl_seconds=60, stale_seconds=0, clock=lambda: now[0])
+    changes = []
+    catalog.add_listener(lambda name, models: changes.append((name, models)))
+    fetch = _Fetcher({"A": "a"})
+
+    async def run():
+        await catalog.get("p", fetch)
+        now[0] += 120
+        await catalog.get("p", fetch)  # 内容未变
+        fetch.models = {"B": "b"}
+        now[0] += 120
+        await catalog.get("p", fetch)
+
+    asyncio.run(run())
+    assert changes == [("p", {"B": "b"})]
+
+
+def test_snapshot_survives_restart(tmp_path):
+    path = tmp_path / "catalog.json"
+    asyncio.run(ModelCatalog(snapshot_path=path).get("p", _Fetcher({"A": "a"})))
+    assert json.loads(path.read_text(encoding="utf-8"))["p"]["models"] == {"A": "a"}
+
+    fetch = _Fetcher({"B": "b"})
+    restarted = ModelCatalog(snapshot_path=path)
+    assert asyncio.run(restarted.get("p", fetch)) == {"A": "a"}
+    assert fetch.calls == 0
+
+
+def test_models_endpoint_supports_etag(monkeypatch):
+    async def fake_models(provider_name=None, session_id=None):
+        return {"Fake": "fake-model"}
+
+    monkeypatch.setattr(chat_module._manager, "aget_available_models", fake_models)
+
+    first = client.get("/api/models")
+    assert first.status_code == 200 and first.json() == {"models": {"Fake": "fake-model"}}
+    etag = first.headers["etag"]
+
+    cached = client.get("/api/models", headers={"If-None-Match": etag})
+    assert cached.status_code == 304 and cached.headers["etag"] == etag
+
+    changed = client.get("/api/models", headers={"If-None-Match": '"stale"'})
+    assert changed.status_code == 200
+
+    wildcard = client.get("/api/models", headers={"If-None-Match": "*"})
+    assert wildcard.status_code == 304
+
+    weak = client.get("/api/models", headers={"If-None-Match": f'"stale", W/{etag}'})
+    assert weak.status_code == 304
@@ -0,0 +1,83 @@
+import asyncio
+import importlib
+
+from fastapi.testclient import TestClient
+
+server_module = importlib.import_module("backend.app.main")
+
+from backend.app import manager as manager_module  # noqa: E402
+from backend.app.api.v1.routers import chat as chat_module  # noqa: E402
+from backend.app.manager import LLMManager  # noqa: E402
+from backend.app.services.model_catalog import ModelCatalog  # noqa: E402
+
+client = TestClient(server_module.app)
+
+
+class _Provider:
+    name = "fake"
+    default_model = "fake-model"
+
+    def __init__(self, valid=True):
+        self.valid = valid
+        self.validated = 0
+
+    def validate(self):
+        self.validated += 1
+        if not self.valid:
+            raise ValueError("API密钥无效")
+
+    def get_available_models(self):
+        return {"Fake": "fake-model"}
+
+
+def _manager(monkeypatch, provider):
+    built = []
+
+    def get(name):
+        built.append(name)
+        return provider
+
+    monkeypatch.setattr(manager_module.provider_factory, "get", get)
+    manager = LLMManager(model_catalog=ModelCatalog())
+    manager.select_provider("fake")
+    return manager, built
+
+
+def test_select_provider_defers_construction(monkeypatch):
+    provider = _Provider()
+    manager, built = _manager(monkeypatch, provider)
+    assert built == []
+    assert manager.health()["status"] == "starting"
+
+    assert manager.current_provider is provider
+    assert manager.current_provider is provider
+    assert built == ["fake"]
+    assert provider.validated == 0  # 构造不做网络校验
+
+
+def test_warm_up_validates_and_reports_ready(monkeypatch):
+    provider = _Provider()
+    manager, _ = _manager(monkeypatch, provider)
+
+    assert asyncio.run(manager.warm_up()) is True
+    assert provider.validated == 1
+    assert manager.health()["status"] == "ready"
+    assert manager.model_catalog.stats()["providers"] == ["fake"]  # 模型列表已预取
+
+    monkeypatch.setattr(chat_module, "_manager", manager)
+    response = client.get("/api/health")
+    assert response.status_code == 200
+    assert response.json()["providers"]["fake"]["state"] == "ready"
+
+
+def test_failed_validation_reports_degraded(monkeypatch):
+    manager, _ = _manager(monkeypatch, _Provider(valid=False))
+
+    assert asyncio.run(manager.warm_up()) is False
+    report = manager.health()
+    assert report["status"] == "degraded"
+    assert report["providers"]["fake"]["error"] == "API密钥无效"
+
+    monkeypatch.setattr(chat_module, "_manager", manager)
+    assert client.get("/api/health").status_code == 503
+    assert client.get("/api/health/live").status_code == 200
@@ -0,0 +1,165 @@
+import asyncio
+import importlib
+import json
+
+from fastapi.testclient import TestClient
+
+server_module = importlib.import_module("backend.app.main")
+
+from backend.app import manager as manager_module  # noqa: E402
+from backend.app.api.v1.routers import chat as chat_module  # noqa: E402
+from backend.app.manager import LLMManager  # noqa: E402
+from backend.app.repositories.in_memory import InMemorySessionRepo  # noqa: E402
+from backend.app.services.model_catalog import ModelCatalog  # noqa: E402
+
+client = TestClient(server_module.app)
+
+
+class _Provider:
+    default_model = "fake-model"
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+
+    def get_available_models(self):
+        return {self.name.title(): f"{self.name}-model"}
+
+    async def achat_completion(self, messages, model, temperature=0.7):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        return f"{self.name}:{messages[-1]['content']}"
+
+    async def chat_completion_stream(self, messages, model, temperature=0.7):
+        yield json.dumps({"type": "stream_chunk", "content": f"{self.name}:{messages[-1]['content']}"})
+        yield json.dumps({"type": "stream_complete"})
+
+
+def _install(monkeypatch, *names):
+    providers = {name: _Provider(name) for name in names}
+
+    def get(name):
+        if name not in providers:
+            raise ValueError(f"不支持的提供商: {name}")
+        return providers[name]
+
+    monkeypatch.setattr(manager_module.provider_factory, "get", get)
+    monkeypatch.setattr(manager_module.provider_factory, "cached", lambda name: None)
+    return providers
+
+
+def _manager(monkeypatch, *names):
+    providers = _install(monkeypatch, *names)
+    manager = LLMManager(session_repo=InMemorySessionRepo(), model_catalog=ModelCatalog())
+    manager.select_provider(names[0])
+    return manager, providers
+
+
+def test_mixed_providers_are_served_concurrently(monkeypatch):
+    """同一 manager 上不同 provider 的请求并发执行，互不切换进程默认"""
+    manager, providers = _manager(monkeypatch, "alpha", "beta")
+
+    async def run():
+        return await asyncio.gather(
+            *(
+                manager.achat([{"role": "user", "content": str(i)}], model="m", provider_name=name)
+                for i, name in enumerate(["alpha", "beta"] * 3)
+            )
+        )
+
+    results = asyncio.run(run())
+    assert [r["response"].split(":")[0] for r in results] == ["alpha", "beta"] * 3
+    assert providers["alpha"].calls == 3 and providers["beta"].calls == 3
+    assert manager.current_provider_name == "alpha"
+
+
+def test_session_default_provider_via_switch(monkeypatch):
+    """带 session_id 的切换只影响该会话，请求显式指定的 provider 优先"""
+    manager, _ = _manager(monkeypatch, "alpha", "beta")
+    monkeypatch.setattr(chat_module, "_manager", manager)
+
+    resp = client.post("/api/provider/switch", json={"provider_name": "beta", "session_id": "s-beta"})
+    assert resp.status_code == 200
+    assert resp.json()["models"] == {"Beta": "beta-model"}
+    assert manager.current_provider_name == "alpha"
+
+    def chat(session_id, **extra):
+        body = {"session_id": session_id, "user_message": "hi", "model": "m", **extra}
+        return client.post("/api/chat", json=body).json()["response"]
+
+    assert chat("s-beta") == "beta:hi"
+    assert chat("s-other") == "alpha:hi"
+    assert chat("s-beta", provider="alpha") == "alpha:hi"
+
+    stream = client.post(
+        "/api/chat/stream",
+        json={"session_id": "s-beta", "user_message": "yo", "model": "m"},
+        headers={"Accept": "application/x-ndjson"},
+    )
+    assert "beta:yo" in stream.text
+
+
+def test_unknown_provider_is_rejected(monkeypatch):
+    manager, _ = _manager(monkeypatch, "alpha")
+    monkeypatch.setattr(chat_module, "_manager", manager)
+
+    resp = client.post("/api/provider/switch", json={"provider_name": "nope", "session_id": "s"})
+    assert resp.status_code == 400
+    assert manager.session_repo.get_provider("s") is None
+
+    resp = client.post("/api/chat", json={"messages": [{"role": "user", "content": "hi"}], "model": "m", "provider": "nope"})
+    assert resp.status_code == 500
+    assert "nope" in resp.json()["detail"]
+
+
+def test_factory_builds_each_provider_once_under_concurrency(monkeypatch):
+    """并发的首次获取只构造一次 provider"""
+    import threading
+    import time
+
+    from backend.app.providers.factory import ProviderFactory
+
+    factory = ProviderFactory()
+    built = []
+
+    def slow_create(name):
+        built.append(name)
+        time.sleep(0.05)  # 模拟导入 SDK、创建客户端
+        return _Provider(name)
+
+    monkeypatch.setattr(factory._mcp_client, "create_provider", slow_create)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(factory.get("alpha"))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert built == ["alpha"]
+    assert len({id(p) for p in results}) == 1
+
+
+def test_routed_backend_is_constructed_off_the_event_loop(monkeypatch):
+    """路由后端首次构造在线程池中进行，不阻塞事件循环"""
+    import threading
+
+    from backend.app.providers.routing import STRATEGY_ORDERED, Backend, ModelRouter
+
+    loop_thread = []
+    provider = _Provider("alpha")
+
+    def get(name):
+        assert threading.get_ident() != loop_thread[0]
+        return provider
+
+    monkeypatch.setattr(manager_module.provider_factory, "get", get)
+    monkeypatch.setattr(manager_module.provider_factory, "cached", lambda name: None)
+    router = ModelRouter({"logical": [Backend("alpha", "alpha-model")]}, STRATEGY_ORDERED)
+    manager = LLMManager(session_repo=InMemorySessionRepo(), model_router=router, model_catalog=ModelCatalog())
+    manager.current_provider = _Provider("current")
+    manager.single_flight = None
+
+    async def run():
+        loop_thread.append(threading.get_ident())
+        return await manager.achat([{"role": "user", "content": "hi"}], model="logical", use_cache=False)
+
+    assert asyncio.run(run())["response"] == "alpha:hi"
@@ -0,0 +1,111 @@
+import asyncio
+import time
+
+import pytest
+
+from backend.app.providers.rate_limit import ProviderRateLimiter, RateLimitExceeded, TokenBucket, estimate_tokens
+
+
+class _Provider:
+    name = "fake"
+    default_model = "m"
+
+
+_MESSAGES = [{"role": "user", "content": "hello"}]
+
+
+def test_limits_resolve_model_over_provider_over_default():
+    limiter = ProviderRateLimiter({
+        "default": {"max_in_flight": 32},
+        "providers": {"fake": {"requests_per_minute": 60, "models": {"big": {"requests_per_minute": 6}}}},
+    })
+    assert limiter.limits_for("fake", "small") == {"max_in_flight": 32, "requests_per_minute": 60}
+    assert limiter.limits_for("fake", "big") == {"max_in_flight": 32, "requests_per_minute": 6}
+    assert limiter.limits_for("other", "m") == {"max_in_flight": 32}
+
+
+def test_unknown_models_share_one_governor():
+    """任意模型名不会无限创建限流器：未登记的模型共用 other，配置了限额的模型单独限流"""
+    limiter = ProviderRateLimiter({"providers": {"fake": {"requests_per_minute": 600, "models": {"big": {}}}}})
+
+    async def run():
+        for model in ["m", "big", *(f"made-up-{i}" for i in range(50))]:
+            async with limiter.limit(_Provider(), model, _MESSAGES):
+                pass
+
+    asyncio.run(run())
+    assert sorted(limiter.stats()) == ["fake/big", "fake/m", "fake/other"]
+    assert limiter.stats()["fake/other"]["admitted"] == 50
+
+
+def test_token_bucket_reservations_queue_in_order():
+    now = [0.0]
+    bucket = TokenBucket(60, clock=lambda: now[0])  # 1 个/秒，容量 60
+
+    async def run():
+        for _ in range(60):
+            assert await bucket.reserve(1, 0) == 0
+        first = await bucket.reserve(1, 10)
+        second = await bucket.reserve(1, 10)
+        rejected = await bucket.reserve(100, 10)
+        return first, second, rejected
+
+    first, second, rejected = asyncio.run(run())
+    assert first == pytest.approx(1.0) and second == pytest.approx(2.0)
+    assert rejected is None  # 等待超过截止时间，不预约
+
+
+def test_requests_over_limit_queue_instead_of_failing():
+    limiter = ProviderRateLimiter({"queue_timeout_seconds": 5, "providers": {"fake": {"requests_per_minute": 600}}})
+
+    async def call():
+        async with limiter.limit(_Provider(), "m", _MESSAGES):
+            return time.monotonic()
+
+    async def run():
+        limiter.governor("fake", "m").requests._tokens = 0  # 桶已耗尽，约 0.1 秒补充 1 个
+        start = time.monotonic()
+        finished = await asyncio.gather(call(), call())
+        return [t - start for t in finished]
+
+    elapsed = asyncio.run(run())
+    assert elapsed[0] == pytest.approx(0.1, abs=0.05)
+    assert elapsed[1] == pytest.approx(0.2, abs=0.05)
+    assert limiter.stats()["fake/m"]["queued"] == 2
+
+
+def test_queue_deadline_raises():
+    limiter = ProviderRateLimiter({"queue_timeout_seconds": 0.05, "providers": {"fake": {"max_in_flight": 1}}})
+
+    async def run():
+        async with limiter.limit(_Provider(), "m", _MESSAGES):
+            with pytest.raises(RateLimitExceeded):
+                async with limiter.limit(_Provider(), "m", _MESSAGES):
+                    pass
+
+    asyncio.run(run())
+    assert limiter.stats()["fake/m"]["rejected"] == 1
+
+
+def test_in_flight_cap_serializes_calls():
+    limiter = ProviderRateLimiter({"providers": {"fake": {"max_in_flight": 2}}})
+    active = peak = 0
+
+    async def call():
+        nonlocal active, peak
+        async with limiter.limit(_Provider(), "m", _MESSAGES):
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+    async def run():
+        await asyncio.gather(*(call() for _ in range(6)))
+
+    asyncio.run(run())
+    assert peak == 2
+
+
+def test_estimate_tokens_counts_cjk_per_char():
+    assert estimate_tokens("你好世界") == 4
+    assert estimate_tokens("abcdefgh") == 2
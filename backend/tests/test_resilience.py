@@ -0,0 +1,152 @@
+import asyncio
+
+import pytest
+
+from backend.app.core.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    Resilience,
+    RetryBudget,
+    RetryPolicy,
+    UpstreamError,
+    is_retryable,
+)
+from mcp_service.client.mcp_client import MCPClient
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _fast_resilience(**kwargs):
+    return Resilience(RetryPolicy(max_attempts=3, base_delay=0.001, max_delay=0.001), **kwargs)
+
+
+def test_error_classification():
+    assert is_retryable(UpstreamError("x", status_code=503))
+    assert is_retryable(UpstreamError("x", status_code=429))
+    assert not is_retryable(UpstreamError("x", status_code=400))
+    assert is_retryable(asyncio.TimeoutError())
+    assert not is_retryable(ValueError("bad"))
+
+
+def test_full_jitter_stays_within_cap():
+    policy = RetryPolicy(base_delay=0.5, max_delay=2.0)
+    delays = [policy.backoff(attempt) for attempt in range(1, 8) for _ in range(50)]
+    assert all(0 <= d <= 2.0 for d in delays)
+    assert max(policy.backoff(1) for _ in range(200)) <= 0.5
+
+
+def test_retries_transient_errors_then_succeeds():
+    res = _fast_resilience()
+    calls = []
+
+    async def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise UpstreamError("busy", status_code=503)
+        return "ok"
+
+    assert asyncio.run(res.call_async("p", flaky)) == "ok"
+    assert len(calls) == 3
+
+
+def test_non_retryable_error_fails_immediately():
+    res = _fast_resilience()
+    calls = []
+
+    def bad():
+        calls.append(1)
+        raise UpstreamError("bad request", status_code=400)
+
+    with pytest.raises(UpstreamError):
+        res.call_sync("p", bad)
+    assert len(calls) == 1
+    assert res.breaker("p").state == CircuitBreaker.CLOSED
+
+
+def test_retry_budget_limits_retries():
+    budget = RetryBudget(ratio=0.0, min_retries=1, clock=_Clock())
+    assert budget.try_spend()
+    assert not budget.try_spend()
+
+
+def test_breaker_opens_fails_fast_and_half_opens():
+    clock = _Clock()
+    breaker = CircuitBreaker("p", failure_threshold=2, recovery_seconds=10, clock=clock)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+
+    clock.now = 10
+    breaker.allow()  # 半开：放行一次探测
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+    breaker.record_failure()  # 探测失败重新打开
+    assert breaker.state == CircuitBreaker.OPEN
+
+    clock.now = 20
+    breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_non_retryable_error_does_not_close_half_open_breaker():
+    """半开探测遇到 401 时熔断器保持半开，探测名额归还给下一次调用"""
+    clock = _Clock()
+    res = _fast_resilience(failure_threshold=1, recovery_seconds=10)
+    breaker = res.breaker("p")
+    breaker._clock = clock
+    breaker.record_failure()
+    clock.now = 10
+
+    def unauthorized():
+        raise UpstreamError("unauthorized", status_code=401)
+
+    with pytest.raises(UpstreamError):
+        res.call_sync("p", unauthorized)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert res.call_sync("p", lambda: "ok") == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_open_breaker_short_circuits_calls():
+    res = _fast_resilience(failure_threshold=1)
+    calls = []
+
+    async def down():
+        calls.append(1)
+        raise UpstreamError("down", status_code=502)
+
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(res.call_async("p", down))
+    assert len(calls) == 1  # 首次失败即熔断，重试直接被拒绝
+
+
+class _FlakySession:
+    def __init__(self):
+        self.calls = 0
+
+    async def call_tool(self, name, arguments):
+        self.calls += 1
+        if self.calls == 1:
+            raise ConnectionResetError("reset")
+
+        class _Result:
+            content = ["done"]
+
+        return _Result()
+
+
+def test_mcp_call_tool_retries_with_backoff():
+    client = MCPClient("http://unused")
+    client.session = _FlakySession()
+    result = asyncio.run(client.call_tool("tool", {}, retry_delay=0.001))
+    assert result == ["done"]
+    assert client.session.calls == 2
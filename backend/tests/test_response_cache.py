@@ -0,0 +1,89 @@
+import importlib
+import time
+
+from fastapi.testclient import TestClient
+
+from backend.app.services.response_cache import MODE_OFF, MODE_ON, MODE_OPT_IN, ResponseCache, make_cache_key
+
+server_module = importlib.import_module("backend.app.main")
+chat_module = importlib.import_module("backend.app.api.v1.routers.chat")
+
+client = TestClient(server_module.app)
+
+
+class _CountingProvider:
+    default_model = "fake-model"
+
+    def __init__(self):
+        self.calls = 0
+
+    def _add_system_prompt(self, messages):
+        return [{"role": "system", "content": "sys"}] + messages
+
+    async def achat_completion(self, messages, model, temperature=0.7):
+        self.calls += 1
+        return f"echo:{messages[-1]['content']}"
+
+
+def test_cache_key_is_canonical():
+    """键只取决于 provider/model/messages/temperature，且包含注入的系统提示词"""
+    provider = _CountingProvider()
+    messages = [{"role": "user", "content": "hi"}]
+    assert make_cache_key(provider, "m", messages) == make_cache_key(provider, "m", [dict(m) for m in messages])
+    assert make_cache_key(provider, "m", messages) != make_cache_key(provider, "m2", messages)
+    assert make_cache_key(provider, "m", messages) != make_cache_key(provider, "m", messages, temperature=0.1)
+    assert make_cache_key(provider, "m", messages) != make_cache_key(object(), "m", messages)
+
+
+def test_lru_and_ttl_eviction(monkeypatch):
+    cache = ResponseCache(max_entries=2, ttl_seconds=10)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"  # a 变为最近使用
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 11)
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 2 and stats["misses"] == 2
+    assert stats["entries"] == 1  # c 尚未被访问，过期条目惰性删除
+
+
+def test_byte_bound_eviction():
+    cache = ResponseCache(max_entries=100, max_bytes=20)
+    cache.set("k1", "x" * 9)
+    cache.set("k2", "y" * 9)
+    assert cache.get("k1") is None
+    assert cache.stats()["bytes"] <= 20
+
+
+def test_mode_and_request_overrides():
+    assert not ResponseCache(mode=MODE_OPT_IN).enabled_for(None)
+    assert ResponseCache(mode=MODE_OPT_IN).enabled_for(True)
+    assert ResponseCache(mode=MODE_ON).enabled_for(None)
+    assert not ResponseCache(mode=MODE_ON).enabled_for(False)
+    assert not ResponseCache(mode=MODE_OFF).enabled_for(True)
+
+
+def test_chat_route_serves_repeat_from_cache(monkeypatch):
+    """显式 cache=true 的重复请求不再调用上游；cache=false 始终绕过"""
+    provider = _CountingProvider()
+    cache = ResponseCache(mode=MODE_OPT_IN)
+    monkeypatch.setattr(chat_module._manager, "current_provider", provider)
+    monkeypatch.setattr(chat_module._manager, "response_cache", cache)
+
+    body = {"messages": [{"role": "user", "content": "faq"}], "model": "m", "cache": True}
+    assert client.post("/api/chat", json=body).json()["response"] == "echo:faq"
+    assert client.post("/api/chat", json=body).json()["response"] == "echo:faq"
+    assert provider.calls == 1
+
+    client.post("/api/chat", json={**body, "cache": False})
+    assert provider.calls == 2
+
+    stats = client.get("/api/cache/stats").json()
+    assert stats["hits"] == 1 and stats["stores"] == 1
+    assert stats["hit_ratio"] == 0.5
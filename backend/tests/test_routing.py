@@ -0,0 +1,133 @@
+import asyncio
+import importlib
+import json
+
+importlib.import_module("backend.app.main")
+
+from backend.app import manager as manager_module  # noqa: E402
+from backend.app.manager import LLMManager  # noqa: E402
+from backend.app.providers.routing import STRATEGY_ORDERED, Backend, ModelRouter  # noqa: E402
+
+
+class _Provider:
+    default_model = "fake-model"
+
+    def __init__(self, name, reply="ok", fail=False, fail_after=None):
+        self.name = name
+        self.reply = reply
+        self.fail = fail
+        self.fail_after = fail_after
+        self.calls = 0
+
+    async def achat_completion(self, messages, model, temperature=0.7):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError(f"{self.name} down")
+        return self.reply
+
+    async def chat_completion_stream(self, messages, model, temperature=0.7):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError(f"{self.name} down")
+        for i, ch in enumerate(self.reply):
+            if self.fail_after is not None and i == self.fail_after:
+                raise RuntimeError(f"{self.name} broke mid-stream")
+            yield json.dumps({"type": "stream_chunk", "content": ch})
+
+
+def _manager(monkeypatch, providers, strategy=STRATEGY_ORDERED, breaker_state=None):
+    router = ModelRouter(
+        {"logical": [Backend(name, f"{name}-model") for name in providers]}, strategy, breaker_state
+    )
+    monkeypatch.setattr(manager_module.provider_factory, "get", lambda name: providers[name])
+    manager = LLMManager(model_router=router)
+    manager.current_provider = _Provider("current", reply="unrouted")
+    manager.single_flight = None
+    return manager, router
+
+
+def test_failover_to_next_backend(monkeypatch):
+    first, second = _Provider("a", fail=True), _Provider("b", reply="from b")
+    manager, router = _manager(monkeypatch, {"a": first, "b": second})
+
+    result = asyncio.run(manager.achat([{"role": "user", "content": "hi"}], "logical"))
+
+    assert result["response"] == "from b"
+    assert first.calls == 1 and second.calls == 1
+    stats = router.stats()["logical"]
+    assert stats["a/a-model"]["failures"] == 1 and stats["b/b-model"]["requests"] == 1
+
+
+def test_unrouted_model_uses_current_provider(monkeypatch):
+    manager, _ = _manager(monkeypatch, {"a": _Provider("a")})
+    result = asyncio.run(manager.achat([{"role": "user", "content": "hi"}], "other"))
+    assert result["response"] == "unrouted"
+
+
+def test_latency_strategy_prefers_faster_backend():
+    slow, fast = Backend("slow", "m"), Backend("fast", "m")
+    router = ModelRouter({"logical": [slow, fast]})
+    assert [b.key for b in router.candidates("logical")] == ["slow/m", "fast/m"]  # 均未探索，保持配置顺序
+
+    router.record_success(slow, 2.0, ttft=1.0)
+    router.record_success(fast, 0.5, ttft=0.2)
+    assert router.candidates("logical")[0] is fast
+
+    # 错误率上升后快后端的得分被惩罚
+    for _ in range(3):
+        router.record_failure(fast, RuntimeError("boom"))
+    assert router.candidates("logical")[0] is slow
+
+
+def test_latency_strategy_scores_by_request_mode():
+    """流式请求按首字延迟排序，非流式按总耗时排序，两类样本互不影响"""
+    batch, streamer = Backend("batch", "m"), Backend("streamer", "m")
+    router = ModelRouter({"logical": [batch, streamer]})
+
+    router.record_success(batch, 1.0)  # 非流式总耗时短
+    router.record_success(streamer, 3.0)
+    router.record_success(batch, 8.0, ttft=2.0, stream=True)
+    router.record_success(streamer, 9.0, ttft=0.1, stream=True)  # 首字快，但整条流长
+
+    assert router.candidates("logical")[0] is batch
+    assert router.candidates("logical", stream=True)[0] is streamer
+
+
+def test_backend_with_open_breaker_is_tried_last():
+    a, b = Backend("a", "m"), Backend("b", "m")
+    router = ModelRouter({"logical": [a, b]}, STRATEGY_ORDERED, lambda name: "open" if name == "a" else "closed")
+    assert router.candidates("logical") == [b, a]
+
+
+def _collect(manager):
+    async def run():
+        return [event async for event in manager.chat_stream([{"role": "user", "content": "s"}], "logical")]
+
+    return asyncio.run(run())
+
+
+def test_stream_fails_over_before_first_delta(monkeypatch):
+    manager, router = _manager(monkeypatch, {"a": _Provider("a", fail=True), "b": _Provider("b", reply="xyz")})
+
+    events = _collect(manager)
+
+    assert events[-1]["type"] == "done" and events[-1]["content"] == "xyz"
+    assert router.stats()["logical"]["b/b-model"]["ttft"] is not None
+
+
+def test_stream_does_not_fail_over_after_first_delta(monkeypatch):
+    second = _Provider("b", reply="xyz")
+    manager, router = _manager(monkeypatch, {"a": _Provider("a", reply="abc", fail_after=1), "b": second})
+
+    events = _collect(manager)
+
+    assert [e["content"] for e in events if e["type"] == "delta"] == ["a"]
+    assert events[-1]["type"] == "error"
+    assert second.calls == 0
+    assert router.stats()["logical"]["a/a-model"]["failures"] == 1
+
+
+def test_weighted_strategy_never_prefers_zero_weight():
+    a, b = Backend("a", "m", 1.0), Backend("b", "m", 0.0)
+    router = ModelRouter({"logical": [b, a]}, "weighted")
+    assert all(router.candidates("logical")[0] is a for _ in range(20))
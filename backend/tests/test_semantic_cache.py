@@ -0,0 +1,142 @@
+import importlib
+import time
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from backend.app.services.response_cache import MODE_OFF, MODE_ON, ResponseCache
+from backend.app.services.semantic_cache import HashedNgramEmbedder, SemanticCache, VectorIndex
+
+server_module = importlib.import_module("backend.app.main")
+chat_module = importlib.import_module("backend.app.api.v1.routers.chat")
+
+client = TestClient(server_module.app)
+
+
+class _CountingProvider:
+    default_model = "fake-model"
+
+    def __init__(self):
+        self.calls = 0
+
+    async def achat_completion(self, messages, model, temperature=0.7):
+        self.calls += 1
+        return f"answer-{self.calls}"
+
+
+def _user(text):
+    return [{"role": "system", "content": "sys"}, {"role": "user", "content": text}]
+
+
+def test_near_duplicate_hits_and_unrelated_misses():
+    cache = SemanticCache(mode=MODE_ON, threshold=0.9)
+    provider = _CountingProvider()
+    cache.store(provider, "m", _user("How do I reset my password?"), "reset-answer")
+
+    assert cache.lookup(provider, "m", _user("how do i reset my password")) == "reset-answer"
+    assert cache.lookup(provider, "m", _user("What is the capital of France?")) is None
+    # 不同模型的条目互相隔离
+    assert cache.lookup(provider, "other", _user("How do I reset my password?")) is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 2 and stats["entries"] == 1
+
+
+def test_default_threshold_rejects_questions_that_need_different_answers():
+    """默认阈值下，否定、换了对象、换了数字的问题都不能命中彼此的回复"""
+    cache = SemanticCache(mode=MODE_ON)
+    provider = _CountingProvider()
+    pairs = [
+        ("How do I reverse a list in Python?", "How do I reverse a list in Java?"),
+        ("is it safe to eat raw chicken", "is it not safe to eat raw chicken"),
+        ("Convert 100 USD to EUR", "Convert 500 USD to EUR"),
+        ("这个药可以空腹吃吗", "这个药不可以空腹吃吗"),
+    ]
+    for stored, asked in pairs:
+        cache.store(provider, "m", _user(stored), stored)
+        assert cache.lookup(provider, "m", _user(asked)) is None, asked
+        assert cache.lookup(provider, "m", _user(stored.upper() + "?")) == stored
+
+
+def test_lookup_miss_does_not_create_or_evict_namespaces():
+    cache = SemanticCache(mode=MODE_ON, capacity=2)
+    provider = _CountingProvider()
+    cache.store(provider, "m", _user("keep me"), "kept")
+    for i in range(10):
+        assert cache.lookup(provider, f"model-{i}", _user("keep me")) is None
+    assert len(cache._namespaces) == 1
+    assert cache.lookup(provider, "m", _user("keep me")) == "kept"
+
+
+def test_same_follow_up_with_different_history_is_isolated():
+    """相同的追问在不同对话上下文中不能命中彼此的条目"""
+    cache = SemanticCache(mode=MODE_ON, threshold=0.9)
+    provider = _CountingProvider()
+    history_a = _user("Write a poem about the sea") + [{"role": "assistant", "content": "Waves..."}]
+    history_b = _user("Summarise my medical report") + [{"role": "assistant", "content": "Your report..."}]
+    follow_up = [{"role": "user", "content": "translate that into French"}]
+
+    cache.store(provider, "m", history_a + follow_up, "poem-in-french")
+    assert cache.lookup(provider, "m", history_b + follow_up) is None
+    assert cache.lookup(provider, "m", history_a + follow_up) == "poem-in-french"
+
+
+def test_namespaces_are_bounded_and_clear_resets_index():
+    cache = SemanticCache(mode=MODE_ON, threshold=0.9, capacity=4)
+    provider = _CountingProvider()
+    for i in range(10):
+        cache.store(provider, "m", [{"role": "system", "content": f"ctx-{i}"}, {"role": "user", "content": "hi"}], str(i))
+    assert len(cache._namespaces) == 4
+    # 被淘汰命名空间的条目随之作废，不会被复用的 id 命中
+    assert cache.lookup(provider, "m", [{"role": "system", "content": "ctx-0"}, {"role": "user", "content": "hi"}]) is None
+
+    cache.clear()
+    assert len(cache._index) == 0 and not cache._namespaces
+    assert not cache._index._last_used.any()
+
+
+def test_capacity_evicts_least_recently_used():
+    embedder = HashedNgramEmbedder()
+    index = VectorIndex(embedder.dim, capacity=2)
+    a = index.add(embedder.embed("alpha"), 0, "a")
+    index.add(embedder.embed("beta"), 0, "b")
+    index.get(a)  # alpha 变为最近使用
+    index.add(embedder.embed("gamma"), 0, "c")
+
+    assert len(index) == 2 and index.evictions == 1
+    assert index.search(embedder.embed("alpha"), 0)[1] > 0.99
+    assert index.search(embedder.embed("beta"), 0)[1] < 0.99
+
+
+def test_search_scales_to_100k_entries():
+    """10 万条目下单次查询与批量查询均应为毫秒级"""
+    dim, size = 256, 100_000
+    index = VectorIndex(dim, capacity=size)
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((size, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    index._vectors[:] = vectors
+    index._namespaces[:] = 0
+    index._size = size
+
+    start = time.perf_counter()
+    slot, score = index.search(vectors[12345], 0)
+    assert time.perf_counter() - start < 0.5
+    assert slot == 12345 and score > 0.99
+
+    slots, _ = index.search_batch(vectors[[1, 2, 3]], 0)
+    assert slots.tolist() == [1, 2, 3]
+
+
+def test_chat_route_uses_semantic_cache(monkeypatch):
+    """SEMANTIC_CACHE_MODE=on 时，改写过的相同问题不再调用上游"""
+    provider = _CountingProvider()
+    monkeypatch.setattr(chat_module._manager, "current_provider", provider)
+    monkeypatch.setattr(chat_module._manager, "response_cache", ResponseCache(mode=MODE_OFF))
+    monkeypatch.setattr(chat_module._manager, "semantic_cache", SemanticCache(mode=MODE_ON, threshold=0.9))
+
+    first = client.post("/api/chat", json={"messages": [{"role": "user", "content": "Reset password?"}], "model": "m"})
+    second = client.post("/api/chat", json={"messages": [{"role": "user", "content": "reset password"}], "model": "m"})
+    assert first.json()["response"] == second.json()["response"] == "answer-1"
+    assert provider.calls == 1
+    assert client.get("/api/cache/stats").json()["semantic"]["hits"] == 1
@@ -0,0 +1,128 @@
+import asyncio
+import importlib
+import json
+import threading
+
+import pytest
+
+importlib.import_module("backend.app.main")
+
+from backend.app.manager import LLMManager  # noqa: E402
+from backend.app.services.single_flight import SingleFlight  # noqa: E402
+
+
+class _CountingProvider:
+    default_model = "fake-model"
+
+    def __init__(self, fail=False):
+        self.calls = 0
+        self.stream_calls = 0
+        self.fail = fail
+
+    async def achat_completion(self, messages, model, temperature=0.7):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        if self.fail:
+            raise RuntimeError("upstream down")
+        return "shared"
+
+    async def chat_completion_stream(self, messages, model, temperature=0.7):
+        self.stream_calls += 1
+        for ch in "abc":
+            await asyncio.sleep(0.01)
+            yield json.dumps({"type": "stream_chunk", "content": ch})
+        yield json.dumps({"type": "stream_complete", "usage": {"total_tokens": 3}})
+
+
+def _manager(provider):
+    manager = LLMManager()
+    manager.current_provider = provider
+    manager.single_flight = SingleFlight()
+    return manager
+
+
+def test_concurrent_identical_calls_share_one_upstream_call():
+    provider = _CountingProvider()
+    manager = _manager(provider)
+    messages = [{"role": "user", "content": "same"}]
+
+    async def run():
+        return await asyncio.gather(*(manager.achat(list(messages), "m") for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert [r["response"] for r in results] == ["shared"] * 5
+    assert provider.calls == 1
+    assert manager.single_flight.stats() == {"calls": 1, "coalesced": 4, "in_flight": 0}
+
+
+def test_waiters_share_the_error():
+    provider = _CountingProvider(fail=True)
+    manager = _manager(provider)
+
+    async def run():
+        return await asyncio.gather(*(manager.achat([{"role": "user", "content": "x"}], "m") for _ in range(3)))
+
+    results = asyncio.run(run())
+    assert all(r == {"status": "error", "error": "upstream down"} for r in results)
+    assert provider.calls == 1
+
+
+def test_cancelled_waiter_does_not_cancel_others():
+    flight = SingleFlight()
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return 42
+
+    async def run():
+        first = asyncio.create_task(flight.do("k", slow))
+        second = asyncio.create_task(flight.do("k", slow))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == 42
+
+
+def test_concurrent_streams_share_one_upstream_stream():
+    provider = _CountingProvider()
+    manager = _manager(provider)
+
+    async def collect():
+        return [event async for event in manager.chat_stream([{"role": "user", "content": "s"}], "m")]
+
+    async def run():
+        return await asyncio.gather(*(collect() for _ in range(3)))
+
+    for events in asyncio.run(run()):
+        assert "".join(e["content"] for e in events if e["type"] == "delta") == "abc"
+        assert events[-1] == {"type": "done", "content": "abc", "usage": {"total_tokens": 3}}
+    assert provider.stream_calls == 1
+
+
+def test_do_sync_coalesces_threads():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def upstream():
+        calls.append(1)
+        started.set()
+        release.wait(1)
+        return "v"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do_sync("k", upstream)))
+    leader.start()
+    started.wait(1)
+    follower = threading.Thread(target=lambda: results.append(flight.do_sync("k", upstream)))
+    follower.start()
+    while flight.stats()["coalesced"] == 0:
+        pass
+    release.set()
+    leader.join()
+    follower.join()
+    assert results == ["v", "v"] and len(calls) == 1
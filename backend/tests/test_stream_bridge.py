@@ -0,0 +1,67 @@
+import asyncio
+import threading
+
+import pytest
+
+from backend.app.providers.stream_bridge import iterate_in_thread
+
+
+def test_first_chunk_arrives_before_producer_finishes():
+    """首块应在同步迭代器结束前送达消费者（真正的增量流式）"""
+    first_seen = threading.Event()
+
+    def _slow_source():
+        yield "a"
+        # 若桥接先缓冲全部结果，此处会一直等不到消费者收到首块
+        assert first_seen.wait(timeout=2)
+        yield "b"
+
+    async def _consume():
+        out = []
+        async for item in iterate_in_thread(_slow_source):
+            out.append(item)
+            first_seen.set()
+        return out
+
+    assert asyncio.run(_consume()) == ["a", "b"]
+
+
+def test_bounded_buffer_and_cancellation():
+    """缓冲区有界；消费者提前退出后生产者停止并关闭迭代器"""
+    produced = []
+    closed = threading.Event()
+
+    def _endless():
+        try:
+            i = 0
+            while True:
+                produced.append(i)
+                yield i
+                i += 1
+        finally:
+            closed.set()
+
+    async def _consume():
+        gen = iterate_in_thread(_endless, maxsize=4)
+        assert await gen.__anext__() == 0
+        await asyncio.sleep(0.2)
+        # 生产者最多领先消费者 maxsize 个块（外加一个正在等待空位的块）
+        assert len(produced) <= 1 + 4 + 1
+        await gen.aclose()
+
+    asyncio.run(_consume())
+    assert closed.wait(timeout=2)
+
+
+def test_producer_error_propagates():
+    """同步迭代器抛出的异常应在消费端重新抛出"""
+
+    def _broken():
+        yield "ok"
+        raise ValueError("upstream failed")
+
+    async def _consume():
+        return [item async for item in iterate_in_thread(_broken)]
+
+    with pytest.raises(ValueError, match="upstream failed"):
+        asyncio.run(_consume())
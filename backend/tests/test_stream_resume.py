@@ -0,0 +1,160 @@
+import asyncio
+import importlib
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.app.services.stream_resume import StreamExpired, StreamLimitReached, StreamNotFound, StreamRegistry
+
+server_module = importlib.import_module("backend.app.main")
+chat_module = importlib.import_module("backend.app.api.v1.routers.chat")
+
+client = TestClient(server_module.app)
+
+
+async def _frames(count, pause=0.01, produced=None):
+    yield {"v": 1, "seq": 0, "type": "start"}
+    for i in range(1, count + 1):
+        await asyncio.sleep(pause)
+        if produced is not None:
+            produced.append(i)
+        yield {"seq": i, "d": str(i)}
+    yield {"seq": count + 1, "type": "done"}
+
+
+def test_resume_after_disconnect_continues_in_background():
+    """订阅者断开后生成继续；重连从最后确认的 seq 之后补发"""
+
+    async def _run():
+        registry = StreamRegistry(grace_seconds=5)
+        registry.start("s1", _frames(5))
+
+        first = registry.subscribe("s1")
+        received = [await first.__anext__(), await first.__anext__()]
+        await first.aclose()  # 模拟断线
+        await asyncio.sleep(0.2)  # 期间上游继续生成
+
+        resumed = [f async for f in registry.subscribe("s1", after_seq=received[-1]["seq"])]
+        return received + resumed
+
+    frames = asyncio.run(_run())
+    assert [f["seq"] for f in frames] == list(range(7))
+    assert frames[-1]["type"] == "done"
+
+
+def test_upstream_cancelled_after_grace_period():
+    """宽限期内无人重连则取消上游生成"""
+    produced = []
+
+    async def _run():
+        registry = StreamRegistry(grace_seconds=0.05)
+        registry.start("s2", _frames(100, pause=0.02, produced=produced))
+        await asyncio.sleep(0.3)
+
+    asyncio.run(_run())
+    assert len(produced) < 20
+
+
+def test_expired_and_unknown_streams():
+    async def _run():
+        registry = StreamRegistry(capacity=3)
+        registry.start("s3", _frames(5, pause=0))
+        await asyncio.sleep(0.05)
+        with pytest.raises(StreamExpired):
+            await registry.subscribe("s3", after_seq=0).__anext__()
+        with pytest.raises(StreamNotFound):
+            await registry.subscribe("missing").__anext__()
+
+    asyncio.run(_run())
+
+
+def test_slow_subscriber_applies_backpressure():
+    """在线订阅者读得比生成慢时，生成端等待而不是淘汰其未读的帧"""
+
+    async def _run():
+        registry = StreamRegistry(capacity=3)
+        registry.start("slow", _frames(20, pause=0))
+        received = []
+        async for frame in registry.subscribe("slow"):
+            received.append(frame)
+            await asyncio.sleep(0.005)
+        return received
+
+    frames = asyncio.run(_run())
+    assert [f["seq"] for f in frames] == list(range(22))
+
+
+def test_max_streams_is_enforced():
+    """保留的流已满且都在进行中时拒绝登记新的流；结束的流可被淘汰"""
+
+    async def _run():
+        registry = StreamRegistry(max_streams=2, grace_seconds=5)
+        registry.start("a", _frames(100, pause=0.05))
+        registry.start("b", _frames(0, pause=0))
+        await asyncio.sleep(0.05)  # b 已结束，可被淘汰
+        registry.start("c", _frames(100, pause=0.05))
+        assert "b" not in registry and len(registry._streams) == 2
+        assert not registry.has_room()
+        with pytest.raises(StreamLimitReached):
+            registry.start("d", _frames(1))
+        for buf in registry._streams.values():
+            buf.task.cancel()
+
+    asyncio.run(_run())
+
+
+def test_stream_falls_back_when_registry_full(monkeypatch):
+    """登记已满时流式接口仍正常返回，只是不带 stream_id"""
+    registry = StreamRegistry(max_streams=0)
+    monkeypatch.setattr("backend.app.services.stream_resume.stream_registry", registry)
+
+    class _Provider:
+        default_model = "fake-model"
+
+        async def chat_completion_stream(self, messages, model, temperature=0.7):
+            yield json.dumps({"type": "stream_chunk", "content": "hi"})
+            yield json.dumps({"type": "stream_complete"})
+
+    monkeypatch.setattr(chat_module._manager, "current_provider", _Provider())
+    resp = client.post("/api/chat/stream", json={"user_message": "hi", "model": "m"})
+    assert resp.status_code == 200
+    assert "X-Stream-Id" not in resp.headers
+    assert '"type":"done"' in resp.text
+
+
+def test_expired_mid_stream_ends_with_error_frame():
+    """读取途中帧已被淘汰时响应以错误帧收尾，而不是中断"""
+
+    async def frames():
+        yield {"seq": 0, "type": "start"}
+        raise StreamExpired(0)
+
+    async def _run():
+        return [chunk async for chunk in chat_module._encode_frames(frames(), chat_module.stream_format.encode_ndjson)]
+
+    lines = [json.loads(line) for line in asyncio.run(_run())]
+    assert lines == [{"seq": 0, "type": "start"}, {"type": "error", "error": "stream_expired"}]
+
+
+def test_resume_route_with_last_event_id(monkeypatch):
+    """GET /api/chat/stream/{id} 依据 Last-Event-ID 补发后续帧"""
+
+    class _Provider:
+        default_model = "m"
+
+        async def chat_completion_stream(self, messages, model, temperature=0.7):
+            for ch in "abc":
+                yield json.dumps({"type": "stream_chunk", "content": ch})
+
+    monkeypatch.setattr(chat_module._manager, "current_provider", _Provider())
+    resp = client.post("/api/chat/stream", json={"messages": [{"role": "user", "content": "x"}], "model": "m"})
+    stream_id = resp.headers["x-stream-id"]
+
+    resumed = client.get(f"/api/chat/stream/{stream_id}", headers={"Last-Event-ID": "1"})
+    assert resumed.status_code == 200
+    frames = [json.loads(line[6:]) for line in resumed.text.splitlines() if line.startswith("data: ")]
+    assert [f.get("d") for f in frames] == ["b", "c", None]
+    assert frames[-1]["type"] == "done"
+
+    assert client.get("/api/chat/stream/unknown").status_code == 404
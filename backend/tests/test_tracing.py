@@ -0,0 +1,100 @@
+import asyncio
+import importlib
+import json
+
+from fastapi.testclient import TestClient
+
+server_module = importlib.import_module("backend.app.main")
+
+from backend.app.api.v1.routers import chat as chat_module  # noqa: E402
+from backend.app.core import tracing  # noqa: E402
+from backend.app.core.tracing import JsonLinesExporter, RingBufferExporter, Tracer  # noqa: E402
+from backend.app.repositories.in_memory import InMemorySessionRepo  # noqa: E402
+
+client = TestClient(server_module.app)
+
+
+class _Provider:
+    name = "tracefake"
+    default_model = "m"
+
+    async def achat_completion(self, messages, model, temperature=0.7):
+        await asyncio.sleep(0.01)
+        return "echo:" + messages[-1]["content"]
+
+
+def test_spans_nest_and_are_noop_without_trace():
+    with tracing.span("orphan") as orphan:
+        orphan.set(ignored=True)
+    assert orphan is tracing.NOOP_SPAN
+
+    local = Tracer()
+    buffer = local.add_exporter(RingBufferExporter(capacity=2))
+    with local.trace("root") as root:
+        with tracing.span("outer") as outer:
+            with tracing.span("inner"):
+                pass
+            tracing.record("measured", tracing.now(), ttft_ms=1.5)
+        try:
+            with tracing.span("failing"):
+                raise KeyError("x")
+        except KeyError:
+            pass
+
+    (exported,) = buffer.recent()
+    spans = {s["name"]: s for s in exported["spans"]}
+    assert exported["trace_id"] == root.trace_id
+    assert spans["outer"]["parent_id"] == root.span_id
+    assert spans["inner"]["parent_id"] == outer.span_id
+    assert spans["measured"]["parent_id"] == outer.span_id
+    assert spans["measured"]["attributes"] == {"ttft_ms": 1.5}
+    assert spans["failing"]["status"] == "error"
+    assert all(s["duration_ms"] >= 0 for s in exported["spans"])
+    assert tracing.current_span() is None
+
+
+def test_chat_response_carries_server_timing_and_propagates_trace_id(monkeypatch):
+    monkeypatch.setattr(chat_module._manager, "current_provider", _Provider())
+    monkeypatch.setattr(chat_module._manager, "session_repo", InMemorySessionRepo())
+    trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+
+    resp = client.post(
+        "/api/chat",
+        json={"session_id": "trace-s", "user_message": "hi", "model": "m", "use_cache": False},
+        headers={"traceparent": f"00-{trace_id}-00f067aa0ba902b7-01"},
+    )
+    assert resp.status_code == 200
+    timing = dict(entry.split(";dur=") for entry in resp.headers["server-timing"].split(", "))
+    for name in ("repo_load", "build_prompt", "provider", "queue", "upstream", "repo_save", "total"):
+        assert name in timing
+    assert float(timing["upstream"]) >= 10 and float(timing["total"]) >= float(timing["upstream"])
+    assert resp.headers["traceparent"].startswith(f"00-{trace_id}-")
+
+    trace = client.get(f"/api/traces/{trace_id}").json()
+    spans = {s["name"]: s for s in trace["spans"]}
+    assert spans["request"]["parent_id"] == "00f067aa0ba902b7"
+    assert spans["request"]["attributes"]["path"] == "/api/chat"
+    assert spans["upstream"]["parent_id"] == spans["provider"]["span_id"]
+    assert spans["provider"]["attributes"]["provider"] == "tracefake"
+
+
+def test_malformed_traceparent_starts_new_trace():
+    assert tracing.parse_traceparent("00-" + "0" * 32 + "-00f067aa0ba902b7-01") is None
+    assert tracing.parse_traceparent("garbage") is None
+    resp = client.get("/api/health/live", headers={"traceparent": "garbage"})
+    assert len(resp.headers["traceparent"].split("-")[1]) == 32
+
+
+def test_json_lines_exporter_writes_one_trace_per_line(tmp_path):
+    path = tmp_path / "traces" / "spans.jsonl"
+    local = Tracer()
+    exporter = local.add_exporter(JsonLinesExporter(str(path)))
+    for name in ("a", "b"):
+        with local.trace(name):
+            with tracing.span("child"):
+                pass
+    local.shutdown()
+
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["spans"][0]["name"] for line in lines] == ["a", "b"]
+    assert exporter.dropped == 0
@@ -0,0 +1,150 @@
+import asyncio
+import importlib
+import json
+
+from fastapi.testclient import TestClient
+
+from backend.app.repositories.in_memory import InMemorySessionRepo
+
+server_module = importlib.import_module("backend.app.main")
+chat_module = importlib.import_module("backend.app.api.v1.routers.chat")
+
+client = TestClient(server_module.app)
+
+
+class _FakeStreamProvider:
+    default_model = "fake-model"
+
+    async def chat_completion_stream(self, messages, model, temperature=0.7):
+        text = messages[-1]["content"]
+        if text == "slow":
+            await asyncio.sleep(30)
+        for ch in text:
+            yield json.dumps({"type": "stream_chunk", "content": ch})
+        yield json.dumps({"type": "stream_complete"})
+
+
+def _install_fake(monkeypatch):
+    monkeypatch.setattr(chat_module._manager, "current_provider", _FakeStreamProvider())
+    monkeypatch.setattr(chat_module._manager, "session_repo", InMemorySessionRepo())
+
+
+def _receive_until(ws, predicate):
+    frames = []
+    while True:
+        frame = ws.receive_json()
+        frames.append(frame)
+        if predicate(frame):
+            return frames
+
+
+def test_ws_multiplexes_concurrent_streams(monkeypatch):
+    """同一连接上的两个生成按 id 区分，各自完整结束"""
+    _install_fake(monkeypatch)
+    with client.websocket_connect("/ws") as ws:
+        ws.send_json({"op": "chat", "id": "a", "session_id": "s-a", "user_message": "abc", "model": "m"})
+        ws.send_json({"op": "chat", "id": "b", "messages": [{"role": "user", "content": "xy"}], "model": "m"})
+
+        frames = []
+        finished = set()
+        while finished != {"a", "b"}:
+            frame = ws.receive_json()
+            frames.append(frame)
+            if frame.get("type") == "done":
+                finished.add(frame["id"])
+
+    text = {sid: "".join(f["d"] for f in frames if f.get("id") == sid and "d" in f) for sid in ("a", "b")}
+    assert text == {"a": "abc", "b": "xy"}
+    assert chat_module._manager.session_repo.get_history("s-a")[-1] == {"role": "assistant", "content": "abc"}
+
+
+def test_ws_cancel_stream(monkeypatch):
+    """cancel 操作应终止对应生成并回复 cancelled，连接上的其它流不受影响"""
+    _install_fake(monkeypatch)
+    with client.websocket_connect("/ws") as ws:
+        ws.send_json({"op": "chat", "id": "slow", "user_message": "slow", "model": "m"})
+        _receive_until(ws, lambda f: f.get("id") == "slow" and f.get("type") == "start")
+        ws.send_json({"op": "cancel", "id": "slow"})
+        _receive_until(ws, lambda f: f.get("id") == "slow" and f.get("type") == "cancelled")
+
+        ws.send_json({"op": "ping"})
+        assert ws.receive_json() == {"type": "pong"}
+
+
+def test_provider_switch_without_session_is_not_global(monkeypatch):
+    """不带 session_id 的切换只返回模型列表：不修改进程默认，也不向其它 WebSocket 连接推送"""
+    manager = chat_module._manager
+    default = manager.current_provider_name
+    calls = []
+
+    async def fake_resolve(name=None, session_id=None):
+        return object()
+
+    async def fake_models(provider_name=None, session_id=None):
+        calls.append(provider_name)
+        return {"Fake": "fake-model"}
+
+    monkeypatch.setattr(manager, "aresolve_provider", fake_resolve)
+    monkeypatch.setattr(manager, "aget_available_models", fake_models)
+    monkeypatch.setattr(manager, "initialize_provider", lambda name: (_ for _ in ()).throw(AssertionError(name)))
+
+    with client.websocket_connect("/ws") as ws:
+        resp = client.post("/api/provider/switch", json={"provider_name": "fake"})
+        assert resp.status_code == 200
+        assert resp.json() == {"status": "selected", "current_provider": "fake", "models": {"Fake": "fake-model"}}
+        ws.send_json({"op": "ping"})
+        assert ws.receive_json() == {"type": "pong"}
+    assert calls == ["fake"]
+    assert manager.current_provider_name == default
+
+
+def test_reader_is_not_blocked_by_full_outbox(monkeypatch):
+    """发送队列已满时，读循环仍能立即处理 ping / cancel / models"""
+    ws_module = importlib.import_module("backend.app.api.v1.routers.ws")
+    fetched = []
+
+    async def fake_models(provider_name=None, session_id=None):
+        fetched.append(provider_name)
+        return {"Fake": "fake-model"}
+
+    monkeypatch.setattr(chat_module._manager, "aget_available_models", fake_models)
+
+    async def scenario():
+        conn = ws_module._Connection(websocket=None, queue_size=1)
+        conn.outbox.put_nowait({"type": "stuck"})  # 没有写协程，队列一直是满的
+        stream = asyncio.create_task(asyncio.sleep(30))
+        conn.streams["a"] = stream
+
+        for message in ({"op": "ping"}, {"op": "models", "provider": "p"}, {"op": "cancel", "id": "a"}):
+            await asyncio.wait_for(ws_module._dispatch(conn, message), timeout=1)
+        await asyncio.sleep(0)
+        assert stream.cancelled()
+        assert fetched == ["p"]
+
+        replies = [conn.outbox.get_nowait()]
+        for _ in range(2):  # 排队中的回复随写协程消费依次送达
+            replies.append(await asyncio.wait_for(conn.outbox.get(), timeout=1))
+        await conn.close()
+        return replies
+
+    replies = asyncio.run(scenario())
+    assert replies[0] == {"type": "stuck"}
+    assert sorted(r["type"] for r in replies[1:]) == ["models", "pong"]
+
+
+def test_model_changes_are_pushed_only_to_connections_using_that_provider(monkeypatch):
+    ws_module = importlib.import_module("backend.app.api.v1.routers.ws")
+    monkeypatch.setattr(chat_module._manager, "current_provider_name", "default-p")
+    monkeypatch.setattr(chat_module._manager, "model_router", None)
+    hub = ws_module.ConnectionHub()
+    switched, other, default = (ws_module._Connection(websocket=None, queue_size=4) for _ in range(3))
+    switched.provider, other.provider = "p", "q"
+    for conn in (switched, other, default):
+        hub.register(conn)
+
+    hub.models_changed("p", {"New": "new-model"})
+    hub.models_changed("default-p", {"D": "d"})
+
+    assert switched.outbox.get_nowait() == {"type": "models", "provider": "p", "models": {"New": "new-model"}}
+    assert default.outbox.get_nowait()["provider"] == "default-p"
+    assert switched.outbox.empty() and other.outbox.empty() and default.outbox.empty()
@@ -253,7 +253,7 @@ document.addEventListener('DOMContentLoaded', async () => {
             modelSelect.innerHTML = '<option value="">正在加载模型列表...</option>';
             modelSelect.disabled = true;
 
-            const response = await fetch(`${API_BASE}/api/models`);
+            const response = await fetch(`${API_BASE}/api/models?provider=${encodeURIComponent(providerSelect.value)}`);
             if (!response.ok) {
                 throw new Error('获取模型列表失败');
             }
@@ -476,7 +476,9 @@ document.addEventListener('DOMContentLoaded', async () => {
                 session_id: currentSessionId,
                 user_message: message,
                 context_window: contextWindow,
-                model: modelSelect.value
+                model: modelSelect.value,
+                // 新会话尚未拿到 session_id，按请求指定 provider，不依赖进程默认
+                provider: providerSelect.value
             };
 
             const response = await fetch(`${API_BASE}/api/chat`, {
@@ -580,7 +582,7 @@ document.addEventListener('DOMContentLoaded', async () => {
                 headers: {
                     'Content-Type': 'application/json'
                 },
-                body: JSON.stringify({ provider_name: provider })
+                body: JSON.stringify({ provider_name: provider, session_id: currentSessionId })
             });
 
             if (!resp.ok) {
@@ -648,7 +650,7 @@ document.addEventListener('DOMContentLoaded', async () => {
             const resp = await fetch(`${API_BASE}/api/provider/switch`, {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ provider_name: provider })
+                body: JSON.stringify({ provider_name: provider, session_id: currentSessionId })
             });
 
             if (!resp.ok) {
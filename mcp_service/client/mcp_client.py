@@ -7,14 +7,14 @@ MCP Client Implementation
 import asyncio
 from contextlib import AsyncExitStack
 import json
-from mcp import ClientSession
-from mcp.client.sse import sse_client
-from mcp.types import RequestParams
-from typing import Dict, Any, Optional
+from typing import TYPE_CHECKING, Dict, Any, Optional
 
 from ..config.settings import MCPSettings
 from ..utils.logger import setup_logger
 
+if TYPE_CHECKING:  # mcp SDK 导入较慢，仅在 connect() 时加载
+    from mcp import ClientSession
+
 # 设置日志记录器
 logger = setup_logger(__name__)
 
@@ -41,7 +41,7 @@ class MCPClient:
             mcp_url (str): ModelScope MCP服务的专属SSE URL
         """
         self.mcp_url = mcp_url
-        self.session: Optional[ClientSession] = None
+        self.session: Optional["ClientSession"] = None
         self._streams_context = None
         self._session_context = None
 
@@ -50,7 +50,7 @@ class MCPClient:
     def create_provider(self, provider_name: str):
         """根据名称创建并返回 LLM Provider 实例
 
-        目前支持 "silicon" 和 "google"。
+        目前支持 "silicon"、"google"、"wisdom_gate"，以及用于压测 / 测试的离线 "mock"。
         """
         provider_name = provider_name.lower()
         if provider_name == "silicon":
@@ -78,6 +78,13 @@ class MCPClient:
                 raise MCPClientError(f"导入 WisdomGateProvider 失败: {e}")
             return WisdomGateProvider()
 
+        elif provider_name == "mock":
+            try:
+                from backend.app.providers.impl.mock_provider import MockProvider
+            except Exception as e:
+                raise MCPClientError(f"导入 MockProvider 失败: {e}")
+            return MockProvider()
+
         raise MCPClientError(f"不支持的 provider: {provider_name}")
 
     def get_available_models(self, provider) -> Dict[str, str]:
@@ -127,6 +134,37 @@ class MCPClient:
 
         raise MCPClientError("Provider 未实现聊天接口")
 
+    async def achat(
+        self,
+        provider,
+        messages,
+        model: str,
+        **kwargs,
+    ):
+        """使用指定 provider 进行异步（非流式）聊天
+
+        优先使用 provider 的原生异步接口 achat_completion；
+        仅有同步接口时放入线程池执行，避免阻塞事件循环。
+        """
+        if not provider:
+            raise MCPClientError("Provider 为空")
+
+        if hasattr(provider, "achat_completion"):
+            return await provider.achat_completion(messages=messages, model=model, **kwargs)
+
+        if hasattr(provider, "chat_completion"):
+            return await asyncio.to_thread(
+                provider.chat_completion, messages=messages, model=model, stream=False, **kwargs
+            )
+
+        if hasattr(provider, "chat_completion_stream"):
+            content = ""
+            async for chunk in provider.chat_completion_stream(messages=messages, model=model):
+                content += chunk
+            return content
+
+        raise MCPClientError("Provider 未实现聊天接口")
+
     async def connect(self) -> None:
         """
         连接到MCP服务器
@@ -134,6 +172,9 @@ class MCPClient:
         Raises:
             ConnectionError: 连接失败时抛出
         """
+        from mcp import ClientSession
+        from mcp.client.sse import sse_client
+
         try:
             # 创建SSE客户端
             self._streams_context = sse_client(url=self.mcp_url)
@@ -171,8 +212,8 @@ class MCPClient:
             tool_name (str): 要调用的工具名称
             arguments (Dict[str, Any]): 工具的输入参数
             timeout (float): 请求超时时间（秒）
-            retry_count (int): 重试次数
-            retry_delay (float): 重试延迟（秒）
+            retry_count (int): 最多尝试次数
+            retry_delay (float): 退避基准延迟（秒），实际等待为指数退避加随机抖动
 
         Returns:
             Optional[Any]: 工具的执行结果，如果发生错误则返回None
@@ -188,61 +229,50 @@ class MCPClient:
         logger.info(f"准备调用工具: {tool_name}")
         logger.debug(f"输入参数: {json.dumps(arguments, indent=2, ensure_ascii=False)}")
 
-        attempt = 0
-        last_error = None
+        # 延迟导入：重试 / 熔断与 provider 共用 backend.app.core.resilience
+        from backend.app.core.resilience import RetryPolicy, resilience
+
+        async def attempt():
+            # 设置超时
+            async with asyncio.timeout(timeout):
+                # 调用工具
+                result = await self.session.call_tool(tool_name, arguments)
+                return await self._collect_result(result)
+
+        try:
+            # 指数退避 + full jitter；超时与连接错误可重试，熔断打开时立即失败
+            return await resilience.call_async("mcp", attempt, RetryPolicy(retry_count, retry_delay))
+        except asyncio.TimeoutError:
+            last_error = f"请求超时（{timeout}秒）"
+            logger.error(last_error)
+            raise TimeoutError(last_error)
+        except MCPClientError:
+            raise
+        except Exception as e:
+            last_error = f"调用工具时发生错误: {e}"
+            logger.error(last_error)
+            logger.exception("详细错误信息")
+            raise MCPClientError(last_error) from e
+
+    @staticmethod
+    async def _collect_result(result) -> Optional[Any]:
+        """把工具返回的内容整理为字符串或字符串列表"""
+        if result.content:
+            # 如果是流式内容
+            if hasattr(result.content, '__aiter__'):
+                full_output = ""
+                async for chunk in result.content:
+                    full_output += str(chunk)
+                    logger.debug(f"收到数据块: {chunk}")
+                return full_output
+
+            # 如果是列表内容
+            elif isinstance(result.content, (list, tuple)):
+                return [str(item) for item in result.content]
+
+            # 其他内容
+            return str(result.content)
 
-        while attempt < retry_count:
-            attempt += 1
-            try:
-                # 设置超时
-                async with asyncio.timeout(timeout):
-                    # 调用工具
-                    result = await self.session.call_tool(tool_name, arguments)
-                    
-                    # 处理结果
-                    if result.content:
-                        # 如果是流式内容
-                        if hasattr(result.content, '__aiter__'):
-                            full_output = ""
-                            async for chunk in result.content:
-                                full_output += str(chunk)
-                                logger.debug(f"收到数据块: {chunk}")
-                            return full_output
-                            
-                        # 如果是列表内容
-                        elif isinstance(result.content, (list, tuple)):
-                            return [str(item) for item in result.content]
-                            
-                        # 其他内容
-                        return str(result.content)
-                        
-                    return None
-
-            except asyncio.TimeoutError:
-                last_error = f"请求超时（{timeout}秒）"
-                logger.error(last_error)
-                if attempt == retry_count:
-                    raise TimeoutError(last_error)
-                
-            except ConnectionError as e:
-                last_error = f"连接错误: {e}"
-                logger.error(last_error)
-                if attempt == retry_count:
-                    raise
-                
-            except Exception as e:
-                last_error = f"调用工具时发生错误: {e}"
-                logger.error(last_error)
-                logger.exception("详细错误信息")
-                if attempt == retry_count:
-                    raise MCPClientError(last_error)
-            
-            # 重试前等待
-            if attempt < retry_count:
-                delay = retry_delay * attempt
-                logger.info(f"第 {attempt} 次重试失败，{delay} 秒后重试...")
-                await asyncio.sleep(delay)
-            
         return None
 
     async def close(self):
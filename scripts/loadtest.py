@@ -0,0 +1,446 @@
+"""HTTP API 压测脚本：按给定并发 / 到达率驱动 ``/api/chat``、流式聊天、``/api/models`` 与 ``/api/export``，
+输出吞吐、延迟分位数、首字延迟与错误率，并保存为 JSON 便于版本间对比。
+
+用法::
+
+    # 自动在子进程中启动后端，上游使用离线 mock provider（见 providers/impl/mock_provider.py）
+    python scripts/loadtest.py --serve --duration 30 --concurrency 50 --output results/load.json
+
+    # 对已运行的服务压测，开环模式下按每秒 200 个请求（泊松到达）发送
+    python scripts/loadtest.py --base-url http://127.0.0.1:8000 --rate 200 --duration 60
+
+    # 与上一版本的结果对比，p99 或错误率退化超过阈值时以非零状态退出
+    python scripts/loadtest.py --serve --compare results/baseline.json --max-regression 0.2
+
+``--mix`` 按权重混合场景，如 ``chat=3,stream=5,models=1,export=1``。
+闭环模式（默认）下每个并发 worker 收到响应后立即发出下一个请求；给出 ``--rate`` 时为开环模式，
+延迟从计划发出时刻算起，客户端排队时间也计入，避免协调遗漏（coordinated omission）低估尾延迟。
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import httpx
+
+ROOT = Path(__file__).resolve().parents[1]
+
+SCENARIOS = ("chat", "stream", "models", "export")
+DEFAULT_MIX = "chat=3,stream=5,models=1,export=1"
+PERCENTILES = (50, 90, 95, 99)
+
+# --serve 时传给后端的默认 mock 上游参数，可被同名环境变量覆盖
+MOCK_ENV = {
+    "MOCK_TTFT_MS": "lognormal:300,0.5",
+    "MOCK_INTER_TOKEN_MS": "normal:20,5",
+    "MOCK_OUTPUT_TOKENS": "uniform:50,200",
+}
+
+
+# ---------------------------------------------------------------------------
+# 统计
+# ---------------------------------------------------------------------------
+
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    """最近秩法分位数；``sorted_values`` 须已排序。"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(values: List[float]) -> Dict[str, Optional[float]]:
+    """延迟样本（秒）汇总为毫秒分位数。"""
+    ordered = sorted(values)
+    summary: Dict[str, Optional[float]] = {
+        f"p{p}_ms": _ms(percentile(ordered, p)) for p in PERCENTILES
+    }
+    summary["mean_ms"] = _ms(sum(ordered) / len(ordered)) if ordered else None
+    summary["max_ms"] = _ms(ordered[-1]) if ordered else None
+    return summary
+
+
+def _out(line: str = "") -> None:
+    sys.stdout.write(line + "\n")
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+class Recorder:
+    """按场景收集每个请求的结果。"""
+
+    def __init__(self, record_from: float = 0.0) -> None:
+        self.samples: Dict[str, List[Dict[str, Any]]] = {name: [] for name in SCENARIOS}
+        # 计划发出时刻早于该时刻（预热期）的请求不计入统计
+        self.record_from = record_from
+
+    def add(self, scenario: str, scheduled: float, ok: bool, error: Optional[str] = None,
+            ttft: Optional[float] = None, chunks: int = 0) -> None:
+        if scheduled >= self.record_from:
+            latency = time.perf_counter() - scheduled
+            self.samples[scenario].append({"latency": latency, "ok": ok, "error": error, "ttft": ttft, "chunks": chunks})
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        scenarios: Dict[str, Any] = {}
+        all_samples: List[Dict[str, Any]] = []
+        for name, samples in self.samples.items():
+            if samples:
+                scenarios[name] = self._report(samples, elapsed)
+                all_samples.extend(samples)
+        return {"overall": self._report(all_samples, elapsed), "scenarios": scenarios}
+
+    @staticmethod
+    def _report(samples: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+        ok = [s for s in samples if s["ok"]]
+        errors: Dict[str, int] = {}
+        for s in samples:
+            if not s["ok"]:
+                errors[s["error"]] = errors.get(s["error"], 0) + 1
+        report: Dict[str, Any] = {
+            "requests": len(samples),
+            "succeeded": len(ok),
+            "error_rate": round(1 - len(ok) / len(samples), 4) if samples else 0.0,
+            "errors": errors,
+            "rps": round(len(ok) / elapsed, 2) if elapsed > 0 else 0.0,
+            "latency": summarize([s["latency"] for s in ok]),
+        }
+        ttfts = [s["ttft"] for s in ok if s["ttft"] is not None]
+        if ttfts:
+            report["ttft"] = summarize(ttfts)
+            report["chunks_per_stream"] = round(sum(s["chunks"] for s in ok) / len(ok), 1)
+        return report
+
+
+# ---------------------------------------------------------------------------
+# 场景
+# ---------------------------------------------------------------------------
+
+
+class Scenarios:
+    """每个场景发出一个请求并把结果交给 :class:`Recorder`。"""
+
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, args: argparse.Namespace) -> None:
+        self.client = client
+        self.recorder = recorder
+        self.args = args
+        self._counter = 0
+
+    def _session_id(self) -> str:
+        self._counter += 1
+        return f"load-{self._counter % self.args.sessions}"
+
+    def _chat_body(self) -> Dict[str, Any]:
+        body: Dict[str, Any] = {
+            "session_id": self._session_id(),
+            "user_message": f"load test message {random.randint(0, 1_000_000)}",
+            "model": self.args.model,
+            "context_window": 4,
+        }
+        if self.args.provider:
+            body["provider"] = self.args.provider
+        return body
+
+    async def run(self, scenario: str, scheduled: float) -> None:
+        try:
+            ttft, chunks = await getattr(self, f"_{scenario}")(scheduled)
+        except httpx.HTTPStatusError as e:
+            self.recorder.add(scenario, scheduled, False, f"http_{e.response.status_code}")
+        except Exception as e:  # noqa: BLE001 - 超时、连接错误等按类型计数
+            self.recorder.add(scenario, scheduled, False, type(e).__name__)
+        else:
+            self.recorder.add(scenario, scheduled, True, ttft=ttft, chunks=chunks)
+
+    async def _chat(self, scheduled: float):
+        response = await self.client.post("/api/chat", json=self._chat_body())
+        response.raise_for_status()
+        return None, 0
+
+    async def _stream(self, scheduled: float):
+        ttft: Optional[float] = None
+        chunks = 0
+        headers = {"Accept": "application/x-ndjson"}
+        async with self.client.stream("POST", "/api/chat/stream", json=self._chat_body(), headers=headers) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                frame = json.loads(line)
+                if "d" in frame:
+                    chunks += 1
+                    if ttft is None:
+                        ttft = time.perf_counter() - scheduled
+                elif frame.get("type") == "error":
+                    raise StreamError(frame.get("error") or "stream_error")
+        return ttft, chunks
+
+    async def _models(self, scheduled: float):
+        params = {"provider": self.args.provider} if self.args.provider else None
+        response = await self.client.get("/api/models", params=params)
+        response.raise_for_status()
+        return None, 0
+
+    async def _export(self, scheduled: float):
+        messages = [
+            {"role": "user", "content": "导出压测：请总结这段对话"},
+            {"role": "assistant", "content": "这是一段用于导出压测的回复。" * 20},
+        ]
+        body = {"messages": messages, "format": self.args.export_format, "title": "loadtest"}
+        response = await self.client.post("/api/export", json=body)
+        response.raise_for_status()
+        await response.aread()
+        return None, 0
+
+
+class StreamError(Exception):
+    """流中返回了 error 帧。"""
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix: Dict[str, float] = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise SystemExit(f"未知场景: {name}（可选 {', '.join(SCENARIOS)}）")
+        mix[name] = float(weight or 1)
+    if not any(w > 0 for w in mix.values()):
+        raise SystemExit("--mix 中至少一个场景的权重需大于 0")
+    return mix
+
+
+# ---------------------------------------------------------------------------
+# 负载生成
+# ---------------------------------------------------------------------------
+
+
+async def run_load(args: argparse.Namespace) -> Dict[str, Any]:
+    mix = parse_mix(args.mix)
+    names, weights = list(mix), list(mix.values())
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    timeout = httpx.Timeout(args.timeout)
+
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=timeout) as client:
+        recorder = Recorder(record_from=time.perf_counter() + args.warmup)
+        scenarios = Scenarios(client, recorder, args)
+        deadline = recorder.record_from + args.duration
+        if args.rate:
+            await _open_loop(scenarios, names, weights, args, deadline)
+        else:
+            await _closed_loop(scenarios, names, weights, args, deadline)
+
+    # 吞吐按计入统计的发出窗口计算
+    result = recorder.report(args.duration)
+    result["meta"] = _meta(args, mix)
+    return result
+
+
+async def _closed_loop(scenarios: Scenarios, names, weights, args, deadline: float) -> None:
+    async def worker() -> None:
+        while time.perf_counter() < deadline:
+            await scenarios.run(random.choices(names, weights)[0], time.perf_counter())
+
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+
+
+def arrival_times(rate: float, start: float, deadline: float, rng: Any = random) -> Iterator[float]:
+    """泊松过程的计划发出时刻：从 ``start`` 起，间隔服从均值 ``1 / rate`` 的指数分布，直到 ``deadline``。"""
+    next_at = start
+    while next_at < deadline:
+        yield next_at
+        next_at += rng.expovariate(rate)
+
+
+async def _open_loop(scenarios: Scenarios, names, weights, args, deadline: float) -> None:
+    """泊松到达；进行中的请求超过 ``--concurrency`` 时新请求在客户端排队，排队时间计入延迟。"""
+    semaphore = asyncio.Semaphore(args.concurrency)
+    tasks = set()
+
+    async def one(scenario: str, scheduled: float) -> None:
+        async with semaphore:
+            await scenarios.run(scenario, scheduled)
+
+    for next_at in arrival_times(args.rate, time.perf_counter(), deadline):
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        task = asyncio.create_task(one(random.choices(names, weights)[0], next_at))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.gather(*tasks)
+
+
+def _meta(args: argparse.Namespace, mix: Dict[str, float]) -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "base_url": args.base_url,
+        "mode": "open" if args.rate else "closed",
+        "concurrency": args.concurrency,
+        "rate": args.rate,
+        "duration": args.duration,
+        "warmup": args.warmup,
+        "mix": mix,
+        "provider": args.provider,
+        "model": args.model,
+        "mock": {key: os.environ.get(key, value) for key, value in MOCK_ENV.items()} if args.serve else None,
+    }
+
+
+# ---------------------------------------------------------------------------
+# 对比与输出
+# ---------------------------------------------------------------------------
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], max_regression: float) -> List[str]:
+    """返回退化项描述：p99 延迟 / 首字延迟增长超过比例，或错误率上升超过 1 个百分点，或吞吐下降超过比例。"""
+    problems = []
+    for name, now in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        for section in ("latency", "ttft"):
+            old = (before.get(section) or {}).get("p99_ms")
+            new = (now.get(section) or {}).get("p99_ms")
+            if old and new and new > old * (1 + max_regression):
+                problems.append(f"{name} {section} p99 {old}ms -> {new}ms")
+        if now["error_rate"] > before["error_rate"] + 0.01:
+            problems.append(f"{name} error_rate {before['error_rate']:.2%} -> {now['error_rate']:.2%}")
+        if before["rps"] and now["rps"] < before["rps"] * (1 - max_regression):
+            problems.append(f"{name} rps {before['rps']} -> {now['rps']}")
+    return problems
+
+
+def print_report(result: Dict[str, Any]) -> None:
+    header = f"{'scenario':<10}{'reqs':>8}{'rps':>10}{'err%':>8}{'p50':>10}{'p90':>10}{'p99':>10}{'ttft p50':>10}{'ttft p99':>10}"
+    _out(header)
+    _out("-" * len(header))
+    rows = list(result["scenarios"].items()) + [("overall", result["overall"])]
+    for name, r in rows:
+        latency, ttft = r["latency"], r.get("ttft") or {}
+        _out(
+            f"{name:<10}{r['requests']:>8}{r['rps']:>10}{r['error_rate'] * 100:>7.2f}%"
+            f"{_fmt(latency['p50_ms']):>10}{_fmt(latency['p90_ms']):>10}{_fmt(latency['p99_ms']):>10}"
+            f"{_fmt(ttft.get('p50_ms')):>10}{_fmt(ttft.get('p99_ms')):>10}"
+        )
+        if r["errors"]:
+            _out(f"{'':<10}errors: {r['errors']}")
+
+
+def _fmt(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.1f}"
+
+
+# ---------------------------------------------------------------------------
+# 本地服务
+# ---------------------------------------------------------------------------
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(args: argparse.Namespace) -> subprocess.Popen:
+    """在子进程中启动后端，默认 provider 为 mock，等待存活检查通过后返回。"""
+    port = _free_port()
+    env = {**MOCK_ENV, **os.environ, "DEFAULT_PROVIDER": args.provider or "mock", "LOG_LEVEL": "WARNING"}
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        cwd=ROOT,
+        env=env,
+    )
+    args.base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"后端启动失败（退出码 {process.returncode}）")
+        try:
+            if httpx.get(f"{args.base_url}/api/health/live", timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise SystemExit("等待后端启动超时")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="LLM Chat API 压测")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000", help="被测服务地址")
+    parser.add_argument("--serve", action="store_true", help="在子进程中启动后端（默认 provider 为 mock）")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"场景权重，默认 {DEFAULT_MIX}")
+    parser.add_argument("--concurrency", type=int, default=20, help="并发 worker 数 / 开环模式下的在途请求上限")
+    parser.add_argument("--rate", type=float, default=0.0, help="开环模式的到达率（请求/秒），0 为闭环模式")
+    parser.add_argument("--duration", type=float, default=30.0, help="计入统计的压测时长（秒）")
+    parser.add_argument("--warmup", type=float, default=3.0, help="预热时长（秒），期间的请求不计入统计")
+    parser.add_argument("--provider", default="mock", help="请求体中的 provider，留空使用服务端默认")
+    parser.add_argument("--model", default="mock-model", help="请求体中的 model")
+    parser.add_argument("--sessions", type=int, default=100, help="轮换使用的会话数")
+    parser.add_argument("--export-format", default="word", choices=("word", "pdf"))
+    parser.add_argument("--timeout", type=float, default=120.0, help="单个请求超时（秒）")
+    parser.add_argument("--seed", type=int, default=None, help="场景选择与到达间隔的随机种子")
+    parser.add_argument("--output", help="结果 JSON 的保存路径")
+    parser.add_argument("--compare", help="作为基线的历史结果 JSON")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="允许的 p99 / 吞吐退化比例")
+    args = parser.parse_args(argv)
+    args.sessions = max(1, args.sessions)
+    args.concurrency = max(1, args.concurrency)
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    if args.seed is not None:
+        random.seed(args.seed)
+    server = start_server(args) if args.serve else None
+    try:
+        result = asyncio.run(run_load(args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    print_report(result)
+    if args.output:
+        path = Path(args.output)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+        _out(f"结果已保存到 {path}")
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        problems = compare(result, baseline, args.max_regression)
+        for problem in problems:
+            _out(f"退化: {problem}")
+        if problems:
+            return 1
+        _out(f"与基线 {args.compare} 相比未发现退化")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())